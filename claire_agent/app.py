@@ -1,76 +1,83 @@
 # claire_agent/app.py
 import streamlit as st
 import datetime
-from typing import List
 
-from langchain.memory import ConversationBufferWindowMemory
-from langchain.schema import HumanMessage, AIMessage, SystemMessage, BaseMessage
-
-# 내부 모듈 import
+# 내부 모듈 import (langchain, chromadb, sentence-transformers를 끌어오는 모듈은 core.startup이 백그라운드에서 import)
 from core.config import (
     DEFAULT_OLLAMA_MODEL_NAME, 
-    CURRENT_LOCATION_STR
-)
-from core.llm_services import (
-    get_chat_llm_instance, 
-    get_ollama_models_available,
-    get_embedding_model # MemorySystem 초기화에 필요할 수 있음 (직접 사용은 X)
+    OLLAMA_WARMUP_ENABLED,
+    STARTUP_BACKGROUND_WARMUP,
+    STARTUP_STATUS_POLL_SEC
 )
-from core.db_services import (
-    init_sqlite_db, 
-    get_rag_vector_store, 
-    get_memory_vector_store
-)
-from core.memory_system import MemorySystem
-from prompts.system_prompts import SYSTEM_PROMPT_CONTENT_TEMPLATE
+from core.model_registry import get_model_registry
+from core.telemetry import get_telemetry
+from core.startup import get_startup_warmup
 
 # --- 0. 애플리케이션 초기 설정 ---
 st.set_page_config(page_title="Claire - 개인 AI 에이전트", layout="wide")
 st.title("Claire 🧠 - Personal AI Agent")
 
-# --- 1. 세션 상태 및 서비스 초기화 ---
-if "app_initialized" not in st.session_state:
-    init_sqlite_db() # SQLite DB 테이블 생성/확인
-    st.session_state.app_initialized = True
-
+# --- 1. 세션 상태 초기화 ---
 if "selected_ollama_model" not in st.session_state:
     st.session_state.selected_ollama_model = DEFAULT_OLLAMA_MODEL_NAME
 if "messages" not in st.session_state: # UI 표시용 메시지 리스트
     st.session_state.messages = [{"role": "assistant", "content": f"안녕하세요! Claire입니다. (모델: {st.session_state.selected_ollama_model})"}]
-if "lc_memory" not in st.session_state: # LangChain 대화 기록용 메모리
-    st.session_state.lc_memory = ConversationBufferWindowMemory(
-        k=7, # 최근 7개 턴 기억 (조정 가능)
-        return_messages=True, 
-        memory_key="history", # 프롬프트의 MessagesPlaceholder와 일치
-        input_key="human_input" # 프롬프트의 HumanMessage content와 일치
-    )
 if "current_session_id" not in st.session_state:
     st.session_state.current_session_id = datetime.datetime.now().strftime("session_%Y%m%d%H%M%S_%f")
 if "user_profile" not in st.session_state:
     st.session_state.user_profile = {"name": "주인님", "preferences_summary": "파악된 사용자 특정 선호 정보 없음."}
 
-# --- 2. 핵심 서비스 인스턴스 로드 (Streamlit 캐싱 활용) ---
-# LLM, 임베딩, 벡터DB는 Streamlit의 cache_resource를 통해 효율적으로 관리
-embedding_model_global = get_embedding_model() # MemorySystem 생성자에 필요
-rag_vector_store_global = get_rag_vector_store()
-memory_vector_store_global = get_memory_vector_store()
+# --- 2. 핵심 서비스 인스턴스 로드 (프로세스 전역 캐시 활용) ---
+# 대화 한 턴의 처리(회상, RAG, 프롬프트 조립, 생성, 장기 기억 통합)는 UI와 무관한 ChatPipeline이 담당하고,
+# 이 앱은 파이프라인 이벤트를 화면에 표시하는 클라이언트 중 하나 (HTTP/SSE 클라이언트는 core/api_server.py 사용)
+# LLM, 임베딩, 벡터DB, 응답 캐시, 통합 작업 큐는 모델별 파이프라인이 프로세스 전역 리소스로 공유
+# 콜드 스타트 시에는 화면을 먼저 그리고, SQLite 초기화/임베딩 모델/벡터DB/파이프라인은 백그라운드 웜업이 로드 (준비 전에는 채팅 입력 비활성)
+startup_warmup = get_startup_warmup(st.session_state.selected_ollama_model)
+if not STARTUP_BACKGROUND_WARMUP and not startup_warmup.ready:
+    with st.spinner("Claire를 준비하는 중입니다..."):
+        startup_warmup.wait()
 
-# 현재 선택된 모델에 따라 ChatOllama 인스턴스 가져오기
-# 이 인스턴스는 채팅 응답 생성 및 메모리 요약에 사용됩니다.
-current_chat_llm = get_chat_llm_instance(st.session_state.selected_ollama_model)
+chat_pipeline = None
+if startup_warmup.ready:
+    from core.chat_pipeline import ChatSession, get_chat_pipeline # 웜업이 이미 import/생성했으므로 바로 반환
+    from core.ollama_client import get_endpoint_pool
+    chat_pipeline = get_chat_pipeline(st.session_state.selected_ollama_model)
+    if OLLAMA_WARMUP_ENABLED: # 첫 질문이 모델 로드 시간을 기다리지 않도록 백그라운드에서 미리 로드 (최근에 올렸으면 건너뜀)
+        get_endpoint_pool().warm_up(st.session_state.selected_ollama_model)
 
-# MemorySystem 인스턴스 (LLM, 임베딩, 메모리 VDB 전달)
-memory_system_instance = MemorySystem(
-    llm_for_summarization=current_chat_llm, # 채팅 LLM을 요약에도 사용
-    embedding_instance=embedding_model_global,
-    memory_vdb_instance=memory_vector_store_global
-)
+memory_system_instance = chat_pipeline.memory_system if chat_pipeline is not None else None # 사이드바의 수동 저장, 피드백, 유지보수에 사용
+consolidation_worker = chat_pipeline.consolidation_worker if chat_pipeline is not None else None # 자동 장기 기억 저장은 백그라운드 작업 큐에서 처리 (응답 직후 사용자 대기 없음)
+response_cache = chat_pipeline.response_cache if chat_pipeline is not None else None # RESPONSE_CACHE_ENABLED일 때만 존재 (전 세션 공유)
+
+def show_startup_progress():
+    """백그라운드 웜업 진행 상황을 표시하고, 준비가 끝나면 전체 화면을 다시 그려 채팅을 활성화합니다."""
+    startup_report = startup_warmup.report()
+    if startup_report.ready:
+        st.rerun()
+    if startup_report.error:
+        st.error(f"서비스를 준비하지 못했습니다. {startup_report.summary()}")
+        if st.button("다시 시도", key="startup_retry_button_app"):
+            startup_warmup.start()
+            st.rerun()
+        return
+    st.progress(startup_report.progress, text=startup_report.summary())
+
+def show_consolidation_results():
+    """백그라운드 자동 저장 작업의 완료 결과를 토스트로 알립니다."""
+    for result in consolidation_worker.poll_results(st.session_state.current_session_id):
+        if result.succeeded:
+            st.toast(f"대화 내용이 자동으로 장기 기억에 저장되었습니다 (ID: {result.entry.id}).", icon="💾")
+        else:
+            st.toast("자동 장기 기억 저장에 실패했습니다.", icon="⚠️")
+    if consolidation_worker.is_busy(st.session_state.current_session_id):
+        st.caption("💾 장기 기억 자동 저장 진행 중...")
 
 # --- 3. 사이드바 UI 구성 ---
 with st.sidebar:
     st.header("🤖 모델 및 시스템 설정")
     
-    available_ollama_models = get_ollama_models_available()
+    # 모델 목록은 레지스트리에서 바로 조회 (llm_services/langchain import 없이 사이드바를 먼저 표시)
+    available_ollama_models = get_model_registry().list_models() or [DEFAULT_OLLAMA_MODEL_NAME]
     # 현재 선택된 모델이 목록에 없으면 첫 번째 모델을 기본값으로 사용
     try:
         current_model_index = available_ollama_models.index(st.session_state.selected_ollama_model)
@@ -92,15 +99,22 @@ with st.sidebar:
 
     if newly_selected_model != st.session_state.selected_ollama_model:
         st.session_state.selected_ollama_model = newly_selected_model
-        # 모델 변경 시 관련 캐시된 리소스 초기화
-        get_chat_llm_instance.clear() 
-        # MemorySystem은 내부적으로 LLM을 사용하므로, LLM이 바뀌면 MemorySystem도 다시 만들어야 함
-        # 하지만 @st.cache_resource는 인자가 바뀌면 자동으로 재생성하므로 명시적 clear 불필요할 수 있음
-        # 여기서는 명확성을 위해 호출 (get_memory_system_instance는 인자로 llm을 받음)
+        if chat_pipeline is not None: # 웜업이 끝나 LLM/파이프라인이 만들어진 경우에만 캐시 초기화 (준비 중이면 새 모델의 웜업이 만듦)
+            from core.llm_services import get_chat_llm_instance
+            # 모델 변경 시 관련 캐시된 리소스 초기화
+            get_chat_llm_instance.clear() 
+            # 파이프라인(MemorySystem 포함)은 내부적으로 LLM을 사용하므로 함께 다시 만듦
+            get_chat_pipeline.clear()
         st.success(f"모델이 {newly_selected_model}로 변경되었습니다. 페이지를 새로고침합니다.")
         st.rerun() # 변경사항 적용 및 LLM 인스턴스 재생성을 위해 페이지 새로고침
 
     st.markdown(f"<sub>현재 LLM: **{st.session_state.selected_ollama_model}**</sub>", unsafe_allow_html=True)
+    selected_model_info = get_model_registry().get_model_info(st.session_state.selected_ollama_model)
+    if selected_model_info and selected_model_info.summary():
+        st.caption(selected_model_info.summary())
+    if st.button("모델 목록 새로고침", key="refresh_models_button_sidebar_app"):
+        get_model_registry().refresh()
+        st.rerun()
 
     with st.expander("⚙️ 사용자 프로필 및 기억 관리", expanded=False):
         st.subheader("사용자 프로필")
@@ -130,7 +144,7 @@ with st.sidebar:
             help="AI 요약 대신 직접 요약 입력 시 사용합니다."
         )
 
-        if st.button("현재 대화 요약 저장 (수동)", key="save_summary_button_sidebar_app"):
+        if st.button("현재 대화 요약 저장 (수동)", key="save_summary_button_sidebar_app", disabled=memory_system_instance is None):
             conversation_history_for_summary = "\n".join(
                 [f"{m['role']}: {m['content']}" for m in st.session_state.messages if m['role'] != 'system']
             )
@@ -163,7 +177,7 @@ with st.sidebar:
         new_importance_for_feedback = st.slider("새로운 중요도 점수:", 0.0, 1.0, 0.5, 0.05, key="fb_imp_sidebar_app")
         # new_summary_for_feedback = st.text_area("수정된 요약 (선택):", height=80, key="fb_summary_sidebar_app") # 향후 확장 가능
 
-        if st.button("선택한 기억에 피드백 적용", key="fb_apply_sidebar_app"):
+        if st.button("선택한 기억에 피드백 적용", key="fb_apply_sidebar_app", disabled=memory_system_instance is None):
             if memory_id_for_feedback:
                 feedback_success = memory_system_instance.apply_user_feedback_to_memory(
                     memory_sqlite_id=memory_id_for_feedback,
@@ -177,16 +191,60 @@ with st.sidebar:
             else:
                 st.warning("피드백할 기억 ID를 입력하세요.")
 
-        if st.button("주기적 기억 유지보수 실행", key="maint_button_sidebar_app"):
+        if st.button("주기적 기억 유지보수 실행", key="maint_button_sidebar_app", disabled=memory_system_instance is None):
             with st.spinner("기억 유지보수 작업 진행 중..."):
-                memory_system_instance.periodic_memory_maintenance()
-            st.success("기억 유지보수 작업이 완료되었습니다.")
+                maintenance_report = memory_system_instance.periodic_memory_maintenance()
+            if maintenance_report.completed:
+                st.success(f"기억 유지보수 작업이 완료되었습니다. ({maintenance_report.summary()})")
+            else:
+                st.warning(f"기억 유지보수 작업이 일부만 진행되었습니다. ({maintenance_report.summary()})")
     
     st.caption(f"현재 세션 ID: {st.session_state.current_session_id}")
+    if "last_prompt_stats" in st.session_state: # 직전 응답의 프롬프트 토큰 사용량
+        st.caption(st.session_state.last_prompt_stats)
+    if response_cache is not None:
+        cache_stats = response_cache.stats()
+        st.caption(f"응답 캐시: {cache_stats['entries']}개 저장, 적중률 {cache_stats['hit_rate']:.0%} ({cache_stats['hits']}/{cache_stats['hits'] + cache_stats['misses']})")
+    with st.expander("⏱️ 최근 턴 단계별 소요 시간", expanded=False):
+        recent_turns = get_telemetry().recent_traces(limit=10, name="chat_turn", session_id=st.session_state.current_session_id)
+        if recent_turns:
+            turn_rows = []
+            for trace in recent_turns:
+                stage_ms = {}
+                for span in trace["spans"]: # 같은 단계가 여러 번이면 첫 span 기준
+                    stage_ms.setdefault(span["name"], span["duration_ms"])
+                generation_attrs = next((span["attributes"] for span in trace["spans"] if span["name"] == "generation"), {})
+                turn_rows.append({
+                    "시각": trace["started_at"][11:19],
+                    "전체(ms)": trace["duration_ms"],
+                    "임베딩": stage_ms.get("embedding"),
+                    "기억 검색": stage_ms.get("ltm_recall"),
+                    "RAG": stage_ms.get("rag_search"),
+                    "프롬프트": stage_ms.get("prompt_build"),
+                    "TTFT": generation_attrs.get("ttft_ms"),
+                    "토큰/초": generation_attrs.get("tokens_per_sec"),
+                    "결과": trace["attributes"].get("outcome", "")
+                })
+            st.dataframe(turn_rows, hide_index=True, use_container_width=True)
+        else:
+            st.caption("아직 기록된 대화 턴이 없습니다.")
+    with st.expander("🚀 시작 단계별 소요 시간", expanded=False):
+        startup_report = startup_warmup.report()
+        st.caption(startup_report.summary())
+        st.dataframe([
+            {"단계": step.label, "상태": step.status, "소요(초)": round(step.duration_sec, 2)} for step in startup_report.steps
+        ], hide_index=True, use_container_width=True)
+        if startup_report.ready:
+            from core.db_services import get_rag_sync_status
+            st.caption(get_rag_sync_status().summary())
+    if consolidation_worker is not None:
+        if hasattr(st, "fragment"): # 지원되는 Streamlit 버전에서는 주기적으로 완료 여부를 확인
+            st.fragment(run_every=2)(show_consolidation_results)()
+        else:
+            show_consolidation_results()
     st.markdown("---")
     if st.button("현재 대화창 내용 지우기 (단기 기억 초기화)", key="clear_chat_button_sidebar_app"):
         st.session_state.messages = [{"role": "assistant", "content": f"Claire입니다. (모델: {st.session_state.selected_ollama_model})"}]
-        st.session_state.lc_memory.clear() # LangChain 메모리도 초기화
         # 새 세션 ID 부여 (선택 사항)
         # st.session_state.current_session_id = datetime.datetime.now().strftime("session_%Y%m%d%H%M%S_%f")
         st.rerun()
@@ -197,12 +255,27 @@ for message in st.session_state.messages:
     with st.chat_message(message["role"]):
         st.markdown(message["content"])
 
+if chat_pipeline is None: # 준비 중 상태 표시 (이전 대화와 사이드바는 그대로 사용 가능)
+    if hasattr(st, "fragment"):
+        st.fragment(run_every=STARTUP_STATUS_POLL_SEC)(show_startup_progress)()
+    else:
+        show_startup_progress()
+        if not startup_warmup.report().error:
+            st.button("준비 상태 새로고침", key="startup_refresh_button_app")
+
 # 사용자 입력 처리
-if user_query := st.chat_input("Claire에게 메시지를 보내세요..."):
-    st.session_state.messages.append({"role": "user", "content": user_query})
+if user_query := st.chat_input("Claire에게 메시지를 보내세요...", disabled=chat_pipeline is None):
     with st.chat_message("user"):
         st.markdown(user_query)
 
+    # 세션 상태의 메시지 리스트와 프로필을 그대로 공유 (파이프라인이 추가한 사용자/답변 메시지가 곧 다음 턴의 대화 기록)
+    chat_session = ChatSession(
+        session_id=st.session_state.current_session_id,
+        messages=st.session_state.messages,
+        user_profile=st.session_state.user_profile,
+        auto_save=st.session_state.get("auto_save_ltm_checkbox", False) # 매 응답 후 자동 장기 기억 저장
+    )
+
     # AI 응답 생성
     with st.chat_message("assistant"):
         progress_bar = st.progress(0, text="Claire가 생각 중입니다...")
@@ -210,103 +283,25 @@ if user_query := st.chat_input("Claire에게 메시지를 보내세요..."):
         assistant_response_final = ""
         
         try:
-            # 1. 장기 기억 회상 (MemorySystem 사용)
-            progress_bar.progress(10, text="과거 기억을 회상하는 중...")
-            recalled_long_term_memories = memory_system_instance.retrieve_relevant_memories(user_query, top_k=1)
-            recalled_ltm_str_for_prompt = "\n".join(
-                [f"- (ID:{mem.id}, 중요도:{mem.user_importance_score:.2f}) {mem.summary}" for mem in recalled_long_term_memories]
-            ) if recalled_long_term_memories else "회상된 주요 과거 대화 없음."
-
-            # 2. RAG 문서 검색 (VectorStoreRetriever 사용)
-            progress_bar.progress(30, text="관련 정보를 검색하는 중 (RAG)...")
-            rag_context_str_for_prompt = ""
-            if rag_vector_store_global: # RAG 벡터 스토어가 성공적으로 로드되었는지 확인
-                try:
-                    rag_retriever = rag_vector_store_global.as_retriever(search_kwargs={"k": 2}) # 상위 2개 문서 검색
-                    retrieved_rag_documents = rag_retriever.invoke(user_query)
-                    rag_context_str_for_prompt = "\n\n".join(
-                        [f"문서 출처: {doc.metadata.get('source', '알 수 없음')}\n내용: {doc.page_content[:250]}..." for doc in retrieved_rag_documents]
-                    ) if retrieved_rag_documents else "현재 질의와 관련된 외부 참조 정보 없음."
-                except Exception as e_rag:
-                    st.warning(f"RAG 검색 중 오류 발생: {e_rag}")
-                    rag_context_str_for_prompt = "RAG 정보 검색에 실패했습니다."
-            else:
-                rag_context_str_for_prompt = "RAG 기능이 활성화되지 않았습니다 (벡터 스토어 로드 실패)."
-
-            # 3. LLM에 전달할 최종 프롬프트 구성
-            progress_bar.progress(50, text="AI에게 전달할 정보를 종합하는 중...")
-            current_time_for_prompt = datetime.datetime.now().strftime("%Y년 %m월 %d일 %A %p %I:%M")
-            
-            # 시스템 프롬프트 내용 포매팅
-            # str()로 감싸서 None일 경우 "None" 문자열이 들어가지 않도록 방지 (특히 recalled_ltm_str, rag_context_str)
-            formatted_system_content = SYSTEM_PROMPT_CONTENT_TEMPLATE.format(
-                current_datetime=str(current_time_for_prompt),
-                current_location=str(CURRENT_LOCATION_STR),
-                user_name=str(st.session_state.user_profile.get("name", "사용자")),
-                user_profile_summary=str(st.session_state.user_profile.get("preferences_summary", "정보 없음")),
-                recalled_ltm_str=str(recalled_ltm_str_for_prompt),
-                rag_context_str=str(rag_context_str_for_prompt)
-            )
-            system_message_object = SystemMessage(content=formatted_system_content)
-
-            # LangChain 메모리에서 이전 대화 기록 가져오기
-            short_term_memory_messages: List[BaseMessage] = st.session_state.lc_memory.chat_memory.messages
-            
-            # 현재 사용자 입력 메시지 객체
-            human_message_object = HumanMessage(content=user_query)
-
-            # LLM에 전달할 전체 메시지 리스트
-            # 순서: 시스템 메시지 -> 단기 기억(과거 대화) -> 현재 사용자 입력
-            final_messages_for_llm: List[BaseMessage] = [system_message_object] + short_term_memory_messages + [human_message_object]
-            
-            # --- 디버깅용 프린트 (필요시 주석 해제) ---
-            # print("\n--- DEBUG: 최종 메시지 리스트 (LLM 전달 직전) ---")
-            # for i, msg_obj in enumerate(final_messages_for_llm):
-            #     print(f"Msg {i}: type={type(msg_obj).__name__}, content='{msg_obj.content[:200]}...'")
-            # print("--- END DEBUG ---")
-            # --- 디버깅용 프린트 끝 ---
-
-            # 4. ChatOllama 스트리밍 호출
-            progress_bar.progress(70, text="Claire가 답변을 생성하는 중...")
-            
-            stream_from_llm = current_chat_llm.stream(final_messages_for_llm) # ChatOllama의 stream 메서드 사용
-            for chunk in stream_from_llm: # chunk는 AIMessageChunk 객체
-                assistant_response_final += chunk.content
-                response_placeholder.markdown(assistant_response_final + "▌") # 타이핑 효과
-            
+            for event in chat_pipeline.stream_turn(chat_session, user_query):
+                if event.type == "status":
+                    progress_bar.progress(event.data["progress"], text=event.data["text"])
+                elif event.type == "warning":
+                    st.warning(event.data["message"])
+                elif event.type == "token":
+                    assistant_response_final += event.data["text"]
+                    response_placeholder.markdown(assistant_response_final + "▌") # 타이핑 효과
+                elif event.type == "error":
+                    st.error(event.data["message"])
+                elif event.type == "done":
+                    assistant_response_final = event.data["response"]
+                    if event.data["prompt_stats"]: # 직전 응답의 프롬프트 토큰 사용량 (또는 캐시 적중 정보)
+                        st.session_state.last_prompt_stats = event.data["prompt_stats"]
+                    if event.data["consolidation_job_id"] is not None: # 완료 알림은 사이드바에서 표시
+                        print(f"Queued LTM auto-save for session: {st.session_state.current_session_id}")
             response_placeholder.markdown(assistant_response_final) # 최종 응답 표시
-
-        except Exception as e_main_chat:
-            st.error(f"AI 응답 생성 중 오류 발생: {e_main_chat}")
-            # traceback.print_exc() # 개발 시 상세 오류 확인용
-            assistant_response_final = "죄송합니다, 답변을 생성하는 중 예상치 못한 오류가 발생했습니다."
-            response_placeholder.markdown(assistant_response_final)
         
         finally:
             progress_bar.empty() # 진행 표시줄 제거
 
-    # UI 메시지 리스트 및 LangChain 메모리에 AI 응답 추가
-    st.session_state.messages.append({"role": "assistant", "content": assistant_response_final})
-    st.session_state.lc_memory.save_context(
-        {"human_input": user_query}, # LangChain 메모리의 input_key
-        {"output": assistant_response_final} # LangChain 메모리의 output_key (기본값)
-    )
-
-    # 자동 장기 기억 저장 기능 (활성화된 경우)
-    if st.session_state.get("auto_save_ltm_checkbox", False):
-        with st.spinner("자동 장기 기억 저장 중 (LLM 요약 사용)..."):
-            # 현재까지의 전체 대화 내용을 기반으로 요약 (st.session_state.messages 사용)
-            current_conversation_history_for_auto_save = "\n".join(
-                [f"{m['role']}: {m['content']}" for m in st.session_state.messages if m['role'] != 'system']
-            )
-            if current_conversation_history_for_auto_save.strip():
-                print(f"Auto-saving LTM for session: {st.session_state.current_session_id}")
-                auto_saved_entry = memory_system_instance.consolidate_session_memory(
-                    session_id=st.session_state.current_session_id, # 현재 세션 ID 사용
-                    conversation_history_str=current_conversation_history_for_auto_save,
-                    use_llm_summary=True # 자동 저장은 항상 LLM 요약 사용 (또는 다른 규칙 적용 가능)
-                )
-                if auto_saved_entry:
-                    st.toast(f"대화 내용이 자동으로 장기 기억에 저장되었습니다 (ID: {auto_saved_entry.id}).", icon="💾")
-                else:
-                    st.toast("자동 장기 기억 저장에 실패했습니다.", icon="⚠️")
\ No newline at end of file
+startup_warmup.mark_ui_ready() # 첫 화면 표시 시점 기록 (시작 단계별 소요 시간에 표시)
@@ -0,0 +1,158 @@
+# claire_agent/benchmarks/fake_ollama.py
+"""
+벤치마크/부하 테스트용 로컬 Ollama 대역 서버.
+
+실제 모델 없이 Ollama HTTP API(/api/tags, /api/show, /api/chat)를 흉내 내며, 응답 지연을 설정으로 조절합니다.
+- ttft_ms: 요청을 받은 뒤 첫 토큰까지의 지연 (프롬프트 처리 시간)
+- tokens_per_sec: 이후 토큰 생성 속도
+- max_parallel: 동시에 생성하는 요청 수 (Ollama의 OLLAMA_NUM_PARALLEL처럼 넘는 요청은 대기)
+/api/chat은 실제 Ollama와 같이 chunked 전송의 NDJSON 스트림으로 응답하므로 커넥션 재사용까지 그대로 측정됩니다.
+
+단독 실행 (claire_agent 디렉토리에서):
+    python -m benchmarks.fake_ollama --port 11434 --tokens-per-sec 40 --ttft-ms 200
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+
+class FakeOllamaServer:
+    def __init__(self, model_names: Optional[List[str]] = None, tokens_per_sec: float = 50.0, ttft_ms: float = 150.0,
+                 response_tokens: int = 60, max_parallel: int = 4, context_length: int = 8192,
+                 host: str = "127.0.0.1", port: int = 0):
+        self.model_names = model_names or ["gemma3:4b"]
+        self.tokens_per_sec = tokens_per_sec
+        self.ttft_ms = ttft_ms
+        self.response_tokens = response_tokens
+        self.context_length = context_length
+        self._slots = threading.Semaphore(max(1, max_parallel))
+        self._lock = threading.Lock()
+        self.chat_requests = 0
+        self.prompt_chars = 0 # 누적 프롬프트 길이 (글자)
+        self.last_chat_request: Optional[dict] = None # 마지막 /api/chat 요청 본문 (클라이언트 요청 형식 확인용)
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeOllamaServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-ollama", daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"chat_requests": self.chat_requests, "prompt_chars": self.prompt_chars}
+
+    def _make_handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1" # keep-alive
+
+            def log_message(self, format, *args): # 요청마다 로그를 찍지 않음
+                pass
+
+            def _send_json(self, payload: dict, status: int = 200):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _read_json(self) -> dict:
+                length = int(self.headers.get("Content-Length", "0"))
+                return json.loads(self.rfile.read(length) or b"{}")
+
+            def _write_chunk(self, payload: dict):
+                line = json.dumps(payload, ensure_ascii=False).encode("utf-8") + b"\n"
+                self.wfile.write(f"{len(line):X}\r\n".encode("ascii") + line + b"\r\n")
+                self.wfile.flush()
+
+            def do_GET(self):
+                if self.path != "/api/tags":
+                    self._send_json({"error": "not found"}, 404)
+                    return
+                self._send_json({"models": [
+                    {"name": name, "model": name, "size": 3 * 1024 ** 3, "digest": f"fake-{name}", "modified_at": "",
+                     "details": {"family": "fake", "parameter_size": "4B", "quantization_level": "Q4_K_M"}}
+                    for name in fake.model_names
+                ]})
+
+            def do_POST(self):
+                body = self._read_json()
+                if self.path == "/api/show":
+                    self._send_json({"model_info": {"general.architecture": "fake", "fake.context_length": fake.context_length},
+                                     "parameters": ""})
+                elif self.path == "/api/chat":
+                    self._chat(body)
+                else:
+                    self._send_json({"error": "not found"}, 404)
+
+            def _chat(self, body: dict):
+                model = body.get("model", "")
+                with fake._lock:
+                    fake.last_chat_request = body
+                if model not in fake.model_names:
+                    self._send_json({"error": f"model '{model}' not found"}, 404)
+                    return
+                messages = body.get("messages") or []
+                if not messages: # 웜업 요청: 모델 로드만 하고 바로 응답
+                    self._send_json({"model": model, "done": True, "done_reason": "load"})
+                    return
+                prompt_chars = sum(len(message.get("content", "")) for message in messages)
+                with fake._lock:
+                    fake.chat_requests += 1
+                    fake.prompt_chars += prompt_chars
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                with fake._slots:
+                    time.sleep(fake.ttft_ms / 1000)
+                    interval = 1.0 / fake.tokens_per_sec if fake.tokens_per_sec > 0 else 0.0
+                    for index in range(fake.response_tokens):
+                        if index and interval:
+                            time.sleep(interval)
+                        self._write_chunk({"model": model, "message": {"role": "assistant", "content": f"토큰{index} "}, "done": False})
+                self._write_chunk({"model": model, "message": {"role": "assistant", "content": ""}, "done": True,
+                                   "done_reason": "stop", "prompt_eval_count": prompt_chars // 4, "eval_count": fake.response_tokens})
+                self.wfile.write(b"0\r\n\r\n")
+                self.wfile.flush()
+
+        return Handler
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local stand-in for the Ollama HTTP API with configurable latency.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--model", action="append", help="Model name to advertise (repeatable).")
+    parser.add_argument("--tokens-per-sec", type=float, default=50.0)
+    parser.add_argument("--ttft-ms", type=float, default=150.0)
+    parser.add_argument("--response-tokens", type=int, default=60)
+    parser.add_argument("--max-parallel", type=int, default=4)
+    args = parser.parse_args()
+
+    server = FakeOllamaServer(model_names=args.model, tokens_per_sec=args.tokens_per_sec, ttft_ms=args.ttft_ms,
+                              response_tokens=args.response_tokens, max_parallel=args.max_parallel,
+                              host=args.host, port=args.port).start()
+    print(f"Fake Ollama listening on {server.url} (models: {', '.join(server.model_names)})")
+    try:
+        server._thread.join()
+    except KeyboardInterrupt:
+        server.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,379 @@
+# claire_agent/benchmarks/pipeline_load.py
+"""
+대화 파이프라인 종단 간(end-to-end) 벤치마크 및 부하 테스트.
+
+앱과 같은 ChatPipeline(장기 기억 회상 + RAG 검색 -> 프롬프트 조립 -> 스트리밍 생성)과 consolidate_session_memory를
+로컬 Ollama 대역 서버(benchmarks/fake_ollama.py)에 대해 실행합니다. 실제 DB 대신 임시 폴더에 합성 기억/RAG 코퍼스를 만들므로
+claire_memory.db와 vector_dbs는 건드리지 않습니다.
+- 단계별 지연 p50/p95/p99 (임베딩, 기억 검색, RAG 검색, 프롬프트 조립, 첫 토큰, 생성, 통합)
+- 동시 세션 수별 처리량 (턴/초)과 메모리 사용량 (RSS, 디스크 DB 크기)
+- 기억 수를 늘려 가며 반복 실행하여 DB 증가에 따른 성능 저하를 확인하고, --baseline 결과보다 p95가 나빠지면 exit 1
+
+실행 (claire_agent 디렉토리에서):
+    python -m benchmarks.pipeline_load --memories 1000,10000 --rag-chunks 2000 --concurrency 1,4,16 --turns 3
+    python -m benchmarks.pipeline_load --json bench.json
+    python -m benchmarks.pipeline_load --baseline bench.json --max-regression 0.25
+    python -m benchmarks.pipeline_load --ollama-url http://localhost:11434   # 대역 서버 대신 실제 Ollama
+"""
+import argparse
+import datetime
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import uuid
+import zlib
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from benchmarks.fake_ollama import FakeOllamaServer
+
+try:
+    import resource # Unix 전용 (최대 RSS)
+except ImportError:
+    resource = None
+
+STAGES = ["retrieval_embedding", "retrieval_ltm", "retrieval_rag", "retrieval_total", "prompt", "ttft", "generation", "total", "consolidate"]
+TOPICS = ["여행", "예산", "커피", "등산", "운동", "독서", "프로젝트", "회의", "가족", "건강", "요리", "음악", "영화", "이사", "공부", "반려동물"]
+
+class HashingEmbeddings(Embeddings):
+    """단어 해시 기반의 결정적 임베딩. 모델 로드 없이 검색 경로(벡터DB, SQLite, 재정렬)의 비용만 측정할 때 사용합니다."""
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for word in text.split():
+            vector[zlib.crc32(word.encode("utf-8")) % self.dim] += 1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm > 0 else vector).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+def _percentile_ms(samples: List[float], q: float) -> float:
+    return float(np.percentile(samples, q) * 1000) if samples else float("nan")
+
+def _current_rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 ** 2
+    except (OSError, ValueError, AttributeError):
+        return float("nan")
+
+def _peak_rss_mb() -> float:
+    if resource is None:
+        return float("nan")
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024 # macOS는 바이트, Linux는 KB
+
+def _dir_size_mb(path: str) -> float:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total / 1024 ** 2
+
+@dataclass
+class LoadLevelResult:
+    memories: int
+    concurrency: int
+    turns: int
+    wall_sec: float
+    errors: int
+    stage_samples: Dict[str, List[float]] = field(default_factory=dict) # 단계 -> 소요 시간 (초)
+    rss_mb: float = 0.0
+    peak_rss_mb: float = 0.0
+    db_mb: float = 0.0
+
+    @property
+    def completed_turns(self) -> int:
+        return len(self.stage_samples.get("total", []))
+
+    @property
+    def turns_per_sec(self) -> float:
+        return self.completed_turns / self.wall_sec if self.wall_sec > 0 else 0.0
+
+    def percentiles(self) -> Dict[str, Dict[str, float]]:
+        return {
+            stage: {"p50": _percentile_ms(samples, 50), "p95": _percentile_ms(samples, 95), "p99": _percentile_ms(samples, 99), "count": len(samples)}
+            for stage, samples in self.stage_samples.items()
+        }
+
+    def summary(self) -> str:
+        return (f"기억 {self.memories}개, 동시 세션 {self.concurrency}: {self.completed_turns}턴/{self.wall_sec:.2f}초 "
+                f"({self.turns_per_sec:.2f}턴/초), 오류 {self.errors}, RSS {self.rss_mb:.0f}MB (최대 {self.peak_rss_mb:.0f}MB), DB {self.db_mb:.1f}MB")
+
+    def to_dict(self) -> dict:
+        return {
+            "memories": self.memories, "concurrency": self.concurrency, "turns": self.turns, "wall_sec": self.wall_sec,
+            "errors": self.errors, "completed_turns": self.completed_turns, "turns_per_sec": self.turns_per_sec,
+            "rss_mb": self.rss_mb, "peak_rss_mb": self.peak_rss_mb, "db_mb": self.db_mb, "stages_ms": self.percentiles()
+        }
+
+class BenchmarkWorkspace:
+    """임시 폴더에 SQLite DB, 기억/RAG 벡터DB를 만들고 합성 코퍼스를 채웁니다 (운영 DB와 분리)."""
+
+    def __init__(self, root: str, embedding_model, seed: int = 0, vector_backend: str = "chroma"):
+        from langchain_community.vectorstores import Chroma
+        from core.db_services import init_sqlite_db
+        from core.vector_backends import ChromaMemoryBackend, NumpyMemoryBackend
+        from core.sqlite_storage import get_sqlite_pool
+        from core.access_tracker import MemoryAccessTracker
+        from core.vector_sync import VectorSyncJournal
+
+        self.root = root
+        self.rng = random.Random(seed)
+        db_path = os.path.join(root, "bench_memory.db")
+        init_sqlite_db(db_path)
+        self.sqlite_pool = get_sqlite_pool(db_path)
+        self.embedding_model = embedding_model
+        if vector_backend == "numpy":
+            self.memory_vdb = NumpyMemoryBackend(os.path.join(root, "numpy_memory"), embedding_model, sqlite_pool=self.sqlite_pool)
+        else:
+            self.memory_vdb = ChromaMemoryBackend(Chroma(persist_directory=os.path.join(root, "chroma_memory"), embedding_function=embedding_model))
+        self.rag_vdb = Chroma(persist_directory=os.path.join(root, "chroma_rag"), embedding_function=embedding_model)
+        self.access_tracker = MemoryAccessTracker(self.sqlite_pool)
+        self.vector_journal = VectorSyncJournal(self.sqlite_pool, self.memory_vdb)
+        self.memory_count = 0
+        self.rag_chunk_count = 0
+
+    def _topics(self, count: int = 2) -> List[str]:
+        return self.rng.sample(TOPICS, count)
+
+    def add_memories(self, count: int, batch_size: int = 1000):
+        """합성 대화 요약 count개를 앱과 같은 경로(SQLite 트랜잭션 + outbox -> 벡터DB 반영)로 추가합니다."""
+        now = datetime.datetime.now()
+        for batch_start in range(0, count, batch_size):
+            with self.sqlite_pool.transaction() as conn:
+                memory_ids = []
+                for index in range(self.memory_count + batch_start, self.memory_count + min(count, batch_start + batch_size)):
+                    first, second = self._topics()
+                    created = (now - datetime.timedelta(days=self.rng.uniform(0, 365))).isoformat()
+                    summary = f"{first}와 {second}에 대한 대화 {index}: 사용자는 {first} 계획을 {self.rng.randint(1, 9)}번 언급했고 {second} 관련 선호를 공유함."
+                    memory_id = conn.execute(
+                        """INSERT INTO long_term_memories (session_id, summary, keywords, full_conversation_snippet,
+                           creation_time, last_accessed_time, access_count, user_importance_score) VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                        (f"bench_session_{index % 500}", summary, json.dumps([first, second], ensure_ascii=False),
+                         f"user: {first} 얘기\nassistant: {second} 얘기", created, created, self.rng.randint(0, 5), self.rng.uniform(0.2, 0.9))
+                    ).lastrowid
+                    conn.execute("UPDATE long_term_memories SET vector_id = ? WHERE id = ?", (str(memory_id), memory_id))
+                    memory_ids.append(memory_id)
+                self.vector_journal.enqueue(conn, memory_ids)
+            self.vector_journal.replay()
+        self.memory_count += count
+
+    def add_rag_chunks(self, count: int, batch_size: int = 500):
+        for batch_start in range(0, count, batch_size):
+            indices = range(self.rag_chunk_count + batch_start, self.rag_chunk_count + min(count, batch_start + batch_size))
+            texts = [" ".join(f"{topic} 관련 참고 문서 {index}번 문단입니다." for topic in self._topics(4)) * 6 for index in indices]
+            self.rag_vdb.add_texts(
+                texts, ids=[f"bench_chunk_{index}" for index in indices],
+                metadatas=[{"source": f"bench_doc_{index // 20}.md", "chunk_index": index % 20} for index in indices]
+            )
+        self.rag_chunk_count += count
+
+    def disk_mb(self) -> float:
+        return _dir_size_mb(self.root)
+
+    def close(self):
+        self.access_tracker.close()
+        self.vector_journal.close()
+
+def build_pipeline(workspace: BenchmarkWorkspace, model_name: str):
+    from core.llm_services import build_chat_llm
+    from core.memory_system import MemorySystem
+    from core.chat_pipeline import ChatPipeline
+
+    llm = build_chat_llm(model_name)
+    return ChatPipeline(
+        model_name=model_name,
+        llm=llm,
+        memory_system=MemorySystem(
+            llm_for_summarization=llm,
+            embedding_instance=workspace.embedding_model,
+            memory_vdb_instance=workspace.memory_vdb,
+            sqlite_pool=workspace.sqlite_pool,
+            access_tracker=workspace.access_tracker,
+            vector_journal=workspace.vector_journal
+        ),
+        rag_vector_store=workspace.rag_vdb,
+        embedding_model=workspace.embedding_model,
+        response_cache=None # 매 턴 실제 생성 경로를 측정
+    )
+
+def run_level(pipeline, workspace: BenchmarkWorkspace, concurrency: int, turns: int, consolidate: bool) -> LoadLevelResult:
+    """동시 세션 concurrency개가 각각 turns턴 대화하고, (선택) 세션 대화를 장기 기억으로 통합합니다."""
+    from core.chat_pipeline import ChatSession
+
+    samples: Dict[str, List[float]] = defaultdict(list)
+    errors = 0
+    lock = threading.Lock()
+    run_id = uuid.uuid4().hex[:8]
+
+    def run_session(index: int):
+        nonlocal errors
+        rng = random.Random(f"{run_id}-{index}")
+        session = ChatSession(session_id=f"bench_{run_id}_{index}")
+        for turn in range(turns):
+            first, second = rng.sample(TOPICS, 2)
+            query = f"지난번에 얘기한 {first} 계획이랑 {second} 관련해서 다시 정리해 줄래? ({turn + 1}번째 질문)"
+            for event in pipeline.stream_turn(session, query):
+                if event.type == "error":
+                    with lock:
+                        errors += 1
+                elif event.type == "done":
+                    with lock:
+                        for stage, seconds in event.data["timings"].items():
+                            samples[stage].append(seconds)
+        if consolidate:
+            conversation = "\n".join(f"{message['role']}: {message['content']}" for message in session.messages)
+            started = time.perf_counter()
+            entry = pipeline.memory_system.consolidate_session_memory(session.session_id, conversation)
+            with lock:
+                samples["consolidate"].append(time.perf_counter() - started)
+                if entry is None:
+                    errors += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="bench-session") as executor:
+        list(executor.map(run_session, range(concurrency)))
+    wall_sec = time.perf_counter() - started
+    return LoadLevelResult(
+        memories=workspace.memory_count, concurrency=concurrency, turns=turns, wall_sec=wall_sec, errors=errors,
+        stage_samples={stage: samples[stage] for stage in STAGES if samples.get(stage)},
+        rss_mb=_current_rss_mb(), peak_rss_mb=_peak_rss_mb(), db_mb=workspace.disk_mb()
+    )
+
+def print_level(result: LoadLevelResult):
+    print(f"\n[{result.summary()}]")
+    print(f"{'stage':<20} {'p50_ms':>9} {'p95_ms':>9} {'p99_ms':>9} {'n':>5}")
+    for stage, stats in result.percentiles().items():
+        print(f"{stage:<20} {stats['p50']:>9.1f} {stats['p95']:>9.1f} {stats['p99']:>9.1f} {stats['count']:>5}")
+
+def compare_to_baseline(results: List[LoadLevelResult], baseline: dict, max_regression: float, min_delta_ms: float = 5.0) -> List[str]:
+    """같은 (기억 수, 동시 세션 수) 조합의 단계별 p95가 기준보다 max_regression 비율 이상 (그리고 min_delta_ms 이상) 느려진 항목."""
+    baseline_levels = {(level["memories"], level["concurrency"]): level for level in baseline.get("levels", [])}
+    regressions = []
+    for result in results:
+        previous = baseline_levels.get((result.memories, result.concurrency))
+        if previous is None:
+            continue
+        for stage, stats in result.percentiles().items():
+            before = previous["stages_ms"].get(stage, {}).get("p95")
+            if before is None or not np.isfinite(before):
+                continue
+            if stats["p95"] > before * (1 + max_regression) and stats["p95"] - before > min_delta_ms:
+                regressions.append(f"기억 {result.memories}개/동시 {result.concurrency}: {stage} p95 {before:.1f}ms -> {stats['p95']:.1f}ms")
+        if previous.get("turns_per_sec") and result.turns_per_sec < previous["turns_per_sec"] / (1 + max_regression):
+            regressions.append(f"기억 {result.memories}개/동시 {result.concurrency}: 처리량 {previous['turns_per_sec']:.2f} -> {result.turns_per_sec:.2f}턴/초")
+    return regressions
+
+def _int_list(value: str) -> List[int]:
+    return [int(part) for part in value.split(",") if part.strip()]
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end latency and load benchmark for the chat pipeline against a local Ollama stand-in.")
+    parser.add_argument("--memories", type=_int_list, default=[1000], help="기억 코퍼스 크기 (쉼표로 여러 값: 순서대로 늘려 가며 측정)")
+    parser.add_argument("--rag-chunks", type=int, default=500, help="RAG 코퍼스 청크 수")
+    parser.add_argument("--concurrency", type=_int_list, default=[1, 4], help="동시 세션 수 (쉼표 구분)")
+    parser.add_argument("--turns", type=int, default=3, help="세션당 대화 턴 수")
+    parser.add_argument("--no-consolidate", action="store_true", help="세션 종료 후 consolidate_session_memory 측정 생략")
+    parser.add_argument("--model", default=None, help="모델 이름 (기본: OLLAMA_MODEL_NAME)")
+    parser.add_argument("--tokens-per-sec", type=float, default=50.0, help="대역 서버의 토큰 생성 속도")
+    parser.add_argument("--ttft-ms", type=float, default=150.0, help="대역 서버의 첫 토큰 지연")
+    parser.add_argument("--response-tokens", type=int, default=40, help="대역 서버의 답변 토큰 수")
+    parser.add_argument("--max-parallel", type=int, default=4, help="대역 서버의 동시 생성 수 (OLLAMA_NUM_PARALLEL)")
+    parser.add_argument("--ollama-url", default=None, help="대역 서버 대신 사용할 실제 Ollama 주소")
+    parser.add_argument("--embedding", choices=["hash", "hf"], default="hash", help="hash: 결정적 해시 임베딩, hf: 설정된 HuggingFace 모델")
+    parser.add_argument("--vector-backend", choices=["chroma", "numpy"], default="chroma", help="기억 벡터DB 백엔드 (MEMORY_VECTOR_BACKEND)")
+    parser.add_argument("--workdir", default=None, help="합성 DB를 만들 폴더 (기본: 임시 폴더, 끝나면 삭제)")
+    parser.add_argument("--json", default=None, help="결과를 저장할 JSON 파일")
+    parser.add_argument("--baseline", default=None, help="비교할 이전 --json 결과")
+    parser.add_argument("--max-regression", type=float, default=0.25, help="허용하는 p95 증가 비율")
+    args = parser.parse_args()
+
+    fake_server = None
+    if args.ollama_url:
+        ollama_url = args.ollama_url
+    else:
+        fake_server = FakeOllamaServer(tokens_per_sec=args.tokens_per_sec, ttft_ms=args.ttft_ms, response_tokens=args.response_tokens,
+                                       max_parallel=args.max_parallel).start()
+        ollama_url = fake_server.url
+    # core 설정은 import 시점에 읽으므로 core 모듈을 불러오기 전에 Ollama 주소를 지정
+    os.environ["OLLAMA_BASE_URL"] = ollama_url
+    os.environ["OLLAMA_BASE_URLS"] = ollama_url
+    from core.config import DEFAULT_OLLAMA_MODEL_NAME
+    model_name = args.model or DEFAULT_OLLAMA_MODEL_NAME
+    if fake_server is not None:
+        fake_server.model_names = [model_name]
+
+    if args.embedding == "hf":
+        from core.llm_services import get_embedding_model
+        embedding_model = get_embedding_model()
+    else:
+        embedding_model = HashingEmbeddings()
+
+    root = args.workdir or tempfile.mkdtemp(prefix="claire_bench_")
+    os.makedirs(root, exist_ok=True)
+    workspace = BenchmarkWorkspace(root, embedding_model, vector_backend=args.vector_backend)
+    results: List[LoadLevelResult] = []
+    try:
+        started = time.perf_counter()
+        workspace.add_rag_chunks(args.rag_chunks)
+        print(f"RAG 코퍼스 {args.rag_chunks}개 청크 준비: {time.perf_counter() - started:.1f}초")
+        pipeline = build_pipeline(workspace, model_name)
+        for memory_target in sorted(args.memories):
+            started = time.perf_counter()
+            workspace.add_memories(max(0, memory_target - workspace.memory_count))
+            print(f"기억 코퍼스 {workspace.memory_count}개 준비: {time.perf_counter() - started:.1f}초")
+            run_level(pipeline, workspace, concurrency=1, turns=1, consolidate=False) # 커넥션, 모델 정보, 캐시 준비 (측정 제외)
+            for concurrency in args.concurrency:
+                result = run_level(pipeline, workspace, concurrency, args.turns, consolidate=not args.no_consolidate)
+                result.memories = memory_target # 통합으로 늘어난 기억 수와 무관하게 같은 조합끼리 비교
+                results.append(result)
+                print_level(result)
+    finally:
+        workspace.close()
+        if fake_server is not None:
+            fake_server.close()
+        if not args.workdir:
+            shutil.rmtree(root, ignore_errors=True)
+
+    report = {
+        "created_at": datetime.datetime.now().isoformat(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("json", "baseline")},
+        "levels": [result.to_dict() for result in results]
+    }
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as output:
+            json.dump(report, output, ensure_ascii=False, indent=2)
+        print(f"\n결과 저장: {args.json}")
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as baseline_file:
+            regressions = compare_to_baseline(results, json.load(baseline_file), args.max_regression)
+        if regressions:
+            print("\n성능 저하 감지:")
+            for line in regressions:
+                print(f"  - {line}")
+            sys.exit(1)
+        print("\n기준 결과 대비 성능 저하 없음.")
+
+if __name__ == "__main__":
+    main()
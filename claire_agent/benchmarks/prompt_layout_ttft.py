@@ -0,0 +1,123 @@
+# claire_agent/benchmarks/prompt_layout_ttft.py
+"""
+프롬프트 레이아웃(classic vs stable_prefix)별 첫 토큰 지연(TTFT) 벤치마크.
+
+같은 스크립트 대화를 레이아웃마다 turns턴 진행하면서, 매 턴 회상 기억/RAG/현재 시각을 바꿔 프롬프트를 조립합니다.
+- 추정 모드 (기본): 직전 턴 프롬프트와 공통인 메시지 접두부를 제외한 "다시 처리해야 할 토큰 수"를 계산
+- Ollama 모드 (--ollama): 실제로 스트리밍 호출하여 TTFT와 Ollama가 보고한 prompt_eval_count(실제로 처리한 프롬프트 토큰)를 측정
+
+실행 (claire_agent 디렉토리에서):
+    python -m benchmarks.prompt_layout_ttft --turns 12
+    python -m benchmarks.prompt_layout_ttft --turns 12 --ollama --model gemma3:4b
+"""
+import argparse
+import datetime
+import statistics
+import time
+from typing import Dict, List, Optional, Tuple
+
+from langchain.schema import AIMessage, HumanMessage, BaseMessage
+from langchain.docstore.document import Document
+
+from core.config import DEFAULT_OLLAMA_MODEL_NAME
+from core.data_models import StoredMemoryEntry
+from core.prompt_builder import PromptBuilder, get_token_counter
+from core.retrieval import RetrievalResult
+from prompts.system_prompts import (
+    SYSTEM_PROMPT_CONTENT_TEMPLATE,
+    STABLE_SYSTEM_PROMPT_TEMPLATE,
+    TURN_CONTEXT_PROMPT_TEMPLATE
+)
+
+LAYOUTS = {
+    "classic": lambda: PromptBuilder(SYSTEM_PROMPT_CONTENT_TEMPLATE),
+    "stable_prefix": lambda: PromptBuilder(STABLE_SYSTEM_PROMPT_TEMPLATE, context_template=TURN_CONTEXT_PROMPT_TEMPLATE)
+}
+TEMPLATE_VALUES = {"current_location": "대한민국 경기도 용인시", "user_name": "주인님", "user_profile_summary": "커피와 등산을 좋아함."}
+
+def _scripted_turn(turn: int) -> Tuple[str, str]:
+    query = f"{turn}번째 질문입니다. 지난번에 이야기한 여행 계획과 예산을 다시 정리해 줄 수 있을까요? " * 2
+    answer = f"{turn}번째 답변입니다. 여행 일정은 3박 4일이며, 숙소와 교통편 예산을 나누어 정리했습니다. " * 6
+    return query, answer
+
+def _turn_retrieval(turn: int) -> RetrievalResult:
+    """매 턴 달라지는 검색 결과 (실제 앱에서 질의마다 회상 기억/RAG가 바뀌는 상황을 흉내 냄)."""
+    now_iso = datetime.datetime.now().isoformat()
+    memory = StoredMemoryEntry(
+        id=turn, session_id="bench", summary=f"{turn}번째 관련 기억: 사용자는 예산을 {turn * 10}만원으로 잡았음.",
+        creation_time=now_iso, last_accessed_time=now_iso
+    )
+    document = Document(page_content=f"{turn}번째 참조 문서 내용. " * 20, metadata={"source": f"doc_{turn}.txt"})
+    return RetrievalResult(memories=[memory], rag_documents=[document])
+
+def _serialize(message: BaseMessage) -> str:
+    return f"{message.type}:{message.content}"
+
+def _reprocessed_tokens(previous: Optional[List[BaseMessage]], current: List[BaseMessage]) -> int:
+    """직전 프롬프트와 공통인 메시지 접두부 이후의 토큰 수 (메시지 단위로 비교하는 보수적 추정)."""
+    counter = get_token_counter()
+    shared = 0
+    if previous:
+        for before, after in zip(previous, current):
+            if _serialize(before) != _serialize(after):
+                break
+            shared += 1
+    return sum(counter.count(message.content) for message in current[shared:])
+
+def run_layout(layout: str, turns: int, llm=None) -> List[Dict[str, float]]:
+    builder = LAYOUTS[layout]()
+    history: List[BaseMessage] = []
+    previous_messages: Optional[List[BaseMessage]] = None
+    results = []
+    for turn in range(1, turns + 1):
+        query, answer = _scripted_turn(turn)
+        template_values = dict(TEMPLATE_VALUES, current_datetime=datetime.datetime.now().strftime("%Y년 %m월 %d일 %H:%M:%S"))
+        prompt = builder.build(query, history, template_values, _turn_retrieval(turn))
+        row = {
+            "turn": turn,
+            "prompt_tokens": prompt.token_counts["total"],
+            "reprocessed_tokens": _reprocessed_tokens(previous_messages, prompt.messages)
+        }
+        if llm is not None:
+            started = time.perf_counter()
+            first_token_at = None
+            for chunk in llm.stream(prompt.messages):
+                if first_token_at is None and chunk.content:
+                    first_token_at = time.perf_counter()
+                if chunk.response_metadata.get("prompt_eval_count") is not None:
+                    row["prompt_eval_count"] = chunk.response_metadata["prompt_eval_count"]
+            row["ttft_ms"] = ((first_token_at or time.perf_counter()) - started) * 1000
+        results.append(row)
+        previous_messages = prompt.messages
+        history += [HumanMessage(content=query), AIMessage(content=answer)] # 모델 답변 대신 고정 답변으로 대화를 이어감
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare time-to-first-token of the classic and stable-prefix prompt layouts.")
+    parser.add_argument("--turns", type=int, default=10, help="레이아웃별 대화 턴 수")
+    parser.add_argument("--ollama", action="store_true", help="실제 Ollama 서버에 스트리밍 호출하여 TTFT 측정")
+    parser.add_argument("--model", default=DEFAULT_OLLAMA_MODEL_NAME, help="--ollama 사용 시 모델 이름")
+    parser.add_argument("--num-predict", type=int, default=8, help="--ollama 사용 시 생성할 최대 토큰 (TTFT만 보므로 짧게)")
+    args = parser.parse_args()
+
+    llm = None
+    if args.ollama:
+        from core.llm_services import build_chat_llm
+        llm = build_chat_llm(args.model)
+        llm.num_predict = args.num_predict
+
+    for layout in LAYOUTS:
+        results = run_layout(layout, args.turns, llm)
+        print(f"\n[{layout}]")
+        print(f"{'turn':>4} {'prompt':>7} {'reproc':>7} {'eval':>6} {'ttft_ms':>8}")
+        for row in results:
+            print(f"{row['turn']:>4} {row['prompt_tokens']:>7} {row['reprocessed_tokens']:>7} "
+                  f"{row.get('prompt_eval_count', '-'):>6} {row.get('ttft_ms', float('nan')):>8.1f}")
+        later = results[1:] or results # 첫 턴은 어느 레이아웃이든 캐시가 없으므로 제외
+        summary = f"  평균 재처리 토큰(2턴~): {statistics.mean(row['reprocessed_tokens'] for row in later):.0f}"
+        if llm is not None:
+            summary += f", 평균 TTFT(2턴~): {statistics.mean(row['ttft_ms'] for row in later):.1f}ms"
+        print(summary)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# claire_agent/core/access_tracker.py
+import atexit
+import datetime
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+# 내부 모듈 import
+from .config import LTM_ACCESS_FLUSH_INTERVAL_SEC, LTM_ACCESS_FLUSH_THRESHOLD
+from .sqlite_storage import SQLiteConnectionPool, get_sqlite_pool
+from .ranking import effective_importance
+
+class MemoryAccessTracker:
+    """
+    장기 기억 접근 기록(last_accessed_time, access_count)을 메모리에 모아두었다가
+    한 번의 배치 UPDATE로 기록하는 write-behind 버퍼.
+    - 버퍼에 쌓인 기억 수가 flush_threshold 이상이 되면 즉시 flush
+    - 그 외에는 flush_interval_sec 주기로 백그라운드 스레드가 flush
+    - 프로세스 종료 시(atexit)에도 flush하여 카운트 유실을 막음
+    """
+
+    def __init__(self, sqlite_pool: Optional[SQLiteConnectionPool] = None,
+                 flush_interval_sec: float = LTM_ACCESS_FLUSH_INTERVAL_SEC,
+                 flush_threshold: int = LTM_ACCESS_FLUSH_THRESHOLD):
+        self.sqlite_pool = sqlite_pool or get_sqlite_pool()
+        self.sqlite_pool.register_function("claire_effective_importance", 3, effective_importance)
+        self.flush_interval_sec = flush_interval_sec
+        self.flush_threshold = max(1, flush_threshold)
+        # memory_id -> (누적 접근 횟수, 마지막 접근 시각 ISO 문자열)
+        self._pending: Dict[int, Tuple[int, str]] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock() # flush 동시 실행 방지
+        self._stop_event = threading.Event()
+        self._flusher = threading.Thread(target=self._run_periodic_flush, name="ltm-access-flusher", daemon=True)
+        self._flusher.start()
+
+    def record_access(self, memory_ids: Iterable[int], accessed_time: Optional[str] = None):
+        accessed_time = accessed_time or datetime.datetime.now().isoformat()
+        with self._lock:
+            for memory_id in memory_ids:
+                count, _ = self._pending.get(memory_id, (0, accessed_time))
+                self._pending[memory_id] = (count + 1, accessed_time)
+            should_flush = len(self._pending) >= self.flush_threshold
+        if should_flush:
+            self.flush()
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def flush(self) -> int:
+        """버퍼를 비우고 한 트랜잭션으로 기록합니다. 기록한 기억 수를 반환합니다."""
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                batch, self._pending = self._pending, {}
+            params = [(accessed_time, accessed_time, count, memory_id) for memory_id, (count, accessed_time) in batch.items()]
+            try:
+                # 접근 시각이 감쇠 기준 시각이므로, 갱신 전에 그때까지의 지연 감쇠를 중요도에 확정 반영
+                self.sqlite_pool.executemany(
+                    """UPDATE long_term_memories SET 
+                        user_importance_score = claire_effective_importance(user_importance_score, last_accessed_time, ?1), 
+                        last_accessed_time = ?2, access_count = access_count + ?3 
+                    WHERE id = ?4""",
+                    params
+                )
+            except Exception as e:
+                print(f"Error flushing memory access stats ({len(params)} entries): {e}")
+                # 실패한 배치는 다음 flush에서 다시 시도하도록 버퍼에 되돌림
+                with self._lock:
+                    for memory_id, (count, accessed_time) in batch.items():
+                        pending_count, pending_time = self._pending.get(memory_id, (0, accessed_time))
+                        self._pending[memory_id] = (pending_count + count, max(pending_time, accessed_time))
+                return 0
+            return len(params)
+
+    def _run_periodic_flush(self):
+        while not self._stop_event.wait(self.flush_interval_sec):
+            self.flush()
+
+    def close(self):
+        self._stop_event.set()
+        self.flush()
+
+_tracker: Optional[MemoryAccessTracker] = None
+_tracker_lock = threading.Lock()
+
+def get_access_tracker() -> MemoryAccessTracker:
+    """프로세스 전역 접근 기록 버퍼를 반환합니다 (Streamlit 재실행마다 새로 만들지 않도록)."""
+    global _tracker
+    with _tracker_lock:
+        if _tracker is None:
+            _tracker = MemoryAccessTracker()
+            atexit.register(_tracker.close)
+        return _tracker
@@ -0,0 +1,436 @@
+# claire_agent/core/api_server.py
+import argparse
+import asyncio
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from http import HTTPStatus
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+# 내부 모듈 import
+from .config import (
+    DEFAULT_OLLAMA_MODEL_NAME,
+    API_SERVER_HOST,
+    API_SERVER_PORT,
+    API_MAX_CONCURRENT_TURNS,
+    API_SESSION_IDLE_TTL_SEC,
+    API_MAX_SESSIONS,
+    API_MAX_REQUEST_BYTES
+)
+from .chat_pipeline import ChatEvent, ChatPipeline, ChatSession, DEFAULT_USER_PROFILE, get_chat_pipeline
+from .telemetry import get_telemetry
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+@dataclass
+class HttpRequest:
+    method: str
+    path: str
+    query: Dict[str, List[str]]
+    headers: Dict[str, str] # 소문자 헤더 이름
+    body: bytes = b""
+
+    @property
+    def keep_alive(self) -> bool:
+        return self.headers.get("connection", "").lower() != "close"
+
+    def json(self) -> dict:
+        if not self.body:
+            return {}
+        try:
+            payload = json.loads(self.body.decode("utf-8"))
+        except (UnicodeDecodeError, json.JSONDecodeError) as e:
+            raise HttpError(400, f"Invalid JSON body: {e}")
+        if not isinstance(payload, dict):
+            raise HttpError(400, "JSON body must be an object.")
+        return payload
+
+@dataclass
+class ServerSession:
+    chat: ChatSession
+    model_name: str
+    created_at: float = field(default_factory=time.time)
+
+    def to_dict(self, include_messages: bool = True) -> dict:
+        data = {
+            "session_id": self.chat.session_id,
+            "model": self.model_name,
+            "auto_save": self.chat.auto_save,
+            "user_profile": self.chat.user_profile,
+            "busy": self.chat.lock.locked(),
+            "message_count": len(self.chat.messages),
+            "last_prompt_stats": self.chat.last_prompt_stats,
+            "created_at": self.created_at,
+            "last_active": self.chat.last_active
+        }
+        if include_messages:
+            data["messages"] = list(self.chat.messages)
+        return data
+
+class SessionStore:
+    """
+    프로세스 메모리에 보관하는 세션별 대화 상태 (단기 기억).
+    idle_ttl_sec 동안 요청이 없는 세션과 max_sessions를 넘는 가장 오래 쉰 세션은 제거합니다 (답변 생성 중인 세션은 제외).
+    장기 기억은 SQLite/벡터DB에 있으므로 세션이 제거되어도 회상에는 영향이 없습니다.
+    """
+
+    def __init__(self, idle_ttl_sec: float = API_SESSION_IDLE_TTL_SEC, max_sessions: int = API_MAX_SESSIONS):
+        self.idle_ttl_sec = idle_ttl_sec
+        self.max_sessions = max(1, max_sessions)
+        self._sessions: "OrderedDict[str, ServerSession]" = OrderedDict() # 최근 사용 순서
+        self._lock = threading.Lock()
+
+    def create(self, model_name: str, session_id: Optional[str] = None, user_profile: Optional[dict] = None,
+               auto_save: bool = False) -> ServerSession:
+        chat = ChatSession(user_profile={**DEFAULT_USER_PROFILE, **(user_profile or {})}, auto_save=auto_save)
+        if session_id:
+            chat.session_id = session_id
+        session = ServerSession(chat=chat, model_name=model_name)
+        with self._lock:
+            if chat.session_id in self._sessions:
+                raise HttpError(409, f"Session {chat.session_id} already exists.")
+            self._sessions[chat.session_id] = session
+        self.evict()
+        return session
+
+    def get(self, session_id: str) -> ServerSession:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                raise HttpError(404, f"Session {session_id} not found.")
+            self._sessions.move_to_end(session_id)
+            session.chat.last_active = time.time()
+            return session
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def evict(self) -> int:
+        now = time.time()
+        with self._lock:
+            idle = [
+                session_id for session_id, session in self._sessions.items()
+                if now - session.chat.last_active > self.idle_ttl_sec and not session.chat.lock.locked()
+            ]
+            for session_id in idle:
+                del self._sessions[session_id]
+            overflow = len(self._sessions) - self.max_sessions
+            for session_id in [sid for sid, s in self._sessions.items() if not s.chat.lock.locked()][:max(0, overflow)]:
+                del self._sessions[session_id]
+            return len(idle) + max(0, overflow)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._sessions)
+
+def _sse(event: ChatEvent) -> bytes:
+    return f"event: {event.type}\ndata: {json.dumps(event.data, ensure_ascii=False)}\n\n".encode("utf-8")
+
+def _response_head(status: int, headers: Dict[str, str]) -> bytes:
+    lines = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}"] + [f"{name}: {value}" for name, value in headers.items()]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+def _json_response(status: int, payload, keep_alive: bool = True) -> bytes:
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    return _response_head(status, {
+        "Content-Type": "application/json; charset=utf-8",
+        "Content-Length": str(len(body)),
+        "Connection": "keep-alive" if keep_alive else "close"
+    }) + body
+
+class ChatApiServer:
+    """
+    ChatPipeline을 HTTP/SSE로 제공하는 asyncio 서버 (표준 라이브러리만 사용).
+    - 이벤트 루프는 연결과 SSE 전송만 담당하고, 검색/생성 같은 블로킹 작업은 스레드 풀에서 실행
+    - 대화 턴은 max_concurrent_turns개까지 동시에 처리하고 나머지는 대기 (Ollama 서버 과부하 방지)
+    - 세션 상태는 이 프로세스 메모리에 있으므로, 여러 프로세스를 띄울 때는 로드밸런서에서 세션 ID 기준 고정 라우팅(sticky) 필요
+
+    엔드포인트:
+      GET    /healthz
+      GET    /v1/models
+      POST   /v1/sessions                  {"model", "user_profile", "auto_save", "session_id"} (모두 선택)
+      GET    /v1/sessions/{id}
+      DELETE /v1/sessions/{id}
+      POST   /v1/sessions/{id}/chat        {"message", "stream": true} -> text/event-stream (status, warning, token, error, done)
+      GET    /v1/memories?q=...&top_k=3
+      GET    /v1/traces?limit=20&session_id=...   최근 대화 턴의 단계별 트레이스
+      GET    /metrics                       Prometheus 메트릭
+    """
+
+    def __init__(self, host: str = API_SERVER_HOST, port: int = API_SERVER_PORT, default_model: str = DEFAULT_OLLAMA_MODEL_NAME,
+                 max_concurrent_turns: int = API_MAX_CONCURRENT_TURNS, sessions: Optional[SessionStore] = None,
+                 pipeline_factory: Callable[[str], ChatPipeline] = get_chat_pipeline):
+        self.host = host
+        self.port = port
+        self.default_model = default_model
+        self.sessions = sessions or SessionStore()
+        self.pipeline_factory = pipeline_factory
+        self._turn_executor = ThreadPoolExecutor(max_workers=max(1, max_concurrent_turns), thread_name_prefix="chat-turn")
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._routes: List[Tuple[str, "re.Pattern", Callable]] = [
+            ("GET", re.compile(r"^/healthz$"), self._health),
+            ("GET", re.compile(r"^/v1/models$"), self._list_models),
+            ("POST", re.compile(r"^/v1/sessions$"), self._create_session),
+            ("GET", re.compile(r"^/v1/sessions/(?P<session_id>[^/]+)$"), self._get_session),
+            ("DELETE", re.compile(r"^/v1/sessions/(?P<session_id>[^/]+)$"), self._delete_session),
+            ("POST", re.compile(r"^/v1/sessions/(?P<session_id>[^/]+)/chat$"), self._chat),
+            ("GET", re.compile(r"^/v1/memories$"), self._search_memories),
+            ("GET", re.compile(r"^/v1/traces$"), self._list_traces),
+            ("GET", re.compile(r"^/metrics$"), self._metrics)
+        ]
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1] # port=0이면 실제 할당된 포트
+        asyncio.get_running_loop().create_task(self._evict_idle_sessions())
+        print(f"Claire API server listening on http://{self.host}:{self.port}")
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    def close(self):
+        if self._server is not None:
+            self._server.close()
+        self._turn_executor.shutdown(wait=False)
+
+    async def _evict_idle_sessions(self):
+        interval = max(1.0, min(60.0, self.sessions.idle_ttl_sec / 4))
+        while True:
+            await asyncio.sleep(interval)
+            evicted = self.sessions.evict()
+            if evicted:
+                print(f"Evicted {evicted} idle API sessions ({len(self.sessions)} active).")
+
+    # --- HTTP 처리 ---
+    async def _read_request(self, reader: asyncio.StreamReader) -> Optional[HttpRequest]:
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.IncompleteReadError: # 클라이언트가 연결을 닫음
+            return None
+        except asyncio.LimitOverrunError:
+            raise HttpError(431, "Request headers too large.")
+        request_line, *header_lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, _ = request_line.split(" ", 2)
+        except ValueError:
+            raise HttpError(400, "Malformed request line.")
+        headers = {}
+        for line in header_lines:
+            if ":" in line:
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+        try:
+            length = int(headers.get("content-length", "0"))
+        except ValueError:
+            raise HttpError(400, "Invalid Content-Length.")
+        if length > API_MAX_REQUEST_BYTES:
+            raise HttpError(413, "Request body too large.")
+        body = await reader.readexactly(length) if length else b""
+        url = urlsplit(target)
+        return HttpRequest(method=method.upper(), path=url.path, query=parse_qs(url.query), headers=headers, body=body)
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True: # HTTP/1.1 keep-alive: 스트리밍 응답 전까지 같은 연결로 여러 요청 처리
+                try:
+                    request = await self._read_request(reader)
+                except HttpError as e:
+                    writer.write(_json_response(e.status, {"error": e.message}, keep_alive=False))
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+                if not await self._dispatch(request, writer):
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, request: HttpRequest, writer: asyncio.StreamWriter) -> bool:
+        """요청 하나를 처리하고, 연결을 계속 쓸 수 있으면 True를 반환합니다."""
+        try:
+            for method, pattern, handler in self._routes:
+                match = pattern.match(request.path)
+                if match is None:
+                    continue
+                if method != request.method:
+                    continue
+                return await handler(request, writer, **match.groupdict())
+            if any(pattern.match(request.path) for _, pattern, _ in self._routes):
+                raise HttpError(405, f"Method {request.method} not allowed.")
+            raise HttpError(404, f"No route for {request.path}.")
+        except HttpError as e:
+            writer.write(_json_response(e.status, {"error": e.message}, request.keep_alive))
+        except Exception as e:
+            print(f"API server error on {request.method} {request.path}: {e}")
+            writer.write(_json_response(500, {"error": str(e)}, request.keep_alive))
+        await writer.drain()
+        return request.keep_alive
+
+    async def _respond(self, writer: asyncio.StreamWriter, request: HttpRequest, status: int, payload) -> bool:
+        writer.write(_json_response(status, payload, request.keep_alive))
+        await writer.drain()
+        return request.keep_alive
+
+    async def _run_blocking(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+    # --- 엔드포인트 ---
+    async def _health(self, request: HttpRequest, writer: asyncio.StreamWriter) -> bool:
+        return await self._respond(writer, request, 200, {"status": "ok", "sessions": len(self.sessions)})
+
+    async def _list_models(self, request: HttpRequest, writer: asyncio.StreamWriter) -> bool:
+        from .llm_services import get_ollama_models_available
+        models = await self._run_blocking(get_ollama_models_available)
+        return await self._respond(writer, request, 200, {"models": models, "default": self.default_model})
+
+    async def _create_session(self, request: HttpRequest, writer: asyncio.StreamWriter) -> bool:
+        payload = request.json()
+        model_name = payload.get("model") or self.default_model
+        user_profile = payload.get("user_profile")
+        if user_profile is not None and not isinstance(user_profile, dict):
+            raise HttpError(400, "user_profile must be an object.")
+        await self._run_blocking(self.pipeline_factory, model_name) # 첫 세션이면 모델/벡터DB 로드 (이후 요청은 캐시 사용)
+        session = self.sessions.create(model_name, session_id=payload.get("session_id"), user_profile=user_profile,
+                                       auto_save=bool(payload.get("auto_save", False)))
+        return await self._respond(writer, request, 201, session.to_dict(include_messages=False))
+
+    async def _get_session(self, request: HttpRequest, writer: asyncio.StreamWriter, session_id: str) -> bool:
+        return await self._respond(writer, request, 200, self.sessions.get(session_id).to_dict())
+
+    async def _delete_session(self, request: HttpRequest, writer: asyncio.StreamWriter, session_id: str) -> bool:
+        if not self.sessions.delete(session_id):
+            raise HttpError(404, f"Session {session_id} not found.")
+        return await self._respond(writer, request, 200, {"deleted": session_id})
+
+    async def _search_memories(self, request: HttpRequest, writer: asyncio.StreamWriter) -> bool:
+        query = (request.query.get("q") or [""])[0].strip()
+        if not query:
+            raise HttpError(400, "Query parameter 'q' is required.")
+        try:
+            top_k = int((request.query.get("top_k") or ["3"])[0])
+        except ValueError:
+            raise HttpError(400, "top_k must be an integer.")
+        pipeline = await self._run_blocking(self.pipeline_factory, self.default_model)
+        memories = await self._run_blocking(pipeline.memory_system.retrieve_relevant_memories, query, top_k)
+        return await self._respond(writer, request, 200, {"memories": [memory.model_dump() for memory in memories]})
+
+    async def _list_traces(self, request: HttpRequest, writer: asyncio.StreamWriter) -> bool:
+        try:
+            limit = int((request.query.get("limit") or ["20"])[0])
+        except ValueError:
+            raise HttpError(400, "limit must be an integer.")
+        session_id = (request.query.get("session_id") or [None])[0]
+        traces = get_telemetry().recent_traces(limit=limit, name="chat_turn", session_id=session_id)
+        return await self._respond(writer, request, 200, {"traces": traces})
+
+    async def _metrics(self, request: HttpRequest, writer: asyncio.StreamWriter) -> bool:
+        body = get_telemetry().render_prometheus().encode("utf-8")
+        writer.write(_response_head(200, {
+            "Content-Type": "text/plain; version=0.0.4; charset=utf-8",
+            "Content-Length": str(len(body)),
+            "Connection": "keep-alive" if request.keep_alive else "close"
+        }) + body)
+        await writer.drain()
+        return request.keep_alive
+
+    async def _chat(self, request: HttpRequest, writer: asyncio.StreamWriter, session_id: str) -> bool:
+        payload = request.json()
+        message = payload.get("message")
+        if not isinstance(message, str) or not message.strip():
+            raise HttpError(400, "'message' must be a non-empty string.")
+        session = self.sessions.get(session_id)
+        if session.chat.lock.locked(): # 빠른 거절용 확인 (경합으로 통과해도 파이프라인이 error 후 done(busy=True)으로 턴을 끝냄)
+            raise HttpError(409, f"Session {session_id} is already generating a response.")
+        pipeline = await self._run_blocking(self.pipeline_factory, session.model_name)
+
+        if not payload.get("stream", True): # 전체 답변을 한 번에 JSON으로 반환
+            events = await asyncio.get_running_loop().run_in_executor(
+                self._turn_executor, lambda: list(pipeline.stream_turn(session.chat, message))
+            )
+            done = next((event.data for event in events if event.type == "done"), {})
+            if done.get("busy"): # 위의 확인 직후 다른 요청이 먼저 턴을 시작한 경우
+                raise HttpError(409, f"Session {session_id} is already generating a response.")
+            return await self._respond(writer, request, 200, {
+                **done,
+                "warnings": [event.data["message"] for event in events if event.type == "warning"],
+                "errors": [event.data["message"] for event in events if event.type == "error"]
+            })
+
+        writer.write(_response_head(200, {
+            "Content-Type": "text/event-stream; charset=utf-8",
+            "Cache-Control": "no-cache",
+            "Connection": "close", # 스트림 끝은 연결 종료로 알림
+            "X-Accel-Buffering": "no" # 리버스 프록시(nginx) 버퍼링 비활성화
+        }))
+        await writer.drain()
+        await self._stream_events(writer, pipeline, session.chat, message)
+        return False
+
+    async def _stream_events(self, writer: asyncio.StreamWriter, pipeline: ChatPipeline, chat: ChatSession, message: str):
+        """턴 실행 스레드가 만든 이벤트를 큐로 넘겨받아 SSE로 보냅니다. 클라이언트가 끊으면 생성을 중단합니다."""
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        cancelled = threading.Event()
+
+        def produce():
+            events = pipeline.stream_turn(chat, message)
+            try:
+                for event in events:
+                    if cancelled.is_set():
+                        break
+                    loop.call_soon_threadsafe(queue.put_nowait, event)
+            finally:
+                events.close() # 중단 시 Ollama 스트림도 닫힘
+                loop.call_soon_threadsafe(queue.put_nowait, None)
+
+        producer = loop.run_in_executor(self._turn_executor, produce)
+        try:
+            while (event := await queue.get()) is not None:
+                writer.write(_sse(event))
+                await writer.drain()
+        except ConnectionError:
+            cancelled.set()
+            print(f"Client disconnected during chat turn in session {chat.session_id}.")
+            return
+        await producer
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the Claire chat pipeline over HTTP with Server-Sent Events.")
+    parser.add_argument("--host", default=API_SERVER_HOST)
+    parser.add_argument("--port", type=int, default=API_SERVER_PORT)
+    parser.add_argument("--model", default=DEFAULT_OLLAMA_MODEL_NAME, help="Default model for new sessions.")
+    parser.add_argument("--max-concurrent-turns", type=int, default=API_MAX_CONCURRENT_TURNS)
+    args = parser.parse_args()
+
+    from .startup import StartupWarmup
+
+    # SQLite 초기화, Ollama 웜업, 임베딩 모델, 벡터DB, 파이프라인을 첫 요청 전에 로드 (RAG 색인 동기화는 백그라운드에서 계속)
+    startup_report = StartupWarmup(args.model).run()
+    if startup_report.error:
+        raise SystemExit(f"Startup failed: {startup_report.error}")
+
+    server = ChatApiServer(host=args.host, port=args.port, default_model=args.model, max_concurrent_turns=args.max_concurrent_turns)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        print("Shutting down API server.")
+    finally:
+        server.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+# claire_agent/core/chat_pipeline.py
+import datetime
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional
+
+# 내부 모듈 import
+from .config import (
+    DEFAULT_OLLAMA_MODEL_NAME,
+    CURRENT_LOCATION_STR,
+    PROMPT_LAYOUT,
+    RESPONSE_CACHE_ENABLED
+)
+from .resources import cached_resource
+from .retrieval import RetrievalOrchestrator
+from .prompt_builder import PromptBuilder, history_from_ui_messages
+from .response_cache import SemanticResponseCache, get_response_cache, replay_chunks, context_fingerprint
+from .model_registry import get_model_registry
+from .telemetry import get_telemetry, iterate_in_context
+from prompts.system_prompts import (
+    SYSTEM_PROMPT_CONTENT_TEMPLATE,
+    STABLE_SYSTEM_PROMPT_TEMPLATE,
+    TURN_CONTEXT_PROMPT_TEMPLATE
+)
+
+FALLBACK_RESPONSE = "죄송합니다, 답변을 생성하는 중 예상치 못한 오류가 발생했습니다."
+DEFAULT_USER_PROFILE = {"name": "주인님", "preferences_summary": "파악된 사용자 특정 선호 정보 없음."}
+
+def new_session_id() -> str:
+    return datetime.datetime.now().strftime("session_%Y%m%d%H%M%S_%f")
+
+@dataclass
+class ChatEvent:
+    type: str # "status"(진행 단계), "warning", "token"(답변 조각), "error", "done"(턴 종료, 최종 답변과 통계)
+    data: dict = field(default_factory=dict)
+
+@dataclass
+class ChatSession:
+    """한 대화 세션의 상태. messages는 {"role", "content"} 리스트이며 파이프라인이 턴마다 사용자/답변 메시지를 추가합니다."""
+    session_id: str = field(default_factory=new_session_id)
+    messages: List[dict] = field(default_factory=list)
+    user_profile: dict = field(default_factory=lambda: dict(DEFAULT_USER_PROFILE))
+    auto_save: bool = False # 턴마다 장기 기억 자동 저장 (백그라운드 통합 작업 큐)
+    last_prompt_stats: str = ""
+    last_active: float = field(default_factory=time.time)
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False) # 한 세션에서 동시에 두 턴이 진행되지 않도록
+
+@dataclass
+class _TurnState:
+    response: str = ""
+    prompt_stats: str = ""
+    cache_hit: bool = False
+    timings: Dict[str, float] = field(default_factory=dict)
+
+class ChatPipeline:
+    """
+    UI와 무관한 대화 한 턴 처리: 장기 기억 회상 + RAG 검색 -> 응답 캐시 확인 -> 프롬프트 조립 -> 스트리밍 생성 -> (선택) 장기 기억 통합.
+    stream_turn()이 ChatEvent를 차례로 내보내므로 Streamlit, HTTP/SSE 서버 등 어떤 클라이언트든 같은 흐름을 재사용합니다.
+    """
+
+    def __init__(self, model_name: str, llm, memory_system, rag_vector_store, embedding_model, consolidation_worker=None,
+                 response_cache: Optional[SemanticResponseCache] = None, prompt_layout: str = PROMPT_LAYOUT,
+                 ltm_top_k: int = 1, rag_top_k: int = 2, location: str = CURRENT_LOCATION_STR):
+        self.model_name = model_name
+        self.llm = llm
+        self.memory_system = memory_system
+        self.rag_vector_store = rag_vector_store
+        self.embedding_model = embedding_model
+        self.consolidation_worker = consolidation_worker
+        self.response_cache = response_cache
+        self.prompt_layout = prompt_layout
+        self.ltm_top_k = ltm_top_k
+        self.rag_top_k = rag_top_k
+        self.location = location
+
+    def _prompt_builder(self) -> PromptBuilder:
+        # 모델 최대 컨텍스트가 설정값보다 작으면 그에 맞춤 (모델 정보는 레지스트리에 캐시됨)
+        context_window = get_model_registry().context_window(self.model_name)
+        if self.prompt_layout == "stable_prefix": # 고정 접두부 + 대화 기록 뒤 컨텍스트 메시지 (Ollama KV 캐시 재사용)
+            return PromptBuilder(STABLE_SYSTEM_PROMPT_TEMPLATE, context_template=TURN_CONTEXT_PROMPT_TEMPLATE, context_window=context_window)
+        return PromptBuilder(SYSTEM_PROMPT_CONTENT_TEMPLATE, context_window=context_window)
+
+    def _run_turn(self, session: ChatSession, user_query: str, turn: _TurnState) -> Iterator[ChatEvent]:
+        telemetry = get_telemetry()
+        started = time.perf_counter()
+        # 1~2. 장기 기억 회상 + RAG 문서 검색 (질의 임베딩 1회 계산 후 두 검색을 병렬 실행)
+        yield ChatEvent("status", {"progress": 20, "text": "과거 기억과 관련 정보를 검색하는 중..."})
+        with telemetry.span("retrieval"):
+            retrieval_result = RetrievalOrchestrator(
+                memory_system=self.memory_system,
+                rag_vector_store=self.rag_vector_store,
+                embedding_model=self.embedding_model,
+                ltm_top_k=self.ltm_top_k,
+                rag_top_k=self.rag_top_k
+            ).retrieve(user_query)
+        turn.timings.update({f"retrieval_{name}": value for name, value in retrieval_result.timings.items()})
+        if "rag" in retrieval_result.errors:
+            yield ChatEvent("warning", {"message": f"RAG 검색 중 오류 발생: {retrieval_result.errors['rag']}"})
+
+        # 같은 모델, 같은 RAG 청크, 같은 회상 기억/프로필에 대한 거의 같은 질문이면 이전 답변을 재사용 (LLM 생성 생략)
+        # 이전 대화에 기대는 후속 질문("계속해")이나 RAG 근거가 없는 질문은 질의만으로 답변이 정해지지 않으므로 캐시하지 않음
+        history = history_from_ui_messages(session.messages[:-1]) # 방금 추가한 현재 입력은 제외
+        cacheable = (self.response_cache is not None and retrieval_result.query_embedding is not None
+                     and bool(retrieval_result.rag_documents) and not history)
+        cache_key = context_fingerprint([mem.id for mem in retrieval_result.memories], session.user_profile) if cacheable else ""
+        cache_hit = None
+        if cacheable:
+            with telemetry.span("response_cache.lookup") as cache_span:
+                cache_hit = self.response_cache.lookup(retrieval_result.query_embedding, self.model_name, retrieval_result.rag_documents, cache_key)
+                cache_span.set(hit=cache_hit is not None)
+        if cache_hit is not None:
+            turn.cache_hit = True
+            turn.prompt_stats = f"응답 캐시 적중 (유사도 {cache_hit.similarity:.3f})"
+            for piece in replay_chunks(cache_hit.response):
+                turn.response += piece
+                yield ChatEvent("token", {"text": piece})
+            turn.timings["total"] = time.perf_counter() - started
+            return
+
+        # 3. 토큰 예산 안에서 시스템 프롬프트, 회상 기억, RAG, 최근 대화 기록을 조립
+        # 예산을 넘는 오래된 대화는 제외하고, 그 자리에 이 세션의 누적 요약(LLM 호출 없이 저장된 값)을 넣음
+        yield ChatEvent("status", {"progress": 50, "text": "AI에게 전달할 정보를 종합하는 중..."})
+        prompt_started = time.perf_counter()
+        with telemetry.span("prompt_build"):
+            prompt = self._prompt_builder().build(
+                query=user_query,
+                history=history,
+                template_values={
+                    "current_datetime": datetime.datetime.now().strftime("%Y년 %m월 %d일 %A %p %I:%M"),
+                    "current_location": str(self.location),
+                    "user_name": str(session.user_profile.get("name", "사용자")),
+                    "user_profile_summary": str(session.user_profile.get("preferences_summary", "정보 없음"))
+                },
+                retrieval=retrieval_result,
+                history_summarizer=lambda dropped: self.memory_system.get_session_summary(session.session_id)
+            )
+        turn.prompt_stats = prompt.summary()
+        turn.timings["prompt"] = time.perf_counter() - prompt_started
+
+        # 4. 스트리밍 생성 (같은 세션의 요청은 같은 Ollama 서버로 보내 서버의 KV 캐시를 재사용)
+        yield ChatEvent("status", {"progress": 70, "text": "Claire가 답변을 생성하는 중..."})
+        with telemetry.span("generation", model=self.model_name) as generation_span:
+            generation_started = time.perf_counter()
+            chunk_count = 0
+            metadata = {}
+            for chunk in self.llm.stream(prompt.messages, affinity_key=session.session_id):
+                if getattr(chunk, "response_metadata", None):
+                    metadata = chunk.response_metadata # 마지막 청크에 Ollama의 eval_count/eval_duration이 담김
+                if not chunk.content:
+                    continue
+                if "ttft" not in turn.timings:
+                    turn.timings["ttft"] = time.perf_counter() - generation_started
+                chunk_count += 1
+                turn.response += chunk.content
+                yield ChatEvent("token", {"text": chunk.content})
+            turn.timings["generation"] = time.perf_counter() - generation_started
+            self._record_generation(generation_span, turn.timings, chunk_count, metadata)
+        turn.timings["total"] = time.perf_counter() - started
+
+        # 검색이 모두 성공한 경우의 정상 답변만 캐시 (오류 시 컨텍스트가 빠진 답변이 재사용되지 않도록)
+        if cacheable and not retrieval_result.errors:
+            self.response_cache.store(user_query, retrieval_result.query_embedding, self.model_name,
+                                      retrieval_result.rag_documents, turn.response, cache_key)
+
+    def _record_generation(self, generation_span, timings: Dict[str, float], chunk_count: int, metadata: dict):
+        """TTFT와 생성 속도를 span 속성과 메트릭으로 남깁니다. Ollama가 토큰 수/생성 시간을 주지 않으면 청크 수로 추정합니다."""
+        telemetry = get_telemetry()
+        tokens = metadata.get("eval_count") or chunk_count
+        eval_duration_sec = (metadata.get("eval_duration") or 0) / 1e9
+        if eval_duration_sec <= 0:
+            eval_duration_sec = timings["generation"] - timings.get("ttft", 0.0)
+        tokens_per_sec = tokens / eval_duration_sec if tokens and eval_duration_sec > 0 else 0.0
+        generation_span.set(tokens=tokens, tokens_per_sec=round(tokens_per_sec, 1))
+        if "ttft" in timings:
+            generation_span.set(ttft_ms=round(timings["ttft"] * 1000, 1))
+            telemetry.observe("claire_ttft_seconds", timings["ttft"], model=self.model_name)
+        if tokens_per_sec > 0:
+            telemetry.observe("claire_generation_tokens_per_second", tokens_per_sec, model=self.model_name)
+        telemetry.increment("claire_generated_tokens_total", tokens, model=self.model_name)
+
+    def stream_turn(self, session: ChatSession, user_query: str) -> Iterator[ChatEvent]:
+        """사용자 메시지 하나를 처리하며 이벤트를 내보냅니다. 마지막 이벤트는 항상 "done"입니다 (클라이언트가 중간에 닫은 경우 제외)."""
+        # 턴 트레이스의 span이 yield 사이에 호출 측 컨텍스트로 새지 않도록 분리된 컨텍스트에서 진행
+        return iterate_in_context(self._stream_turn(session, user_query))
+
+    def _stream_turn(self, session: ChatSession, user_query: str) -> Iterator[ChatEvent]:
+        if not session.lock.acquire(blocking=False):
+            # 진행 중인 턴의 대화 기록에는 손대지 않고, 이 경우에도 마지막 이벤트는 done (busy=True)
+            yield ChatEvent("error", {"message": "이 세션은 이미 답변을 생성하는 중입니다."})
+            yield ChatEvent("done", {"response": "", "prompt_stats": "", "cache_hit": False, "timings": {},
+                                     "consolidation_job_id": None, "trace_id": None, "busy": True})
+            return
+        telemetry = get_telemetry()
+        turn = _TurnState()
+        outcome = "cancelled" # 클라이언트가 중간에 닫으면 이 값으로 집계
+        with telemetry.span("chat_turn", session_id=session.session_id, model=self.model_name) as turn_span:
+            try:
+                session.messages.append({"role": "user", "content": user_query})
+                try:
+                    yield from self._run_turn(session, user_query, turn)
+                    outcome = "cache_hit" if turn.cache_hit else "ok"
+                except Exception as e:
+                    print(f"Chat pipeline error in session {session.session_id}: {e}")
+                    turn_span.error = f"{type(e).__name__}: {e}"
+                    turn.response = FALLBACK_RESPONSE
+                    outcome = "error"
+                    yield ChatEvent("error", {"message": f"AI 응답 생성 중 오류 발생: {e}"})
+            finally:
+                # 클라이언트가 중간에 끊어도 여기까지 생성된 답변은 대화 기록에 남김 (다음 턴의 문맥)
+                session.messages.append({"role": "assistant", "content": turn.response})
+                session.last_prompt_stats = turn.prompt_stats
+                session.last_active = time.time()
+                session.lock.release()
+                turn_span.set(outcome=outcome)
+                telemetry.increment("claire_chat_turns_total", outcome=outcome)
+
+            consolidation_job_id = None
+            if session.auto_save and self.consolidation_worker is not None:
+                # 세션별 누적 요약을 마지막 체크포인트 이후의 새 메시지만으로 갱신 (같은 세션의 대기 중인 요청은 최신 요청으로 합쳐짐)
+                consolidation_job_id = self.consolidation_worker.submit(
+                    session_id=session.session_id,
+                    conversation_history_str="",
+                    memory_system=self.memory_system,
+                    messages=list(session.messages)
+                )
+        # done은 턴 span을 닫은 뒤 내보냄 (done 이후 클라이언트가 바로 닫아도 트레이스가 완료된 상태로 남도록)
+        yield ChatEvent("done", {
+            "response": turn.response,
+            "prompt_stats": turn.prompt_stats,
+            "cache_hit": turn.cache_hit,
+            "timings": {name: round(value, 4) for name, value in turn.timings.items()},
+            "consolidation_job_id": consolidation_job_id,
+            "trace_id": turn_span.trace_id,
+            "busy": False
+        })
+
+@cached_resource
+def get_chat_pipeline(model_name: str = DEFAULT_OLLAMA_MODEL_NAME) -> ChatPipeline:
+    """모델별 공유 파이프라인 (임베딩, 벡터DB, 커넥션 풀 등은 프로세스 전역 리소스를 재사용)."""
+    from .llm_services import get_chat_llm_instance, get_embedding_model
+    from .db_services import get_rag_vector_store, get_memory_vector_store
+    from .memory_system import MemorySystem
+    from .consolidation_worker import get_consolidation_worker
+
+    llm = get_chat_llm_instance(model_name)
+    embedding_model = get_embedding_model()
+    return ChatPipeline(
+        model_name=model_name,
+        llm=llm,
+        memory_system=MemorySystem(
+            llm_for_summarization=llm, # 채팅 LLM을 요약에도 사용
+            embedding_instance=embedding_model,
+            memory_vdb_instance=get_memory_vector_store()
+        ),
+        rag_vector_store=get_rag_vector_store(),
+        embedding_model=embedding_model,
+        consolidation_worker=get_consolidation_worker(),
+        response_cache=get_response_cache() if RESPONSE_CACHE_ENABLED else None
+    )
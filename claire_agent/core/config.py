@@ -9,6 +9,16 @@ load_dotenv()
 DEFAULT_OLLAMA_MODEL_NAME = os.getenv("OLLAMA_MODEL_NAME", "gemma3:4b")
 HF_EMBEDDING_MODEL_NAME = os.getenv("HF_EMBEDDING_MODEL_NAME", "jhgan/ko-sbert-nli")
 OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m") # 마지막 요청 후 모델(과 KV 캐시)을 메모리에 유지할 시간
+OLLAMA_HTTP_TIMEOUT_SEC = float(os.getenv("OLLAMA_HTTP_TIMEOUT_SEC", "3")) # 모델 목록/정보 조회 HTTP 타임아웃 (초)
+OLLAMA_HTTP_POOL_SIZE = int(os.getenv("OLLAMA_HTTP_POOL_SIZE", "10")) # Ollama HTTP 커넥션 풀 크기
+OLLAMA_MODEL_LIST_TTL_SEC = float(os.getenv("OLLAMA_MODEL_LIST_TTL_SEC", "60")) # 모델 목록 캐시 유효 시간 (지나면 비동기 갱신)
+OLLAMA_MODEL_REFRESH_INTERVAL_SEC = float(os.getenv("OLLAMA_MODEL_REFRESH_INTERVAL_SEC", "30")) # 백그라운드 모델 목록 갱신 주기 (초)
+OLLAMA_BASE_URLS = [url.strip() for url in os.getenv("OLLAMA_BASE_URLS", OLLAMA_BASE_URL).split(",") if url.strip()] # 채팅 요청을 분산할 Ollama 서버 목록 (쉼표 구분)
+OLLAMA_ENDPOINT_COOLDOWN_SEC = float(os.getenv("OLLAMA_ENDPOINT_COOLDOWN_SEC", "30")) # 연결 실패한 서버를 후순위로 둘 시간 (초)
+OLLAMA_WARMUP_ENABLED = os.getenv("OLLAMA_WARMUP_ENABLED", "true").lower() in ("1", "true", "yes") # 선택된 모델을 백그라운드에서 미리 로드
+OLLAMA_WARMUP_INTERVAL_SEC = float(os.getenv("OLLAMA_WARMUP_INTERVAL_SEC", "600")) # 같은 서버/모델 웜업 최소 간격 (초)
+OLLAMA_WARMUP_TIMEOUT_SEC = float(os.getenv("OLLAMA_WARMUP_TIMEOUT_SEC", "300")) # 모델 로드 대기 최대 시간 (초)
 
 # 경로 설정
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) # 프로젝트 루트 디렉토리
@@ -16,7 +26,140 @@ RAG_DOCS_PATH = os.path.join(BASE_DIR, "rag_documents/")
 VECTOR_DB_ROOT_PATH = os.path.join(BASE_DIR, "vector_dbs") # Chroma DB 저장용 루트 폴더
 VECTOR_DB_RAG_PATH = os.path.join(VECTOR_DB_ROOT_PATH, "chroma_db_rag/")
 VECTOR_DB_MEMORY_PATH = os.path.join(VECTOR_DB_ROOT_PATH, "chroma_db_memory/")
+VECTOR_DB_MEMORY_NUMPY_PATH = os.path.join(VECTOR_DB_ROOT_PATH, "numpy_memory/") # MEMORY_VECTOR_BACKEND="numpy"일 때 기억 벡터 저장 폴더
 SQLITE_DB_NAME = os.path.join(BASE_DIR, "claire_memory.db") # SQLite DB 파일 경로
+RAG_MANIFEST_PATH = os.path.join(VECTOR_DB_ROOT_PATH, "rag_manifest.json") # RAG 인덱스에 반영된 파일 목록 (경로, mtime, 해시, 청크 ID)
+EMBEDDING_CACHE_DB_PATH = os.path.join(VECTOR_DB_ROOT_PATH, "embedding_cache.db") # 임베딩 디스크 캐시 (모델명 + 텍스트 해시 키)
+
+# 임베딩 캐시 설정
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+EMBEDDING_CACHE_LRU_SIZE = int(os.getenv("EMBEDDING_CACHE_LRU_SIZE", "4096")) # 프로세스 내 LRU에 보관할 임베딩 수
+
+# RAG 문서 분할 설정
+RAG_CHUNK_SIZE = int(os.getenv("RAG_CHUNK_SIZE", "1000"))
+RAG_CHUNK_OVERLAP = int(os.getenv("RAG_CHUNK_OVERLAP", "150"))
+
+# RAG 스트리밍 색인 설정
+RAG_EMBED_BATCH_SIZE = int(os.getenv("RAG_EMBED_BATCH_SIZE", "64")) # 임베딩 및 Chroma upsert 배치 크기 (청크 수)
+RAG_EMBED_WORKERS = int(os.getenv("RAG_EMBED_WORKERS", "0")) # 임베딩 프로세스 수 (0이면 CPU 코어 수의 절반, 1이면 단일 프로세스)
+RAG_EMBED_POOL_MIN_BATCHES = int(os.getenv("RAG_EMBED_POOL_MIN_BATCHES", "4")) # 이 배치 수를 넘는 대량 색인일 때만 프로세스 풀 시작
+RAG_PROGRESS_INTERVAL_SEC = float(os.getenv("RAG_PROGRESS_INTERVAL_SEC", "5")) # 진행률/처리량 출력 간격 (초)
+RAG_MANIFEST_SAVE_EVERY_FILES = int(os.getenv("RAG_MANIFEST_SAVE_EVERY_FILES", "50")) # 색인 중 매니페스트를 저장할 파일 수 간격
+RAG_MANIFEST_SAVE_INTERVAL_SEC = float(os.getenv("RAG_MANIFEST_SAVE_INTERVAL_SEC", "10")) # 또는 이 시간(초)이 지나면 저장 (끝날 때 한 번 더 저장)
+
+# SQLite 커넥션 풀 설정
+SQLITE_POOL_SIZE = int(os.getenv("SQLITE_POOL_SIZE", "8")) # 풀에 유지할 최대 커넥션 수
+SQLITE_BUSY_TIMEOUT_SEC = float(os.getenv("SQLITE_BUSY_TIMEOUT_SEC", "10")) # 잠금 대기 최대 시간 (초)
+SQLITE_STATEMENT_CACHE_SIZE = int(os.getenv("SQLITE_STATEMENT_CACHE_SIZE", "256")) # 커넥션별 준비된 문장 캐시 크기
+
+# 장기 기억 접근 기록(write-behind) 설정
+LTM_ACCESS_FLUSH_INTERVAL_SEC = float(os.getenv("LTM_ACCESS_FLUSH_INTERVAL_SEC", "5")) # 주기적 flush 간격 (초)
+LTM_ACCESS_FLUSH_THRESHOLD = int(os.getenv("LTM_ACCESS_FLUSH_THRESHOLD", "50")) # 버퍼된 기억 수가 이 값 이상이면 즉시 flush
+
+# 백그라운드 장기 기억 통합 작업 큐 설정
+CONSOLIDATION_WORKER_THREADS = int(os.getenv("CONSOLIDATION_WORKER_THREADS", "1")) # 통합 작업 스레드 수
+CONSOLIDATION_RESULT_HISTORY = int(os.getenv("CONSOLIDATION_RESULT_HISTORY", "100")) # 보관할 완료 결과 수
+LTM_SEGMENT_MAX_MESSAGES = int(os.getenv("LTM_SEGMENT_MAX_MESSAGES", "40")) # 누적 요약 하나가 담당하는 최대 메시지 수 (넘으면 새 세그먼트)
+
+# 장기 기억 검색 설정
+LTM_RETRIEVAL_MODE = os.getenv("LTM_RETRIEVAL_MODE", "dense") # "dense"(기본, 벡터 검색) | "lexical"(FTS5 BM25) | "hybrid"(BM25 + 벡터 RRF 융합, 선택 사용)
+LTM_HYBRID_CANDIDATE_FACTOR = int(os.getenv("LTM_HYBRID_CANDIDATE_FACTOR", "5")) # hybrid 모드에서 각 검색이 가져올 후보 수 = top_k * factor
+LTM_RRF_K = int(os.getenv("LTM_RRF_K", "60")) # Reciprocal Rank Fusion 상수
+
+# 장기 기억 재정렬(ranking) 설정: 종합 점수 = 가중치 합 (유사도, 중요도, 최근성, 접근 빈도)
+LTM_RANKING_ENABLED = os.getenv("LTM_RANKING_ENABLED", "true").lower() in ("1", "true", "yes")
+LTM_RANK_OVERFETCH_FACTOR = int(os.getenv("LTM_RANK_OVERFETCH_FACTOR", "5")) # 재정렬용 후보 수 = top_k * factor
+LTM_RANK_WEIGHT_SIMILARITY = float(os.getenv("LTM_RANK_WEIGHT_SIMILARITY", "0.7"))
+LTM_RANK_WEIGHT_IMPORTANCE = float(os.getenv("LTM_RANK_WEIGHT_IMPORTANCE", "0.15"))
+LTM_RANK_WEIGHT_RECENCY = float(os.getenv("LTM_RANK_WEIGHT_RECENCY", "0.1"))
+LTM_RANK_WEIGHT_FREQUENCY = float(os.getenv("LTM_RANK_WEIGHT_FREQUENCY", "0.05"))
+LTM_RANK_RECENCY_HALF_LIFE_DAYS = float(os.getenv("LTM_RANK_RECENCY_HALF_LIFE_DAYS", "30")) # 최근성 점수가 절반이 되는 기간 (일)
+
+# 장기 기억 유지보수 설정 (중요도 감쇠는 마지막 접근 시각 기준으로 조회 시점에 계산)
+LTM_DECAY_GRACE_DAYS = float(os.getenv("LTM_DECAY_GRACE_DAYS", "30")) # 마지막 접근 후 감쇠가 시작되기까지의 기간 (일)
+LTM_DECAY_PERIOD_DAYS = float(os.getenv("LTM_DECAY_PERIOD_DAYS", "30")) # 감쇠 1단계 주기 (일)
+LTM_DECAY_FACTOR = float(os.getenv("LTM_DECAY_FACTOR", "0.9")) # 단계당 중요도 배율
+LTM_DECAY_FLOOR = float(os.getenv("LTM_DECAY_FLOOR", "0.05")) # 감쇠로는 이 값 아래로 내려가지 않음
+LTM_PRUNE_THRESHOLD = float(os.getenv("LTM_PRUNE_THRESHOLD", "0.01")) # 이 값 미만의 중요도를 가진 기억은 삭제
+LTM_MAINTENANCE_CHUNK_SIZE = int(os.getenv("LTM_MAINTENANCE_CHUNK_SIZE", "500")) # 유지보수 삭제 배치 크기 (행 수)
+
+# SQLite <-> 기억 벡터DB 동기화 (outbox) 설정
+LTM_VECTOR_SYNC_INTERVAL_SEC = float(os.getenv("LTM_VECTOR_SYNC_INTERVAL_SEC", "10")) # 적용 실패한 벡터 작업 재시도 주기 (초)
+LTM_VECTOR_SYNC_BATCH_SIZE = int(os.getenv("LTM_VECTOR_SYNC_BATCH_SIZE", "100")) # 한 번에 적용할 outbox 작업 수
+LTM_VECTOR_SYNC_PAGE_SIZE = int(os.getenv("LTM_VECTOR_SYNC_PAGE_SIZE", "1000")) # 일관성 점검 시 Chroma ID 조회 페이지 크기
+
+# 기억 벡터DB 백엔드 설정
+MEMORY_VECTOR_BACKEND = os.getenv("MEMORY_VECTOR_BACKEND", "chroma") # "chroma" 또는 "numpy" (메모리 맵 배열 + 정확한 전수 검색)
+MEMORY_VECTOR_DTYPE = os.getenv("MEMORY_VECTOR_DTYPE", "float32") # numpy 백엔드 저장 형식 ("float16"이면 디스크/메모리 절반)
+
+# 유사(중복) 기억 병합 설정
+LTM_DEDUP_ENABLED = os.getenv("LTM_DEDUP_ENABLED", "false").lower() in ("1", "true", "yes") # 저장 시 유사한 기존 기억이 있으면 새로 만들지 않고 병합 (기존 기억을 덮어쓰므로 선택 사용)
+LTM_DEDUP_SIMILARITY_THRESHOLD = float(os.getenv("LTM_DEDUP_SIMILARITY_THRESHOLD", "0.92")) # 중복으로 볼 코사인 유사도 하한
+LTM_DEDUP_SCOPE = os.getenv("LTM_DEDUP_SCOPE", "session") # "session"(같은 세션 안에서만) 또는 "global"(전체 기억)
+LTM_DEDUP_CANDIDATES = int(os.getenv("LTM_DEDUP_CANDIDATES", "3")) # 저장 시 비교할 최근접 기억 수
+
+# 계층형 기억 (세션 롤업 -> 기간 다이제스트) 설정
+LTM_TIERS_ENABLED = os.getenv("LTM_TIERS_ENABLED", "false").lower() in ("1", "true", "yes") # 백그라운드 롤업과 상위 계층 우선 검색 사용 여부 (선택 사용)
+LTM_ROLLUP_SESSION_IDLE_MIN = float(os.getenv("LTM_ROLLUP_SESSION_IDLE_MIN", "60")) # 마지막 활동 후 이 시간(분)이 지난 세션/기억만 롤업
+LTM_ROLLUP_MIN_CHILDREN = int(os.getenv("LTM_ROLLUP_MIN_CHILDREN", "2")) # 상위 요약을 새로 만들 최소 하위 기억 수
+LTM_DIGEST_PERIOD = os.getenv("LTM_DIGEST_PERIOD", "week") # 다이제스트 단위: "week" 또는 "month"
+LTM_ROLLUP_SUMMARY_CHARS = int(os.getenv("LTM_ROLLUP_SUMMARY_CHARS", "400")) # 세션/다이제스트 요약 길이 (자)
+LTM_ROLLUP_INTERVAL_SEC = float(os.getenv("LTM_ROLLUP_INTERVAL_SEC", "600")) # 백그라운드 롤업 작업 최소 실행 간격 (초)
+LTM_ROLLUP_MAX_GROUPS = int(os.getenv("LTM_ROLLUP_MAX_GROUPS", "20")) # 한 번에 롤업할 세션/기간 수 (LLM 호출 수 제한)
+LTM_TIER_DRILL_WIDTH = int(os.getenv("LTM_TIER_DRILL_WIDTH", "2")) # 검색 시 하위 계층까지 내려가 볼 상위 노드 수
+
+# 검색(LTM + RAG) 오케스트레이션 설정
+RETRIEVAL_LTM_TIMEOUT_SEC = float(os.getenv("RETRIEVAL_LTM_TIMEOUT_SEC", "5")) # 장기 기억 검색 타임아웃 (초)
+RETRIEVAL_RAG_TIMEOUT_SEC = float(os.getenv("RETRIEVAL_RAG_TIMEOUT_SEC", "5")) # RAG 검색 타임아웃 (초)
+RETRIEVAL_MAX_WORKERS = int(os.getenv("RETRIEVAL_MAX_WORKERS", "8")) # 병렬 검색용 스레드 풀 크기 (전 세션 공유)
+
+# 프롬프트 토큰 예산 설정
+PROMPT_CONTEXT_WINDOW = int(os.getenv("PROMPT_CONTEXT_WINDOW", "4096")) # 모델 컨텍스트 길이 (토큰)
+PROMPT_RESPONSE_RESERVE_TOKENS = int(os.getenv("PROMPT_RESPONSE_RESERVE_TOKENS", "1024")) # 답변 생성용으로 남겨둘 토큰
+PROMPT_LTM_BUDGET_TOKENS = int(os.getenv("PROMPT_LTM_BUDGET_TOKENS", "400")) # 회상 기억 섹션 최대 토큰
+PROMPT_RAG_BUDGET_TOKENS = int(os.getenv("PROMPT_RAG_BUDGET_TOKENS", "800")) # RAG 섹션 최대 토큰 (쓰지 않은 만큼은 대화 기록에 배정)
+PROMPT_HISTORY_SUMMARY_TOKENS = int(os.getenv("PROMPT_HISTORY_SUMMARY_TOKENS", "300")) # 잘려나간 이전 대화 요약에 쓸 최대 토큰
+PROMPT_TOKENIZER_NAME = os.getenv("PROMPT_TOKENIZER_NAME", "") # 토큰 계산용 HuggingFace 토크나이저 (비우면 근사 계산)
+PROMPT_TOKEN_COUNT_CACHE_SIZE = int(os.getenv("PROMPT_TOKEN_COUNT_CACHE_SIZE", "4096")) # 텍스트별 토큰 수 캐시 크기
+PROMPT_LAYOUT = os.getenv("PROMPT_LAYOUT", "classic") # "classic"(기본): 시스템 메시지에 모두 포함, "stable_prefix": 매 턴 바뀌는 컨텍스트를 대화 기록 뒤 두 번째 시스템 메시지로 배치 (KV 캐시 재사용, 대화 중간의 시스템 메시지를 지원하는 모델에서만 선택 사용)
+PROMPT_HISTORY_DROP_STEP = int(os.getenv("PROMPT_HISTORY_DROP_STEP", "8")) # stable_prefix에서 대화 기록을 잘라낼 때의 메시지 단위 (클수록 캐시 무효화가 드묾, 짝수 권장)
+
+# 응답 캐시 설정 (반복되는 질문에 LLM 생성 없이 이전 답변 재사용, 기본 비활성)
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "false").lower() in ("1", "true", "yes")
+RESPONSE_CACHE_SIMILARITY_THRESHOLD = float(os.getenv("RESPONSE_CACHE_SIMILARITY_THRESHOLD", "0.95")) # 같은 질문으로 볼 질의 임베딩 코사인 유사도 하한
+RESPONSE_CACHE_TTL_SEC = float(os.getenv("RESPONSE_CACHE_TTL_SEC", "3600")) # 캐시 항목 유효 시간 (초)
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "512")) # 최대 항목 수 (넘으면 가장 오래 쓰이지 않은 항목부터 제거)
+RESPONSE_CACHE_REPLAY_CHUNK_CHARS = int(os.getenv("RESPONSE_CACHE_REPLAY_CHUNK_CHARS", "40")) # 캐시된 답변을 스트리밍처럼 표시할 때의 조각 크기 (글자)
+
+# HTTP/SSE API 서버 설정 (python -m core.api_server)
+API_SERVER_HOST = os.getenv("API_SERVER_HOST", "127.0.0.1")
+API_SERVER_PORT = int(os.getenv("API_SERVER_PORT", "8765"))
+API_MAX_CONCURRENT_TURNS = int(os.getenv("API_MAX_CONCURRENT_TURNS", "8")) # 동시에 처리할 대화 턴 수 (넘는 요청은 대기)
+API_SESSION_IDLE_TTL_SEC = float(os.getenv("API_SESSION_IDLE_TTL_SEC", "3600")) # 이 시간 동안 요청이 없는 세션은 메모리에서 제거 (초)
+API_MAX_SESSIONS = int(os.getenv("API_MAX_SESSIONS", "1000")) # 메모리에 유지할 최대 세션 수 (넘으면 가장 오래 쉰 세션부터 제거)
+API_MAX_REQUEST_BYTES = int(os.getenv("API_MAX_REQUEST_BYTES", "1048576")) # 요청 본문 최대 크기 (바이트)
+
+# 텔레메트리 (단계별 트레이스, Prometheus 메트릭) 설정
+TELEMETRY_ENABLED = os.getenv("TELEMETRY_ENABLED", "true").lower() in ("1", "true", "yes")
+TELEMETRY_TRACE_LOG_PATH = os.getenv("TELEMETRY_TRACE_LOG_PATH", "") # 완료된 트레이스를 JSON Lines로 남길 파일 (비우면 기록 안 함)
+TELEMETRY_RECENT_TRACES = int(os.getenv("TELEMETRY_RECENT_TRACES", "200")) # 메모리에 보관할 최근 트레이스 수 (사이드바, /v1/traces)
+TELEMETRY_MAX_SPANS_PER_TRACE = int(os.getenv("TELEMETRY_MAX_SPANS_PER_TRACE", "200")) # 트레이스당 최대 span 수 (넘는 span은 메트릭만 기록)
+TELEMETRY_METRICS_PORT = int(os.getenv("TELEMETRY_METRICS_PORT", "0")) # /metrics HTTP 포트 (0이면 사용 안 함, API 서버는 자체 /metrics 제공)
+
+# 임베딩 엔진 설정 (ONNX/int8 엔진은 python -m core.onnx_embeddings export로 모델을 먼저 내보내야 함)
+EMBEDDING_ENGINE = os.getenv("EMBEDDING_ENGINE", "hf") # "hf"(PyTorch sentence-transformers) 또는 "onnx" (onnxruntime)
+EMBEDDING_ONNX_DIR = os.getenv("EMBEDDING_ONNX_DIR", os.path.join(BASE_DIR, "models", "onnx_embedding")) # 내보낸 ONNX 모델/토크나이저 폴더
+EMBEDDING_ONNX_QUANTIZED = os.getenv("EMBEDDING_ONNX_QUANTIZED", "true").lower() in ("1", "true", "yes") # int8 동적 양자화 모델 사용 (있을 때)
+EMBEDDING_NUM_THREADS = int(os.getenv("EMBEDDING_NUM_THREADS", "0")) # ONNX 추론 스레드 수 (0이면 onnxruntime 기본값)
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "32")) # 한 번의 추론(forward)에 넣을 최대 문장 수
+EMBEDDING_MICROBATCH_ENABLED = os.getenv("EMBEDDING_MICROBATCH_ENABLED", "true").lower() in ("1", "true", "yes") # 동시 임베딩 요청을 한 번의 추론으로 합침
+EMBEDDING_MICROBATCH_WAIT_MS = float(os.getenv("EMBEDDING_MICROBATCH_WAIT_MS", "2")) # 다른 세션의 요청을 기다리는 최대 시간 (밀리초)
+EMBEDDING_PARITY_MIN_COSINE = float(os.getenv("EMBEDDING_PARITY_MIN_COSINE", "0.99")) # 기준(PyTorch) 임베딩과의 최소 코사인 유사도
+
+# 시작(콜드 스타트) 설정
+STARTUP_BACKGROUND_WARMUP = os.getenv("STARTUP_BACKGROUND_WARMUP", "true").lower() in ("1", "true", "yes") # UI를 먼저 표시하고 모델/벡터DB는 백그라운드에서 로드 (false면 첫 실행에서 모두 로드한 뒤 표시)
+STARTUP_STATUS_POLL_SEC = float(os.getenv("STARTUP_STATUS_POLL_SEC", "1")) # 준비 중 화면이 로딩 상태를 다시 확인하는 주기 (초)
+RAG_SYNC_IN_BACKGROUND = os.getenv("RAG_SYNC_IN_BACKGROUND", "true").lower() in ("1", "true", "yes") # RAG 색인 동기화를 별도 스레드에서 실행 (동기화 중에는 기존 색인으로 검색)
 
 # 기타 설정
 CURRENT_LOCATION_STR = os.getenv("CURRENT_USER_LOCATION", "대한민국 경기도 용인시") # 사용자의 현재 위치
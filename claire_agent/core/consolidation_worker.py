@@ -0,0 +1,296 @@
+# claire_agent/core/consolidation_worker.py
+import atexit
+import datetime
+import itertools
+import json
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, List, Optional, Set
+
+# 내부 모듈 import
+from .config import CONSOLIDATION_WORKER_THREADS, CONSOLIDATION_RESULT_HISTORY, LTM_TIERS_ENABLED, LTM_ROLLUP_INTERVAL_SEC
+from .data_models import StoredMemoryEntry
+
+ROLLUP_JOB_KEY = "__tier_rollup__" # 계층 롤업 작업의 큐 키 (세션 작업과 같은 방식으로 합쳐짐)
+
+@dataclass
+class ConsolidationJob:
+    session_id: str
+    conversation_history_str: str
+    memory_system: object # MemorySystem (순환 import 방지를 위해 타입은 느슨하게 둠)
+    user_provided_summary: Optional[str] = None
+    use_llm_summary: bool = True
+    messages: Optional[List[dict]] = None # 지정 시 누적 요약(incremental) 모드로 통합
+    kind: str = "session" # "session"(대화 통합) 또는 "rollup"(세션 롤업/기간 다이제스트)
+    job_id: int = 0
+    submitted_time: float = field(default_factory=time.time)
+    coalesced_count: int = 0 # 이 작업에 흡수된(실행되지 않은) 이전 요청 수
+
+@dataclass
+class ConsolidationResult:
+    job_id: int
+    session_id: str
+    entry: Optional[StoredMemoryEntry]
+    error: Optional[str] = None
+    coalesced_count: int = 0
+    queued_sec: float = 0.0
+    duration_sec: float = 0.0
+    completed_time: str = ""
+
+    @property
+    def succeeded(self) -> bool:
+        return self.entry is not None and self.error is None
+
+class ConsolidationWorker:
+    """
+    장기 기억 통합(consolidate_session_memory)을 백그라운드 스레드에서 실행하는 작업 큐.
+    - 같은 session_id의 요청이 대기 중에 다시 들어오면 최신 요청 하나로 합칩니다(coalescing).
+    - 완료 결과는 poll_results()로 가져가거나, 등록된 콜백으로 통지됩니다.
+    - 대화 통합 후 LTM_ROLLUP_INTERVAL_SEC마다 계층형 기억 롤업(run_tier_rollups)도 같은 큐에서 실행합니다.
+    """
+
+    def __init__(self, num_threads: int = CONSOLIDATION_WORKER_THREADS, result_history: int = CONSOLIDATION_RESULT_HISTORY):
+        self._pending: "OrderedDict[str, ConsolidationJob]" = OrderedDict() # session_id -> 최신 작업
+        self._running_sessions: Set[str] = set()
+        self._results: Deque[ConsolidationResult] = deque(maxlen=result_history)
+        self._callbacks: List[Callable[[ConsolidationResult], None]] = []
+        self._job_ids = itertools.count(1)
+        self._cond = threading.Condition()
+        self._shutdown = False
+        self._last_rollup_time: Optional[float] = None
+        self._threads = [
+            threading.Thread(target=self._run, name=f"ltm-consolidation-{i}", daemon=True)
+            for i in range(max(1, num_threads))
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, session_id: str, conversation_history_str: str, memory_system, user_provided_summary: Optional[str] = None, use_llm_summary: bool = True, messages: Optional[List[dict]] = None) -> int:
+        """작업을 큐에 넣고 job_id를 반환합니다. 같은 세션의 대기 작업은 새 작업으로 교체됩니다."""
+        with self._cond:
+            if self._shutdown:
+                raise RuntimeError("ConsolidationWorker has been shut down.")
+            job = ConsolidationJob(
+                session_id=session_id,
+                conversation_history_str=conversation_history_str,
+                memory_system=memory_system,
+                user_provided_summary=user_provided_summary,
+                use_llm_summary=use_llm_summary,
+                messages=messages,
+                job_id=next(self._job_ids)
+            )
+            replaced = self._pending.pop(session_id, None)
+            if replaced is not None:
+                job.coalesced_count = replaced.coalesced_count + 1
+                job.submitted_time = replaced.submitted_time # 대기 시간은 가장 오래된 요청 기준
+                print(f"Coalesced consolidation job {replaced.job_id} into {job.job_id} for session: {session_id}")
+            self._pending[session_id] = job
+            self._cond.notify()
+            return job.job_id
+
+    def submit_rollup(self, memory_system) -> int:
+        """계층형 기억 롤업 작업을 큐에 넣습니다. 대기 중인 롤업 작업이 있으면 하나로 합쳐집니다."""
+        with self._cond:
+            if self._shutdown:
+                raise RuntimeError("ConsolidationWorker has been shut down.")
+            job = ConsolidationJob(
+                session_id=ROLLUP_JOB_KEY,
+                conversation_history_str="",
+                memory_system=memory_system,
+                kind="rollup",
+                job_id=next(self._job_ids)
+            )
+            replaced = self._pending.pop(ROLLUP_JOB_KEY, None)
+            if replaced is not None:
+                job.coalesced_count = replaced.coalesced_count + 1
+                job.submitted_time = replaced.submitted_time
+            self._pending[ROLLUP_JOB_KEY] = job
+            self._last_rollup_time = time.monotonic()
+            self._cond.notify()
+            return job.job_id
+
+    def _maybe_schedule_rollup(self, memory_system):
+        """대화 통합 후 LTM_ROLLUP_INTERVAL_SEC마다 한 번씩 롤업 작업을 예약합니다."""
+        if not LTM_TIERS_ENABLED or not hasattr(memory_system, "run_tier_rollups"):
+            return
+        with self._cond:
+            due = self._last_rollup_time is None or time.monotonic() - self._last_rollup_time >= LTM_ROLLUP_INTERVAL_SEC
+        if due:
+            try:
+                self.submit_rollup(memory_system)
+            except RuntimeError: # 종료 중
+                pass
+
+    def add_completion_callback(self, callback: Callable[[ConsolidationResult], None]):
+        with self._cond:
+            self._callbacks.append(callback)
+
+    def is_busy(self, session_id: Optional[str] = None) -> bool:
+        with self._cond:
+            if session_id is None:
+                return bool(self._pending or self._running_sessions)
+            return session_id in self._pending or session_id in self._running_sessions
+
+    def poll_results(self, session_id: Optional[str] = None) -> List[ConsolidationResult]:
+        """완료된 결과를 꺼내 반환합니다 (session_id 지정 시 해당 세션 결과만 꺼냄)."""
+        with self._cond:
+            taken = [r for r in self._results if session_id is None or r.session_id == session_id]
+            remaining = [r for r in self._results if not (session_id is None or r.session_id == session_id)]
+            self._results.clear()
+            self._results.extend(remaining)
+            return taken
+
+    def wait_until_idle(self, timeout: Optional[float] = None) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._pending or self._running_sessions:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+    def shutdown(self, wait: bool = True, timeout: Optional[float] = None):
+        if wait:
+            self.wait_until_idle(timeout)
+        with self._cond:
+            self._shutdown = True
+            self._cond.notify_all()
+
+    def _next_job(self) -> Optional[ConsolidationJob]:
+        with self._cond:
+            while True:
+                if self._shutdown:
+                    return None
+                # 이미 실행 중인 세션의 작업은 건너뛰어 같은 세션이 동시에 두 번 통합되지 않도록 함
+                for session_id in self._pending:
+                    if session_id not in self._running_sessions:
+                        self._running_sessions.add(session_id)
+                        return self._pending.pop(session_id)
+                self._cond.wait()
+
+    def _run(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            started = time.time()
+            entry, error = None, None
+            try:
+                if job.kind == "rollup":
+                    job.memory_system.run_tier_rollups()
+                elif job.messages is not None:
+                    # 체크포인트는 DB에 저장되므로, 합쳐진(최신) 작업의 전체 메시지로 누락 없이 갱신됨
+                    entry = job.memory_system.consolidate_session_incremental(job.session_id, job.messages)
+                else:
+                    entry = job.memory_system.consolidate_session_memory(
+                        session_id=job.session_id,
+                        conversation_history_str=job.conversation_history_str,
+                        user_provided_summary=job.user_provided_summary,
+                        use_llm_summary=job.use_llm_summary
+                    )
+                if entry is None and job.kind == "session":
+                    error = "consolidate_session_memory returned no entry"
+            except Exception as e:
+                error = str(e)
+                print(f"Background consolidation failed for session {job.session_id}: {e}")
+            result = ConsolidationResult(
+                job_id=job.job_id,
+                session_id=job.session_id,
+                entry=entry,
+                error=error,
+                coalesced_count=job.coalesced_count,
+                queued_sec=started - job.submitted_time,
+                duration_sec=time.time() - started,
+                completed_time=datetime.datetime.now().isoformat()
+            )
+            with self._cond:
+                self._running_sessions.discard(job.session_id)
+                self._results.append(result)
+                callbacks = list(self._callbacks)
+                self._cond.notify_all()
+            for callback in callbacks:
+                try:
+                    callback(result)
+                except Exception as e:
+                    print(f"Consolidation completion callback error: {e}")
+            if job.kind == "session":
+                self._maybe_schedule_rollup(job.memory_system)
+
+_worker: Optional[ConsolidationWorker] = None
+_worker_lock = threading.Lock()
+
+def get_consolidation_worker() -> ConsolidationWorker:
+    """프로세스 전역 통합 작업 큐를 반환합니다 (모든 Streamlit 세션이 공유)."""
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = ConsolidationWorker()
+            atexit.register(_worker.shutdown, True, 30.0)
+        return _worker
+
+def validate_job_request(request) -> Optional[str]:
+    """stdin 작업 한 줄(JSON)의 형식을 확인합니다. 문제가 있으면 건너뛸 이유를, 없으면 None을 반환."""
+    if not isinstance(request, dict):
+        return "job must be a JSON object"
+    session_id = request.get("session_id")
+    if not isinstance(session_id, str) or not session_id:
+        return "missing or non-string 'session_id'"
+    messages = request.get("messages")
+    if messages is not None and (not isinstance(messages, list) or not all(isinstance(m, dict) for m in messages)):
+        return "'messages' must be a list of {\"role\", \"content\"} objects"
+    return None
+
+def main():
+    """
+    헤드리스 실행 진입점: stdin으로 JSON Lines 작업을 받아 처리합니다.
+    예) echo '{"session_id": "s1", "conversation": "user: ..."}' | python -m core.consolidation_worker
+    """
+    from .config import DEFAULT_OLLAMA_MODEL_NAME
+    from .llm_services import get_chat_llm_instance, get_embedding_model
+    from .db_services import init_sqlite_db, get_memory_vector_store
+    from .memory_system import MemorySystem
+
+    init_sqlite_db()
+    memory_systems: Dict[str, object] = {}
+    worker = ConsolidationWorker()
+    worker.add_completion_callback(lambda r: print(json.dumps({
+        "job_id": r.job_id, "session_id": r.session_id,
+        "memory_id": r.entry.id if r.entry else None, "error": r.error,
+        "coalesced": r.coalesced_count, "duration_sec": round(r.duration_sec, 3)
+    }, ensure_ascii=False), flush=True))
+
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        try:
+            request = json.loads(line)
+        except json.JSONDecodeError as e:
+            print(f"Skipping invalid job line: {e}", file=sys.stderr)
+            continue
+        error = validate_job_request(request)
+        if error:
+            print(f"Skipping invalid job line: {error}", file=sys.stderr)
+            continue
+        model_name = request.get("model", DEFAULT_OLLAMA_MODEL_NAME)
+        if model_name not in memory_systems:
+            memory_systems[model_name] = MemorySystem(
+                llm_for_summarization=get_chat_llm_instance(model_name),
+                embedding_instance=get_embedding_model(),
+                memory_vdb_instance=get_memory_vector_store()
+            )
+        worker.submit(
+            session_id=request["session_id"],
+            conversation_history_str=request.get("conversation", ""),
+            memory_system=memory_systems[model_name],
+            user_provided_summary=request.get("summary"),
+            use_llm_summary=request.get("use_llm_summary", True),
+            messages=request.get("messages") # {"role", "content"} 리스트를 주면 누적 요약 모드
+        )
+    worker.shutdown(wait=True)
+
+if __name__ == "__main__":
+    main()
@@ -12,4 +12,6 @@ class StoredMemoryEntry(BaseModel):
     creation_time: str
     last_accessed_time: str
     access_count: int = 0
-    user_importance_score: float = 0.5
\ No newline at end of file
+    user_importance_score: float = 0.5
+    tier: int = 0 # 0: 대화 요약, 1: 세션 롤업, 2: 기간 다이제스트
+    parent_id: int = 0 # 상위 계층 기억 ID (0이면 최상위)
\ No newline at end of file
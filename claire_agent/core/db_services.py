@@ -1,94 +1,194 @@
 # claire_agent/core/db_services.py
-import streamlit as st
-import sqlite3
-import os
+import datetime
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
 from langchain_community.vectorstores import Chroma
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.document_loaders import DirectoryLoader, TextLoader
 
 # config 및 llm_services 모듈에서 필요한 요소 가져오기
 from .config import (
     RAG_DOCS_PATH,
     VECTOR_DB_RAG_PATH,
     VECTOR_DB_MEMORY_PATH,
+    VECTOR_DB_MEMORY_NUMPY_PATH,
+    MEMORY_VECTOR_BACKEND,
+    RAG_SYNC_IN_BACKGROUND,
     SQLITE_DB_NAME
 )
 from .llm_services import get_embedding_model
+from .sqlite_storage import get_sqlite_pool
+from .resources import cached_resource
+from .rag_ingestion import IngestionReport, PrecomputedEmbeddings, sync_rag_index
+from .vector_backends import MemoryVectorBackend, ChromaMemoryBackend, NumpyMemoryBackend
 
-@st.cache_resource
+@cached_resource
 def get_rag_vector_store() -> Chroma:
     print("Initializing RAG Vector Store...")
-    embedding_func = get_embedding_model()
-    if os.path.exists(VECTOR_DB_RAG_PATH) and os.listdir(VECTOR_DB_RAG_PATH):
-        print(f"Loading RAG vector store from {VECTOR_DB_RAG_PATH}")
-        return Chroma(persist_directory=VECTOR_DB_RAG_PATH, embedding_function=embedding_func)
+    # 색인 시 프로세스 풀이 계산한 청크 임베딩을 영구 캐시 설정과 무관하게 add_documents에 넘기기 위한 조회층
+    embedding_func = PrecomputedEmbeddings(get_embedding_model())
+    print(f"Loading RAG vector store from {VECTOR_DB_RAG_PATH}")
+    db = Chroma(persist_directory=VECTOR_DB_RAG_PATH, embedding_function=embedding_func)
+    if RAG_SYNC_IN_BACKGROUND:
+        # 문서가 많거나 처음 색인하는 경우에도 시작/첫 요청을 막지 않음 (동기화 중에는 이미 색인된 청크로 검색)
+        threading.Thread(target=_sync_rag_store, args=(db,), name="rag-index-sync", daemon=True).start()
     else:
-        print(f"No existing RAG vector store at {VECTOR_DB_RAG_PATH}. Attempting to create new one.")
-        try:
-            # RAG_DOCS_PATH에 문서가 있는지 확인
-            if not os.path.exists(RAG_DOCS_PATH) or not os.listdir(RAG_DOCS_PATH):
-                print(f"No documents found in RAG directory: {RAG_DOCS_PATH}. Creating an empty RAG DB.")
-                # 빈 DB 생성
-                db = Chroma(persist_directory=VECTOR_DB_RAG_PATH, embedding_function=embedding_func)
-                db.persist()
-                return db
+        _sync_rag_store(db)
+    return db
 
-            loader = DirectoryLoader(
-                RAG_DOCS_PATH,
-                glob="**/*.*", # 모든 파일 대상
-                show_progress=True,
-                use_multithreading=True,
-                loader_cls=TextLoader, # 텍스트 파일 로더 사용
-                silent_errors=True # 오류 발생 시 경고만 출력하고 계속 진행
-            )
-            documents = loader.load()
+@dataclass
+class RagSyncStatus:
+    state: str = "idle" # idle, running, done, failed
+    elapsed_sec: float = 0.0
+    report: Optional[IngestionReport] = None
+    error: Optional[str] = None
 
-            if not documents:
-                print(f"No documents successfully loaded from {RAG_DOCS_PATH}. Creating an empty RAG DB.")
-                db = Chroma(persist_directory=VECTOR_DB_RAG_PATH, embedding_function=embedding_func)
-                db.persist()
-                return db
+    def summary(self) -> str:
+        if self.state == "running":
+            return f"RAG 색인 동기화 중 ({self.elapsed_sec:.1f}초 경과)"
+        if self.state == "done" and self.report is not None:
+            return f"RAG 색인 동기화 완료 {self.elapsed_sec:.1f}초 ({self.report.summary()})"
+        if self.state == "failed":
+            return f"RAG 색인 동기화 실패: {self.error}"
+        return "RAG 색인 동기화 전"
 
-            text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=150)
-            texts = text_splitter.split_documents(documents)
-            print(f"Creating RAG vector store with {len(texts)} document chunks.")
-            db = Chroma.from_documents(texts, embedding_func, persist_directory=VECTOR_DB_RAG_PATH)
-            db.persist()
-            print("RAG vector store created and persisted.")
-            return db
-        except Exception as e:
-            st.error(f"Error creating RAG vector store: {e}")
-            # 오류 발생 시에도 빈 DB 생성 시도
-            db = Chroma(persist_directory=VECTOR_DB_RAG_PATH, embedding_function=embedding_func)
-            db.persist()
-            return db
+_rag_sync_status = RagSyncStatus()
+_rag_sync_started_at: Optional[float] = None
+_rag_sync_lock = threading.Lock()
 
-@st.cache_resource
-def get_memory_vector_store() -> Chroma:
-    print(f"Initializing/Loading Memory Vector Store from {VECTOR_DB_MEMORY_PATH}...")
+def _sync_rag_store(db: Chroma):
+    """매니페스트와 비교하여 추가/변경된 문서만 임베딩하고, 삭제된 문서의 청크는 제거합니다 (진행 상태는 get_rag_sync_status())."""
+    global _rag_sync_started_at
+    with _rag_sync_lock:
+        _rag_sync_status.state = "running"
+        _rag_sync_started_at = time.perf_counter()
+    try:
+        report = sync_rag_index(db, docs_path=RAG_DOCS_PATH)
+    except Exception as e:
+        print(f"Error syncing RAG vector store: {e}")
+        with _rag_sync_lock:
+            _rag_sync_status.state, _rag_sync_status.error = "failed", str(e)
+            _rag_sync_status.elapsed_sec = time.perf_counter() - _rag_sync_started_at
+        return
+    with _rag_sync_lock:
+        _rag_sync_status.state, _rag_sync_status.report, _rag_sync_status.error = "done", report, None
+        _rag_sync_status.elapsed_sec = time.perf_counter() - _rag_sync_started_at
+
+def get_rag_sync_status() -> RagSyncStatus:
+    """get_rag_vector_store()가 시작한 RAG 색인 동기화의 현재 상태 (복사본)."""
+    with _rag_sync_lock:
+        elapsed_sec = _rag_sync_status.elapsed_sec
+        if _rag_sync_status.state == "running":
+            elapsed_sec = time.perf_counter() - _rag_sync_started_at
+        return RagSyncStatus(_rag_sync_status.state, elapsed_sec, _rag_sync_status.report, _rag_sync_status.error)
+
+@cached_resource
+def get_memory_vector_store() -> MemoryVectorBackend:
+    """MEMORY_VECTOR_BACKEND 설정에 따른 기억 벡터DB ("chroma" 또는 "numpy")."""
     embedding_func = get_embedding_model()
+    if MEMORY_VECTOR_BACKEND == "numpy":
+        print(f"Loading NumPy Memory Vector Store from {VECTOR_DB_MEMORY_NUMPY_PATH}...")
+        backend = NumpyMemoryBackend(VECTOR_DB_MEMORY_NUMPY_PATH, embedding_func)
+        if backend.count() == 0:
+            print("NumPy memory index is empty. Run 'python -m core.vector_sync' to index existing memories from SQLite.")
+        return backend
+    if MEMORY_VECTOR_BACKEND != "chroma":
+        print(f"Unknown MEMORY_VECTOR_BACKEND '{MEMORY_VECTOR_BACKEND}', falling back to chroma.")
+    print(f"Initializing/Loading Memory Vector Store from {VECTOR_DB_MEMORY_PATH}...")
     db = Chroma(persist_directory=VECTOR_DB_MEMORY_PATH, embedding_function=embedding_func)
     # db.persist() # Chroma는 persist_directory 지정 시 자동으로 로드/저장 관리하므로 명시적 호출 불필요할 수 있음
-    return db
+    return ChromaMemoryBackend(db)
 
-def init_sqlite_db():
-    """SQLite 데이터베이스와 long_term_memories 테이블을 초기화합니다."""
-    print(f"Initializing SQLite DB at: {SQLITE_DB_NAME}")
-    conn = sqlite3.connect(SQLITE_DB_NAME)
-    cursor = conn.cursor()
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS long_term_memories (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        vector_id TEXT UNIQUE,
-        session_id TEXT NOT NULL,
-        summary TEXT NOT NULL,
-        keywords TEXT,
-        full_conversation_snippet TEXT,
-        creation_time TEXT NOT NULL,
-        last_accessed_time TEXT NOT NULL,
-        access_count INTEGER DEFAULT 0,
-        user_importance_score REAL DEFAULT 0.5
-    )""")
-    conn.commit()
-    conn.close()
-    print("SQLite DB initialized successfully.")
\ No newline at end of file
+def init_sqlite_db(db_path: Optional[str] = None):
+    """SQLite 데이터베이스와 long_term_memories 테이블을 초기화합니다. db_path를 주면 해당 파일 (예: 벤치마크용 임시 DB)."""
+    print(f"Initializing SQLite DB at: {db_path or SQLITE_DB_NAME}")
+    pool = get_sqlite_pool(db_path)
+    with pool.transaction() as conn: # 공유 커넥션 풀 사용 (WAL 모드는 커넥션 생성 시 설정됨)
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS long_term_memories (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            vector_id TEXT UNIQUE,
+            session_id TEXT NOT NULL,
+            summary TEXT NOT NULL,
+            keywords TEXT,
+            full_conversation_snippet TEXT,
+            creation_time TEXT NOT NULL,
+            last_accessed_time TEXT NOT NULL,
+            access_count INTEGER DEFAULT 0,
+            user_importance_score REAL DEFAULT 0.5,
+            tier INTEGER NOT NULL DEFAULT 0,
+            parent_id INTEGER NOT NULL DEFAULT 0
+        )""")
+        # 재정렬용 메타데이터를 테이블 접근 없이 읽도록 하는 커버링 인덱스
+        conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_ltm_ranking
+        ON long_term_memories (id, user_importance_score, access_count, last_accessed_time)""")
+        # 유지보수(감쇠 대상 집계, 저중요도 삭제)가 전체 테이블을 훑지 않도록 하는 인덱스
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_ltm_last_accessed ON long_term_memories (last_accessed_time)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_ltm_importance ON long_term_memories (user_importance_score)")
+        # 요약/키워드/대화 일부에 대한 FTS5 키워드 인덱스 (long_term_memories를 외부 콘텐츠로 사용, 트리거로 동기화)
+        fts_exists = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'long_term_memories_fts'").fetchone()
+        conn.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS long_term_memories_fts USING fts5(
+            summary, keywords, full_conversation_snippet,
+            content='long_term_memories', content_rowid='id', tokenize='unicode61'
+        )""")
+        conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS long_term_memories_fts_ai AFTER INSERT ON long_term_memories BEGIN
+            INSERT INTO long_term_memories_fts(rowid, summary, keywords, full_conversation_snippet)
+            VALUES (new.id, new.summary, new.keywords, new.full_conversation_snippet);
+        END""")
+        conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS long_term_memories_fts_ad AFTER DELETE ON long_term_memories BEGIN
+            INSERT INTO long_term_memories_fts(long_term_memories_fts, rowid, summary, keywords, full_conversation_snippet)
+            VALUES ('delete', old.id, old.summary, old.keywords, old.full_conversation_snippet);
+        END""")
+        conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS long_term_memories_fts_au AFTER UPDATE OF summary, keywords, full_conversation_snippet ON long_term_memories BEGIN
+            INSERT INTO long_term_memories_fts(long_term_memories_fts, rowid, summary, keywords, full_conversation_snippet)
+            VALUES ('delete', old.id, old.summary, old.keywords, old.full_conversation_snippet);
+            INSERT INTO long_term_memories_fts(rowid, summary, keywords, full_conversation_snippet)
+            VALUES (new.id, new.summary, new.keywords, new.full_conversation_snippet);
+        END""")
+        if not fts_exists: # 기존 데이터가 있는 DB에 처음 인덱스를 만드는 경우 전체 색인
+            conn.execute("INSERT INTO long_term_memories_fts(long_term_memories_fts) VALUES ('rebuild')")
+        # 세션(세그먼트)별 누적 요약 상태: 어디까지 요약에 반영했는지(turn_checkpoint)와 대응하는 기억 행
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS session_summaries (
+            session_id TEXT NOT NULL,
+            segment_index INTEGER NOT NULL DEFAULT 0,
+            memory_id INTEGER,
+            summary TEXT NOT NULL,
+            segment_start INTEGER NOT NULL DEFAULT 0,
+            turn_checkpoint INTEGER NOT NULL DEFAULT 0,
+            conversation_tail TEXT,
+            prefix_hash TEXT,
+            updated_time TEXT NOT NULL,
+            PRIMARY KEY (session_id, segment_index)
+        )""")
+        # 요약에 반영한 메시지들의 지문(prefix_hash)이 없는 기존 DB: 컬럼 추가 (NULL이면 메시지 수로만 초기화 여부를 판단)
+        if "prefix_hash" not in {row[1] for row in conn.execute("PRAGMA table_info(session_summaries)")}:
+            conn.execute("ALTER TABLE session_summaries ADD COLUMN prefix_hash TEXT")
+        # 기억 벡터DB에 아직 반영되지 않은 작업 (기억 행 변경과 같은 트랜잭션에서 기록, vector_sync가 적용 후 삭제)
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS vector_outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            memory_id INTEGER NOT NULL,
+            op TEXT NOT NULL,
+            created_time TEXT NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            last_error TEXT
+        )""")
+        # 계층형 기억 컬럼이 없는 기존 DB: 컬럼을 추가하고, 벡터 메타데이터(tier, parent_id)를 갱신하도록 전체 행을 outbox에 기록
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(long_term_memories)")}
+        if "tier" not in columns:
+            conn.execute("ALTER TABLE long_term_memories ADD COLUMN tier INTEGER NOT NULL DEFAULT 0")
+            conn.execute("ALTER TABLE long_term_memories ADD COLUMN parent_id INTEGER NOT NULL DEFAULT 0")
+            conn.execute(
+                "INSERT INTO vector_outbox (memory_id, op, created_time) SELECT id, 'migrate', ? FROM long_term_memories",
+                (datetime.datetime.now().isoformat(),)
+            )
+        # 계층 검색(최상위/하위 노드 조회)과 세션별 롤업 대상 조회용 인덱스
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_ltm_parent ON long_term_memories (parent_id, tier)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_ltm_session_tier ON long_term_memories (session_id, tier)")
+    print("SQLite DB initialized successfully.")
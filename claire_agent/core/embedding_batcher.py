@@ -0,0 +1,134 @@
+# claire_agent/core/embedding_batcher.py
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+# 내부 모듈 import
+from .config import EMBEDDING_BATCH_SIZE, EMBEDDING_MICROBATCH_WAIT_MS
+from .telemetry import get_telemetry
+
+@dataclass
+class _EmbeddingRequest:
+    texts: List[str]
+    done: threading.Event = field(default_factory=threading.Event)
+    vectors: Optional[List[List[float]]] = None
+    error: Optional[BaseException] = None
+
+class MicroBatchingEmbeddings(Embeddings):
+    """
+    여러 세션/스레드에서 동시에 들어온 작은 임베딩 요청을 모아 기반 모델의 embed_documents 한 번(한 번의 forward)으로 처리합니다.
+    - 전담 스레드가 큐의 첫 요청을 꺼낸 뒤 max_wait_ms 동안(또는 max_batch_size개가 찰 때까지) 뒤따르는 요청을 합침
+    - 이전 배치를 계산하는 동안 쌓인 요청은 기다리지 않고 바로 다음 배치로 합쳐짐
+    - max_batch_size 이상인 요청(RAG 색인 배치 등)은 합치지 않고 호출 스레드에서 바로 계산
+    질의와 문서를 같은 방식으로 임베딩하는 대칭형 모델(sentence-transformers)을 전제로 embed_query도 embed_documents로 계산합니다.
+    """
+
+    def __init__(self, base_embeddings: Embeddings, max_batch_size: int = EMBEDDING_BATCH_SIZE,
+                 max_wait_ms: float = EMBEDDING_MICROBATCH_WAIT_MS):
+        self.base_embeddings = base_embeddings
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_sec = max(0.0, max_wait_ms) / 1000
+        self._queue: "queue.Queue[Optional[_EmbeddingRequest]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+        self._closed = False
+        self.batches = 0
+        self.requests = 0
+        self.merged_texts = 0
+
+    def __getattr__(self, name):
+        # model_name 등 기반 모델 속성을 그대로 노출 (CachedEmbeddings, 벤치마크 출력에서 사용)
+        if name == "base_embeddings":
+            raise AttributeError(name)
+        return getattr(self.base_embeddings, name)
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Embedding micro-batcher is closed.")
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="embedding-microbatch", daemon=True)
+                self._worker.start()
+
+    def _submit(self, texts: List[str]) -> List[List[float]]:
+        self._ensure_worker()
+        request = _EmbeddingRequest(texts=list(texts))
+        self._queue.put(request)
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.vectors
+
+    def _collect(self, first: _EmbeddingRequest) -> List[_EmbeddingRequest]:
+        batch, size = [first], len(first.texts)
+        deadline = time.perf_counter() + self.max_wait_sec
+        while size < self.max_batch_size:
+            try:
+                remaining = deadline - time.perf_counter()
+                request = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is None: # close() 신호는 다시 넣어 현재 배치 처리 후 종료
+                self._queue.put(None)
+                break
+            batch.append(request)
+            size += len(request.texts)
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = self._collect(first)
+            texts = [text for request in batch for text in request.texts]
+            try:
+                vectors = self.base_embeddings.embed_documents(texts)
+            except BaseException as e:
+                for request in batch:
+                    request.error = e
+                    request.done.set()
+                continue
+            offset = 0
+            for request in batch:
+                request.vectors = [list(vector) for vector in vectors[offset:offset + len(request.texts)]]
+                offset += len(request.texts)
+                request.done.set()
+            with self._lock:
+                self.batches += 1
+                self.requests += len(batch)
+                self.merged_texts += len(texts)
+            get_telemetry().observe("claire_embedding_batch_size", len(texts))
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        if len(texts) >= self.max_batch_size:
+            return self.base_embeddings.embed_documents(texts)
+        return self._submit(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._submit([text])[0]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "batches": self.batches,
+                "requests": self.requests,
+                "avg_batch_texts": self.merged_texts / self.batches if self.batches else 0.0,
+                "avg_requests_per_batch": self.requests / self.batches if self.batches else 0.0
+            }
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            worker = self._worker
+        if worker is not None:
+            self._queue.put(None)
+            worker.join(timeout=5)
@@ -0,0 +1,143 @@
+# claire_agent/core/embedding_cache.py
+import hashlib
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence
+
+try:
+    from langchain_core.embeddings import Embeddings
+except ImportError: # 구버전 langchain
+    from langchain.embeddings.base import Embeddings
+
+# 내부 모듈 import
+from .config import (
+    HF_EMBEDDING_MODEL_NAME,
+    EMBEDDING_CACHE_DB_PATH,
+    EMBEDDING_CACHE_LRU_SIZE
+)
+from .sqlite_storage import SQLiteConnectionPool, get_sqlite_pool, chunked, placeholders
+
+def _vector_to_blob(vector: Sequence[float]) -> bytes:
+    return array("f", vector).tobytes() # float32로 저장 (문장 임베딩 정밀도로 충분)
+
+def _blob_to_vector(blob: bytes) -> List[float]:
+    values = array("f")
+    values.frombytes(blob)
+    return values.tolist()
+
+class CachedEmbeddings(Embeddings):
+    """
+    임베딩 모델을 감싸 (모델명, sha256(텍스트)) 키로 결과를 캐시합니다.
+    프로세스 내 LRU를 먼저 확인하고, 없으면 디스크(SQLite) 캐시를 조회하며, 둘 다 없을 때만 모델을 호출합니다.
+    """
+
+    def __init__(self, base_embeddings: Embeddings, model_name: str = HF_EMBEDDING_MODEL_NAME,
+                 sqlite_pool: Optional[SQLiteConnectionPool] = None, lru_size: int = EMBEDDING_CACHE_LRU_SIZE):
+        self.base_embeddings = base_embeddings
+        self.model_name = model_name
+        self.sqlite_pool = sqlite_pool or get_sqlite_pool(EMBEDDING_CACHE_DB_PATH)
+        self.lru_size = max(0, lru_size)
+        self._lru: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.sqlite_pool.execute("""
+            CREATE TABLE IF NOT EXISTS embedding_cache (
+                model_name TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                PRIMARY KEY (model_name, text_hash)
+            ) WITHOUT ROWID""", commit=True)
+
+    def _text_hash(self, text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _remember(self, text_hash: str, vector: List[float]):
+        if not self.lru_size:
+            return
+        with self._lock:
+            self._lru[text_hash] = vector
+            self._lru.move_to_end(text_hash)
+            while len(self._lru) > self.lru_size:
+                self._lru.popitem(last=False)
+
+    def get_cached(self, texts: Sequence[str]) -> List[Optional[List[float]]]:
+        """캐시에 있는 임베딩만 찾아 반환합니다 (없으면 None). 모델은 호출하지 않습니다."""
+        hashes = [self._text_hash(text) for text in texts]
+        results: List[Optional[List[float]]] = [None] * len(texts)
+        disk_lookup: Dict[str, List[int]] = {}
+        with self._lock:
+            for i, text_hash in enumerate(hashes):
+                vector = self._lru.get(text_hash)
+                if vector is not None:
+                    self._lru.move_to_end(text_hash)
+                    results[i] = vector
+                    self.memory_hits += 1
+                else:
+                    disk_lookup.setdefault(text_hash, []).append(i)
+        if disk_lookup:
+            try:
+                for hash_chunk in chunked(list(disk_lookup)):
+                    rows = self.sqlite_pool.execute(
+                        f"SELECT text_hash, vector FROM embedding_cache WHERE model_name = ? AND text_hash IN ({placeholders(len(hash_chunk))})",
+                        (self.model_name, *hash_chunk)
+                    )
+                    for text_hash, blob in rows:
+                        vector = _blob_to_vector(blob)
+                        self._remember(text_hash, vector)
+                        for i in disk_lookup[text_hash]:
+                            results[i] = vector
+                            self.disk_hits += 1
+            except Exception as e:
+                print(f"Embedding cache lookup error: {e}")
+        with self._lock:
+            self.misses += sum(1 for vector in results if vector is None)
+        return results
+
+    def store(self, texts: Sequence[str], vectors: Sequence[Sequence[float]]):
+        """모델로 새로 계산한 임베딩을 LRU와 디스크 캐시에 기록합니다."""
+        rows = []
+        for text, vector in zip(texts, vectors):
+            text_hash = self._text_hash(text)
+            vector = list(vector)
+            self._remember(text_hash, vector)
+            rows.append((self.model_name, text_hash, _vector_to_blob(vector)))
+        if not rows:
+            return
+        try:
+            self.sqlite_pool.executemany(
+                "INSERT OR REPLACE INTO embedding_cache (model_name, text_hash, vector) VALUES (?, ?, ?)", rows
+            )
+        except Exception as e:
+            print(f"Embedding cache write error: {e}")
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        results = self.get_cached(texts)
+        missing_texts = list(dict.fromkeys(text for text, vector in zip(texts, results) if vector is None)) # 배치 내 중복 제거
+        if missing_texts:
+            computed = dict(zip(missing_texts, self.base_embeddings.embed_documents(missing_texts)))
+            self.store(missing_texts, [computed[text] for text in missing_texts])
+            results = [vector if vector is not None else list(computed[text]) for text, vector in zip(texts, results)]
+        return results
+
+    def embed_query(self, text: str) -> List[float]:
+        cached = self.get_cached([text])[0]
+        if cached is not None:
+            return cached
+        vector = list(self.base_embeddings.embed_query(text))
+        self.store([text], [vector])
+        return vector
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "model_name": self.model_name,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                "lru_entries": len(self._lru)
+            }
@@ -1,19 +1,27 @@
 # claire_agent/core/llm_services.py
-import streamlit as st
-import subprocess
-from typing import List
-from langchain_community.chat_models import ChatOllama
-from langchain_community.embeddings import HuggingFaceEmbeddings
+from typing import TYPE_CHECKING, List
 
 # config 모듈에서 설정값 가져오기
 from .config import (
     DEFAULT_OLLAMA_MODEL_NAME,
     HF_EMBEDDING_MODEL_NAME,
-    OLLAMA_BASE_URL
+    OLLAMA_KEEP_ALIVE,
+    EMBEDDING_CACHE_ENABLED,
+    EMBEDDING_ENGINE,
+    EMBEDDING_MICROBATCH_ENABLED
 )
+from .embedding_cache import CachedEmbeddings, Embeddings
+from .embedding_batcher import MicroBatchingEmbeddings
+from .resources import cached_resource
+from .model_registry import get_model_registry
 
-@st.cache_resource
-def get_embedding_model() -> HuggingFaceEmbeddings:
+if TYPE_CHECKING: # langchain 채팅 모델/sentence-transformers import는 실제로 만들 때까지 미룸 (모델 목록 조회 등 가벼운 용도의 import를 빠르게)
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+    from .ollama_client import PooledChatOllama
+
+def build_hf_embedding_model() -> "HuggingFaceEmbeddings":
+    """PyTorch(sentence-transformers) 임베딩 모델 (기본 엔진, ONNX 일치 검사의 기준)."""
+    from langchain_community.embeddings import HuggingFaceEmbeddings
     print(f"Initializing HuggingFace Embedding Model: {HF_EMBEDDING_MODEL_NAME}...")
     return HuggingFaceEmbeddings(
         model_name=HF_EMBEDDING_MODEL_NAME,
@@ -21,25 +29,47 @@ def get_embedding_model() -> HuggingFaceEmbeddings:
         encode_kwargs={'normalize_embeddings': True}
     )
 
-@st.cache_resource
-def get_chat_llm_instance(model_name: str = DEFAULT_OLLAMA_MODEL_NAME) -> ChatOllama:
-    print(f"Initializing ChatOllama with model: {model_name} at {OLLAMA_BASE_URL}...")
-    return ChatOllama(model=model_name, base_url=OLLAMA_BASE_URL)
+def build_embedding_model() -> Embeddings:
+    """캐시 없이 EMBEDDING_ENGINE 설정의 임베딩 모델을 새로 로드합니다 (색인용 워커 프로세스 등에서 사용)."""
+    if EMBEDDING_ENGINE == "onnx":
+        try:
+            from .onnx_embeddings import OnnxEmbeddings
+            return OnnxEmbeddings()
+        except Exception as e: # 내보낸 모델이 없거나 onnxruntime 미설치
+            print(f"ONNX embedding engine unavailable, falling back to PyTorch: {e}")
+    elif EMBEDDING_ENGINE != "hf":
+        print(f"Unknown EMBEDDING_ENGINE '{EMBEDDING_ENGINE}', using PyTorch.")
+    return build_hf_embedding_model()
+
+@cached_resource
+def get_embedding_model() -> Embeddings:
+    base_model = build_embedding_model()
+    # 엔진마다 결과가 조금씩 다르므로 캐시 키에 엔진 종류를 포함 (PyTorch 엔진은 기존 캐시 키 그대로)
+    variant = getattr(base_model, "variant", None)
+    cache_model_name = f"{HF_EMBEDDING_MODEL_NAME}#{variant}" if variant else HF_EMBEDDING_MODEL_NAME
+    if EMBEDDING_MICROBATCH_ENABLED:
+        # 여러 세션의 질의 임베딩을 한 번의 추론으로 합침 (캐시에 없는 텍스트만 배처까지 내려감)
+        base_model = MicroBatchingEmbeddings(base_model)
+    if not EMBEDDING_CACHE_ENABLED:
+        return base_model
+    # 동일 텍스트(같은 질의, 변경 없는 청크)는 다시 계산하지 않도록 LRU + 디스크 캐시로 감쌈
+    return CachedEmbeddings(base_model, model_name=cache_model_name)
+
+def build_chat_llm(model_name: str = DEFAULT_OLLAMA_MODEL_NAME) -> "PooledChatOllama":
+    """캐시 없이 채팅 LLM을 새로 만듭니다 (벤치마크 등 Streamlit 밖에서 사용). 요청은 공유 엔드포인트 풀을 통해 전송됩니다."""
+    from .ollama_client import PooledChatOllama, get_endpoint_pool
+    endpoint_pool = get_endpoint_pool()
+    print(f"Initializing ChatOllama with model: {model_name} at {', '.join(endpoint['url'] for endpoint in endpoint_pool.stats())}...")
+    return PooledChatOllama(
+        model=model_name,
+        keep_alive=OLLAMA_KEEP_ALIVE, # 유휴 시간에 모델이 내려가면 KV 캐시도 사라지므로 충분히 유지
+        num_ctx=get_model_registry().context_window(model_name) # 프롬프트 예산과 같은 컨텍스트 길이 (더 짧으면 Ollama가 앞부분을 잘라 접두부 캐시가 깨짐)
+    )
+
+@cached_resource
+def get_chat_llm_instance(model_name: str = DEFAULT_OLLAMA_MODEL_NAME) -> "PooledChatOllama":
+    return build_chat_llm(model_name)
 
 def get_ollama_models_available() -> List[str]:
-    """시스템에 설치된 Ollama 모델 목록을 가져옵니다."""
-    try:
-        result = subprocess.run(['ollama', 'list'], capture_output=True, text=True, check=True)
-        lines = result.stdout.strip().split('\n')
-        if len(lines) > 1: # 첫 줄은 헤더
-            return [line.split()[0] for line in lines[1:]] # 모델명은 첫 번째 컬럼
-    except FileNotFoundError:
-        print("Ollama command not found. Please ensure Ollama is installed and in your PATH.")
-        return [DEFAULT_OLLAMA_MODEL_NAME]
-    except subprocess.CalledProcessError as e:
-        print(f"Error fetching Ollama models via subprocess: {e}")
-        return [DEFAULT_OLLAMA_MODEL_NAME]
-    except Exception as e:
-        print(f"An unexpected error occurred while fetching Ollama models: {e}")
-        return [DEFAULT_OLLAMA_MODEL_NAME]
-    return [DEFAULT_OLLAMA_MODEL_NAME] # 예외 발생 시 기본 모델 반환
\ No newline at end of file
+    """Ollama에 설치된 모델 목록을 가져옵니다 (/api/tags 결과를 캐시하는 모델 레지스트리 사용, 실패 시 기본 모델)."""
+    return get_model_registry().list_models() or [DEFAULT_OLLAMA_MODEL_NAME]
\ No newline at end of file
@@ -0,0 +1,134 @@
+# claire_agent/core/memory_dedup.py
+import argparse
+import json
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# 내부 모듈 import
+from .config import (
+    LTM_DEDUP_SIMILARITY_THRESHOLD,
+    LTM_DEDUP_SCOPE,
+    LTM_VECTOR_SYNC_PAGE_SIZE
+)
+from .sqlite_storage import chunked, placeholders
+
+@dataclass
+class DedupReport:
+    scanned: int = 0 # 비교한 기억 수 (벡터가 있는 행)
+    groups: int = 0 # 중복 묶음 수
+    merged_rows: int = 0 # 병합되어 삭제된 (삭제될) 행 수
+    dry_run: bool = False
+    elapsed_sec: float = 0.0
+
+    def summary(self) -> str:
+        action = "삭제 예정" if self.dry_run else "병합/삭제"
+        return f"기억 {self.scanned}개 비교, 중복 묶음 {self.groups}개, {self.merged_rows}개 {action}, {self.elapsed_sec:.2f}초"
+
+def find_duplicate_groups(embeddings: np.ndarray, threshold: float) -> List[List[int]]:
+    """
+    행 순서를 우선순위로 보고 탐욕적으로 묶습니다: 아직 묶이지 않은 행마다 유사도 threshold 이상인 나머지 행을 모읍니다.
+    반환값은 [대표 행 인덱스, 중복 행 인덱스...] 리스트의 리스트입니다 (중복이 없는 행은 제외).
+    """
+    if len(embeddings) < 2:
+        return []
+    vectors = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors = vectors / np.where(norms > 0, norms, 1.0)
+    assigned = np.zeros(len(vectors), dtype=bool)
+    groups = []
+    for i in range(len(vectors)):
+        if assigned[i]:
+            continue
+        assigned[i] = True
+        similar = (vectors @ vectors[i] >= threshold) & ~assigned
+        members = np.flatnonzero(similar)
+        if members.size:
+            assigned[members] = True
+            groups.append([i, *members.tolist()])
+    return groups
+
+def deduplicate_memories(memory_system, scope: str = LTM_DEDUP_SCOPE, threshold: float = LTM_DEDUP_SIMILARITY_THRESHOLD,
+                         dry_run: bool = False, page_size: int = LTM_VECTOR_SYNC_PAGE_SIZE) -> DedupReport:
+    """
+    기존 대화 요약(tier 0) 전체를 대상으로 유사(중복) 기억을 찾아 묶음마다 하나로 병합합니다.
+    대표 행은 중요도가 가장 높고 (같으면 최근에 접근한) 기억이며, 중요도는 최댓값, 키워드는 합집합, 접근 횟수는 합계로 갱신합니다.
+    scope가 "session"이면 같은 세션 안에서만 비교합니다.
+    """
+    started = time.perf_counter()
+    report = DedupReport(dry_run=dry_run)
+    memory_system.access_tracker.flush() # 접근 횟수 합산 전에 버퍼된 기록 반영
+    vectors = memory_system.memory_vdb.load_embeddings(page_size=max(1, page_size))
+
+    rows = []
+    for id_chunk in chunked(sorted(vectors)):
+        rows.extend(memory_system.sqlite_pool.execute(
+            f"SELECT id, session_id, keywords, last_accessed_time, access_count, user_importance_score FROM long_term_memories WHERE tier = 0 AND id IN ({placeholders(len(id_chunk))})",
+            tuple(id_chunk)
+        ))
+    report.scanned = len(rows)
+    # 대표 행이 먼저 오도록 중요도 내림차순, 최근 접근 순으로 정렬
+    rows.sort(key=lambda row: (row[5] or 0.0, row[3] or ""), reverse=True)
+
+    row_groups: Dict[Optional[str], List[tuple]] = {}
+    for row in rows:
+        row_groups.setdefault(row[1] if scope == "session" else None, []).append(row)
+
+    merges = []
+    for group_rows in row_groups.values():
+        for indices in find_duplicate_groups(np.array([vectors[row[0]] for row in group_rows]), threshold):
+            merges.append([group_rows[i] for i in indices])
+    report.groups = len(merges)
+    report.merged_rows = sum(len(group) - 1 for group in merges)
+    if dry_run or not merges:
+        report.elapsed_sec = time.perf_counter() - started
+        return report
+
+    for group in merges:
+        keeper, duplicates = group[0], group[1:]
+        keywords = []
+        for row in group:
+            try:
+                keywords.extend(json.loads(row[2]) if row[2] else [])
+            except json.JSONDecodeError:
+                pass
+        duplicate_ids = [row[0] for row in duplicates]
+        with memory_system.sqlite_pool.transaction() as conn:
+            conn.execute(
+                "UPDATE long_term_memories SET keywords = ?, last_accessed_time = ?, access_count = ?, user_importance_score = ? WHERE id = ?",
+                (json.dumps(list(dict.fromkeys(keywords)), ensure_ascii=False), max(row[3] for row in group),
+                 sum(row[4] or 0 for row in group), max(row[5] or 0.0 for row in group), keeper[0])
+            )
+            conn.execute(f"DELETE FROM long_term_memories WHERE id IN ({placeholders(len(duplicate_ids))})", duplicate_ids)
+            # 누적 요약 세그먼트가 삭제된 행을 가리키면 대표 행으로 옮김
+            conn.execute(f"UPDATE session_summaries SET memory_id = ? WHERE memory_id IN ({placeholders(len(duplicate_ids))})", (keeper[0], *duplicate_ids))
+            memory_system.vector_journal.enqueue(conn, [keeper[0], *duplicate_ids], op="dedup")
+    memory_system.vector_journal.replay()
+    report.elapsed_sec = time.perf_counter() - started
+    return report
+
+def main():
+    """기존 장기 기억 중복 정리 명령: python -m core.memory_dedup"""
+    from .db_services import init_sqlite_db, get_memory_vector_store
+    from .llm_services import get_embedding_model
+    from .memory_system import MemorySystem
+
+    parser = argparse.ArgumentParser(description="Merge near-duplicate long-term memories.")
+    parser.add_argument("--scope", choices=["session", "global"], default=LTM_DEDUP_SCOPE, help="같은 세션 안에서만 비교할지, 전체를 비교할지")
+    parser.add_argument("--threshold", type=float, default=LTM_DEDUP_SIMILARITY_THRESHOLD, help="중복으로 볼 코사인 유사도 하한")
+    parser.add_argument("--dry-run", action="store_true", help="병합하지 않고 결과만 보고")
+    args = parser.parse_args()
+
+    init_sqlite_db()
+    memory_system = MemorySystem(
+        llm_for_summarization=None,
+        embedding_instance=get_embedding_model(),
+        memory_vdb_instance=get_memory_vector_store()
+    )
+    report = deduplicate_memories(memory_system, scope=args.scope, threshold=args.threshold, dry_run=args.dry_run)
+    print(f"Memory dedup finished: {report.summary()}")
+
+if __name__ == "__main__":
+    main()
@@ -1,51 +1,116 @@
 # claire_agent/core/memory_system.py
 import sqlite3
 import datetime
+import hashlib
 import json
-from typing import List, Optional
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
 
 from langchain_community.chat_models import ChatOllama
 from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_community.vectorstores import Chroma
-from langchain.docstore.document import Document
 from langchain.schema import SystemMessage, HumanMessage
 
 # 내부 모듈 import
-from .config import SQLITE_DB_NAME
+from .config import (
+    LTM_SEGMENT_MAX_MESSAGES,
+    LTM_RETRIEVAL_MODE,
+    LTM_HYBRID_CANDIDATE_FACTOR,
+    LTM_RRF_K,
+    LTM_RANKING_ENABLED,
+    LTM_RANK_OVERFETCH_FACTOR,
+    LTM_DECAY_GRACE_DAYS,
+    LTM_DECAY_FLOOR,
+    LTM_PRUNE_THRESHOLD,
+    LTM_MAINTENANCE_CHUNK_SIZE,
+    LTM_DEDUP_ENABLED,
+    LTM_DEDUP_SIMILARITY_THRESHOLD,
+    LTM_DEDUP_SCOPE,
+    LTM_DEDUP_CANDIDATES,
+    LTM_TIERS_ENABLED,
+    LTM_ROLLUP_SESSION_IDLE_MIN,
+    LTM_ROLLUP_MIN_CHILDREN,
+    LTM_DIGEST_PERIOD,
+    LTM_ROLLUP_SUMMARY_CHARS,
+    LTM_ROLLUP_MAX_GROUPS,
+    LTM_TIER_DRILL_WIDTH
+)
 from .data_models import StoredMemoryEntry
+from .sqlite_storage import SQLiteConnectionPool, get_sqlite_pool, chunked, placeholders
+from .vector_backends import MemoryVectorBackend, as_memory_backend
+from .access_tracker import MemoryAccessTracker, get_access_tracker
+from .ranking import MemoryRanker, effective_importance
+from .vector_sync import VectorSyncJournal, get_vector_journal
+from .telemetry import traced
+
+# 기억 계층 (long_term_memories.tier)
+MEMORY_TIER_ENTRY = 0 # 대화(세그먼트) 요약
+MEMORY_TIER_SESSION = 1 # 세션 롤업: 한 세션의 대화 요약들을 묶은 요약
+MEMORY_TIER_DIGEST = 2 # 기간 다이제스트: 한 주/달의 세션 롤업(및 묶이지 않은 요약)을 묶은 요약
+
+def digest_period_key(iso_time: str, period: str = LTM_DIGEST_PERIOD) -> str:
+    """다이제스트 기간 키를 반환합니다 (예: 주 단위 "2025-W07", 월 단위 "2025-02")."""
+    moment = datetime.datetime.fromisoformat(iso_time)
+    if period == "month":
+        return moment.strftime("%Y-%m")
+    year, week, _ = moment.isocalendar()
+    return f"{year}-W{week:02d}"
+
+def messages_fingerprint(messages: List[dict]) -> str:
+    """누적 요약에 반영한 UI 메시지들의 지문. 대화창 초기화 후 메시지 수가 같아져도 앞부분이 바뀐 것을 알아냅니다."""
+    payload = json.dumps([(m.get("role"), m.get("content")) for m in messages], ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+@dataclass
+class RollupReport:
+    sessions_rolled_up: int = 0 # 새로 만들거나 갱신한 세션 롤업 수
+    digests_updated: int = 0 # 새로 만들거나 갱신한 기간 다이제스트 수
+    children_linked: int = 0 # 상위 요약에 새로 연결된 기억 수
+    elapsed_sec: float = 0.0
+
+    def summary(self) -> str:
+        return f"세션 롤업 {self.sessions_rolled_up}개, 다이제스트 {self.digests_updated}개, 연결된 기억 {self.children_linked}개, {self.elapsed_sec:.2f}초"
+
+@dataclass
+class MaintenanceReport:
+    phases: Dict[str, Dict[str, float]] = field(default_factory=dict) # 단계별 처리 행 수와 소요 시간 (초)
+    decaying_count: int = 0 # 유예 기간이 지나 감쇠가 적용 중인 기억 수 (조회 시 계산)
+    total_sec: float = 0.0
+    completed: bool = True # 시간 제한/오류로 중단되면 False (다시 실행하면 이어서 처리)
+
+    def add_phase(self, name: str, rows: int, seconds: float):
+        self.phases[name] = {"rows": rows, "seconds": seconds}
+
+    def summary(self) -> str:
+        parts = [f"{name}: {int(stats['rows'])}건/{stats['seconds']:.2f}초" for name, stats in self.phases.items()]
+        parts.append(f"감쇠 적용 중: {self.decaying_count}건")
+        if not self.completed:
+            parts.append("미완료 (다시 실행하면 이어서 처리)")
+        return ", ".join(parts)
 
 class MemorySystem:
-    def __init__(self, llm_for_summarization: ChatOllama, embedding_instance: HuggingFaceEmbeddings, memory_vdb_instance: Chroma):
+    def __init__(self, llm_for_summarization: ChatOllama, embedding_instance: HuggingFaceEmbeddings, memory_vdb_instance: MemoryVectorBackend, sqlite_pool: Optional[SQLiteConnectionPool] = None, access_tracker: Optional[MemoryAccessTracker] = None, vector_journal: Optional[VectorSyncJournal] = None):
         self.llm_summarizer = llm_for_summarization
-        self.embeddings = embedding_instance # 현재 직접 사용하지 않으나, 향후 확장성 위해 유지
-        self.memory_vdb = memory_vdb_instance
+        self.embeddings = embedding_instance # 저장 시 중복 기억 확인에 사용
+        self.memory_vdb = as_memory_backend(memory_vdb_instance) # Chroma 인스턴스를 넘기면 백엔드 인터페이스로 감쌈
+        self.sqlite_pool = sqlite_pool or get_sqlite_pool() # 세션 간 공유되는 WAL 커넥션 풀
+        self.sqlite_pool.register_function("claire_effective_importance", 3, effective_importance) # 접근 시각 갱신 전 감쇠 확정용
+        self.access_tracker = access_tracker or get_access_tracker() # 접근 기록 write-behind 버퍼
+        self.ranker = MemoryRanker() # 유사도/중요도/최근성/빈도 가중치 기반 재정렬
+        self.vector_journal = vector_journal or get_vector_journal(self.memory_vdb) # SQLite -> 벡터DB 반영용 outbox
 
     def _execute_sqlite_query(self, query: str, params: tuple = (), fetch_one: bool = False, commit: bool = False):
-        conn = sqlite3.connect(SQLITE_DB_NAME)
-        cursor = conn.cursor()
         try:
-            cursor.execute(query, params)
-            result = None
-            if fetch_one:
-                result = cursor.fetchone()
-            elif not commit: # SELECT 쿼리 (fetchall)
-                result = cursor.fetchall()
-            
-            last_row_id = None
-            if commit: # INSERT, UPDATE, DELETE 쿼리
-                conn.commit()
-                last_row_id = cursor.lastrowid
+            # commit=True (INSERT/UPDATE/DELETE) 시에는 (결과, 마지막 행 ID) 반환
+            # commit=False (SELECT) 시에는 결과만 반환
+            return self.sqlite_pool.execute(query, params, fetch_one=fetch_one, commit=commit)
         except sqlite3.Error as e:
             print(f"SQLite error: {e} in query: {query} with params: {params}")
             # 프로덕션 환경에서는 더 정교한 로깅 및 예외 처리 필요
             raise  # 호출한 쪽에서 예외를 알 수 있도록 다시 발생
-        finally:
-            conn.close()
-        
-        # commit=True (INSERT/UPDATE/DELETE) 시에는 (결과, 마지막 행 ID) 반환
-        # commit=False (SELECT) 시에는 결과만 반환
-        return (result, last_row_id) if commit else result
 
+    @traced("llm.summarize")
     def _summarize_text_with_llm(self, text_to_summarize: str, max_length_chars: int = 200) -> str:
         if not self.llm_summarizer:
             return text_to_summarize[:max_length_chars] + ("..." if len(text_to_summarize) > max_length_chars else "")
@@ -69,6 +134,7 @@ class MemorySystem:
             # 요약 실패 시 원본 텍스트의 일부를 반환 (fallback)
             return text_to_summarize[:max_length_chars] + ("..." if len(text_to_summarize) > max_length_chars else "")
 
+    @traced("consolidation")
     def consolidate_session_memory(self, session_id: str, conversation_history_str: str, user_provided_summary: Optional[str] = None, use_llm_summary: bool = True):
         print(f"Consolidating memory for session: {session_id}")
         summary_to_store = ""
@@ -86,10 +152,14 @@ class MemorySystem:
             print("Summary could not be generated or provided.")
             return None
         
-        keywords_list = [word for word in summary_to_store.replace(",", " ").replace(".", " ").split() if len(word) > 2][:5]
-        keywords_json_str = json.dumps(keywords_list, ensure_ascii=False)
+        keywords_list, keywords_json_str = self._extract_keywords(summary_to_store)
         now_iso = datetime.datetime.now().isoformat()
 
+        duplicate_row = self._find_duplicate_memory(summary_to_store, session_id)
+        if duplicate_row:
+            # 거의 같은 내용의 기억이 이미 있으면 새 행을 만들지 않고 병합
+            return self._merge_into_memory(duplicate_row, summary_to_store, keywords_list, 0.6, conversation_history_str[:1000], now_iso)
+
         last_sqlite_id = None 
         final_vector_id = None
 
@@ -101,27 +171,19 @@ class MemorySystem:
             """
             insert_params_step1 = (session_id, summary_to_store, keywords_json_str, conversation_history_str[:1000], now_iso, now_iso, 0.6)
             
-            _, temp_last_sqlite_id = self._execute_sqlite_query(insert_query_step1, insert_params_step1, commit=True)
+            # INSERT, vector_id UPDATE, 벡터 작업(outbox) 기록을 하나의 트랜잭션으로 묶어 커밋(fsync)을 한 번만 수행
+            with self.sqlite_pool.transaction() as conn:
+                temp_last_sqlite_id = conn.execute(insert_query_step1, insert_params_step1).lastrowid
+                if temp_last_sqlite_id:
+                    update_query_step2 = "UPDATE long_term_memories SET vector_id = ? WHERE id = ?"
+                    conn.execute(update_query_step2, (str(temp_last_sqlite_id), temp_last_sqlite_id))
+                    self.vector_journal.enqueue(conn, [temp_last_sqlite_id])
 
             if temp_last_sqlite_id:
                 last_sqlite_id = temp_last_sqlite_id
                 final_vector_id = str(last_sqlite_id) 
 
-                update_query_step2 = "UPDATE long_term_memories SET vector_id = ? WHERE id = ?"
-                self._execute_sqlite_query(update_query_step2, (final_vector_id, last_sqlite_id), commit=True)
-
-                metadata = {
-                    "sqlite_id": last_sqlite_id, 
-                    "session_id": session_id, 
-                    "type": "conversation_summary", 
-                    "creation_time": now_iso, 
-                    "keywords_json": keywords_json_str, 
-                    "user_importance": 0.6
-                }
-                doc_to_add = Document(page_content=summary_to_store, metadata=metadata)
-                
-                self.memory_vdb.add_documents([doc_to_add], ids=[final_vector_id])
-                # self.memory_vdb.persist() # ChromaDB는 persist_directory 사용 시 자동 관리 경향
+                self._sync_vector_store()
                 
                 print(f"Memory (SQLite ID: {last_sqlite_id}, Vector ID: {final_vector_id}) stored.")
                 return StoredMemoryEntry(
@@ -140,58 +202,408 @@ class MemorySystem:
             print(f"An unexpected error occurred during memory consolidation: {e}")
             return None
 
-    def retrieve_relevant_memories(self, query_text: str, top_k: int = 2) -> List[StoredMemoryEntry]:
-        print(f"Retrieving LTM for query (first 50 chars): '{query_text[:50]}...' (top_k={top_k})")
-        if not query_text.strip() or not self.memory_vdb:
+    def _find_duplicate_memory(self, summary_text: str, session_id: str, scope: Optional[str] = None) -> Optional[tuple]:
+        """요약과 코사인 유사도가 임계값 이상인 기존 기억 행을 찾습니다. scope: "session" 또는 "global"."""
+        if not LTM_DEDUP_ENABLED:
+            return None
+        embedder = self.embeddings or getattr(self.memory_vdb, "embeddings", None)
+        if embedder is None:
+            return None
+        scope = scope or LTM_DEDUP_SCOPE
+        try:
+            summary_embedding = embedder.embed_query(summary_text) # 캐시된 임베딩이면 이후 벡터 저장 시 재사용됨
+            hits = self.memory_vdb.search(
+                summary_embedding, k=LTM_DEDUP_CANDIDATES,
+                where={"session_id": session_id} if scope == "session" else None
+            )
+        except Exception as e:
+            print(f"Duplicate memory check skipped: {e}")
+            return None
+        for sqlite_id, distance in hits: # 거리 오름차순
+            if 1.0 - distance / 2.0 < LTM_DEDUP_SIMILARITY_THRESHOLD:
+                break
+            row = self._execute_sqlite_query("SELECT * FROM long_term_memories WHERE id = ?", (sqlite_id,), fetch_one=True) if sqlite_id else None
+            if row and row[10] == MEMORY_TIER_ENTRY: # 고아 벡터와 상위 계층(롤업/다이제스트) 요약은 건너뜀
+                return row
+        return None
+
+    def _merge_into_memory(self, existing_row: tuple, summary_text: str, keywords_list: List[str], importance: float, conversation_snippet: str, now_iso: str) -> Optional[StoredMemoryEntry]:
+        """새 요약을 기존 기억에 병합합니다: 최신 요약/대화로 교체, 높은 중요도 유지, 키워드 합집합, 접근 횟수 증가."""
+        memory_id = existing_row[0]
+        try:
+            existing_keywords = json.loads(existing_row[4]) if existing_row[4] else []
+        except json.JSONDecodeError:
+            existing_keywords = []
+        merged_keywords = list(dict.fromkeys(existing_keywords + keywords_list))
+        try:
+            with self.sqlite_pool.transaction() as conn:
+                # 접근 시각이 감쇠 기준 시각이므로, 갱신 전에 그때까지의 지연 감쇠를 중요도에 확정 반영한 뒤 새 중요도와 비교
+                conn.execute(
+                    """UPDATE long_term_memories SET summary = ?1, keywords = ?2, full_conversation_snippet = ?3, last_accessed_time = ?4, access_count = access_count + 1, 
+                        user_importance_score = MAX(claire_effective_importance(user_importance_score, last_accessed_time, ?4), ?5) WHERE id = ?6""",
+                    (summary_text, json.dumps(merged_keywords, ensure_ascii=False), conversation_snippet, now_iso, importance, memory_id)
+                )
+                self.vector_journal.enqueue(conn, [memory_id], op="merge")
+        except sqlite3.Error as e:
+            print(f"SQLite error while merging into memory ID {memory_id}: {e}")
+            return None
+        self._sync_vector_store()
+        print(f"Merged new summary into existing memory (SQLite ID: {memory_id}).")
+        merged = self._fetch_memories_by_ids([memory_id])
+        return merged[0] if merged else None
+
+    def _extract_keywords(self, summary_text: str):
+        keywords_list = [word for word in summary_text.replace(",", " ").replace(".", " ").split() if len(word) > 2][:5]
+        return keywords_list, json.dumps(keywords_list, ensure_ascii=False)
+
+    def _sync_vector_store(self) -> int:
+        """커밋된 outbox 작업을 벡터DB에 바로 반영합니다. 실패해도 outbox에 남아 백그라운드에서 재시도되므로 예외를 던지지 않습니다."""
+        try:
+            return self.vector_journal.replay()
+        except Exception as e:
+            print(f"Vector sync deferred: {e}")
+            return 0
+
+    @traced("llm.summarize")
+    def _update_summary_with_llm(self, previous_summary: str, new_turns_str: str, max_length_chars: int = 300) -> str:
+        """기존 누적 요약에 새 대화 턴만 반영하여 갱신된 요약을 만듭니다 (전체 대화를 다시 요약하지 않음)."""
+        if not self.llm_summarizer:
+            merged = f"{previous_summary} {new_turns_str}".strip()
+            return merged[:max_length_chars] + ("..." if len(merged) > max_length_chars else "")
+        
+        print(f"Updating rolling summary with LLM... New turns length: {len(new_turns_str)} chars.")
+        try:
+            messages_for_summary = [
+                SystemMessage(content=f"다음은 지금까지의 대화 요약과 그 이후 새로 나눈 대화입니다. 기존 요약에 새 대화의 핵심을 반영하여 한국어로 {max_length_chars}자 내외의 갱신된 요약을 작성해줘. 다른 부연 설명 없이 요약 내용만 정확히 반환해줘."),
+                HumanMessage(content=f"[기존 요약]\n{previous_summary}\n\n[새 대화]\n{new_turns_str}")
+            ]
+            summary_text = ""
+            for chunk in self.llm_summarizer.stream(messages_for_summary):
+                summary_text += chunk.content
+            summary_text = summary_text.strip()
+            return summary_text if summary_text else previous_summary
+        except Exception as e:
+            print(f"Error during rolling LLM summarization: {e}")
+            return previous_summary
+
+    def get_session_summary(self, session_id: str) -> Optional[str]:
+        """세션의 최신 누적 요약을 반환합니다 (LLM 호출 없음). 프롬프트에서 잘려나간 이전 대화를 대신할 때 사용합니다."""
+        row = self._execute_sqlite_query(
+            "SELECT summary FROM session_summaries WHERE session_id = ? ORDER BY segment_index DESC LIMIT 1", (session_id,), fetch_one=True
+        )
+        return row[0] if row else None
+
+    @traced("consolidation")
+    def consolidate_session_incremental(self, session_id: str, messages: List[dict]) -> Optional[StoredMemoryEntry]:
+        """
+        세션의 누적(rolling) 요약을 마지막 체크포인트 이후의 새 메시지만으로 갱신합니다.
+        세션(세그먼트)마다 long_term_memories 행과 벡터를 하나만 유지하며 upsert합니다.
+        messages는 UI 메시지 리스트({"role", "content"})이고, 체크포인트는 이미 반영된 메시지 수입니다.
+        """
+        state = self._execute_sqlite_query(
+            "SELECT segment_index, memory_id, summary, segment_start, turn_checkpoint, conversation_tail, prefix_hash FROM session_summaries WHERE session_id = ? ORDER BY segment_index DESC LIMIT 1",
+            (session_id,), fetch_one=True
+        )
+        segment_index, memory_id, running_summary, segment_start, checkpoint, conversation_tail, prefix_hash = state if state else (0, None, "", 0, 0, "", None)
+
+        if len(messages) < checkpoint or (prefix_hash and messages_fingerprint(messages[:checkpoint]) != prefix_hash):
+            # 대화창이 초기화된 경우 (메시지 수가 줄었거나, 같은 길이여도 이미 요약한 앞부분이 달라짐): 같은 세션 ID로 새 세그먼트를 시작
+            segment_index, memory_id, running_summary, segment_start, checkpoint, conversation_tail = segment_index + 1, None, "", 0, 0, ""
+        elif memory_id and checkpoint - segment_start >= LTM_SEGMENT_MAX_MESSAGES:
+            # 세그먼트가 충분히 길어지면 새 세그먼트로 넘어가 요약이 지나치게 압축되지 않도록 함
+            segment_index, memory_id, running_summary, segment_start, conversation_tail = segment_index + 1, None, "", checkpoint, ""
+
+        new_turns_str = "\n".join(
+            [f"{m['role']}: {m['content']}" for m in messages[checkpoint:] if m.get('role') != 'system']
+        )
+        if not new_turns_str.strip():
+            print(f"No new turns to consolidate for session: {session_id}")
+            existing = self._fetch_memories_by_ids([memory_id]) if memory_id else []
+            return existing[0] if existing else None
+
+        print(f"Incrementally consolidating session {session_id} (segment {segment_index}, messages {checkpoint}->{len(messages)})")
+        if running_summary:
+            summary_to_store = self._update_summary_with_llm(running_summary, new_turns_str)
+        else:
+            summary_to_store = self._summarize_text_with_llm(new_turns_str)
+        if not summary_to_store:
+            print("Summary could not be generated.")
+            return None
+
+        keywords_list, keywords_json_str = self._extract_keywords(summary_to_store)
+        conversation_tail = f"{conversation_tail}\n{new_turns_str}".strip()[-1000:] # 세그먼트의 최근 대화 원문 일부
+        now_iso = datetime.datetime.now().isoformat()
+        try:
+            with self.sqlite_pool.transaction() as conn:
+                if memory_id and conn.execute("SELECT 1 FROM long_term_memories WHERE id = ?", (memory_id,)).fetchone():
+                    conn.execute(
+                        """UPDATE long_term_memories SET summary = ?1, keywords = ?2, full_conversation_snippet = ?3, 
+                            user_importance_score = claire_effective_importance(user_importance_score, last_accessed_time, ?4), last_accessed_time = ?4 WHERE id = ?5""",
+                        (summary_to_store, keywords_json_str, conversation_tail, now_iso, memory_id)
+                    )
+                else: # 새 세그먼트이거나 유지보수로 행이 삭제된 경우 새로 INSERT
+                    memory_id = conn.execute(
+                        """
+                        INSERT INTO long_term_memories 
+                        (session_id, summary, keywords, full_conversation_snippet, creation_time, last_accessed_time, user_importance_score) 
+                        VALUES (?, ?, ?, ?, ?, ?, ?)
+                        """,
+                        (session_id, summary_to_store, keywords_json_str, conversation_tail, now_iso, now_iso, 0.6)
+                    ).lastrowid
+                    conn.execute("UPDATE long_term_memories SET vector_id = ? WHERE id = ?", (str(memory_id), memory_id))
+                self.vector_journal.enqueue(conn, [memory_id])
+                conn.execute(
+                    """
+                    INSERT INTO session_summaries 
+                    (session_id, segment_index, memory_id, summary, segment_start, turn_checkpoint, conversation_tail, prefix_hash, updated_time) 
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(session_id, segment_index) DO UPDATE SET 
+                        memory_id = excluded.memory_id, summary = excluded.summary, 
+                        turn_checkpoint = excluded.turn_checkpoint, conversation_tail = excluded.conversation_tail, 
+                        prefix_hash = excluded.prefix_hash, updated_time = excluded.updated_time
+                    """,
+                    (session_id, segment_index, memory_id, summary_to_store, segment_start, len(messages), conversation_tail,
+                     messages_fingerprint(messages), now_iso)
+                )
+            stored = self._fetch_memories_by_ids([memory_id])
+            if not stored:
+                return None
+            entry = stored[0]
+            self._sync_vector_store()
+            print(f"Rolling memory (SQLite ID: {memory_id}) upserted for session {session_id}.")
+            return entry
+        except Exception as e:
+            print(f"An unexpected error occurred during incremental consolidation: {e}")
+            return None
+
+    @traced("chroma.query", new_trace=False)
+    def _dense_search(self, query_text: str, k: int, query_embedding: Optional[List[float]] = None, search_filter: Optional[dict] = None) -> List[Tuple[int, float]]:
+        """벡터 검색 결과를 유사도 순서의 (SQLite ID, 거리) 리스트로 반환합니다. search_filter는 Chroma 형식의 메타데이터 조건입니다."""
+        if not self.memory_vdb:
             return []
         try:
-            # score_threshold를 사용하여 너무 낮은 유사도 결과는 필터링 가능
-            retrieved_docs = self.memory_vdb.similarity_search_with_score(query_text, k=top_k) 
+            if query_embedding is None: # 호출 측에서 계산한 질의 임베딩이 있으면 재사용 (RAG 검색과 공유)
+                embedder = self.embeddings or self.memory_vdb.embeddings
+                query_embedding = embedder.embed_query(query_text)
+            retrieved = self.memory_vdb.search(query_embedding, k=k, where=search_filter)
         except Exception as e:
             print(f"Memory VDB search error: {e}")
             return []
         
+        # VDB 결과 순서(유사도 순)를 유지한 채 중복 SQLite ID 제거
+        hits, seen = [], set()
+        for sqlite_id, score in retrieved:
+            if sqlite_id not in seen:
+                seen.add(sqlite_id)
+                hits.append((sqlite_id, score))
+        return hits
+
+    def _fetch_tiers(self, sqlite_ids: List[int]) -> dict:
+        tiers = {}
+        for id_chunk in chunked(list(sqlite_ids)):
+            for sqlite_id, tier in self._execute_sqlite_query(
+                f"SELECT id, tier FROM long_term_memories WHERE id IN ({placeholders(len(id_chunk))})", tuple(id_chunk)
+            ) or []:
+                tiers[sqlite_id] = tier
+        return tiers
+
+    def _tiered_dense_search(self, query_text: str, k: int, query_embedding: Optional[List[float]] = None) -> List[Tuple[int, float]]:
+        """
+        최상위 노드(다이제스트, 아직 묶이지 않은 세션 롤업/대화 요약)만 먼저 검색하고, 상위 요약이 걸린 경우에만
+        가장 가까운 LTM_TIER_DRILL_WIDTH개의 하위 계층으로 내려가 대화 요약을 찾습니다.
+        기억이 수년간 쌓여도 첫 검색은 작은 최상위 집합에서만 이루어집니다.
+        """
+        if query_embedding is None: # 계층마다 다시 임베딩하지 않도록 한 번만 계산
+            embedder = self.embeddings or getattr(self.memory_vdb, "embeddings", None)
+            if embedder is not None:
+                query_embedding = embedder.embed_query(query_text)
+        root_hits = self._dense_search(query_text, k, query_embedding, search_filter={"parent_id": 0})
+        if not root_hits: # 계층 메타데이터가 아직 반영되지 않은 벡터DB
+            return self._dense_search(query_text, k, query_embedding)
+
+        leaves, frontier = [], root_hits
+        for _ in range(MEMORY_TIER_DIGEST + 1): # 최상위 + 최대 계층 깊이만큼만 내려감
+            tiers = self._fetch_tiers([sqlite_id for sqlite_id, _ in frontier])
+            # SQLite에 없는 ID(고아 벡터)는 대화 요약으로 취급하여 호출 측의 고아 정리에 맡김
+            leaves.extend(hit for hit in frontier if tiers.get(hit[0], MEMORY_TIER_ENTRY) == MEMORY_TIER_ENTRY)
+            coarse_ids = [sqlite_id for sqlite_id, _ in frontier if tiers.get(sqlite_id, MEMORY_TIER_ENTRY) > MEMORY_TIER_ENTRY][:LTM_TIER_DRILL_WIDTH]
+            if not coarse_ids:
+                break
+            frontier = self._dense_search(query_text, k, query_embedding, search_filter={"parent_id": {"$in": coarse_ids}})
+        if not leaves: # 하위 대화 요약을 찾지 못하면 상위 요약 자체를 결과로 사용
+            return root_hits
+
+        hits, seen = [], set()
+        for sqlite_id, distance in sorted(leaves, key=lambda hit: hit[1]):
+            if sqlite_id not in seen:
+                seen.add(sqlite_id)
+                hits.append((sqlite_id, distance))
+        return hits[:k]
+
+    def _build_fts_query(self, query_text: str) -> str:
+        # 각 단어를 따옴표로 감싸 FTS5 문법 문자를 무력화하고, 접두어 일치(*)를 OR로 묶음 (조사가 붙은 단어 대응)
+        terms = []
+        for term in re.findall(r"\w+", query_text):
+            if len(term) < 2:
+                continue
+            terms.append(term)
+            if len(term) >= 3 and re.match(r"[가-힣]", term[-1]): # 질의 쪽 조사 제거 ("김철수가" -> "김철수")
+                terms.append(term[:-1])
+        terms = [term.replace('"', '""') for term in terms]
+        return " OR ".join(f'"{term}"*' for term in dict.fromkeys(terms))
+
+    def search_memories_lexical(self, query_text: str, k: int) -> List[Tuple[int, float]]:
+        """FTS5 키워드 인덱스(요약, 키워드, 대화 일부)에서 BM25 순서의 (SQLite ID, bm25 점수) 리스트를 반환합니다. 임베딩 계산 없음."""
+        fts_query = self._build_fts_query(query_text)
+        if not fts_query:
+            return []
+        try:
+            rows = self._execute_sqlite_query(
+                "SELECT rowid, bm25(long_term_memories_fts, 2.0, 1.5, 0.5) AS rank_score FROM long_term_memories_fts WHERE long_term_memories_fts MATCH ? ORDER BY rank_score LIMIT ?",
+                (fts_query, k)
+            )
+        except sqlite3.Error as e:
+            print(f"Memory FTS search error: {e}")
+            return []
+        return [(row[0], row[1]) for row in rows or []]
+
+    def _reciprocal_rank_fusion(self, *ranked_id_lists: List[int]) -> List[Tuple[int, float]]:
+        """여러 순위 리스트를 RRF(1 / (k + 순위)) 점수 합으로 융합하여 (ID, 점수)를 점수 내림차순으로 반환합니다."""
+        fused_scores = {}
+        for ranked_ids in ranked_id_lists:
+            for rank, sqlite_id in enumerate(ranked_ids, start=1):
+                fused_scores[sqlite_id] = fused_scores.get(sqlite_id, 0.0) + 1.0 / (LTM_RRF_K + rank)
+        return sorted(fused_scores.items(), key=lambda item: item[1], reverse=True)
+
+    def _search_candidates(self, query_text: str, k: int, query_embedding: Optional[List[float]], mode: str) -> List[Tuple[int, float]]:
+        """검색 모드별 후보를 (SQLite ID, [0, 1]로 정규화한 관련도) 리스트로 반환합니다."""
+        dense_search = self._tiered_dense_search if LTM_TIERS_ENABLED else self._dense_search
+        if mode == "lexical":
+            hits = self.search_memories_lexical(query_text, k)
+            best = min((score for _, score in hits), default=0.0) # bm25는 음수이며 작을수록 관련도가 높음
+            return [(sqlite_id, score / best if best else 0.0) for sqlite_id, score in hits]
+        if mode == "hybrid":
+            dense_ids = [sqlite_id for sqlite_id, _ in dense_search(query_text, k, query_embedding)]
+            lexical_ids = [sqlite_id for sqlite_id, _ in self.search_memories_lexical(query_text, k)]
+            fused = self._reciprocal_rank_fusion(dense_ids, lexical_ids)[:k]
+            best = fused[0][1] if fused else 0.0
+            return [(sqlite_id, score / best if best else 0.0) for sqlite_id, score in fused]
+        # dense: 정규화된 임베딩의 L2 제곱 거리 d = 2 - 2cos 이므로 cos = 1 - d / 2
+        return [(sqlite_id, 1.0 - distance / 2.0) for sqlite_id, distance in dense_search(query_text, k, query_embedding)]
+
+    def _fetch_ranking_metadata(self, sqlite_ids: List[int]) -> dict:
+        """재정렬에 필요한 컬럼만 커버링 인덱스(idx_ltm_ranking)로 한 번에 조회합니다."""
+        metadata = {}
+        for id_chunk in chunked(list(sqlite_ids)):
+            rows = self._execute_sqlite_query(
+                f"SELECT id, user_importance_score, access_count, last_accessed_time FROM long_term_memories INDEXED BY idx_ltm_ranking WHERE id IN ({placeholders(len(id_chunk))})",
+                tuple(id_chunk)
+            )
+            for row in rows or []:
+                metadata[row[0]] = row[1:]
+        return metadata
+
+    def retrieve_relevant_memories(self, query_text: str, top_k: int = 2, query_embedding: Optional[List[float]] = None, mode: Optional[str] = None) -> List[StoredMemoryEntry]:
+        """
+        mode: "dense"(벡터 검색), "lexical"(FTS5 BM25만, 임베딩 불필요), "hybrid"(두 결과를 RRF로 융합).
+        지정하지 않으면 설정값 LTM_RETRIEVAL_MODE를 사용합니다.
+        재정렬이 켜져 있으면 top_k보다 많은 후보를 가져와 유사도/중요도/최근성/접근 빈도의 가중합으로 다시 고릅니다.
+        """
+        mode = mode or LTM_RETRIEVAL_MODE
+        print(f"Retrieving LTM for query (first 50 chars): '{query_text[:50]}...' (top_k={top_k}, mode={mode})")
+        if not query_text.strip():
+            return []
+
+        candidate_k = top_k * max(LTM_HYBRID_CANDIDATE_FACTOR if mode == "hybrid" else 1, LTM_RANK_OVERFETCH_FACTOR if LTM_RANKING_ENABLED else 1)
+        candidates = self._search_candidates(query_text, candidate_k, query_embedding, mode)
+        metadata = self._fetch_ranking_metadata([sqlite_id for sqlite_id, _ in candidates])
+        orphan_ids = [sqlite_id for sqlite_id, _ in candidates if sqlite_id not in metadata]
+        if orphan_ids:
+            # SQLite 행이 없는 벡터(고아)가 검색 슬롯을 차지한 경우: 정리를 예약하고, 결과가 모자라면 그만큼 더 가져옴
+            self._schedule_orphan_cleanup(orphan_ids)
+            if len(candidates) - len(orphan_ids) < top_k:
+                candidates = self._search_candidates(query_text, candidate_k + len(orphan_ids), query_embedding, mode)
+                metadata = self._fetch_ranking_metadata([sqlite_id for sqlite_id, _ in candidates])
+            candidates = [(sqlite_id, relevance) for sqlite_id, relevance in candidates if sqlite_id in metadata]
+        if LTM_RANKING_ENABLED and len(candidates) > 1:
+            ranked = self.ranker.rank(
+                candidate_ids=[sqlite_id for sqlite_id, _ in candidates],
+                similarities=[relevance for _, relevance in candidates],
+                importances=[metadata[sqlite_id][0] for sqlite_id, _ in candidates],
+                access_counts=[metadata[sqlite_id][1] for sqlite_id, _ in candidates],
+                last_accessed_times=[metadata[sqlite_id][2] for sqlite_id, _ in candidates],
+                top_k=top_k
+            )
+            ordered_sqlite_ids = [sqlite_id for sqlite_id, _ in ranked]
+        else:
+            ordered_sqlite_ids = [sqlite_id for sqlite_id, _ in candidates[:top_k]]
+
+        memories = self._fetch_memories_by_ids(ordered_sqlite_ids)
+        if memories:
+            # 접근 기록은 즉시 UPDATE하지 않고 버퍼에 모아 배치로 기록 (hot path에서 fsync 제거)
+            self.access_tracker.record_access([mem.id for mem in memories])
+        return memories
+
+    def _schedule_orphan_cleanup(self, sqlite_ids: List[int]):
+        """고아 벡터 삭제를 outbox에 기록합니다 (행이 없으므로 replay 시 sqlite_id 메타데이터로 삭제됨)."""
+        print(f"Found {len(sqlite_ids)} orphaned memory vectors; scheduling cleanup.")
+        try:
+            with self.sqlite_pool.transaction() as conn:
+                self.vector_journal.enqueue(conn, sqlite_ids, op="delete")
+        except sqlite3.Error as e:
+            print(f"Error scheduling orphan vector cleanup: {e}")
+
+    def _row_to_memory_entry(self, row: tuple) -> Optional[StoredMemoryEntry]:
+        # SQLite 테이블 컬럼 순서: 
+        # 0:id, 1:vector_id, 2:session_id, 3:summary, 4:keywords, 
+        # 5:full_conversation_snippet, 6:creation_time, 7:last_accessed_time, 
+        # 8:access_count, 9:user_importance_score, 10:tier, 11:parent_id
+        try:
+            keywords_json_data = row[4] # keywords는 5번째 컬럼 (인덱스 4)
+            loaded_keywords = []
+            if keywords_json_data and isinstance(keywords_json_data, str) and keywords_json_data.strip():
+                loaded_keywords = json.loads(keywords_json_data)
+            
+            entry_data = {
+                "id": row[0],
+                "vector_id": row[1], 
+                "session_id": row[2],
+                "summary": row[3],
+                "keywords": loaded_keywords,
+                "full_conversation_snippet": row[5],
+                "creation_time": row[6],
+                "last_accessed_time": row[7],
+                "access_count": row[8],
+                "user_importance_score": row[9],
+                "tier": row[10],
+                "parent_id": row[11]
+            }
+            return StoredMemoryEntry(**entry_data)
+        except json.JSONDecodeError as je:
+            print(f"Error decoding JSON for keywords (SQLite ID: {row[0]}, data: '{row[4]}'): {je}")
+        except Exception as ex: # Pydantic ValidationError 등 포함
+            print(f"Error processing or validating memory entry (SQLite ID: {row[0]}): {ex}")
+        return None
+
+    def _fetch_memories_by_ids(self, sqlite_ids: List[int]) -> List[StoredMemoryEntry]:
+        """여러 기억을 WHERE id IN (...) 배치 조회로 가져오고, 입력 ID 순서대로 반환합니다."""
+        if not sqlite_ids:
+            return []
+        rows_by_id = {}
+        for id_chunk in chunked(list(sqlite_ids)):
+            rows = self._execute_sqlite_query(
+                f"SELECT * FROM long_term_memories WHERE id IN ({placeholders(len(id_chunk))})",
+                tuple(id_chunk)
+            )
+            for row in rows or []:
+                rows_by_id[row[0]] = row
         memories = []
-        for doc, score in retrieved_docs:
-            # print(f"Retrieved doc from VDB with score {score:.4f}: {doc.metadata}") # 디버깅
-            sqlite_id_from_vdb_meta = doc.metadata.get("sqlite_id")
-            if sqlite_id_from_vdb_meta:
-                # SQLite 테이블 컬럼 순서: 
-                # 0:id, 1:vector_id, 2:session_id, 3:summary, 4:keywords, 
-                # 5:full_conversation_snippet, 6:creation_time, 7:last_accessed_time, 
-                # 8:access_count, 9:user_importance_score
-                row = self._execute_sqlite_query("SELECT * FROM long_term_memories WHERE id = ?", (sqlite_id_from_vdb_meta,), fetch_one=True)
-                if row:
-                    try:
-                        keywords_json_data = row[4] # keywords는 5번째 컬럼 (인덱스 4)
-                        loaded_keywords = []
-                        if keywords_json_data and isinstance(keywords_json_data, str) and keywords_json_data.strip():
-                            loaded_keywords = json.loads(keywords_json_data)
-                        
-                        entry_data = {
-                            "id": row[0],
-                            "vector_id": row[1], 
-                            "session_id": row[2],
-                            "summary": row[3],
-                            "keywords": loaded_keywords,
-                            "full_conversation_snippet": row[5],
-                            "creation_time": row[6],
-                            "last_accessed_time": row[7],
-                            "access_count": row[8],
-                            "user_importance_score": row[9]
-                        }
-                        entry = StoredMemoryEntry(**entry_data)
-                        memories.append(entry)
-                        
-                        self._execute_sqlite_query(
-                            "UPDATE long_term_memories SET last_accessed_time = ?, access_count = access_count + 1 WHERE id = ?", 
-                            (datetime.datetime.now().isoformat(), sqlite_id_from_vdb_meta), 
-                            commit=True
-                        )
-                    except json.JSONDecodeError as je:
-                        print(f"Error decoding JSON for keywords (SQLite ID: {sqlite_id_from_vdb_meta}, data: '{row[4]}'): {je}")
-                    except Exception as ex: # Pydantic ValidationError 등 포함
-                        print(f"Error processing or validating memory entry (SQLite ID: {sqlite_id_from_vdb_meta}): {ex}")
+        for sqlite_id in sqlite_ids:
+            row = rows_by_id.get(sqlite_id)
+            if row:
+                entry = self._row_to_memory_entry(row)
+                if entry:
+                    memories.append(entry)
         return memories
 
     def apply_user_feedback_to_memory(self, memory_sqlite_id: int, new_importance: float, new_summary: Optional[str] = None):
@@ -202,77 +614,195 @@ class MemorySystem:
 
         summary_to_update = new_summary.strip() if new_summary and new_summary.strip() else current_row[3] 
         
-        # SQLite 업데이트
-        self._execute_sqlite_query(
-            "UPDATE long_term_memories SET user_importance_score = ?, summary = ? WHERE id = ?", 
-            (new_importance, summary_to_update, memory_sqlite_id), 
-            commit=True
-        )
-        
-        # 요약 내용이 실제로 변경된 경우 (또는 중요도가 변경된 경우에도 VDB 메타데이터 업데이트)
-        if (new_summary and new_summary.strip() and new_summary.strip() != current_row[3]) or new_importance != current_row[9]:
-            vector_id_str = current_row[1] 
-            if not vector_id_str: vector_id_str = str(memory_sqlite_id)
-
-            updated_row_for_vdb = self._execute_sqlite_query("SELECT * FROM long_term_memories WHERE id = ?", (memory_sqlite_id,), fetch_one=True)
-            if not updated_row_for_vdb:
-                print(f"Could not retrieve updated row for VDB sync (ID: {memory_sqlite_id})."); return True 
-
-            keywords_json_str_updated = updated_row_for_vdb[4] 
-            metadata_for_vdb = {
-                "sqlite_id": updated_row_for_vdb[0], 
-                "session_id": updated_row_for_vdb[2], 
-                "type": "conversation_summary",
-                "creation_time": updated_row_for_vdb[6], 
-                "keywords_json": keywords_json_str_updated, 
-                "user_importance": updated_row_for_vdb[9] # 업데이트된 중요도 사용
-            }
-            doc_for_vdb = Document(page_content=summary_to_update, metadata=metadata_for_vdb)
-            
-            try:
-                # ChromaDB는 ID를 지정하여 add_documents를 호출하면 기존 문서를 덮어씁니다 (upsert 동작).
-                self.memory_vdb.add_documents([doc_for_vdb], ids=[vector_id_str])
-                # self.memory_vdb.persist() # 변경사항 즉시 반영
-                print(f"VectorDB document for ID {vector_id_str} updated/added.")
-            except Exception as e:
-                print(f"Error updating/adding document in VectorDB for ID {vector_id_str}: {e}")
-                # 필요시 삭제 후 재시도 로직 (이전 답변 참조)
+        # 요약 내용이나 중요도가 실제로 변경된 경우 VDB 문서/메타데이터도 갱신하도록 같은 트랜잭션에서 outbox에 기록
+        vector_changed = (new_summary and new_summary.strip() and new_summary.strip() != current_row[3]) or new_importance != current_row[9]
+        with self.sqlite_pool.transaction() as conn:
+            conn.execute(
+                "UPDATE long_term_memories SET user_importance_score = ?, summary = ? WHERE id = ?", 
+                (new_importance, summary_to_update, memory_sqlite_id)
+            )
+            if vector_changed:
+                self.vector_journal.enqueue(conn, [memory_sqlite_id])
+        if vector_changed:
+            self._sync_vector_store()
         print(f"User feedback applied to memory ID: {memory_sqlite_id}")
         return True
 
-    def periodic_memory_maintenance(self):
+    def _upsert_rollup(self, parent_session_id: str, tier: int, child_ids: List[int]) -> Optional[int]:
+        """
+        하위 기억들을 상위 요약 행(tier)에 묶습니다. 상위 요약이 이미 있으면 새 하위 기억만 반영하여 갱신합니다.
+        상위 행의 중요도는 하위의 최댓값, 생성 시각은 가장 이른 하위 기억 기준입니다.
+        """
+        children = sorted(self._fetch_memories_by_ids(child_ids), key=lambda child: child.creation_time)
+        if not children:
+            return None
+        parent_row = self._execute_sqlite_query(
+            "SELECT * FROM long_term_memories WHERE session_id = ? AND tier = ? LIMIT 1", (parent_session_id, tier), fetch_one=True
+        )
+        children_text = "\n".join(f"- {child.summary}" for child in children)
+        if parent_row:
+            summary_to_store = self._update_summary_with_llm(parent_row[3], children_text, max_length_chars=LTM_ROLLUP_SUMMARY_CHARS)
+            snippet = f"{parent_row[5] or ''}\n{children_text}".strip()[-1000:]
+        else:
+            summary_to_store = self._summarize_text_with_llm(children_text, max_length_chars=LTM_ROLLUP_SUMMARY_CHARS)
+            snippet = children_text[-1000:]
+        _, keywords_json_str = self._extract_keywords(summary_to_store)
+        creation_time = children[0].creation_time
+        last_accessed_time = max(child.last_accessed_time for child in children)
+        access_count = sum(child.access_count for child in children)
+        importance = max(child.user_importance_score for child in children)
+        linked_ids = [child.id for child in children]
+
+        try:
+            with self.sqlite_pool.transaction() as conn:
+                if parent_row:
+                    parent_id = parent_row[0]
+                    conn.execute(
+                        """UPDATE long_term_memories SET summary = ?, keywords = ?, full_conversation_snippet = ?, 
+                            creation_time = MIN(creation_time, ?), last_accessed_time = MAX(last_accessed_time, ?), 
+                            access_count = access_count + ?, user_importance_score = MAX(user_importance_score, ?) WHERE id = ?""",
+                        (summary_to_store, keywords_json_str, snippet, creation_time, last_accessed_time, access_count, importance, parent_id)
+                    )
+                else:
+                    parent_id = conn.execute(
+                        """
+                        INSERT INTO long_term_memories 
+                        (session_id, summary, keywords, full_conversation_snippet, creation_time, last_accessed_time, access_count, user_importance_score, tier) 
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                        """,
+                        (parent_session_id, summary_to_store, keywords_json_str, snippet, creation_time, last_accessed_time, access_count, importance, tier)
+                    ).lastrowid
+                    conn.execute("UPDATE long_term_memories SET vector_id = ? WHERE id = ?", (str(parent_id), parent_id))
+                conn.execute(
+                    f"UPDATE long_term_memories SET parent_id = ? WHERE id IN ({placeholders(len(linked_ids))})", (parent_id, *linked_ids)
+                )
+                self.vector_journal.enqueue(conn, [parent_id, *linked_ids], op="rollup") # 하위 벡터의 parent_id 메타데이터도 갱신
+        except sqlite3.Error as e:
+            print(f"SQLite error while rolling up {len(linked_ids)} memories into {parent_session_id}: {e}")
+            return None
+        self._sync_vector_store()
+        return parent_id
+
+    def run_tier_rollups(self, max_groups: int = LTM_ROLLUP_MAX_GROUPS, now: Optional[datetime.datetime] = None) -> RollupReport:
+        """
+        계층형 기억 롤업 작업 (백그라운드 통합 작업 큐에서 주기적으로 실행).
+        1. 마지막 활동 후 LTM_ROLLUP_SESSION_IDLE_MIN이 지난 세션의 대화 요약 -> 세션 롤업 (tier 1)
+        2. 끝난 기간(주/달)의 최상위 세션 롤업과 묶이지 않은 대화 요약 -> 기간 다이제스트 (tier 2)
+        LLM 요약 호출 수는 max_groups로 제한하며, 남은 대상은 다음 실행에서 처리됩니다.
+        """
+        print("Running memory tier rollups...")
+        report = RollupReport()
+        started = time.perf_counter()
+        now = now or datetime.datetime.now()
+        idle_cutoff = (now - datetime.timedelta(minutes=LTM_ROLLUP_SESSION_IDLE_MIN)).isoformat()
+        remaining = max(0, max_groups)
+
+        # 1. 세션 롤업: 묶이지 않은 대화 요약이 충분히 쌓였거나, 이미 롤업이 있는 세션
+        session_rows = self._execute_sqlite_query(
+            """
+            SELECT e.session_id, GROUP_CONCAT(e.id) FROM long_term_memories e 
+            WHERE e.parent_id = 0 AND e.tier = ? 
+            GROUP BY e.session_id 
+            HAVING MAX(e.last_accessed_time) < ? AND (COUNT(*) >= ? OR EXISTS (
+                SELECT 1 FROM long_term_memories r WHERE r.session_id = e.session_id AND r.tier = ?))
+            LIMIT ?
+            """,
+            (MEMORY_TIER_ENTRY, idle_cutoff, LTM_ROLLUP_MIN_CHILDREN, MEMORY_TIER_SESSION, remaining)
+        ) or []
+        for session_id, id_list in session_rows:
+            child_ids = [int(child_id) for child_id in id_list.split(",")]
+            if self._upsert_rollup(session_id, MEMORY_TIER_SESSION, child_ids):
+                report.sessions_rolled_up += 1
+                report.children_linked += len(child_ids)
+        remaining -= len(session_rows)
+
+        # 2. 기간 다이제스트: 진행 중인 기간은 제외
+        if remaining > 0:
+            current_period = digest_period_key(now.isoformat())
+            periods = {}
+            for memory_id, creation_time in self._execute_sqlite_query(
+                "SELECT id, creation_time FROM long_term_memories WHERE parent_id = 0 AND tier < ? AND last_accessed_time < ?",
+                (MEMORY_TIER_DIGEST, idle_cutoff)
+            ) or []:
+                period = digest_period_key(creation_time)
+                if period != current_period:
+                    periods.setdefault(period, []).append(memory_id)
+            for period in sorted(periods)[:remaining]:
+                digest_session_id = f"digest:{period}"
+                digest_exists = self._execute_sqlite_query(
+                    "SELECT 1 FROM long_term_memories WHERE session_id = ? AND tier = ?", (digest_session_id, MEMORY_TIER_DIGEST), fetch_one=True
+                )
+                if len(periods[period]) < LTM_ROLLUP_MIN_CHILDREN and not digest_exists:
+                    continue
+                if self._upsert_rollup(digest_session_id, MEMORY_TIER_DIGEST, periods[period]):
+                    report.digests_updated += 1
+                    report.children_linked += len(periods[period])
+
+        report.elapsed_sec = time.perf_counter() - started
+        print(f"Memory tier rollups finished: {report.summary()}")
+        return report
+
+    def periodic_memory_maintenance(self, max_seconds: Optional[float] = None, chunk_size: int = LTM_MAINTENANCE_CHUNK_SIZE) -> MaintenanceReport:
+        """
+        기억 유지보수를 인덱스 기반의 작은 배치로 수행합니다.
+        - 중요도 감쇠는 행을 다시 쓰지 않고 마지막 접근 시각 기준으로 조회/접근 시 계산 (ranking.effective_importance)
+        - 삭제는 chunk_size 단위로 커밋하고 벡터 삭제는 같은 트랜잭션의 outbox로 기록하므로, 중간에 멈춰도 다시 실행하면 남은 부분부터 이어서 처리
+        - max_seconds를 넘기면 남은 배치는 다음 실행으로 미룸 (report.completed == False)
+        """
         print("Running periodic memory maintenance...")
-        thirty_days_ago = (datetime.datetime.now() - datetime.timedelta(days=30)).isoformat()
-        # 1. 오래된 기억의 중요도 감소
-        self._execute_sqlite_query(
-            "UPDATE long_term_memories SET user_importance_score = user_importance_score * 0.9 WHERE last_accessed_time < ? AND user_importance_score > 0.05", 
-            (thirty_days_ago,), 
-            commit=True
+        report = MaintenanceReport()
+        started = time.perf_counter()
+        chunk_size = max(1, chunk_size)
+
+        # 1. 버퍼된 접근 기록 반영 (접근 시점에 그때까지의 감쇠가 중요도에 확정됨)
+        phase_started = time.perf_counter()
+        report.add_phase("flush_access", self.access_tracker.flush(), time.perf_counter() - phase_started)
+
+        # 2. 감쇠 대상 집계 (idx_ltm_last_accessed 범위 스캔, 행 갱신 없음)
+        phase_started = time.perf_counter()
+        grace_cutoff = (datetime.datetime.now() - datetime.timedelta(days=LTM_DECAY_GRACE_DAYS)).isoformat()
+        decaying_row = self._execute_sqlite_query(
+            "SELECT COUNT(*) FROM long_term_memories INDEXED BY idx_ltm_last_accessed WHERE last_accessed_time < ? AND user_importance_score > ?",
+            (grace_cutoff, LTM_DECAY_FLOOR), fetch_one=True
         )
-        # print(f"Decayed importance for affected entries.") # 실제 영향받은 row 수는 알 수 없음
+        report.decaying_count = decaying_row[0] if decaying_row else 0
+        report.add_phase("decay_scan", 0, time.perf_counter() - phase_started)
 
-        # 2. 중요도가 매우 낮은 기억 삭제
-        rows_to_delete_info = self._execute_sqlite_query("SELECT id, vector_id FROM long_term_memories WHERE user_importance_score < 0.01")
-        
-        if rows_to_delete_info: # None이 아니고 비어있지 않은 경우
-            sqlite_ids_to_delete = [row[0] for row in rows_to_delete_info]
-            # vector_id가 None일 수도 있으므로 필터링
-            vector_ids_to_delete = [row[1] for row in rows_to_delete_info if row[1]] 
-            
-            if sqlite_ids_to_delete:
-                 self._execute_sqlite_query(
-                     f"DELETE FROM long_term_memories WHERE id IN ({','.join(['?']*len(sqlite_ids_to_delete))})", 
-                     tuple(sqlite_ids_to_delete), 
-                     commit=True
-                 )
-                 print(f"Pruned {len(sqlite_ids_to_delete)} entries from SQLite based on low importance.")
-
-            if vector_ids_to_delete:
-                try:
-                    self.memory_vdb.delete(ids=vector_ids_to_delete)
-                    # self.memory_vdb.persist() # 변경사항 즉시 반영
-                    print(f"Pruned {len(vector_ids_to_delete)} entries from VectorDB.")
-                except Exception as e:
-                    print(f"Error pruning from VectorDB: {e}")
-        else:
-            print("No memories to prune based on low importance score.")
\ No newline at end of file
+        # 3. 중요도가 매우 낮은 기억 삭제 (idx_ltm_importance 범위 스캔, 배치 단위 커밋)
+        phase_started = time.perf_counter()
+        pruned_rows = 0
+        while True:
+            if max_seconds is not None and time.perf_counter() - started > max_seconds:
+                report.completed = False
+                break
+            rows = self._execute_sqlite_query(
+                "SELECT id FROM long_term_memories INDEXED BY idx_ltm_importance WHERE user_importance_score < ? LIMIT ?",
+                (LTM_PRUNE_THRESHOLD, chunk_size)
+            )
+            if not rows:
+                break
+            sqlite_ids = [row[0] for row in rows]
+            with self.sqlite_pool.transaction() as conn:
+                conn.execute(f"DELETE FROM long_term_memories WHERE id IN ({placeholders(len(sqlite_ids))})", sqlite_ids)
+                self.vector_journal.enqueue(conn, sqlite_ids, op="delete") # VectorDB 삭제는 outbox를 통해 적용 (실패 시 재시도)
+                # 삭제된 롤업/다이제스트의 하위 기억은 다시 최상위로 올려 검색에서 빠지지 않도록 함
+                orphaned_children = [row[0] for row in conn.execute(
+                    f"SELECT id FROM long_term_memories WHERE parent_id IN ({placeholders(len(sqlite_ids))})", sqlite_ids
+                )]
+                if orphaned_children:
+                    conn.execute(f"UPDATE long_term_memories SET parent_id = 0 WHERE id IN ({placeholders(len(orphaned_children))})", orphaned_children)
+                    self.vector_journal.enqueue(conn, orphaned_children, op="detach")
+            pruned_rows += len(sqlite_ids)
+            if len(sqlite_ids) < chunk_size:
+                break
+        report.add_phase("prune", pruned_rows, time.perf_counter() - phase_started)
+
+        # 4. 삭제/변경된 기억을 VectorDB에 반영 (이전에 실패해 남아 있던 작업 포함)
+        phase_started = time.perf_counter()
+        report.add_phase("vector_sync", self._sync_vector_store(), time.perf_counter() - phase_started)
+        if self.vector_journal.pending_count():
+            report.completed = False
+
+        report.total_sec = time.perf_counter() - started
+        print(f"Memory maintenance finished: {report.summary()}")
+        return report
\ No newline at end of file
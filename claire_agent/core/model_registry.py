@@ -0,0 +1,183 @@
+# claire_agent/core/model_registry.py
+import atexit
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# 내부 모듈 import
+from .config import (
+    OLLAMA_BASE_URLS,
+    OLLAMA_HTTP_TIMEOUT_SEC,
+    OLLAMA_HTTP_POOL_SIZE,
+    OLLAMA_MODEL_LIST_TTL_SEC,
+    OLLAMA_MODEL_REFRESH_INTERVAL_SEC,
+    PROMPT_CONTEXT_WINDOW
+)
+
+@dataclass
+class OllamaModelInfo:
+    name: str
+    size_bytes: int = 0
+    digest: str = ""
+    family: str = ""
+    parameter_size: str = "" # 예: "4.3B"
+    quantization_level: str = "" # 예: "Q4_K_M"
+    modified_at: str = ""
+    context_length: Optional[int] = None # 모델이 지원하는 최대 컨텍스트 길이 (/api/show, 조회 전에는 None)
+    default_num_ctx: Optional[int] = None # Modelfile에 지정된 num_ctx (없으면 None)
+    details_loaded: bool = False
+
+    def summary(self) -> str:
+        parts = [part for part in (self.parameter_size, self.quantization_level) if part]
+        if self.size_bytes:
+            parts.append(f"{self.size_bytes / 1024 ** 3:.1f}GB")
+        if self.context_length:
+            parts.append(f"컨텍스트 {self.context_length}")
+        return ", ".join(parts)
+
+class OllamaModelRegistry:
+    """
+    Ollama HTTP API(/api/tags, /api/show)로 설치된 모델 목록과 메타데이터를 조회하고 캐시합니다 (여러 서버를 쓰면 첫 번째 서버 기준).
+    - 커넥션을 재사용하는 requests.Session 하나를 모든 세션이 공유 (요청마다 프로세스를 띄우던 `ollama list` 대체)
+    - 목록은 TTL 동안 캐시하고, 백그라운드 스레드가 주기적으로 갱신 (TTL이 지난 뒤의 조회는 기존 목록을 바로 돌려주고 비동기로 갱신)
+    - 모델별 상세 정보(/api/show)는 처음 필요할 때 한 번 조회하고, 모델 digest가 바뀔 때까지 유지
+    """
+
+    def __init__(self, base_url: str = OLLAMA_BASE_URLS[0], ttl_sec: float = OLLAMA_MODEL_LIST_TTL_SEC,
+                 refresh_interval_sec: float = OLLAMA_MODEL_REFRESH_INTERVAL_SEC, timeout_sec: float = OLLAMA_HTTP_TIMEOUT_SEC,
+                 pool_size: int = OLLAMA_HTTP_POOL_SIZE):
+        self.base_url = base_url.rstrip("/")
+        self.ttl_sec = ttl_sec
+        self.refresh_interval_sec = refresh_interval_sec
+        self.timeout_sec = timeout_sec
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, pool_size))
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._models: Dict[str, OllamaModelInfo] = {}
+        self._loaded_at: Optional[float] = None # 마지막으로 목록 조회에 성공한 시각
+        self._attempted = False # 목록 조회를 한 번이라도 시도했는지 (서버가 꺼져 있을 때 매번 동기 조회하지 않도록)
+        self._details_failed_at: Dict[str, float] = {} # 상세 정보 조회에 실패한 모델 -> 시각 (TTL 동안 재시도하지 않음)
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock() # 목록 조회 동시 실행 방지
+        self._stop_event = threading.Event()
+        self._refresher: Optional[threading.Thread] = None
+
+    def refresh(self) -> bool:
+        """/api/tags로 모델 목록을 다시 읽습니다. 실패하면 기존 목록을 유지하고 False를 반환합니다."""
+        with self._refresh_lock:
+            self._attempted = True
+            try:
+                response = self.session.get(f"{self.base_url}/api/tags", timeout=self.timeout_sec)
+                response.raise_for_status()
+                entries = response.json().get("models", [])
+            except (requests.RequestException, ValueError) as e:
+                print(f"Error fetching Ollama models from {self.base_url}: {e}")
+                return False
+            models: Dict[str, OllamaModelInfo] = {}
+            with self._lock:
+                for entry in entries:
+                    name = entry.get("name") or entry.get("model")
+                    if not name:
+                        continue
+                    details = entry.get("details") or {}
+                    previous = self._models.get(name)
+                    info = OllamaModelInfo(
+                        name=name,
+                        size_bytes=entry.get("size", 0),
+                        digest=entry.get("digest", ""),
+                        family=details.get("family", ""),
+                        parameter_size=details.get("parameter_size", ""),
+                        quantization_level=details.get("quantization_level", ""),
+                        modified_at=entry.get("modified_at", "")
+                    )
+                    if previous and previous.details_loaded and previous.digest == info.digest: # 같은 모델이면 상세 정보 유지
+                        info.context_length, info.default_num_ctx, info.details_loaded = previous.context_length, previous.default_num_ctx, True
+                    models[name] = info
+                self._models = models
+                self._loaded_at = time.monotonic()
+            return True
+
+    def _refresh_async(self):
+        if self._refresh_lock.locked(): # 이미 갱신 중
+            return
+        threading.Thread(target=self.refresh, name="ollama-model-refresh", daemon=True).start()
+
+    def list_models(self) -> List[str]:
+        """캐시된 모델 이름 목록을 반환합니다. 아직 한 번도 읽지 않았으면 동기로 조회하고, TTL이 지났으면 비동기로 갱신합니다."""
+        if not self._attempted:
+            self.refresh()
+        elif self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl_sec:
+            self._refresh_async()
+        with self._lock:
+            return sorted(self._models)
+
+    def get_model_info(self, model_name: str) -> Optional[OllamaModelInfo]:
+        """모델 메타데이터를 반환합니다. 컨텍스트 길이 등 상세 정보는 처음 요청될 때 /api/show로 한 번 조회합니다."""
+        if not self._attempted:
+            self.refresh()
+        with self._lock:
+            info = self._models.get(model_name)
+            failed_at = self._details_failed_at.get(model_name)
+        if info is None or info.details_loaded or (failed_at is not None and time.monotonic() - failed_at < self.ttl_sec):
+            return info
+        try:
+            response = self.session.post(f"{self.base_url}/api/show", json={"model": model_name}, timeout=self.timeout_sec)
+            response.raise_for_status()
+            data = response.json()
+        except (requests.RequestException, ValueError) as e:
+            print(f"Error fetching Ollama model details for {model_name}: {e}")
+            with self._lock:
+                self._details_failed_at[model_name] = time.monotonic()
+            return info
+        model_info = data.get("model_info") or {}
+        architecture = model_info.get("general.architecture")
+        with self._lock:
+            info.context_length = model_info.get(f"{architecture}.context_length") if architecture else None
+            for line in (data.get("parameters") or "").splitlines():
+                key, _, value = line.partition(" ")
+                if key == "num_ctx" and value.strip().isdigit():
+                    info.default_num_ctx = int(value.strip())
+            info.details_loaded = True
+            self._details_failed_at.pop(model_name, None)
+        return info
+
+    def context_window(self, model_name: str, configured: int = PROMPT_CONTEXT_WINDOW) -> int:
+        """프롬프트 예산에 쓸 컨텍스트 길이: 설정값과 모델 최대 컨텍스트 중 작은 값 (모델 정보를 모르면 설정값)."""
+        info = self.get_model_info(model_name)
+        if info and info.context_length:
+            return min(configured, info.context_length)
+        return configured
+
+    def start(self):
+        """주기적으로 목록을 갱신하는 백그라운드 스레드를 시작합니다 (이미 실행 중이면 무시)."""
+        if self._refresher and self._refresher.is_alive():
+            return
+        self._stop_event.clear()
+        self._refresher = threading.Thread(target=self._run_periodic_refresh, name="ollama-model-registry", daemon=True)
+        self._refresher.start()
+
+    def _run_periodic_refresh(self):
+        while not self._stop_event.wait(self.refresh_interval_sec):
+            self.refresh()
+
+    def close(self):
+        self._stop_event.set()
+        self.session.close()
+
+_registry: Optional[OllamaModelRegistry] = None
+_registry_lock = threading.Lock()
+
+def get_model_registry() -> OllamaModelRegistry:
+    """프로세스 전역 모델 레지스트리를 반환하고, 백그라운드 갱신 스레드를 한 번만 시작합니다."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = OllamaModelRegistry()
+            _registry.start()
+            atexit.register(_registry.close)
+        return _registry
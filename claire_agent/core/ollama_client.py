@@ -0,0 +1,282 @@
+# claire_agent/core/ollama_client.py
+import atexit
+import hashlib
+import json
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+from langchain_community.llms.ollama import OllamaEndpointNotFoundError
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel, generate_from_stream
+from langchain_core.messages import AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from pydantic import Field
+
+# 내부 모듈 import
+from .config import (
+    OLLAMA_BASE_URLS,
+    OLLAMA_KEEP_ALIVE,
+    OLLAMA_HTTP_POOL_SIZE,
+    OLLAMA_ENDPOINT_COOLDOWN_SEC,
+    OLLAMA_WARMUP_INTERVAL_SEC,
+    OLLAMA_WARMUP_TIMEOUT_SEC
+)
+
+@dataclass
+class OllamaEndpoint:
+    url: str
+    in_flight: int = 0 # 진행 중인 요청 수
+    requests: int = 0 # 누적 요청 수
+    failures: int = 0 # 누적 연결 실패 수
+    unhealthy_until: float = 0.0 # 연결 실패 후 이 시각(monotonic)까지는 후순위
+
+class OllamaEndpointPool:
+    """
+    하나 이상의 Ollama 서버로 요청을 분산하고, 서버별 커넥션을 재사용(keep-alive)하는 공유 HTTP 클라이언트.
+    - affinity_key(예: 세션 ID)가 있으면 rendezvous 해시로 항상 같은 서버를 우선 사용 (서버의 KV 캐시 재사용)
+    - 없으면 진행 중인 요청이 가장 적은 서버를 사용
+    - 연결에 실패한 서버는 cooldown_sec 동안 후순위로 미루고 다음 서버로 재시도
+    """
+
+    def __init__(self, base_urls: List[str] = OLLAMA_BASE_URLS, pool_size: int = OLLAMA_HTTP_POOL_SIZE,
+                 cooldown_sec: float = OLLAMA_ENDPOINT_COOLDOWN_SEC):
+        self.endpoints = [OllamaEndpoint(url=url.rstrip("/")) for url in base_urls]
+        if not self.endpoints:
+            raise ValueError("At least one Ollama base URL is required.")
+        self.cooldown_sec = cooldown_sec
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=len(self.endpoints), pool_maxsize=max(1, pool_size))
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._lock = threading.Lock()
+        self._warming: Set[Tuple[str, str]] = set() # 진행 중인 (엔드포인트, 모델) 웜업
+        self._warmed_at: Dict[Tuple[str, str], float] = {}
+
+    @property
+    def primary_url(self) -> str:
+        return self.endpoints[0].url
+
+    def _ordered_endpoints(self, affinity_key: Optional[str]) -> List[OllamaEndpoint]:
+        now = time.monotonic()
+        with self._lock:
+            healthy = [endpoint for endpoint in self.endpoints if endpoint.unhealthy_until <= now]
+            unhealthy = [endpoint for endpoint in self.endpoints if endpoint.unhealthy_until > now]
+            if affinity_key is not None:
+                healthy.sort(key=lambda endpoint: hashlib.md5(f"{affinity_key}|{endpoint.url}".encode("utf-8")).digest(), reverse=True)
+            else:
+                healthy.sort(key=lambda endpoint: (endpoint.in_flight, endpoint.requests))
+            return healthy + sorted(unhealthy, key=lambda endpoint: endpoint.unhealthy_until) # 모두 실패 중이어도 시도는 함
+
+    def post(self, path: str, affinity_key: Optional[str] = None, **request_kwargs) -> Tuple[OllamaEndpoint, requests.Response]:
+        """
+        path로 POST 요청을 보냅니다. 연결 실패 시 다음 엔드포인트로 재시도합니다.
+        반환된 엔드포인트는 응답 처리를 마친 뒤 반드시 release()해야 합니다 (진행 중 요청 수 집계).
+        """
+        last_error: Optional[Exception] = None
+        for endpoint in self._ordered_endpoints(affinity_key):
+            with self._lock:
+                endpoint.in_flight += 1
+                endpoint.requests += 1
+            try:
+                response = self.session.post(f"{endpoint.url}{path}", **request_kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                print(f"Ollama endpoint {endpoint.url} unavailable: {e}")
+                with self._lock:
+                    endpoint.in_flight -= 1
+                    endpoint.failures += 1
+                    endpoint.unhealthy_until = time.monotonic() + self.cooldown_sec
+                last_error = e
+                continue
+            with self._lock:
+                endpoint.unhealthy_until = 0.0
+            return endpoint, response
+        raise last_error
+
+    def release(self, endpoint: OllamaEndpoint):
+        with self._lock:
+            endpoint.in_flight -= 1
+
+    def stream_lines(self, endpoint: OllamaEndpoint, response: requests.Response) -> Iterator[str]:
+        """스트리밍 응답을 줄 단위로 읽고, 끝나면 커넥션을 풀에 돌려줍니다."""
+        try:
+            yield from response.iter_lines(decode_unicode=True)
+        finally:
+            response.close()
+            self.release(endpoint)
+
+    def _warm_up_endpoint(self, endpoint: OllamaEndpoint, model_name: str, keep_alive: str):
+        key = (endpoint.url, model_name)
+        started = time.perf_counter()
+        try:
+            # 메시지 없이 /api/chat을 호출하면 Ollama는 모델을 메모리에 올리기만 하고 바로 응답함
+            response = self.session.post(
+                f"{endpoint.url}/api/chat", json={"model": model_name, "messages": [], "keep_alive": keep_alive},
+                timeout=OLLAMA_WARMUP_TIMEOUT_SEC
+            )
+            response.raise_for_status()
+            with self._lock:
+                self._warmed_at[key] = time.monotonic()
+            print(f"Warmed up {model_name} on {endpoint.url} in {time.perf_counter() - started:.1f}s.")
+        except requests.RequestException as e:
+            print(f"Could not warm up {model_name} on {endpoint.url}: {e}")
+            if isinstance(e, (requests.ConnectionError, requests.Timeout)):
+                with self._lock:
+                    endpoint.failures += 1
+                    endpoint.unhealthy_until = time.monotonic() + self.cooldown_sec
+        finally:
+            with self._lock:
+                self._warming.discard(key)
+
+    def warm_up(self, model_name: str, keep_alive: str = OLLAMA_KEEP_ALIVE, wait: bool = False,
+                min_interval_sec: float = OLLAMA_WARMUP_INTERVAL_SEC) -> int:
+        """
+        정상 엔드포인트 모두에 모델을 미리 올립니다 (백그라운드). min_interval_sec 안에 이미 올렸거나 진행 중이면 건너뜁니다.
+        시작한 웜업 수를 반환하며, wait=True이면 끝날 때까지 기다립니다.
+        """
+        now = time.monotonic()
+        threads = []
+        for endpoint in self.endpoints:
+            key = (endpoint.url, model_name)
+            with self._lock:
+                warmed_at = self._warmed_at.get(key)
+                if (key in self._warming or endpoint.unhealthy_until > now
+                        or (warmed_at is not None and now - warmed_at < min_interval_sec)):
+                    continue
+                self._warming.add(key)
+            thread = threading.Thread(target=self._warm_up_endpoint, args=(endpoint, model_name, keep_alive),
+                                      name="ollama-warmup", daemon=True)
+            thread.start()
+            threads.append(thread)
+        if wait:
+            for thread in threads:
+                thread.join()
+        return len(threads)
+
+    def stats(self) -> List[dict]:
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {"url": endpoint.url, "in_flight": endpoint.in_flight, "requests": endpoint.requests,
+                 "failures": endpoint.failures, "healthy": endpoint.unhealthy_until <= now}
+                for endpoint in self.endpoints
+            ]
+
+    def close(self):
+        self.session.close()
+
+_pool: Optional[OllamaEndpointPool] = None
+_pool_lock = threading.Lock()
+
+def get_endpoint_pool() -> OllamaEndpointPool:
+    """프로세스 전역 Ollama 엔드포인트 풀 (모든 세션과 LLM 인스턴스가 커넥션을 공유)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = OllamaEndpointPool()
+            atexit.register(_pool.close)
+        return _pool
+
+OLLAMA_ROLES = {"human": "user", "ai": "assistant", "system": "system", "tool": "tool"}
+
+def to_ollama_message(message: BaseMessage) -> dict:
+    """LangChain 메시지를 Ollama /api/chat 메시지({"role", "content"})로 변환합니다."""
+    content = message.content
+    if isinstance(content, list): # 멀티모달 형식이면 텍스트 조각만 이어 붙임
+        content = "".join(part if isinstance(part, str) else part.get("text", "") for part in content)
+    role = getattr(message, "role", None) if message.type == "chat" else OLLAMA_ROLES.get(message.type)
+    if role is None:
+        raise ValueError(f"Unsupported message type for Ollama: {message.type}")
+    return {"role": role, "content": content}
+
+class PooledChatOllama(BaseChatModel):
+    """
+    공유 엔드포인트 풀로 Ollama /api/chat을 직접 호출하는 채팅 모델 (langchain_core의 공개 BaseChatModel 인터페이스만 구현).
+    langchain_community의 ChatOllama는 요청마다 requests.post로 새 커넥션을 열고 전송 경로를 바꿀 공개 확장 지점이 없으므로,
+    요청 본문 구성과 NDJSON 스트림 파싱을 여기서 직접 하여 keep-alive 커넥션을 재사용하고 여러 서버로 분산합니다.
+    stream()/invoke()에 affinity_key=... 를 넘기면 같은 키의 요청은 같은 서버를 우선 사용합니다.
+    """
+
+    model: str
+    keep_alive: Optional[Union[int, str]] = None # 요청 후 모델을 메모리에 유지할 시간 (예: "30m")
+    num_ctx: Optional[int] = None # 컨텍스트 길이 (Ollama 옵션)
+    temperature: Optional[float] = None
+    num_predict: Optional[int] = None # 생성할 최대 토큰 수 (Ollama 옵션, ChatOllama와 같은 이름)
+    stop: Optional[List[str]] = None
+    options: Optional[Dict[str, Any]] = None # 그 밖의 Ollama 옵션 (top_p 등)
+    headers: Optional[Dict[str, str]] = None
+    timeout: Optional[float] = None
+    endpoint_pool: Optional[Any] = Field(default=None, exclude=True) # None이면 프로세스 전역 풀 (get_endpoint_pool)
+
+    @property
+    def _llm_type(self) -> str:
+        return "pooled-ollama-chat"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"model": self.model, "num_ctx": self.num_ctx, "temperature": self.temperature}
+
+    def _build_payload(self, messages: List[BaseMessage], stop: Optional[List[str]], **kwargs: Any) -> dict:
+        if self.stop is not None and stop is not None:
+            raise ValueError("`stop` found in both the input and default params.")
+        options = {"num_ctx": self.num_ctx, "temperature": self.temperature, "num_predict": self.num_predict,
+                   "stop": stop if stop is not None else self.stop}
+        options = {key: value for key, value in options.items() if value is not None}
+        options.update(self.options or {})
+        options.update(kwargs.pop("options", None) or {})
+        options.update(kwargs) # 나머지 호출 인자는 기존 ChatOllama처럼 Ollama 옵션으로 전달
+        payload = {"model": self.model, "messages": [to_ollama_message(message) for message in messages], "stream": True, "options": options}
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+        return payload
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        affinity_key = kwargs.pop("affinity_key", None) # Ollama 옵션으로 넘어가지 않도록 먼저 꺼냄
+        payload = self._build_payload(messages, stop, **kwargs)
+        pool = self.endpoint_pool or get_endpoint_pool()
+        endpoint, response = pool.post(
+            "/api/chat",
+            affinity_key=affinity_key,
+            headers={"Content-Type": "application/json", **(self.headers or {})},
+            json=payload,
+            stream=True,
+            timeout=self.timeout
+        )
+        response.encoding = "utf-8"
+        if response.status_code != 200:
+            detail = response.text
+            response.close()
+            pool.release(endpoint)
+            if response.status_code == 404:
+                raise OllamaEndpointNotFoundError(
+                    f"Ollama call failed with status code 404. Maybe your model is not found "
+                    f"and you should pull the model with `ollama pull {self.model}`."
+                )
+            raise ValueError(f"Ollama call failed with status code {response.status_code}. Details: {detail}")
+
+        lines = pool.stream_lines(endpoint, response)
+        try:
+            for line in lines:
+                if not line:
+                    continue
+                parsed = json.loads(line)
+                if "error" in parsed:
+                    raise ValueError(f"Ollama stream error: {parsed['error']}")
+                # 마지막 줄(done)의 eval_count/eval_duration 등은 generation_info -> response_metadata로 전달됨
+                chunk = ChatGenerationChunk(
+                    message=AIMessageChunk(content=parsed.get("message", {}).get("content", "")),
+                    generation_info=parsed if parsed.get("done") is True else None
+                )
+                if run_manager:
+                    run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+                yield chunk
+        finally:
+            lines.close() # 중간에 멈춰도 커넥션을 바로 풀에 돌려줌
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        return generate_from_stream(self._stream(messages, stop=stop, run_manager=run_manager, **kwargs))
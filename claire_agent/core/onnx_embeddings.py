@@ -0,0 +1,292 @@
+# claire_agent/core/onnx_embeddings.py
+"""
+sentence-transformers 임베딩 모델을 ONNX(선택: int8 동적 양자화)로 내보내고 onnxruntime으로 CPU 추론하는 임베딩 엔진.
+
+모델 내보내기 + 기준(PyTorch) 임베딩과의 일치 검사 (claire_agent 디렉토리에서):
+    python -m core.onnx_embeddings export
+    python -m core.onnx_embeddings parity --db-samples 200
+내보낸 뒤 .env에 EMBEDDING_ENGINE="onnx"를 설정하면 get_embedding_model()이 이 엔진을 사용합니다.
+내보내기에는 torch, onnx 패키지가 필요하고, 추론에는 onnxruntime과 tokenizers만 필요합니다.
+"""
+import argparse
+import datetime
+import json
+import os
+import time
+from dataclasses import asdict, dataclass
+from typing import List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+# 내부 모듈 import
+from .config import (
+    EMBEDDING_ONNX_DIR,
+    EMBEDDING_ONNX_QUANTIZED,
+    EMBEDDING_NUM_THREADS,
+    EMBEDDING_BATCH_SIZE,
+    EMBEDDING_PARITY_MIN_COSINE
+)
+
+METADATA_FILE = "claire_embedding.json"
+FP32_MODEL_FILE = "model.onnx"
+INT8_MODEL_FILE = "model_int8.onnx"
+
+# 일치 검사 기본 문장 (대화 요약, 질문, RAG 문단 형태를 고루 포함)
+DEFAULT_PARITY_TEXTS = [
+    "사용자는 다음 달 제주도 여행 계획을 세우고 있으며 예산은 100만 원 정도라고 말했다.",
+    "주말에 등산을 가려고 하는데 날씨가 어떨지 모르겠어.",
+    "커피는 산미가 적은 원두를 선호하고 라떼를 자주 마신다.",
+    "프로젝트 마감이 금요일이라 이번 주는 야근이 많을 것 같아.",
+    "지난번에 추천해 준 책 제목이 뭐였지?",
+    "반려견 산책 시간은 보통 아침 7시와 저녁 8시이다.",
+    "회의록 요약: 신규 기능 출시 일정을 2주 연기하고 QA 인력을 충원하기로 함.",
+    "건강검진 결과 콜레스테롤 수치가 조금 높게 나와 식단을 조절하기로 했다.",
+    "오늘 저녁 메뉴로 김치찌개와 계란말이를 만들 예정이다.",
+    "이사할 집은 회사까지 지하철로 30분 이내였으면 좋겠어.",
+    "Claire, 내가 좋아하는 음악 장르 기억나?",
+    "영어 공부를 위해 매일 아침 팟캐스트를 30분씩 듣고 있다.",
+    "가족 모임은 설 연휴 둘째 날 부모님 댁에서 하기로 했다.",
+    "운동은 주 3회 헬스장에서 근력 운동 위주로 하고 있다.",
+    "The quarterly budget review is scheduled for next Tuesday.",
+    "요리 레시피 문서: 된장찌개는 멸치 육수를 먼저 내고 된장을 풀어 애호박, 두부, 양파 순으로 넣는다."
+]
+
+class OnnxEmbeddings(Embeddings):
+    """
+    export_onnx_model()로 내보낸 폴더의 ONNX 모델을 onnxruntime으로 실행합니다.
+    - 길이가 비슷한 문장끼리 묶도록 길이순으로 정렬한 뒤 batch_size 단위로 추론 (패딩 낭비 감소)
+    - 풀링(mean/cls)과 L2 정규화는 원본 sentence-transformers 설정과 동일하게 numpy로 계산
+    """
+
+    def __init__(self, model_dir: str = EMBEDDING_ONNX_DIR, quantized: bool = EMBEDDING_ONNX_QUANTIZED,
+                 num_threads: int = EMBEDDING_NUM_THREADS, batch_size: int = EMBEDDING_BATCH_SIZE):
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        metadata_path = os.path.join(model_dir, METADATA_FILE)
+        if not os.path.exists(metadata_path):
+            raise FileNotFoundError(f"No exported ONNX embedding model in {model_dir} (run: python -m core.onnx_embeddings export)")
+        with open(metadata_path, "r", encoding="utf-8") as f:
+            self.metadata = json.load(f)
+        model_file = INT8_MODEL_FILE if quantized and os.path.exists(os.path.join(model_dir, INT8_MODEL_FILE)) else FP32_MODEL_FILE
+        self.model_dir = model_dir
+        self.model_file = model_file
+        self.model_name = self.metadata["source_model"]
+        self.variant = "onnx-int8" if model_file == INT8_MODEL_FILE else "onnx"
+        self.pooling = self.metadata.get("pooling", "mean")
+        self.batch_size = max(1, batch_size)
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = onnxruntime.ExecutionMode.ORT_SEQUENTIAL
+        options.inter_op_num_threads = 1 # 그래프가 직렬이므로 연산 내부 병렬화(intra_op)만 사용
+        if num_threads > 0:
+            options.intra_op_num_threads = num_threads
+        self.session = onnxruntime.InferenceSession(os.path.join(model_dir, model_file), sess_options=options,
+                                                    providers=["CPUExecutionProvider"])
+        self.input_names = [model_input.name for model_input in self.session.get_inputs()]
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=self.metadata.get("max_seq_length", 512))
+        self.tokenizer.enable_padding(pad_id=self.metadata.get("pad_token_id", 0), pad_token=self.metadata.get("pad_token", "[PAD]"))
+
+        parity = self.metadata.get("parity")
+        if parity and not parity.get("passed", True):
+            print(f"Warning: ONNX embedding model failed the recorded parity check ({parity.get('min_cosine')}).")
+        print(f"Loaded ONNX embedding model: {self.model_name} ({model_file}, threads={num_threads or 'auto'})")
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        features = {
+            "input_ids": np.array([encoding.ids for encoding in encodings], dtype=np.int64),
+            "attention_mask": np.array([encoding.attention_mask for encoding in encodings], dtype=np.int64),
+            "token_type_ids": np.array([encoding.type_ids for encoding in encodings], dtype=np.int64)
+        }
+        hidden = self.session.run(None, {name: features[name] for name in self.input_names})[0]
+        if self.pooling == "cls":
+            pooled = hidden[:, 0]
+        else: # mean: 패딩 토큰을 제외한 평균
+            mask = features["attention_mask"][..., None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        return pooled / np.clip(norms, 1e-12, None)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        vectors = np.empty((len(texts), 0), dtype=np.float32)
+        for start in range(0, len(order), self.batch_size):
+            indices = order[start:start + self.batch_size]
+            batch_vectors = self._encode_batch([texts[i] for i in indices])
+            if vectors.shape[1] == 0:
+                vectors = np.empty((len(texts), batch_vectors.shape[1]), dtype=np.float32)
+            vectors[indices] = batch_vectors
+        return vectors.tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+@dataclass
+class ParityReport:
+    texts: int = 0
+    min_cosine: float = 0.0
+    mean_cosine: float = 0.0
+    neighbor_agreement: float = 0.0 # 각 문장의 최근접 이웃이 두 엔진에서 같은 비율
+    reference_sec: float = 0.0
+    candidate_sec: float = 0.0
+    threshold: float = EMBEDDING_PARITY_MIN_COSINE
+    passed: bool = False
+
+    @property
+    def speedup(self) -> float:
+        return self.reference_sec / self.candidate_sec if self.candidate_sec > 0 else 0.0
+
+    def summary(self) -> str:
+        return (f"{self.texts}개 문장, 코사인 최소 {self.min_cosine:.4f} / 평균 {self.mean_cosine:.4f}, "
+                f"최근접 이웃 일치 {self.neighbor_agreement:.0%}, 기준 {self.reference_sec:.2f}초 -> {self.candidate_sec:.2f}초 "
+                f"({self.speedup:.1f}배), {'통과' if self.passed else '실패'} (기준 {self.threshold})")
+
+def check_embedding_parity(reference: Embeddings, candidate: Embeddings, texts: Optional[List[str]] = None,
+                           threshold: float = EMBEDDING_PARITY_MIN_COSINE) -> ParityReport:
+    """같은 문장에 대한 두 엔진의 임베딩을 비교합니다 (문장별 코사인 유사도, 최근접 이웃 일치율, 처리 시간)."""
+    texts = list(texts or DEFAULT_PARITY_TEXTS)
+    reference.embed_documents(texts[:2]) # 첫 호출의 초기화 비용은 시간 측정에서 제외
+    candidate.embed_documents(texts[:2])
+    started = time.perf_counter()
+    reference_vectors = np.asarray(reference.embed_documents(texts), dtype=np.float32)
+    reference_sec = time.perf_counter() - started
+    started = time.perf_counter()
+    candidate_vectors = np.asarray(candidate.embed_documents(texts), dtype=np.float32)
+    candidate_sec = time.perf_counter() - started
+
+    reference_vectors /= np.clip(np.linalg.norm(reference_vectors, axis=1, keepdims=True), 1e-12, None)
+    candidate_vectors /= np.clip(np.linalg.norm(candidate_vectors, axis=1, keepdims=True), 1e-12, None)
+    cosines = (reference_vectors * candidate_vectors).sum(axis=1)
+    neighbor_agreement = 1.0
+    if len(texts) > 2:
+        reference_similarity = reference_vectors @ reference_vectors.T
+        candidate_similarity = candidate_vectors @ candidate_vectors.T
+        np.fill_diagonal(reference_similarity, -np.inf)
+        np.fill_diagonal(candidate_similarity, -np.inf)
+        neighbor_agreement = float(np.mean(reference_similarity.argmax(axis=1) == candidate_similarity.argmax(axis=1)))
+    min_cosine = float(cosines.min())
+    return ParityReport(texts=len(texts), min_cosine=min_cosine, mean_cosine=float(cosines.mean()),
+                        neighbor_agreement=neighbor_agreement, reference_sec=reference_sec, candidate_sec=candidate_sec,
+                        threshold=threshold, passed=min_cosine >= threshold)
+
+def _sample_memory_texts(limit: int) -> List[str]:
+    """일치 검사에 실제 데이터 분포를 반영하도록 저장된 기억 요약을 가져옵니다 (DB가 없으면 빈 리스트)."""
+    if limit <= 0:
+        return []
+    from .sqlite_storage import get_sqlite_pool
+    try:
+        rows = get_sqlite_pool().execute("SELECT summary FROM long_term_memories ORDER BY id DESC LIMIT ?", (limit,))
+    except Exception as e:
+        print(f"Could not read memory summaries for parity check: {e}")
+        return []
+    return [row[0] for row in rows if row[0]]
+
+def export_onnx_model(reference: Optional[Embeddings] = None, output_dir: str = EMBEDDING_ONNX_DIR,
+                      quantize: bool = True, opset: int = 17) -> dict:
+    """
+    reference(HuggingFaceEmbeddings)의 트랜스포머 인코더를 ONNX로 내보내고, quantize=True면 int8 동적 양자화 모델도 만듭니다.
+    토크나이저(tokenizer.json)와 풀링 방식, 최대 길이는 claire_embedding.json에 함께 저장합니다.
+    """
+    import torch
+    if reference is None:
+        from .llm_services import build_hf_embedding_model
+        reference = build_hf_embedding_model()
+    sentence_model = reference.client # sentence_transformers.SentenceTransformer
+    transformer = sentence_model[0]
+    tokenizer = transformer.tokenizer
+    if not getattr(tokenizer, "is_fast", False):
+        raise RuntimeError("ONNX export needs a fast tokenizer (tokenizer.json).")
+    pooling = "mean"
+    if len(sentence_model) > 1 and hasattr(sentence_model[1], "get_pooling_mode_str"):
+        pooling = sentence_model[1].get_pooling_mode_str()
+    if pooling not in ("mean", "cls"):
+        raise RuntimeError(f"Unsupported pooling mode for ONNX export: {pooling}")
+
+    class _Encoder(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, attention_mask, token_type_ids=None):
+            return self.model(input_ids=input_ids, attention_mask=attention_mask, token_type_ids=token_type_ids).last_hidden_state
+
+    os.makedirs(output_dir, exist_ok=True)
+    tokenizer.save_pretrained(output_dir)
+    sample = tokenizer(DEFAULT_PARITY_TEXTS[:2], padding=True, return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    encoder = _Encoder(transformer.auto_model).eval() # 감싼 모듈도 eval이어야 드롭아웃이 그래프에 들어가지 않음
+    fp32_path = os.path.join(output_dir, FP32_MODEL_FILE)
+    print(f"Exporting {reference.model_name} to {fp32_path}...")
+    with torch.no_grad():
+        torch.onnx.export(
+            encoder, tuple(sample[name] for name in input_names), fp32_path,
+            input_names=input_names, output_names=["last_hidden_state"],
+            dynamic_axes={name: {0: "batch", 1: "sequence"} for name in input_names + ["last_hidden_state"]},
+            opset_version=opset, dynamo=False
+        )
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        print(f"Quantizing weights to int8: {INT8_MODEL_FILE}")
+        quantize_dynamic(fp32_path, os.path.join(output_dir, INT8_MODEL_FILE), weight_type=QuantType.QInt8)
+
+    metadata = {
+        "source_model": reference.model_name,
+        "pooling": pooling,
+        "max_seq_length": int(getattr(sentence_model, "max_seq_length", None) or tokenizer.model_max_length),
+        "pad_token": tokenizer.pad_token,
+        "pad_token_id": tokenizer.pad_token_id,
+        "input_names": input_names,
+        "exported_at": datetime.datetime.now().isoformat(timespec="seconds")
+    }
+    with open(os.path.join(output_dir, METADATA_FILE), "w", encoding="utf-8") as f:
+        json.dump(metadata, f, ensure_ascii=False, indent=2)
+    return metadata
+
+def _record_parity(output_dir: str, report: ParityReport, model_file: str):
+    metadata_path = os.path.join(output_dir, METADATA_FILE)
+    with open(metadata_path, "r", encoding="utf-8") as f:
+        metadata = json.load(f)
+    metadata["parity"] = {**asdict(report), "speedup": round(report.speedup, 2), "model_file": model_file}
+    with open(metadata_path, "w", encoding="utf-8") as f:
+        json.dump(metadata, f, ensure_ascii=False, indent=2)
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the sentence embedding model to ONNX/int8 and check parity with PyTorch.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export_parser = subparsers.add_parser("export", help="ONNX 모델 내보내기 (+ int8 양자화, 일치 검사)")
+    export_parser.add_argument("--no-quantize", action="store_true", help="int8 양자화 모델을 만들지 않음")
+    export_parser.add_argument("--opset", type=int, default=17)
+    parity_parser = subparsers.add_parser("parity", help="내보낸 모델과 PyTorch 기준 임베딩 비교")
+    for command_parser in (export_parser, parity_parser):
+        command_parser.add_argument("--model-dir", default=EMBEDDING_ONNX_DIR, help="ONNX 모델 폴더")
+        command_parser.add_argument("--db-samples", type=int, default=100, help="일치 검사에 추가할 저장된 기억 요약 수")
+        command_parser.add_argument("--threads", type=int, default=EMBEDDING_NUM_THREADS)
+        command_parser.add_argument("--threshold", type=float, default=EMBEDDING_PARITY_MIN_COSINE)
+    args = parser.parse_args()
+
+    from .llm_services import build_hf_embedding_model
+    reference = build_hf_embedding_model()
+    if args.command == "export":
+        export_onnx_model(reference, output_dir=args.model_dir, quantize=not args.no_quantize, opset=args.opset)
+    texts = DEFAULT_PARITY_TEXTS + _sample_memory_texts(args.db_samples)
+    has_int8 = os.path.exists(os.path.join(args.model_dir, INT8_MODEL_FILE))
+    runtime_file = INT8_MODEL_FILE if EMBEDDING_ONNX_QUANTIZED and has_int8 else FP32_MODEL_FILE
+    exit_code = 0
+    for quantized in ([False, True] if has_int8 else [False]):
+        candidate = OnnxEmbeddings(args.model_dir, quantized=quantized, num_threads=args.threads)
+        report = check_embedding_parity(reference, candidate, texts, threshold=args.threshold)
+        print(f"[{candidate.model_file}] {report.summary()}")
+        if candidate.model_file == runtime_file: # 실제로 사용할 모델의 결과를 기록 (로드 시 경고에 사용)
+            _record_parity(args.model_dir, report, candidate.model_file)
+            exit_code = 0 if report.passed else 1
+    raise SystemExit(exit_code)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+# claire_agent/core/prompt_builder.py
+import functools
+import math
+import re
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+from langchain.schema import HumanMessage, AIMessage, SystemMessage, BaseMessage
+from langchain.docstore.document import Document
+
+try:
+    from tokenizers import Tokenizer
+except ImportError: # 토크나이저 라이브러리가 없으면 근사 계산만 사용
+    Tokenizer = None
+
+# 내부 모듈 import
+from .config import (
+    PROMPT_CONTEXT_WINDOW,
+    PROMPT_RESPONSE_RESERVE_TOKENS,
+    PROMPT_LTM_BUDGET_TOKENS,
+    PROMPT_RAG_BUDGET_TOKENS,
+    PROMPT_HISTORY_SUMMARY_TOKENS,
+    PROMPT_HISTORY_DROP_STEP,
+    PROMPT_TOKENIZER_NAME,
+    PROMPT_TOKEN_COUNT_CACHE_SIZE
+)
+from .data_models import StoredMemoryEntry
+from .retrieval import RetrievalResult, NO_LTM_CONTEXT, NO_RAG_CONTEXT
+
+MESSAGE_OVERHEAD_TOKENS = 4 # 메시지마다 붙는 역할/구분 토큰 (채팅 템플릿 근사치)
+HISTORY_SUMMARY_HEADER = "[이전 대화 요약]\n"
+_ESTIMATE_PATTERN = re.compile(r"[가-힣]|[A-Za-z]+|\d|[^\sA-Za-z\d가-힣]")
+
+class TokenCounter:
+    """
+    텍스트 토큰 수를 계산합니다. 토크나이저는 한 번만 로드하고, 같은 텍스트(이전 대화, 시스템 프롬프트)의 결과는 LRU로 캐시합니다.
+    PROMPT_TOKENIZER_NAME이 없거나 로드에 실패하면 한글 음절/영단어 기준의 보수적인 근사치를 사용합니다.
+    """
+
+    def __init__(self, tokenizer_name: str = PROMPT_TOKENIZER_NAME, cache_size: int = PROMPT_TOKEN_COUNT_CACHE_SIZE):
+        self.tokenizer = None
+        if tokenizer_name and Tokenizer is not None:
+            try:
+                self.tokenizer = Tokenizer.from_pretrained(tokenizer_name)
+            except Exception as e:
+                print(f"Could not load tokenizer '{tokenizer_name}', falling back to estimation: {e}")
+        self.count = functools.lru_cache(maxsize=cache_size)(self._count_uncached)
+
+    def _count_uncached(self, text: str) -> int:
+        if not text:
+            return 0
+        if self.tokenizer is not None:
+            return len(self.tokenizer.encode(text, add_special_tokens=False).ids)
+        tokens = 0
+        for piece in _ESTIMATE_PATTERN.findall(text):
+            tokens += math.ceil(len(piece) / 4) if piece[0].isascii() and piece[0].isalpha() else 1
+        return tokens
+
+    def truncate(self, text: str, max_tokens: int, suffix: str = "...") -> str:
+        """text를 max_tokens 이하로 자릅니다 (글자 단위 이분 탐색)."""
+        if max_tokens <= 0:
+            return ""
+        if self.count(text) <= max_tokens:
+            return text
+        low, high = 0, len(text)
+        while low < high:
+            mid = (low + high + 1) // 2
+            if self._count_uncached(text[:mid] + suffix) <= max_tokens:
+                low = mid
+            else:
+                high = mid - 1
+        return text[:low] + suffix if low else ""
+
+@functools.lru_cache(maxsize=None)
+def get_token_counter(tokenizer_name: str = PROMPT_TOKENIZER_NAME) -> TokenCounter:
+    """프로세스 전역 토큰 카운터 (토크나이저 로드와 카운트 캐시를 모든 세션이 공유)."""
+    return TokenCounter(tokenizer_name)
+
+def history_from_ui_messages(messages: List[dict]) -> List[BaseMessage]:
+    """UI 메시지 리스트({"role", "content"})를 LangChain 메시지로 변환합니다 (첫 사용자 메시지 이전의 인사말은 제외)."""
+    history: List[BaseMessage] = []
+    for message in messages:
+        if message.get("role") == "user":
+            history.append(HumanMessage(content=message["content"]))
+        elif message.get("role") == "assistant" and history:
+            history.append(AIMessage(content=message["content"]))
+    return history
+
+@dataclass
+class PromptBuildResult:
+    messages: List[BaseMessage]
+    token_counts: Dict[str, int] = field(default_factory=dict) # 섹션별 토큰 수 (system, ltm, rag, history_summary, history, query, total)
+    budget: int = 0 # 프롬프트에 쓸 수 있는 토큰 수 (컨텍스트 길이 - 답변 예약분)
+    history_messages_used: int = 0
+    history_messages_dropped: int = 0
+    history_summarized: bool = False
+
+    def summary(self) -> str:
+        dropped = f", 이전 대화 {self.history_messages_dropped}개 {'요약' if self.history_summarized else '제외'}" if self.history_messages_dropped else ""
+        return f"프롬프트 {self.token_counts.get('total', 0)}/{self.budget} 토큰 (대화 기록 {self.history_messages_used}개{dropped})"
+
+class PromptBuilder:
+    """
+    시스템 프롬프트, 회상 기억(LTM), RAG, 대화 기록을 토큰 예산 안에서 조립합니다.
+    - 전체 예산: context_window - response_reserve
+    - LTM/RAG는 각자의 상한까지만 쓰고, 남은 예산은 모두 최근 대화 기록에 배정
+    - 대화 기록이 넘치면 오래된 메시지부터 제외하고, history_summarizer가 있으면 넘친 부분을 넘겨 받은 요약을 대신 넣음
+      (요약이 있을 때만 그 크기만큼 대화 기록을 더 제외)
+    - context_template이 있으면 (고정 접두부 레이아웃) 시스템 메시지에는 고정 내용만 두고, 회상 기억/RAG/현재 시각은
+      대화 기록 뒤, 현재 질문 바로 앞의 컨텍스트 메시지로 보냄: [시스템, 대화 기록..., (요약), 컨텍스트, 질문]
+    """
+
+    def __init__(self, system_template: str, context_template: Optional[str] = None, context_window: int = PROMPT_CONTEXT_WINDOW,
+                 response_reserve: int = PROMPT_RESPONSE_RESERVE_TOKENS, ltm_budget: int = PROMPT_LTM_BUDGET_TOKENS,
+                 rag_budget: int = PROMPT_RAG_BUDGET_TOKENS, history_summary_budget: int = PROMPT_HISTORY_SUMMARY_TOKENS,
+                 history_drop_step: int = PROMPT_HISTORY_DROP_STEP, token_counter: Optional[TokenCounter] = None):
+        self.system_template = system_template
+        self.context_template = context_template
+        self.budget = max(0, context_window - response_reserve)
+        self.ltm_budget = ltm_budget
+        self.rag_budget = rag_budget
+        self.history_summary_budget = history_summary_budget
+        self.history_drop_step = max(1, history_drop_step)
+        self.tokens = token_counter or get_token_counter()
+
+    def _message_tokens(self, message: BaseMessage) -> int:
+        return self.tokens.count(message.content) + MESSAGE_OVERHEAD_TOKENS
+
+    def _fit_ltm(self, memories: List[StoredMemoryEntry], budget: int) -> str:
+        lines, used = [], 0
+        for mem in memories:
+            line = f"- (ID:{mem.id}, 중요도:{mem.user_importance_score:.2f}) {mem.summary}"
+            line = self.tokens.truncate(line, budget - used)
+            if not line:
+                break
+            lines.append(line)
+            used += self.tokens.count(line) + 1
+        return "\n".join(lines)
+
+    def _fit_rag(self, documents: List[Document], budget: int) -> str:
+        # 문서마다 남은 예산을 균등하게 나눠 상위 문서 하나가 예산을 독차지하지 않도록 함 (남은 몫은 다음 문서로 이월)
+        blocks, used = [], 0
+        for i, doc in enumerate(documents):
+            share = (budget - used) // (len(documents) - i)
+            header = f"문서 출처: {doc.metadata.get('source', '알 수 없음')}\n내용: "
+            content = self.tokens.truncate(doc.page_content, share - self.tokens.count(header))
+            if not content:
+                continue
+            blocks.append(header + content)
+            used += self.tokens.count(blocks[-1]) + 2
+        return "\n\n".join(blocks)
+
+    def _fit_history(self, history: List[BaseMessage], history_tokens: List[int], budget: int) -> Tuple[List[BaseMessage], int]:
+        """최근 메시지부터 budget 안에 들어가는 대화 기록과 그 토큰 수를 반환합니다."""
+        kept, used = 0, 0
+        for tokens in reversed(history_tokens):
+            if used + tokens > budget:
+                break
+            used += tokens
+            kept += 1
+        if self.context_template and kept < len(history):
+            # 잘라낼 위치를 history_drop_step 단위로 맞춰, 예산이 넘칠 때마다 접두부가 매 턴 바뀌지 않도록 함 (몇 턴에 한 번만 캐시 무효화)
+            start = -(-(len(history) - kept) // self.history_drop_step) * self.history_drop_step
+            kept = max(0, len(history) - start)
+            used = sum(history_tokens[len(history) - kept:])
+        kept_history = history[len(history) - kept:]
+        while kept_history and not isinstance(kept_history[0], HumanMessage): # 사용자 메시지로 시작하도록 정리
+            used -= self._message_tokens(kept_history[0])
+            kept_history = kept_history[1:]
+        return kept_history, used
+
+    def build(self, query: str, history: List[BaseMessage], template_values: Dict[str, str], retrieval: RetrievalResult,
+              history_summarizer: Optional[Callable[[List[BaseMessage]], Optional[str]]] = None) -> PromptBuildResult:
+        counts: Dict[str, int] = {}
+        base_system = self.system_template.format(**template_values, recalled_ltm_str="", rag_context_str="")
+        query_message = HumanMessage(content=query)
+        counts["system"] = self.tokens.count(base_system) + MESSAGE_OVERHEAD_TOKENS
+        if self.context_template:
+            base_context = self.context_template.format(**template_values, recalled_ltm_str="", rag_context_str="")
+            counts["system"] += self.tokens.count(base_context) + MESSAGE_OVERHEAD_TOKENS
+        counts["query"] = self._message_tokens(query_message)
+        remaining = self.budget - counts["system"] - counts["query"]
+
+        # 1. 회상 기억과 RAG (검색 결과가 없거나 실패한 경우에는 검색 단계의 안내 문구 사용)
+        if retrieval.memories:
+            ltm_str = self._fit_ltm(retrieval.memories, min(self.ltm_budget, remaining)) or NO_LTM_CONTEXT
+        else:
+            ltm_str = retrieval.ltm_context_str
+        counts["ltm"] = self.tokens.count(ltm_str)
+        remaining -= counts["ltm"]
+        if retrieval.rag_documents:
+            rag_str = self._fit_rag(retrieval.rag_documents, min(self.rag_budget, remaining)) or NO_RAG_CONTEXT
+        else:
+            rag_str = retrieval.rag_context_str
+        counts["rag"] = self.tokens.count(rag_str)
+        remaining -= counts["rag"]
+
+        # 2. 대화 기록: 최근 메시지부터 남은 예산만큼
+        history_tokens = [self._message_tokens(message) for message in history]
+        kept_history, used = self._fit_history(history, history_tokens, remaining)
+        summary_messages: List[BaseMessage] = []
+        if len(kept_history) < len(history) and history_summarizer is not None:
+            # 요약을 먼저 받아 실제 요약 크기만큼만 대화 기록 예산에서 뺌 (요약이 없는 세션은 예산을 그대로 사용)
+            summary_text = history_summarizer(history[:len(history) - len(kept_history)])
+            summary_limit = min(self.history_summary_budget, max(remaining, 0)) - MESSAGE_OVERHEAD_TOKENS - self.tokens.count(HISTORY_SUMMARY_HEADER)
+            summary_text = self.tokens.truncate(summary_text or "", summary_limit)
+            if summary_text:
+                summary_messages.append(SystemMessage(content=HISTORY_SUMMARY_HEADER + summary_text))
+                kept_history, used = self._fit_history(history, history_tokens, remaining - self._message_tokens(summary_messages[0]))
+        dropped_history = history[:len(history) - len(kept_history)]
+        counts["history"] = used
+        counts["history_summary"] = sum(self._message_tokens(message) for message in summary_messages)
+
+        context_values = dict(template_values, recalled_ltm_str=ltm_str, rag_context_str=rag_str)
+        counts["total"] = counts["system"] + counts["ltm"] + counts["rag"] + counts["history_summary"] + counts["history"] + counts["query"]
+        if self.context_template:
+            # 시스템 메시지와 대화 기록이 턴 사이에 그대로 유지되어 Ollama가 이전 턴의 KV 캐시를 재사용할 수 있음
+            # (누적 요약도 자동 저장 때마다 바뀌므로 대화 기록 뒤에 배치)
+            messages = ([SystemMessage(content=self.system_template.format(**template_values))] + kept_history + summary_messages
+                        + [SystemMessage(content=self.context_template.format(**context_values)), query_message])
+        else:
+            messages = [SystemMessage(content=self.system_template.format(**context_values))] + summary_messages + kept_history + [query_message]
+        return PromptBuildResult(
+            messages=messages,
+            token_counts=counts,
+            budget=self.budget,
+            history_messages_used=len(kept_history),
+            history_messages_dropped=len(dropped_history),
+            history_summarized=bool(summary_messages)
+        )
@@ -0,0 +1,479 @@
+# claire_agent/core/rag_ingestion.py
+import argparse
+import datetime
+import hashlib
+import json
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Deque, Dict, Iterator, List, Optional, Tuple
+
+from langchain_community.vectorstores import Chroma
+from langchain_core.embeddings import Embeddings
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_community.document_loaders import TextLoader
+
+# config 모듈에서 설정값 가져오기
+from .config import (
+    RAG_DOCS_PATH,
+    RAG_MANIFEST_PATH,
+    RAG_CHUNK_SIZE,
+    RAG_CHUNK_OVERLAP,
+    RAG_EMBED_BATCH_SIZE,
+    RAG_EMBED_WORKERS,
+    RAG_EMBED_POOL_MIN_BATCHES,
+    RAG_PROGRESS_INTERVAL_SEC,
+    RAG_MANIFEST_SAVE_EVERY_FILES,
+    RAG_MANIFEST_SAVE_INTERVAL_SEC
+)
+
+@dataclass
+class IngestionReport:
+    added_files: List[str] = field(default_factory=list)
+    changed_files: List[str] = field(default_factory=list)
+    removed_files: List[str] = field(default_factory=list)
+    failed_files: List[str] = field(default_factory=list)
+    unchanged_files: int = 0
+    chunks_added: int = 0
+    chunks_deleted: int = 0
+    elapsed_sec: float = 0.0
+    chunks_per_sec: float = 0.0
+
+    @property
+    def index_changed(self) -> bool:
+        return bool(self.added_files or self.changed_files or self.removed_files)
+
+    def summary(self) -> str:
+        return (f"added={len(self.added_files)}, changed={len(self.changed_files)}, removed={len(self.removed_files)}, "
+                f"failed={len(self.failed_files)}, unchanged={self.unchanged_files}, "
+                f"chunks +{self.chunks_added}/-{self.chunks_deleted}, {self.chunks_per_sec:.1f} chunks/s")
+
+class RagManifest:
+    """
+    RAG 인덱스에 반영된 파일 목록 (경로, mtime, 크기, 내용 해시, 청크 ID)을 JSON 파일로 관리합니다.
+    version은 인덱스 내용이 바뀔 때마다 증가하여, 인덱스 변경 감지에 사용할 수 있습니다.
+    """
+
+    def __init__(self, manifest_path: str = RAG_MANIFEST_PATH):
+        self.manifest_path = manifest_path
+        self.version = 0
+        self.files: Dict[str, dict] = {}
+        self.exists = os.path.exists(manifest_path)
+        if self.exists:
+            try:
+                with open(manifest_path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                self.version = data.get("version", 0)
+                self.files = data.get("files", {})
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"Could not read RAG manifest at {manifest_path}: {e}. Treating as empty.")
+                self.exists = False
+
+    def save(self):
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": self.version, "updated_time": datetime.datetime.now().isoformat(), "files": self.files}, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.manifest_path) # 원자적 교체로 중간 상태의 매니페스트가 남지 않도록 함
+        self.exists = True
+
+def file_content_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def iter_rag_files(docs_path: str = RAG_DOCS_PATH) -> Iterator[str]:
+    """RAG 문서 폴더의 파일 경로(docs_path 기준 상대 경로)를 정렬된 순서로 하나씩 반환합니다."""
+    for dir_path, dir_names, file_names in os.walk(docs_path):
+        dir_names.sort()
+        for file_name in sorted(file_names):
+            if file_name.startswith(".") or "." not in file_name: # 기존 glob="**/*.*"와 동일한 대상
+                continue
+            yield os.path.relpath(os.path.join(dir_path, file_name), docs_path).replace(os.sep, "/")
+
+def make_chunk_ids(rel_path: str, content_hash: str, num_chunks: int) -> List[str]:
+    path_hash = hashlib.sha1(rel_path.encode("utf-8")).hexdigest()[:12]
+    return [f"{path_hash}-{content_hash[:12]}-{i}" for i in range(num_chunks)]
+
+def load_and_split_file(abs_path: str, rel_path: str, content_hash: str, text_splitter: Optional[RecursiveCharacterTextSplitter] = None):
+    """파일 하나를 읽어 청크 문서 리스트와 결정적(deterministic) 청크 ID 리스트를 반환합니다."""
+    text_splitter = text_splitter or RecursiveCharacterTextSplitter(chunk_size=RAG_CHUNK_SIZE, chunk_overlap=RAG_CHUNK_OVERLAP)
+    documents = TextLoader(abs_path, autodetect_encoding=True).load()
+    chunks = text_splitter.split_documents(documents)
+    for chunk in chunks:
+        chunk.metadata["source"] = abs_path
+        chunk.metadata["content_hash"] = content_hash
+    return chunks, make_chunk_ids(rel_path, content_hash, len(chunks))
+
+def _delete_chunks(vector_store: Chroma, chunk_ids: List[str]) -> int:
+    if not chunk_ids:
+        return 0
+    vector_store.delete(ids=chunk_ids)
+    return len(chunk_ids)
+
+# --- 프로세스 풀 임베딩 워커 (각 워커 프로세스가 자체 모델을 한 번 로드) ---
+_worker_embedding_model = None
+
+def _init_embedding_worker(torch_threads: int):
+    global _worker_embedding_model
+    try:
+        import torch
+        torch.set_num_threads(max(1, torch_threads)) # 워커끼리 코어를 나눠 쓰도록 스레드 수 제한
+    except ImportError:
+        pass
+    from .llm_services import build_embedding_model
+    _worker_embedding_model = build_embedding_model()
+
+def _embed_batch_in_worker(texts: List[str]) -> List[List[float]]:
+    return _worker_embedding_model.embed_documents(texts)
+
+class PrecomputedEmbeddings(Embeddings):
+    """
+    RAG 벡터DB의 임베딩 함수를 감싸, 색인 중 프로세스 풀이 미리 계산한 청크 임베딩을 add_documents에 그대로 넘겨주는 메모리 조회층.
+    영구 임베딩 캐시(EMBEDDING_CACHE_ENABLED)와 무관하게 동작하며, 넘겨준 벡터는 바로 지워 진행 중인 배치만큼만 메모리를 사용합니다.
+    질의 임베딩(embed_query)은 감싼 모델로 그대로 전달합니다.
+    """
+
+    def __init__(self, base_embeddings: Embeddings):
+        self.base_embeddings = base_embeddings
+        self._pending: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        # model_name, stats 등 감싼 모델의 속성을 그대로 노출
+        if name == "base_embeddings":
+            raise AttributeError(name)
+        return getattr(self.base_embeddings, name)
+
+    def get_cached(self, texts: List[str]) -> List[Optional[List[float]]]:
+        with self._lock:
+            results = [self._pending.get(text) for text in texts]
+        base_lookup = getattr(self.base_embeddings, "get_cached", None)
+        missing = [i for i, vector in enumerate(results) if vector is None]
+        if missing and callable(base_lookup): # 영구 캐시가 있으면 이전 실행에서 계산한 벡터도 재사용
+            for i, vector in zip(missing, base_lookup([texts[i] for i in missing])):
+                results[i] = vector
+        return results
+
+    def store(self, texts: List[str], vectors: List[List[float]]):
+        with self._lock:
+            self._pending.update(zip(texts, vectors))
+        base_store = getattr(self.base_embeddings, "store", None)
+        if callable(base_store):
+            base_store(texts, vectors)
+
+    def discard(self):
+        """upsert되지 못한(실패한 배치의) 벡터를 버립니다."""
+        with self._lock:
+            self._pending.clear()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        with self._lock:
+            results = [self._pending.pop(text, None) for text in texts]
+        missing_texts = list(dict.fromkeys(text for text, vector in zip(texts, results) if vector is None))
+        if missing_texts:
+            computed = dict(zip(missing_texts, self.base_embeddings.embed_documents(missing_texts)))
+            results = [vector if vector is not None else computed[text] for text, vector in zip(texts, results)]
+        return results
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.base_embeddings.embed_query(text)
+
+class EmbeddingBatchRunner:
+    """
+    청크 배치를 임베딩합니다. 처음 몇 배치는 upsert 시 add_documents가 현재 프로세스의 모델로 계산하고,
+    배치가 계속 이어지면(대량 색인) CPU 프로세스 풀을 띄워 여러 코어에 분산합니다.
+    풀의 결과는 임베딩 함수의 store()로 넘기므로, 벡터DB의 임베딩 함수가 PrecomputedEmbeddings(또는 CachedEmbeddings)여야 풀을 사용합니다.
+    """
+
+    def __init__(self, embedding_function, num_workers: int = RAG_EMBED_WORKERS, pool_min_batches: int = RAG_EMBED_POOL_MIN_BATCHES):
+        self.embedding_function = embedding_function
+        self.num_workers = num_workers if num_workers > 0 else max(1, (os.cpu_count() or 2) // 2)
+        self.pool_min_batches = pool_min_batches
+        self._submitted = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._warned = False
+
+    def submit(self, texts: List[str]) -> Future:
+        self._submitted += 1
+        future: Future = Future()
+        wants_pool = self.num_workers > 1 and self._executor is None and self._submitted > self.pool_min_batches
+        if wants_pool and not callable(getattr(self.embedding_function, "store", None)):
+            if not self._warned:
+                # 계산한 벡터를 add_documents에 넘길 방법이 없으므로 풀 없이 upsert 시점에 한 번만 계산
+                print(f"Warning: {self.num_workers} embedding workers requested, but the RAG store's embedding function "
+                      f"({type(self.embedding_function).__name__}) cannot take precomputed vectors. "
+                      "Wrap it in PrecomputedEmbeddings to use the process pool. Embedding serially.")
+                self._warned = True
+        elif wants_pool:
+            print(f"Starting embedding process pool with {self.num_workers} workers...")
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.num_workers,
+                mp_context=multiprocessing.get_context("spawn"), # torch 스레드 상태를 fork로 복제하지 않도록 spawn 사용
+                initializer=_init_embedding_worker,
+                initargs=(max(1, (os.cpu_count() or 1) // self.num_workers),)
+            )
+        if self._executor is not None:
+            return self._submit_to_pool(texts)
+        future.set_result(None) # upsert 시 add_documents가 계산 (미리 계산해 두면 캐시 없는 임베딩 함수에서는 두 번 계산하게 됨)
+        return future
+
+    def _submit_to_pool(self, texts: List[str]) -> Future:
+        """조회층에 없는 텍스트만 워커로 보내고, 결과를 합쳐 기록합니다 (upsert 시 add_documents가 조회층에서 읽음)."""
+        cached = self.embedding_function.get_cached(texts)
+        missing_texts = [text for text, vector in zip(texts, cached) if vector is None]
+        merged: Future = Future()
+        if not missing_texts:
+            merged.set_result(cached)
+            return merged
+
+        def _merge(worker_future: Future):
+            try:
+                computed = iter(worker_future.result())
+                new_vectors = []
+                results = []
+                for vector in cached:
+                    if vector is None:
+                        vector = next(computed)
+                        new_vectors.append(vector)
+                    results.append(vector)
+                self.embedding_function.store(missing_texts, new_vectors)
+                merged.set_result(results)
+            except Exception as e:
+                merged.set_exception(e)
+
+        self._executor.submit(_embed_batch_in_worker, missing_texts).add_done_callback(_merge)
+        return merged
+
+    @property
+    def max_in_flight(self) -> int:
+        return self.num_workers * 2 if self._executor is not None else 1
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        discard = getattr(self.embedding_function, "discard", None)
+        if callable(discard):
+            discard()
+
+@dataclass
+class _PendingFile:
+    rel_path: str
+    previous_entry: Optional[dict]
+    manifest_entry: dict
+    remaining_chunks: int
+    failed: bool = False
+    written_ids: List[str] = field(default_factory=list) # 이미 upsert된 청크 ID (일부 배치만 실패했을 때 정리용)
+
+class StreamingRagIngestion:
+    """
+    메모리 사용량이 코퍼스 크기와 무관하도록 파일 -> 청크 -> 임베딩 배치 -> Chroma 배치 upsert를 스트리밍으로 처리합니다.
+    한 번에 메모리에 올라가는 것은 처리 중인 파일 하나의 청크와 진행 중인(in-flight) 배치들뿐입니다.
+    파일의 모든 청크가 upsert된 뒤에만 매니페스트에 기록하므로, 중단되어도 다음 실행에서 해당 파일부터 다시 처리합니다.
+    매니페스트 파일은 파일마다가 아니라 save_every_files개 또는 save_interval_sec초마다, 그리고 끝날 때 저장합니다
+    (저장 전에 중단되면 그 사이 파일은 다음 실행에서 같은 청크 ID로 다시 upsert되므로 결과는 같음).
+    """
+
+    def __init__(self, vector_store: Chroma, docs_path: str = RAG_DOCS_PATH, manifest: Optional[RagManifest] = None,
+                 batch_size: int = RAG_EMBED_BATCH_SIZE, num_workers: int = RAG_EMBED_WORKERS,
+                 save_every_files: int = RAG_MANIFEST_SAVE_EVERY_FILES, save_interval_sec: float = RAG_MANIFEST_SAVE_INTERVAL_SEC):
+        self.vector_store = vector_store
+        self.docs_path = docs_path
+        self.manifest = manifest or RagManifest()
+        self.batch_size = max(1, batch_size)
+        self.runner = EmbeddingBatchRunner(vector_store.embeddings, num_workers=num_workers)
+        self.text_splitter = RecursiveCharacterTextSplitter(chunk_size=RAG_CHUNK_SIZE, chunk_overlap=RAG_CHUNK_OVERLAP)
+        self.report = IngestionReport()
+        self.save_every_files = max(1, save_every_files)
+        self.save_interval_sec = save_interval_sec
+        self._started = 0.0
+        self._last_progress = 0.0
+        self._unsaved_files = 0
+        self._last_save = 0.0
+
+    def _manifest_changed(self):
+        """매니페스트 변경을 모아 두었다가 일정 파일 수/시간마다 저장합니다 (파일마다 전체를 다시 쓰지 않도록)."""
+        self._unsaved_files += 1
+        if self._unsaved_files >= self.save_every_files or time.monotonic() - self._last_save >= self.save_interval_sec:
+            self._save_manifest()
+
+    def _save_manifest(self):
+        self.manifest.save()
+        self._unsaved_files = 0
+        self._last_save = time.monotonic()
+
+    def _iter_pending_chunks(self, seen_paths: set) -> Iterator[Tuple[_PendingFile, str, object]]:
+        """추가/변경된 파일만 골라 (파일 상태, 청크 ID, 청크 문서)를 하나씩 생성합니다."""
+        for rel_path in iter_rag_files(self.docs_path):
+            seen_paths.add(rel_path)
+            abs_path = os.path.join(self.docs_path, rel_path)
+            try:
+                stat = os.stat(abs_path)
+                entry = self.manifest.files.get(rel_path)
+                if entry and entry.get("mtime") == stat.st_mtime and entry.get("size") == stat.st_size:
+                    self.report.unchanged_files += 1
+                    continue
+                content_hash = file_content_hash(abs_path)
+                if entry and entry.get("content_hash") == content_hash:
+                    # 내용은 같고 mtime만 바뀐 경우 (touch, 복사 등): 재임베딩 없이 매니페스트만 갱신
+                    entry.update({"mtime": stat.st_mtime, "size": stat.st_size})
+                    self._manifest_changed()
+                    self.report.unchanged_files += 1
+                    continue
+                chunks, chunk_ids = load_and_split_file(abs_path, rel_path, content_hash, self.text_splitter)
+            except Exception as e:
+                # 기존 DirectoryLoader(silent_errors=True)와 같이 실패한 파일은 경고만 출력하고 계속 진행
+                print(f"Error ingesting RAG file {rel_path}: {e}")
+                self.report.failed_files.append(rel_path)
+                continue
+
+            pending = _PendingFile(
+                rel_path=rel_path,
+                previous_entry=entry,
+                manifest_entry={"mtime": stat.st_mtime, "size": stat.st_size, "content_hash": content_hash, "chunk_ids": chunk_ids},
+                remaining_chunks=len(chunks)
+            )
+            if not chunks: # 빈 파일: 임베딩할 청크 없이 바로 반영
+                self._finalize_file(pending)
+                continue
+            for chunk_id, chunk in zip(chunk_ids, chunks):
+                yield pending, chunk_id, chunk
+
+    def _iter_batches(self, seen_paths: set) -> Iterator[List[Tuple[_PendingFile, str, object]]]:
+        batch = []
+        for item in self._iter_pending_chunks(seen_paths):
+            batch.append(item)
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def _finalize_file(self, pending: _PendingFile):
+        previous_ids = pending.previous_entry.get("chunk_ids", []) if pending.previous_entry else []
+        if pending.failed:
+            self.report.failed_files.append(pending.rel_path)
+            # 매니페스트에 없는 청크가 인덱스에 남지 않도록, 먼저 성공한 배치의 청크를 지움 (이전 버전 청크는 유지)
+            partial_ids = [i for i in pending.written_ids if i not in set(previous_ids)]
+            try:
+                self.report.chunks_deleted += _delete_chunks(self.vector_store, partial_ids)
+            except Exception as e:
+                print(f"Error removing partially indexed chunks of RAG file {pending.rel_path}: {e}")
+            return
+        new_ids = set(pending.manifest_entry["chunk_ids"])
+        # 새 청크가 모두 반영된 뒤에 이전 버전 청크를 삭제하여, 도중에 검색 결과가 비지 않도록 함
+        self.report.chunks_deleted += _delete_chunks(self.vector_store, [i for i in previous_ids if i not in new_ids])
+        (self.report.changed_files if pending.previous_entry else self.report.added_files).append(pending.rel_path)
+        self.manifest.files[pending.rel_path] = pending.manifest_entry
+        self.manifest.version += 1
+        self._manifest_changed()
+        print(f"Indexed RAG file {pending.rel_path} ({len(new_ids)} chunks).")
+
+    def _complete_batch(self, batch: List[Tuple[_PendingFile, str, object]], future: Future):
+        try:
+            future.result()
+            # 공개 API(add_documents)로 upsert. 프로세스 풀이 계산한 배치 임베딩은 임베딩 함수의 조회층에 있으므로 다시 계산하지 않음
+            self.vector_store.add_documents([chunk for _, _, chunk in batch], ids=[chunk_id for _, chunk_id, _ in batch])
+            self.report.chunks_added += len(batch)
+            for pending, chunk_id, _ in batch:
+                pending.written_ids.append(chunk_id)
+        except Exception as e:
+            print(f"Error embedding/upserting RAG batch of {len(batch)} chunks: {e}")
+            for pending, _, _ in batch:
+                pending.failed = True
+        for pending, _, _ in batch:
+            pending.remaining_chunks -= 1
+            if pending.remaining_chunks == 0:
+                self._finalize_file(pending)
+        self._report_progress()
+
+    def _report_progress(self, force: bool = False):
+        now = time.monotonic()
+        if not force and now - self._last_progress < RAG_PROGRESS_INTERVAL_SEC:
+            return
+        self._last_progress = now
+        elapsed = max(now - self._started, 1e-9)
+        self.report.elapsed_sec = elapsed
+        self.report.chunks_per_sec = self.report.chunks_added / elapsed
+        print(f"RAG ingestion progress: {self.report.chunks_added} chunks embedded, "
+              f"{len(self.report.added_files) + len(self.report.changed_files)} files done "
+              f"({self.report.chunks_per_sec:.1f} chunks/s)")
+
+    def run(self) -> IngestionReport:
+        self._started = self._last_progress = self._last_save = time.monotonic()
+        if not self.manifest.exists and self.vector_store.get(limit=1, include=[])["ids"]:
+            # 매니페스트 없이 만들어진 기존 인덱스는 청크 ID를 알 수 없으므로 한 번 비우고 다시 색인
+            print("Existing RAG index has no manifest. Clearing it once for manifest-tracked re-ingestion.")
+            legacy_ids = self.vector_store.get(include=[])["ids"]
+            self.report.chunks_deleted += _delete_chunks(self.vector_store, legacy_ids)
+
+        seen_paths: set = set()
+        in_flight: Deque[Tuple[list, Future]] = deque()
+        try:
+            for batch in self._iter_batches(seen_paths):
+                in_flight.append((batch, self.runner.submit([chunk.page_content for _, _, chunk in batch])))
+                # 진행 중인 배치 수를 제한하여 메모리 사용량을 일정하게 유지 (제출 순서대로 완료 처리)
+                while len(in_flight) >= self.runner.max_in_flight:
+                    self._complete_batch(*in_flight.popleft())
+            while in_flight:
+                self._complete_batch(*in_flight.popleft())
+        finally:
+            self.runner.close()
+            if self._unsaved_files: # 중단되더라도 끝까지 반영된 파일은 기록
+                self._save_manifest()
+
+        for rel_path in [p for p in self.manifest.files if p not in seen_paths]:
+            try:
+                self.report.chunks_deleted += _delete_chunks(self.vector_store, self.manifest.files[rel_path].get("chunk_ids", []))
+                del self.manifest.files[rel_path]
+                self.report.removed_files.append(rel_path)
+                self.manifest.version += 1
+                self._manifest_changed()
+                print(f"Removed RAG file {rel_path} from index.")
+            except Exception as e:
+                print(f"Error removing chunks of deleted RAG file {rel_path}: {e}")
+                self.report.failed_files.append(rel_path)
+
+        if self._unsaved_files or not self.manifest.exists:
+            self._save_manifest()
+        self._report_progress(force=True)
+        print(f"RAG index sync finished: {self.report.summary()}")
+        return self.report
+
+def sync_rag_index(vector_store: Chroma, docs_path: str = RAG_DOCS_PATH, manifest: Optional[RagManifest] = None,
+                   batch_size: int = RAG_EMBED_BATCH_SIZE, num_workers: int = RAG_EMBED_WORKERS) -> IngestionReport:
+    """
+    RAG 문서 폴더와 매니페스트를 비교하여 추가/변경된 파일만 임베딩하고, 삭제된 파일의 청크는 제거합니다.
+    mtime과 크기가 같으면 해시 계산도 건너뛰며, 끝까지 반영된 파일만 매니페스트에 기록하여 중단 후 재실행 시 이어서 진행합니다.
+    """
+    return StreamingRagIngestion(vector_store, docs_path=docs_path, manifest=manifest, batch_size=batch_size, num_workers=num_workers).run()
+
+def main():
+    """RAG 인덱스 증분 동기화 명령: python -m core.rag_ingestion"""
+    from .config import VECTOR_DB_RAG_PATH
+    from .llm_services import get_embedding_model
+
+    parser = argparse.ArgumentParser(description="Incrementally sync RAG documents into the Chroma index.")
+    parser.add_argument("--docs-path", default=RAG_DOCS_PATH, help="RAG 문서 폴더 경로")
+    parser.add_argument("--full", action="store_true", help="매니페스트를 무시하고 모든 파일을 다시 색인")
+    parser.add_argument("--batch-size", type=int, default=RAG_EMBED_BATCH_SIZE, help="임베딩/upsert 배치 크기 (청크 수)")
+    parser.add_argument("--workers", type=int, default=RAG_EMBED_WORKERS, help="임베딩 프로세스 수 (0이면 CPU 코어 수의 절반)")
+    args = parser.parse_args()
+
+    vector_store = Chroma(persist_directory=VECTOR_DB_RAG_PATH, embedding_function=PrecomputedEmbeddings(get_embedding_model()))
+    manifest = RagManifest()
+    if args.full:
+        for entry in manifest.files.values():
+            _delete_chunks(vector_store, entry.get("chunk_ids", []))
+        manifest.files = {}
+        manifest.version += 1
+    sync_rag_index(vector_store, docs_path=args.docs_path, manifest=manifest, batch_size=args.batch_size, num_workers=args.workers)
+
+if __name__ == "__main__":
+    main()
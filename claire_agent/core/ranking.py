@@ -0,0 +1,91 @@
+# claire_agent/core/ranking.py
+import datetime
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# config 모듈에서 설정값 가져오기
+from .config import (
+    LTM_RANK_WEIGHT_SIMILARITY,
+    LTM_RANK_WEIGHT_IMPORTANCE,
+    LTM_RANK_WEIGHT_RECENCY,
+    LTM_RANK_WEIGHT_FREQUENCY,
+    LTM_RANK_RECENCY_HALF_LIFE_DAYS,
+    LTM_DECAY_GRACE_DAYS,
+    LTM_DECAY_PERIOD_DAYS,
+    LTM_DECAY_FACTOR,
+    LTM_DECAY_FLOOR
+)
+
+def parse_iso_times(iso_times: Sequence[str]) -> np.ndarray:
+    """ISO 문자열 리스트를 datetime64[us] 배열로 변환합니다 (파싱 실패 값은 NaT)."""
+    try:
+        return np.array(iso_times, dtype="datetime64[us]")
+    except ValueError:
+        parsed = []
+        for value in iso_times:
+            try:
+                parsed.append(np.datetime64(value, "us"))
+            except (ValueError, TypeError):
+                parsed.append(np.datetime64("NaT"))
+        return np.array(parsed, dtype="datetime64[us]")
+
+def decayed_importance(importances: np.ndarray, age_days: np.ndarray) -> np.ndarray:
+    """
+    마지막 접근 후 경과 일수로 중요도 감쇠를 계산합니다 (저장값을 주기적으로 다시 쓰지 않는 지연(lazy) 감쇠).
+    유예 기간(LTM_DECAY_GRACE_DAYS)이 지나면 1단계, 이후 LTM_DECAY_PERIOD_DAYS마다 1단계씩 LTM_DECAY_FACTOR를 곱하며,
+    기존 유지보수와 같이 LTM_DECAY_FLOOR 이하로는 감쇠시키지 않습니다.
+    """
+    steps = np.where(age_days > LTM_DECAY_GRACE_DAYS, np.floor((age_days - LTM_DECAY_GRACE_DAYS) / LTM_DECAY_PERIOD_DAYS) + 1, 0)
+    decayed = np.maximum(importances * np.power(LTM_DECAY_FACTOR, steps), LTM_DECAY_FLOOR)
+    return np.where(importances > LTM_DECAY_FLOOR, decayed, importances)
+
+def effective_importance(importance: float, last_accessed_time: str, now_iso: Optional[str] = None) -> float:
+    """단일 기억의 현재 유효 중요도 (SQLite 사용자 함수로도 등록하여 사용)."""
+    if importance is None:
+        return importance
+    try:
+        now = datetime.datetime.fromisoformat(now_iso) if now_iso else datetime.datetime.now()
+        age_days = (now - datetime.datetime.fromisoformat(last_accessed_time)).total_seconds() / 86400.0
+    except (TypeError, ValueError):
+        return importance
+    return float(decayed_importance(np.array([importance], dtype=np.float64), np.array([age_days]))[0])
+
+class MemoryRanker:
+    """
+    검색 후보를 유사도, 중요도, 최근성(지수 감쇠), 접근 빈도의 가중합으로 재정렬합니다.
+    모든 점수는 [0, 1] 범위로 정규화한 뒤 NumPy로 한 번에 계산합니다.
+    """
+
+    def __init__(self, weight_similarity: float = LTM_RANK_WEIGHT_SIMILARITY, weight_importance: float = LTM_RANK_WEIGHT_IMPORTANCE,
+                 weight_recency: float = LTM_RANK_WEIGHT_RECENCY, weight_frequency: float = LTM_RANK_WEIGHT_FREQUENCY,
+                 recency_half_life_days: float = LTM_RANK_RECENCY_HALF_LIFE_DAYS):
+        self.weights = np.array([weight_similarity, weight_importance, weight_recency, weight_frequency], dtype=np.float64)
+        self.recency_half_life_days = max(recency_half_life_days, 1e-6)
+
+    def score(self, similarities: Sequence[float], importances: Sequence[float], access_counts: Sequence[int],
+              last_accessed_times: Sequence[str], now: Optional[datetime.datetime] = None) -> np.ndarray:
+        now64 = np.datetime64(now or datetime.datetime.now(), "us")
+        similarity = np.clip(np.asarray(similarities, dtype=np.float64), 0.0, 1.0)
+
+        age_days = (now64 - parse_iso_times(last_accessed_times)) / np.timedelta64(1, "D")
+        age_days = np.clip(np.nan_to_num(age_days.astype(np.float64), nan=365.0), 0.0, None) # 시각을 알 수 없으면 오래된 것으로 간주
+        importance = np.clip(np.nan_to_num(np.asarray(importances, dtype=np.float64), nan=0.5), 0.0, 1.0)
+        importance = decayed_importance(importance, age_days) # 저장된 중요도에 지연 감쇠 적용
+        recency = np.exp2(-age_days / self.recency_half_life_days)
+
+        counts = np.log1p(np.clip(np.asarray(access_counts, dtype=np.float64), 0.0, None))
+        frequency = counts / counts.max() if counts.size and counts.max() > 0 else np.zeros_like(counts)
+
+        features = np.stack([similarity, importance, recency, frequency], axis=1)
+        return features @ self.weights
+
+    def rank(self, candidate_ids: Sequence[int], similarities: Sequence[float], importances: Sequence[float],
+             access_counts: Sequence[int], last_accessed_times: Sequence[str], top_k: int,
+             now: Optional[datetime.datetime] = None) -> List[Tuple[int, float]]:
+        """상위 top_k개의 (기억 ID, 종합 점수)를 점수 내림차순으로 반환합니다."""
+        if not len(candidate_ids):
+            return []
+        scores = self.score(similarities, importances, access_counts, last_accessed_times, now)
+        order = np.argsort(-scores, kind="stable")[:top_k]
+        return [(candidate_ids[i], float(scores[i])) for i in order]
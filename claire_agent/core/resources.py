@@ -0,0 +1,41 @@
+# claire_agent/core/resources.py
+import functools
+import threading
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+def cached_resource(func: Callable) -> Callable:
+    """
+    프로세스 전역 리소스(모델, 벡터DB 등)를 인자별로 한 번만 만드는 데코레이터 (st.cache_resource 대체).
+    Streamlit 없이도 동작하므로 API 서버, CLI, 벤치마크에서 같은 로더를 공유할 수 있습니다.
+    - 같은 인자로 동시에 처음 호출되면 하나만 생성하고 나머지는 기다림 (인자별 잠금)
+    - func.clear()로 캐시를 비움 (예: 모델 변경 시)
+    """
+    cache: Dict[Hashable, Any] = {}
+    key_locks: Dict[Hashable, threading.Lock] = {}
+    lock = threading.Lock()
+
+    def _key(args: Tuple, kwargs: Dict[str, Any]) -> Hashable:
+        return args + tuple(sorted(kwargs.items()))
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        key = _key(args, kwargs)
+        with lock:
+            if key in cache:
+                return cache[key]
+            key_lock = key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            with lock:
+                if key in cache: # 기다리는 동안 다른 스레드가 생성함
+                    return cache[key]
+            value = func(*args, **kwargs)
+            with lock:
+                cache[key] = value
+            return value
+
+    def clear():
+        with lock:
+            cache.clear()
+
+    wrapper.clear = clear
+    return wrapper
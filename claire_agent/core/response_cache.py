@@ -0,0 +1,172 @@
+# claire_agent/core/response_cache.py
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Iterable, Iterator, Optional, Sequence
+
+import numpy as np
+from langchain.docstore.document import Document
+
+# 내부 모듈 import
+from .config import (
+    RAG_MANIFEST_PATH,
+    RESPONSE_CACHE_SIMILARITY_THRESHOLD,
+    RESPONSE_CACHE_TTL_SEC,
+    RESPONSE_CACHE_MAX_ENTRIES,
+    RESPONSE_CACHE_REPLAY_CHUNK_CHARS
+)
+
+def rag_fingerprint(documents: Sequence[Document]) -> str:
+    """검색된 RAG 청크 ID 집합의 지문. ID가 없는 문서는 출처, 내용 해시, 본문으로 대신합니다."""
+    keys = []
+    for doc in documents:
+        if doc.id:
+            keys.append(doc.id)
+        else:
+            keys.append(f"{doc.metadata.get('source', '')}:{doc.metadata.get('content_hash', '')}:{doc.page_content}")
+    return hashlib.sha1("\n".join(sorted(keys)).encode("utf-8")).hexdigest()
+
+def context_fingerprint(memory_ids: Iterable[Optional[int]], user_profile: Optional[dict] = None) -> str:
+    """답변에 함께 쓰인 회상 기억 ID와 사용자 프로필의 지문 (같은 질문이라도 다른 기억/프로필로 만든 답변은 재사용하지 않음)."""
+    profile = user_profile or {}
+    keys = [",".join(str(memory_id) for memory_id in sorted(memory_id for memory_id in memory_ids if memory_id is not None))]
+    keys += [f"{name}={profile[name]}" for name in sorted(profile)]
+    return hashlib.sha1("\n".join(keys).encode("utf-8")).hexdigest()
+
+def replay_chunks(response: str, chunk_chars: int = RESPONSE_CACHE_REPLAY_CHUNK_CHARS) -> Iterator[str]:
+    """캐시된 답변을 스트리밍 응답과 같은 방식으로 표시할 수 있도록 조각으로 나눕니다."""
+    chunk_chars = max(1, chunk_chars)
+    for start in range(0, len(response), chunk_chars):
+        yield response[start:start + chunk_chars]
+
+@dataclass
+class CachedResponse:
+    query: str
+    response: str
+    model_name: str
+    rag_fingerprint: str
+    context_fingerprint: str
+    embedding: np.ndarray # 정규화된 질의 임베딩
+    created_at: float
+
+@dataclass
+class CacheHit:
+    response: str
+    similarity: float
+    cached_query: str
+
+class SemanticResponseCache:
+    """
+    질의 임베딩 유사도로 이전 답변을 찾는 프로세스 내 응답 캐시.
+    - 키: (모델명, 검색된 RAG 청크 ID 지문, 회상 기억/사용자 프로필 지문)이 같고 질의 임베딩 코사인 유사도가 threshold 이상인 항목
+    - 대화 기록은 키에 넣지 않으므로, 이전 대화에 기대는 후속 질문("계속해")은 호출 측에서 캐시를 거치지 않아야 함
+    - TTL이 지난 항목은 조회 시 제거하고, max_entries를 넘으면 가장 오래 쓰이지 않은 항목부터 제거 (LRU)
+    - RAG 매니페스트 파일이 다시 저장되면 (색인 동기화로 인덱스 변경) 전체를 비움
+    """
+
+    def __init__(self, similarity_threshold: float = RESPONSE_CACHE_SIMILARITY_THRESHOLD, ttl_sec: float = RESPONSE_CACHE_TTL_SEC,
+                 max_entries: int = RESPONSE_CACHE_MAX_ENTRIES, manifest_path: str = RAG_MANIFEST_PATH):
+        self.similarity_threshold = similarity_threshold
+        self.ttl_sec = ttl_sec
+        self.max_entries = max(1, max_entries)
+        self.manifest_path = manifest_path
+        self._entries: "OrderedDict[int, CachedResponse]" = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self._manifest_mtime = self._read_manifest_mtime()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _read_manifest_mtime(self) -> Optional[float]:
+        try:
+            return os.stat(self.manifest_path).st_mtime
+        except OSError:
+            return None
+
+    def _check_rag_index(self):
+        """매니페스트 파일이 다시 저장되었으면 (RAG 인덱스 변경) 캐시를 비웁니다. 호출 측에서 _lock을 잡고 있어야 합니다."""
+        mtime = self._read_manifest_mtime()
+        if mtime != self._manifest_mtime:
+            self._manifest_mtime = mtime
+            if self._entries:
+                print(f"RAG index changed. Clearing {len(self._entries)} cached responses.")
+                self._entries.clear()
+                self.invalidations += 1
+
+    @staticmethod
+    def _normalize(embedding: Sequence[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def lookup(self, query_embedding: Sequence[float], model_name: str, documents: Sequence[Document],
+               context_key: str = "") -> Optional[CacheHit]:
+        fingerprint = rag_fingerprint(documents)
+        query_vector = self._normalize(query_embedding)
+        now = time.time()
+        with self._lock:
+            self._check_rag_index()
+            expired = [entry_id for entry_id, entry in self._entries.items() if now - entry.created_at > self.ttl_sec]
+            for entry_id in expired:
+                del self._entries[entry_id]
+            candidates = [
+                (entry_id, entry) for entry_id, entry in self._entries.items()
+                if entry.model_name == model_name and entry.rag_fingerprint == fingerprint and entry.context_fingerprint == context_key
+            ]
+            if candidates:
+                similarities = np.stack([entry.embedding for _, entry in candidates]) @ query_vector
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.similarity_threshold:
+                    entry_id, entry = candidates[best]
+                    self._entries.move_to_end(entry_id)
+                    self.hits += 1
+                    return CacheHit(response=entry.response, similarity=float(similarities[best]), cached_query=entry.query)
+            self.misses += 1
+            return None
+
+    def store(self, query: str, query_embedding: Sequence[float], model_name: str, documents: Sequence[Document], response: str,
+              context_key: str = ""):
+        """생성이 정상적으로 끝난 답변만 저장합니다 (오류 안내 문구 등은 호출 측에서 제외)."""
+        if not response.strip():
+            return
+        entry = CachedResponse(
+            query=query, response=response, model_name=model_name, rag_fingerprint=rag_fingerprint(documents),
+            context_fingerprint=context_key, embedding=self._normalize(query_embedding), created_at=time.time()
+        )
+        with self._lock:
+            self._check_rag_index()
+            self._entries[self._next_id] = entry
+            self._next_id += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "invalidations": self.invalidations
+            }
+
+_cache: Optional[SemanticResponseCache] = None
+_cache_lock = threading.Lock()
+
+def get_response_cache() -> SemanticResponseCache:
+    """프로세스 전역 응답 캐시를 반환합니다 (같은 배포의 모든 세션이 공유)."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = SemanticResponseCache()
+        return _cache
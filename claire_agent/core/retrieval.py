@@ -0,0 +1,132 @@
+# claire_agent/core/retrieval.py
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from langchain_community.vectorstores import Chroma
+from langchain.docstore.document import Document
+
+# 내부 모듈 import
+from .config import (
+    RETRIEVAL_LTM_TIMEOUT_SEC,
+    RETRIEVAL_RAG_TIMEOUT_SEC,
+    RETRIEVAL_MAX_WORKERS
+)
+from .data_models import StoredMemoryEntry
+from .telemetry import get_telemetry
+
+# 세션(재실행)마다 스레드를 만들지 않도록 프로세스 전역 스레드 풀을 공유
+_retrieval_executor = ThreadPoolExecutor(max_workers=RETRIEVAL_MAX_WORKERS, thread_name_prefix="retrieval")
+
+NO_LTM_CONTEXT = "회상된 주요 과거 대화 없음."
+NO_RAG_CONTEXT = "현재 질의와 관련된 외부 참조 정보 없음."
+
+@dataclass
+class RetrievalResult:
+    memories: List[StoredMemoryEntry] = field(default_factory=list)
+    rag_documents: List[Document] = field(default_factory=list)
+    ltm_context_str: str = NO_LTM_CONTEXT
+    rag_context_str: str = NO_RAG_CONTEXT
+    query_embedding: Optional[List[float]] = None # 응답 캐시 조회 등에 재사용
+    timings: Dict[str, float] = field(default_factory=dict) # 단계별 소요 시간 (초)
+    errors: Dict[str, str] = field(default_factory=dict) # 소스별 오류/타임아웃 메시지
+
+def format_ltm_context(memories: List[StoredMemoryEntry]) -> str:
+    return "\n".join(
+        [f"- (ID:{mem.id}, 중요도:{mem.user_importance_score:.2f}) {mem.summary}" for mem in memories]
+    ) if memories else NO_LTM_CONTEXT
+
+def format_rag_context(documents: List[Document]) -> str:
+    return "\n\n".join(
+        [f"문서 출처: {doc.metadata.get('source', '알 수 없음')}\n내용: {doc.page_content[:250]}..." for doc in documents]
+    ) if documents else NO_RAG_CONTEXT
+
+class RetrievalOrchestrator:
+    """
+    질의 임베딩을 한 번만 계산한 뒤, 장기 기억(LTM) 검색과 RAG 검색을 병렬로 실행합니다.
+    소스별 타임아웃을 넘기면 해당 컨텍스트 없이 진행하므로, 생성 전 단계는 느린 쪽 검색 시간 이내로 끝납니다.
+    """
+
+    def __init__(self, memory_system, rag_vector_store: Optional[Chroma], embedding_model,
+                 ltm_top_k: int = 1, rag_top_k: int = 2,
+                 ltm_timeout_sec: float = RETRIEVAL_LTM_TIMEOUT_SEC, rag_timeout_sec: float = RETRIEVAL_RAG_TIMEOUT_SEC):
+        self.memory_system = memory_system
+        self.rag_vector_store = rag_vector_store
+        self.embedding_model = embedding_model
+        self.ltm_top_k = ltm_top_k
+        self.rag_top_k = rag_top_k
+        self.ltm_timeout_sec = ltm_timeout_sec
+        self.rag_timeout_sec = rag_timeout_sec
+
+    def _search_ltm(self, query_text: str, query_embedding: List[float]) -> List[StoredMemoryEntry]:
+        return self.memory_system.retrieve_relevant_memories(query_text, top_k=self.ltm_top_k, query_embedding=query_embedding)
+
+    def _search_rag(self, query_embedding: List[float]) -> List[Document]:
+        # 응답 캐시 키는 Document.id(청크 ID)를 쓰고, id를 채우지 않는 langchain 버전에서는 출처/내용 해시/본문으로 대신함
+        with get_telemetry().span("chroma.query", new_trace=False, collection="rag"):
+            return self.rag_vector_store.similarity_search_by_vector(query_embedding, k=self.rag_top_k)
+
+    def _timed(self, timings: Dict[str, float], name: str, span_name: str, func, *args):
+        started = time.perf_counter()
+        try:
+            with get_telemetry().span(span_name):
+                return func(*args)
+        finally:
+            timings[name] = time.perf_counter() - started
+
+    def retrieve(self, query_text: str) -> RetrievalResult:
+        result = RetrievalResult()
+        if not query_text.strip():
+            return result
+
+        started = time.perf_counter()
+        try:
+            with get_telemetry().span("embedding"):
+                query_embedding = self.embedding_model.embed_query(query_text) # LTM과 RAG가 같은 임베딩을 공유
+        except Exception as e:
+            print(f"Query embedding error: {e}")
+            result.errors["embedding"] = str(e)
+            result.rag_context_str = "RAG 정보 검색에 실패했습니다."
+            return result
+        result.query_embedding = query_embedding
+        result.timings["embedding"] = time.perf_counter() - started
+
+        # 스레드 풀 작업이 현재 트레이스의 하위 span으로 기록되도록 컨텍스트를 복사해서 실행
+        ltm_future = _retrieval_executor.submit(contextvars.copy_context().run, self._timed, result.timings, "ltm", "ltm_recall",
+                                                self._search_ltm, query_text, query_embedding)
+        rag_future = None
+        if self.rag_vector_store:
+            rag_future = _retrieval_executor.submit(contextvars.copy_context().run, self._timed, result.timings, "rag", "rag_search",
+                                                    self._search_rag, query_embedding)
+        else:
+            result.rag_context_str = "RAG 기능이 활성화되지 않았습니다 (벡터 스토어 로드 실패)."
+
+        # 두 검색은 동시에 진행 중이므로, 각 타임아웃은 검색 시작 시점 기준으로 계산
+        search_started = time.perf_counter()
+        try:
+            result.memories = ltm_future.result(timeout=self.ltm_timeout_sec)
+            result.ltm_context_str = format_ltm_context(result.memories)
+        except FutureTimeoutError:
+            print(f"LTM recall timed out after {self.ltm_timeout_sec}s.")
+            result.errors["ltm"] = "timeout"
+        except Exception as e:
+            print(f"LTM recall error: {e}")
+            result.errors["ltm"] = str(e)
+
+        if rag_future is not None:
+            remaining = max(0.0, self.rag_timeout_sec - (time.perf_counter() - search_started))
+            try:
+                result.rag_documents = rag_future.result(timeout=remaining)
+                result.rag_context_str = format_rag_context(result.rag_documents)
+            except FutureTimeoutError:
+                print(f"RAG search timed out after {self.rag_timeout_sec}s.")
+                result.errors["rag"] = "timeout"
+                result.rag_context_str = "RAG 정보 검색 시간이 초과되었습니다."
+            except Exception as e:
+                print(f"RAG search error: {e}")
+                result.errors["rag"] = str(e)
+                result.rag_context_str = "RAG 정보 검색에 실패했습니다."
+        result.timings["total"] = time.perf_counter() - started
+        return result
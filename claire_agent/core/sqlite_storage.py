@@ -0,0 +1,166 @@
+# claire_agent/core/sqlite_storage.py
+import sqlite3
+import threading
+import queue
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# config 모듈에서 설정값 가져오기
+from .config import (
+    SQLITE_DB_NAME,
+    SQLITE_POOL_SIZE,
+    SQLITE_BUSY_TIMEOUT_SEC,
+    SQLITE_STATEMENT_CACHE_SIZE
+)
+from .telemetry import get_telemetry, traced
+
+# SQLite 기본 바인딩 변수 한도(구버전 999)를 넘지 않도록 IN (...) 절을 나눌 때 사용
+SQLITE_MAX_IN_CLAUSE_VARS = 500
+
+class SQLiteConnectionPool:
+    """
+    스레드 안전한 SQLite 커넥션 풀.
+    - WAL 저널링으로 쓰기 중에도 읽기가 막히지 않도록 합니다.
+    - 커넥션마다 cached_statements를 크게 잡아 준비된(prepared) 문장을 재사용합니다.
+    - transaction()으로 여러 문장을 하나의 명시적 트랜잭션으로 묶을 수 있습니다.
+    """
+
+    def __init__(self, db_path: str = SQLITE_DB_NAME, pool_size: int = SQLITE_POOL_SIZE,
+                 busy_timeout_sec: float = SQLITE_BUSY_TIMEOUT_SEC,
+                 statement_cache_size: int = SQLITE_STATEMENT_CACHE_SIZE):
+        self.db_path = db_path
+        self.pool_size = max(1, pool_size)
+        self.busy_timeout_sec = busy_timeout_sec
+        self.statement_cache_size = statement_cache_size
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue(maxsize=self.pool_size)
+        self._created = 0
+        self._lock = threading.Lock()
+        self._functions: Dict[str, Tuple[int, Callable]] = {}
+        self._all_connections: List[sqlite3.Connection] = []
+        self._closed = False
+
+    def _new_connection(self) -> sqlite3.Connection:
+        # isolation_level=None: 자동 커밋 모드. 트랜잭션은 transaction()에서 BEGIN/COMMIT으로 명시적으로 관리
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.busy_timeout_sec,
+            isolation_level=None,
+            check_same_thread=False, # 풀에서 여러 스레드가 번갈아 사용 (동시 사용은 하지 않음)
+            cached_statements=self.statement_cache_size
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL") # WAL 모드에서는 NORMAL로도 충돌 시 일관성 보장
+        conn.execute("PRAGMA foreign_keys=ON")
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_sec * 1000)}")
+        for name, (num_params, func) in self._functions.items():
+            conn.create_function(name, num_params, func, deterministic=True)
+        return conn
+
+    def register_function(self, name: str, num_params: int, func: Callable):
+        """풀의 모든 커넥션(기존 및 이후 생성분)에 SQL 사용자 함수를 등록합니다."""
+        with self._lock:
+            self._functions[name] = (num_params, func)
+            for conn in self._all_connections:
+                conn.create_function(name, num_params, func, deterministic=True)
+
+    def _acquire(self) -> sqlite3.Connection:
+        if self._closed:
+            raise sqlite3.ProgrammingError("SQLite connection pool is closed.")
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.pool_size:
+                conn = self._new_connection()
+                self._created += 1
+                self._all_connections.append(conn)
+                return conn
+        # 풀이 가득 찼으면 다른 스레드가 반납할 때까지 대기 (호출부가 sqlite3.Error만 처리하므로 같은 계열 예외로 변환)
+        try:
+            return self._idle.get(timeout=self.busy_timeout_sec)
+        except queue.Empty:
+            raise sqlite3.OperationalError("database pool exhausted") from None
+
+    def _release(self, conn: sqlite3.Connection):
+        if conn.in_transaction: # 예외 등으로 트랜잭션이 남아있다면 정리 후 반납
+            conn.rollback()
+        self._idle.put_nowait(conn)
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """풀에서 커넥션을 빌려 자동 커밋 모드로 사용합니다."""
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            self._release(conn)
+
+    @contextmanager
+    def transaction(self, immediate: bool = True) -> Iterator[sqlite3.Connection]:
+        """
+        여러 문장을 하나의 트랜잭션으로 실행합니다. 블록이 정상 종료되면 COMMIT, 예외 시 ROLLBACK.
+        immediate=True이면 BEGIN IMMEDIATE로 쓰기 잠금을 먼저 잡아 도중의 SQLITE_BUSY를 피합니다.
+        """
+        with get_telemetry().span("sqlite.transaction", new_trace=False), self.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except BaseException:
+                if conn.in_transaction: # 일부 오류(I/O, 제약 조건)는 SQLite가 이미 롤백함 (원래 예외를 가리지 않도록)
+                    conn.execute("ROLLBACK")
+                raise
+
+    @traced("sqlite.execute", new_trace=False)
+    def execute(self, query: str, params: Sequence = (), fetch_one: bool = False, commit: bool = False):
+        """
+        단일 문장 실행 헬퍼.
+        commit=True (INSERT/UPDATE/DELETE) 시에는 (결과, 마지막 행 ID)를, 그 외(SELECT)에는 결과만 반환합니다.
+        """
+        if commit:
+            with self.transaction() as conn:
+                cursor = conn.execute(query, params)
+                return None, cursor.lastrowid
+        with self.connection() as conn:
+            cursor = conn.execute(query, params)
+            return cursor.fetchone() if fetch_one else cursor.fetchall()
+
+    @traced("sqlite.executemany", new_trace=False)
+    def executemany(self, query: str, seq_of_params: Sequence[Sequence]) -> int:
+        """여러 파라미터 묶음을 하나의 트랜잭션에서 실행하고 영향받은 행 수를 반환합니다."""
+        with self.transaction() as conn:
+            cursor = conn.executemany(query, seq_of_params)
+            return cursor.rowcount
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            for conn in self._all_connections:
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+            self._all_connections.clear()
+            self._created = 0
+
+def chunked(items: Sequence, size: int = SQLITE_MAX_IN_CLAUSE_VARS) -> Iterator[Sequence]:
+    """IN (...) 절 바인딩 변수 한도를 넘지 않도록 시퀀스를 나눕니다."""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def placeholders(count: int) -> str:
+    return ",".join(["?"] * count)
+
+_pools: Dict[str, SQLiteConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+def get_sqlite_pool(db_path: Optional[str] = None) -> SQLiteConnectionPool:
+    """DB 파일별로 프로세스 전역 커넥션 풀을 하나씩 공유합니다."""
+    db_path = db_path or SQLITE_DB_NAME
+    with _pools_lock:
+        pool = _pools.get(db_path)
+        if pool is None:
+            pool = SQLiteConnectionPool(db_path)
+            _pools[db_path] = pool
+        return pool
@@ -0,0 +1,212 @@
+# claire_agent/core/startup.py
+import argparse
+import importlib
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+# 내부 모듈 import (langchain, chromadb, sentence-transformers를 끌어오는 모듈은 각 단계 안에서 import)
+from .config import DEFAULT_OLLAMA_MODEL_NAME, OLLAMA_WARMUP_ENABLED
+from .telemetry import get_telemetry
+
+_MODULE_LOADED_AT = time.perf_counter() # 첫 화면 표시 시간의 기준 (앱이 이 모듈을 처음 import한 시점)
+
+@dataclass
+class StartupStep:
+    name: str
+    label: str
+    status: str = "pending" # pending, running, done, skipped, failed
+    duration_sec: float = 0.0
+    error: Optional[str] = None
+
+@dataclass
+class StartupReport:
+    model_name: str
+    steps: List[StartupStep] = field(default_factory=list)
+    elapsed_sec: float = 0.0 # 웜업 시작부터 (끝났으면 완료까지, 진행 중이면 현재까지)
+    ui_ready_sec: Optional[float] = None # 첫 화면 표시까지 (무거운 서비스 로드와 무관)
+    ready: bool = False
+    error: Optional[str] = None
+
+    @property
+    def current_step(self) -> Optional[StartupStep]:
+        return next((step for step in self.steps if step.status == "running"), None)
+
+    @property
+    def progress(self) -> float:
+        finished = sum(1 for step in self.steps if step.status in ("done", "skipped"))
+        return finished / len(self.steps) if self.steps else 1.0
+
+    def summary(self) -> str:
+        timings = ", ".join(f"{step.label} {step.duration_sec:.1f}초" for step in self.steps if step.status == "done")
+        ui_ready = f", 첫 화면 {self.ui_ready_sec:.1f}초" if self.ui_ready_sec is not None else ""
+        if self.error:
+            return f"시작 실패 ({self.elapsed_sec:.1f}초 경과{ui_ready}): {self.error}"
+        if self.ready:
+            return f"준비 완료 {self.elapsed_sec:.1f}초{ui_ready} ({timings})"
+        current = self.current_step
+        return f"준비 중 {self.elapsed_sec:.1f}초 경과{ui_ready} (현재: {current.label if current else '대기'})"
+
+class StartupWarmup:
+    """
+    모델/벡터DB 등 무거운 서비스를 백그라운드 스레드에서 순서대로 로드하여, UI는 먼저 표시하고 준비되는 대로 채팅을 활성화합니다.
+    - 각 단계는 프로세스 전역 캐시(cached_resource) 로더를 호출하므로, 끝난 뒤의 get_chat_pipeline() 등은 바로 반환
+    - 단계별 소요 시간은 report()와 "startup" 트레이스(텔레메트리)로 확인
+    - RAG 색인 동기화는 get_rag_vector_store()가 별도 스레드에서 진행하므로 준비 완료를 늦추지 않음
+    """
+
+    def __init__(self, model_name: str = DEFAULT_OLLAMA_MODEL_NAME):
+        self.model_name = model_name
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._started_at: Optional[float] = None
+        self._finished_at: Optional[float] = None
+        self._ui_ready_sec: Optional[float] = None
+        self.error: Optional[str] = None
+        self.steps = [StartupStep(name=name, label=label) for name, label, _ in self._plan()]
+
+    def _plan(self) -> List[Tuple[str, str, Callable[[], Optional[bool]]]]:
+        return [
+            ("imports", "모듈 import", self._import_modules),
+            ("ollama_warmup", "Ollama 웜업 요청", self._warm_up_ollama),
+            ("sqlite", "SQLite 초기화", self._init_sqlite),
+            ("embedding_model", "임베딩 모델", self._load_embedding_model),
+            ("memory_store", "기억 벡터DB", self._load_memory_store),
+            ("rag_store", "RAG 벡터DB", self._load_rag_store),
+            ("chat_pipeline", "채팅 파이프라인", self._build_pipeline)
+        ]
+
+    def _import_modules(self):
+        for module in ("llm_services", "db_services", "chat_pipeline", "memory_system", "consolidation_worker"):
+            importlib.import_module(f".{module}", __package__)
+
+    def _warm_up_ollama(self) -> Optional[bool]:
+        if not OLLAMA_WARMUP_ENABLED:
+            return False
+        from .ollama_client import get_endpoint_pool
+        get_endpoint_pool().warm_up(self.model_name) # 모델 로드는 Ollama가 하므로 요청만 보내고 나머지 단계와 병행
+
+    def _init_sqlite(self):
+        from .db_services import init_sqlite_db
+        init_sqlite_db()
+
+    def _load_embedding_model(self):
+        from .llm_services import get_embedding_model
+        model = get_embedding_model()
+        while hasattr(model, "base_embeddings"): # 캐시/배처를 거치지 않고 실제 모델로 한 번 추론해 지연 초기화를 끝냄
+            model = model.base_embeddings
+        model.embed_query("warm-up")
+
+    def _load_memory_store(self):
+        from .db_services import get_memory_vector_store
+        get_memory_vector_store().count()
+
+    def _load_rag_store(self):
+        from .db_services import get_rag_vector_store
+        get_rag_vector_store()
+
+    def _build_pipeline(self):
+        from .chat_pipeline import get_chat_pipeline
+        get_chat_pipeline(self.model_name)
+
+    def start(self) -> "StartupWarmup":
+        """백그라운드 웜업을 시작합니다. 진행 중이거나 끝났으면 아무것도 하지 않고, 실패했으면 처음부터 다시 시도합니다."""
+        with self._lock:
+            if self._thread is not None and (self._thread.is_alive() or self.error is None):
+                return self
+            self.error = None
+            self._finished_at = None
+            self._done.clear()
+            self.steps = [StartupStep(name=name, label=label) for name, label, _ in self._plan()]
+            self._started_at = time.perf_counter()
+            self._thread = threading.Thread(target=self._run, name="startup-warmup", daemon=True)
+            self._thread.start()
+        return self
+
+    def run(self) -> StartupReport:
+        """웜업을 시작하고 끝날 때까지 기다린 뒤 보고서를 반환합니다 (API 서버, CLI)."""
+        self.start()
+        self.wait()
+        return self.report()
+
+    def _run(self):
+        telemetry = get_telemetry()
+        try:
+            with telemetry.span("startup", model=self.model_name):
+                for step, (_, _, func) in zip(self.steps, self._plan()):
+                    with self._lock:
+                        step.status = "running"
+                    started = time.perf_counter()
+                    try:
+                        with telemetry.span(step.name):
+                            performed = func()
+                    except Exception as e:
+                        with self._lock:
+                            step.status = "failed"
+                            step.duration_sec = time.perf_counter() - started
+                            step.error = f"{type(e).__name__}: {e}"
+                            self.error = f"{step.label}: {step.error}"
+                        print(f"Startup step '{step.name}' failed: {e}")
+                        return
+                    with self._lock:
+                        step.status = "skipped" if performed is False else "done"
+                        step.duration_sec = time.perf_counter() - started
+        finally:
+            with self._lock:
+                self._finished_at = time.perf_counter()
+            self._done.set()
+            print(f"Startup warm-up for {self.model_name}: {self.report().summary()}")
+
+    @property
+    def ready(self) -> bool:
+        return self._done.is_set() and self.error is None
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """웜업이 끝날 때까지 기다립니다 (timeout 초). 성공적으로 준비되었으면 True."""
+        self._done.wait(timeout)
+        return self.ready
+
+    def mark_ui_ready(self):
+        """첫 화면을 다 그린 시점을 기록합니다 (처음 한 번만)."""
+        with self._lock:
+            if self._ui_ready_sec is None:
+                self._ui_ready_sec = time.perf_counter() - _MODULE_LOADED_AT
+
+    def report(self) -> StartupReport:
+        with self._lock:
+            now = self._finished_at or time.perf_counter()
+            return StartupReport(
+                model_name=self.model_name,
+                steps=[StartupStep(step.name, step.label, step.status, step.duration_sec, step.error) for step in self.steps],
+                elapsed_sec=now - self._started_at if self._started_at is not None else 0.0,
+                ui_ready_sec=self._ui_ready_sec,
+                ready=self._done.is_set() and self.error is None,
+                error=self.error
+            )
+
+_warmups: Dict[str, StartupWarmup] = {}
+_warmups_lock = threading.Lock()
+
+def get_startup_warmup(model_name: str = DEFAULT_OLLAMA_MODEL_NAME) -> StartupWarmup:
+    """모델별 프로세스 전역 웜업 (처음 요청될 때 백그라운드에서 시작, 여러 브라우저 세션이 공유)."""
+    with _warmups_lock:
+        warmup = _warmups.get(model_name)
+        if warmup is None:
+            warmup = _warmups[model_name] = StartupWarmup(model_name)
+    return warmup.start()
+
+def main():
+    """콜드 스타트 단계별 소요 시간 측정: python -m core.startup"""
+    parser = argparse.ArgumentParser(description="Load the chat services once and report the cold-start timing of each step.")
+    parser.add_argument("--model", default=DEFAULT_OLLAMA_MODEL_NAME, help="Chat model to build the pipeline for.")
+    args = parser.parse_args()
+
+    report = StartupWarmup(args.model).run()
+    for step in report.steps:
+        print(f"  {step.name:<16} {step.status:<8} {step.duration_sec:7.2f}s" + (f"  {step.error}" if step.error else ""))
+    print(report.summary())
+
+if __name__ == "__main__":
+    main()
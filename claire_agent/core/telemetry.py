@@ -0,0 +1,318 @@
+# claire_agent/core/telemetry.py
+import atexit
+import bisect
+import contextvars
+import datetime
+import functools
+import itertools
+import json
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+# 내부 모듈 import
+from .config import (
+    TELEMETRY_ENABLED,
+    TELEMETRY_TRACE_LOG_PATH,
+    TELEMETRY_RECENT_TRACES,
+    TELEMETRY_MAX_SPANS_PER_TRACE,
+    TELEMETRY_METRICS_PORT
+)
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+RATE_BUCKETS = (1, 2, 5, 10, 20, 30, 50, 75, 100, 150, 200, 500)
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+# 메트릭 이름 -> (설명, 버킷). 여기에 없는 히스토그램은 지연 시간 버킷을 사용
+HISTOGRAMS = {
+    "claire_stage_duration_seconds": ("Duration of each traced stage (span) in seconds.", LATENCY_BUCKETS),
+    "claire_ttft_seconds": ("Time from sending the prompt to the first generated token.", LATENCY_BUCKETS),
+    "claire_generation_tokens_per_second": ("Generation speed reported by Ollama (or estimated from chunks).", RATE_BUCKETS),
+    "claire_embedding_batch_size": ("Texts per embedding forward pass after micro-batching.", BATCH_BUCKETS)
+}
+COUNTERS = {
+    "claire_chat_turns_total": "Chat turns by outcome.",
+    "claire_generated_tokens_total": "Tokens generated by the chat model.",
+    "claire_stage_errors_total": "Traced stages that ended with an exception."
+}
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar("claire_current_span", default=None)
+_span_ids = itertools.count(1) # 프로세스 안에서만 고유하면 되므로 uuid 대신 카운터 사용
+
+def _labels_key(labels: Dict[str, Any]) -> Tuple[Tuple[str, str], ...]:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+def _format_labels(key: Tuple[Tuple[str, str], ...], extra: str = "") -> str:
+    parts = [f'{name}="{value}"' for name, value in key]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str] = None
+    started_at: float = field(default_factory=time.time) # epoch 초
+    duration_sec: float = 0.0
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+    recorded: bool = True # False이면 트레이스에 남기지 않고 메트릭만 기록 (트레이스당 span 수 제한)
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def to_dict(self, trace_started_at: float) -> dict:
+        return {
+            "name": self.name, "span_id": self.span_id, "parent_id": self.parent_id,
+            "offset_ms": round((self.started_at - trace_started_at) * 1000, 2),
+            "duration_ms": round(self.duration_sec * 1000, 2),
+            "attributes": self.attributes, "error": self.error
+        }
+
+class _Histogram:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.series: Dict[Tuple, List[float]] = {} # 라벨 -> [버킷별 개수..., 합계, 개수]
+
+    def observe(self, key: Tuple, value: float):
+        values = self.series.setdefault(key, [0.0] * (len(self.buckets) + 2))
+        index = bisect.bisect_left(self.buckets, value) # value 이하인 가장 작은 상한의 버킷 (모든 상한보다 크면 +Inf에만 반영)
+        if index < len(self.buckets):
+            values[index] += 1
+        values[-2] += value
+        values[-1] += 1
+
+class Telemetry:
+    """
+    대화 턴의 단계별 span 트레이스와 Prometheus 형식 메트릭을 프로세스 안에서 수집합니다.
+    - span(): 현재 실행 흐름(contextvars)의 하위 span을 만들고, 끝나면 claire_stage_duration_seconds{stage=...}에 기록
+    - 부모가 없는 span은 트레이스의 루트가 되며, 끝나면 최근 트레이스 목록과 JSON Lines 로그(설정 시)에 남김
+    - 스레드 풀로 넘기는 작업은 contextvars.copy_context().run으로 감싸야 같은 트레이스에 이어짐
+    """
+
+    def __init__(self, enabled: bool = TELEMETRY_ENABLED, trace_log_path: str = TELEMETRY_TRACE_LOG_PATH,
+                 recent_traces: int = TELEMETRY_RECENT_TRACES, max_spans_per_trace: int = TELEMETRY_MAX_SPANS_PER_TRACE):
+        self.enabled = enabled
+        self.trace_log_path = trace_log_path
+        self.max_spans_per_trace = max(1, max_spans_per_trace)
+        self._lock = threading.Lock()
+        self._traces: Dict[str, List[Span]] = {} # 진행 중인 트레이스 ID -> span 목록
+        self._recent: deque = deque(maxlen=max(1, recent_traces))
+        self._histograms: Dict[str, _Histogram] = {}
+        self._counters: Dict[str, Dict[Tuple, float]] = {}
+        self._log_file = None
+        self._metrics_server: Optional[ThreadingHTTPServer] = None
+
+    # --- 트레이스 ---
+    @contextmanager
+    def span(self, name: str, new_trace: bool = True, **attributes) -> Iterator[Span]:
+        """
+        name 단계의 span을 엽니다. 진행 중인 트레이스가 없으면 새 트레이스의 루트가 되는데,
+        new_trace=False이면 (SQLite/Chroma 호출처럼 자주 불리는 저수준 단계) 트레이스를 만들지 않고 메트릭만 기록합니다.
+        """
+        parent: Optional[Span] = _current_span.get()
+        if parent is None:
+            span = Span(name=name, trace_id=uuid.uuid4().hex[:16] if new_trace else "", span_id=f"{next(_span_ids):x}", attributes=attributes, recorded=new_trace)
+            if self.enabled and new_trace:
+                with self._lock:
+                    self._traces[span.trace_id] = [span]
+        else:
+            span = Span(name=name, trace_id=parent.trace_id, span_id=f"{next(_span_ids):x}", parent_id=parent.span_id, attributes=attributes)
+            if self.enabled:
+                with self._lock:
+                    spans = self._traces.get(span.trace_id)
+                    if spans is not None and len(spans) < self.max_spans_per_trace:
+                        spans.append(span)
+                    else:
+                        span.recorded = False
+        token = _current_span.set(span)
+        started = time.perf_counter()
+        try:
+            yield span
+        except GeneratorExit: # 스트리밍 제너레이터를 클라이언트가 중간에 닫은 경우 (오류가 아님)
+            span.set(cancelled=True)
+            raise
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}" if str(e) else type(e).__name__
+            raise
+        finally:
+            span.duration_sec = time.perf_counter() - started
+            try:
+                _current_span.reset(token)
+            except ValueError: # 제너레이터가 다른 컨텍스트에서 닫힌 경우
+                _current_span.set(parent)
+            if self.enabled:
+                self.observe("claire_stage_duration_seconds", span.duration_sec, stage=name)
+                if span.error:
+                    self.increment("claire_stage_errors_total", stage=name)
+                if parent is None and span.recorded:
+                    self._finish_trace(span)
+
+    def current_span(self) -> Optional[Span]:
+        return _current_span.get()
+
+    def _finish_trace(self, root: Span):
+        with self._lock:
+            spans = self._traces.pop(root.trace_id, [root])
+        trace = {
+            "trace_id": root.trace_id,
+            "name": root.name,
+            "started_at": datetime.datetime.fromtimestamp(root.started_at).isoformat(timespec="milliseconds"),
+            "duration_ms": round(root.duration_sec * 1000, 2),
+            "attributes": root.attributes,
+            "error": root.error,
+            "spans": [span.to_dict(root.started_at) for span in spans[1:]]
+        }
+        with self._lock:
+            self._recent.append(trace)
+            if self.trace_log_path:
+                try:
+                    if self._log_file is None:
+                        self._log_file = open(self.trace_log_path, "a", encoding="utf-8")
+                    self._log_file.write(json.dumps(trace, ensure_ascii=False, default=str) + "\n")
+                    self._log_file.flush()
+                except OSError as e:
+                    print(f"Could not write trace log {self.trace_log_path}: {e}")
+                    self.trace_log_path = ""
+
+    def recent_traces(self, limit: int = 20, name: Optional[str] = None, session_id: Optional[str] = None) -> List[dict]:
+        """최근 완료된 트레이스 (최신순). name, session_id 속성으로 거를 수 있습니다."""
+        with self._lock:
+            traces = list(self._recent)
+        traces = [
+            trace for trace in reversed(traces)
+            if (name is None or trace["name"] == name) and (session_id is None or trace["attributes"].get("session_id") == session_id)
+        ]
+        return traces[:limit]
+
+    # --- 메트릭 ---
+    def observe(self, metric: str, value: float, **labels):
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self._histograms.get(metric)
+            if histogram is None:
+                histogram = self._histograms[metric] = _Histogram(HISTOGRAMS.get(metric, ("", LATENCY_BUCKETS))[1])
+            histogram.observe(_labels_key(labels), value)
+
+    def increment(self, metric: str, amount: float = 1, **labels):
+        if not self.enabled:
+            return
+        with self._lock:
+            series = self._counters.setdefault(metric, {})
+            key = _labels_key(labels)
+            series[key] = series.get(key, 0) + amount
+
+    def render_prometheus(self) -> str:
+        """Prometheus 텍스트 노출 형식 (text/plain; version=0.0.4)."""
+        lines = []
+        with self._lock:
+            for metric, series in sorted(self._counters.items()):
+                lines.append(f"# HELP {metric} {COUNTERS.get(metric, metric)}")
+                lines.append(f"# TYPE {metric} counter")
+                for key, value in sorted(series.items()):
+                    lines.append(f"{metric}{_format_labels(key)} {value:g}")
+            for metric, histogram in sorted(self._histograms.items()):
+                lines.append(f"# HELP {metric} {HISTOGRAMS.get(metric, (metric,))[0]}")
+                lines.append(f"# TYPE {metric} histogram")
+                for key, values in sorted(histogram.series.items()):
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets, values):
+                        cumulative += count
+                        bucket_labels = _format_labels(key, 'le="%g"' % bound)
+                        lines.append(f"{metric}_bucket{bucket_labels} {cumulative:g}")
+                    inf_labels = _format_labels(key, 'le="+Inf"')
+                    lines.append(f"{metric}_bucket{inf_labels} {values[-1]:g}")
+                    lines.append(f"{metric}_sum{_format_labels(key)} {values[-2]:.6f}")
+                    lines.append(f"{metric}_count{_format_labels(key)} {values[-1]:g}")
+        return "\n".join(lines) + "\n"
+
+    def start_metrics_server(self, port: int, host: str = "0.0.0.0"):
+        """GET /metrics (Prometheus), GET /traces (최근 트레이스 JSON)를 제공하는 HTTP 서버를 백그라운드에서 시작합니다."""
+        if self._metrics_server is not None:
+            return
+        telemetry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                if self.path == "/metrics":
+                    body, content_type = telemetry.render_prometheus().encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8"
+                elif self.path.startswith("/traces"):
+                    body, content_type = json.dumps(telemetry.recent_traces(limit=100), ensure_ascii=False, default=str).encode("utf-8"), "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        try:
+            self._metrics_server = ThreadingHTTPServer((host, port), Handler)
+        except OSError as e: # 여러 Streamlit 프로세스가 같은 포트를 쓰려는 경우 등
+            print(f"Could not start metrics server on port {port}: {e}")
+            return
+        self._metrics_server.daemon_threads = True
+        threading.Thread(target=self._metrics_server.serve_forever, name="telemetry-metrics", daemon=True).start()
+        print(f"Serving Prometheus metrics on http://{host}:{port}/metrics")
+
+    def close(self):
+        if self._metrics_server is not None:
+            self._metrics_server.shutdown()
+        with self._lock:
+            if self._log_file is not None:
+                self._log_file.close()
+                self._log_file = None
+
+def iterate_in_context(iterator: Iterator) -> Iterator:
+    """
+    제너레이터를 호출 측과 분리된 컨텍스트 복사본에서 진행시킵니다.
+    제너레이터 안에서 연 span이 yield 사이에 호출 측(예: Streamlit 스크립트 스레드)의 현재 span으로 남지 않게 합니다.
+    """
+    context = contextvars.copy_context()
+    try:
+        while True:
+            try:
+                item = context.run(next, iterator)
+            except StopIteration:
+                return
+            yield item
+    finally:
+        close = getattr(iterator, "close", None)
+        if close is not None:
+            context.run(close)
+
+def traced(name: str, new_trace: bool = True) -> Callable:
+    """함수 호출 전체를 name span으로 감싸는 데코레이터 (Telemetry.span 참고)."""
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with get_telemetry().span(name, new_trace=new_trace):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+_telemetry: Optional[Telemetry] = None
+_telemetry_lock = threading.Lock()
+
+def get_telemetry() -> Telemetry:
+    """프로세스 전역 텔레메트리 (TELEMETRY_METRICS_PORT가 설정되어 있으면 메트릭 서버도 한 번 시작)."""
+    global _telemetry
+    with _telemetry_lock:
+        if _telemetry is None:
+            _telemetry = Telemetry()
+            if _telemetry.enabled and TELEMETRY_METRICS_PORT:
+                _telemetry.start_metrics_server(TELEMETRY_METRICS_PORT)
+            atexit.register(_telemetry.close)
+        return _telemetry
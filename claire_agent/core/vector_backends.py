@@ -0,0 +1,394 @@
+# claire_agent/core/vector_backends.py
+import glob
+import json
+import os
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+# 내부 모듈 import
+from .config import MEMORY_VECTOR_DTYPE, LTM_VECTOR_SYNC_PAGE_SIZE
+from .sqlite_storage import SQLiteConnectionPool, get_sqlite_pool, placeholders
+
+# 검색 필터에 쓸 수 있는 메타데이터 -> long_term_memories 컬럼
+FILTER_COLUMNS = {"sqlite_id": "id", "session_id": "session_id", "tier": "tier", "parent_id": "parent_id"}
+
+class MemoryVectorBackend(ABC):
+    """
+    장기 기억 벡터 저장소 인터페이스. MemorySystem, vector_sync, memory_dedup은 이 메서드만 사용합니다 (빠진 메서드가 있으면 생성 시 TypeError).
+    거리(distance)는 정규화된 임베딩 사이의 제곱 L2 거리 (= 2 - 2 * 코사인 유사도)로 통일합니다.
+    search의 where는 Chroma 메타데이터 조건 형식 ({"parent_id": 0}, {"parent_id": {"$in": [...]}}, {"session_id": ...}) 입니다.
+    """
+
+    embeddings: Optional[Embeddings] = None
+
+    @abstractmethod
+    def search(self, query_embedding: List[float], k: int, where: Optional[dict] = None) -> List[Tuple[int, float]]:
+        """가까운 순서의 (SQLite ID, 거리) 리스트."""
+        ...
+
+    @abstractmethod
+    def upsert(self, documents: List[Document], ids: List[str]):
+        """memory_row_to_document()로 만든 문서를 벡터 ID로 추가하거나 덮어씁니다."""
+        ...
+
+    @abstractmethod
+    def delete_by_sqlite_ids(self, sqlite_ids: List[int]):
+        ...
+
+    @abstractmethod
+    def delete(self, ids: List[str]):
+        ...
+
+    @abstractmethod
+    def list_ids(self, page_size: int = LTM_VECTOR_SYNC_PAGE_SIZE) -> Set[str]:
+        """저장된 모든 벡터 ID (일관성 점검용). page_size는 페이지 단위로 읽는 백엔드의 한 번 조회 크기입니다."""
+        ...
+
+    @abstractmethod
+    def load_embeddings(self, page_size: int = LTM_VECTOR_SYNC_PAGE_SIZE) -> Dict[int, List[float]]:
+        """SQLite ID별 임베딩 (유사 기억 일괄 병합용)."""
+        ...
+
+    @abstractmethod
+    def count(self) -> int:
+        ...
+
+class ChromaMemoryBackend(MemoryVectorBackend):
+    """기존 langchain Chroma 기억 컬렉션을 감싼 백엔드."""
+
+    def __init__(self, store):
+        self.store = store
+        self.embeddings = getattr(store, "embeddings", None)
+
+    def search(self, query_embedding: List[float], k: int, where: Optional[dict] = None) -> List[Tuple[int, float]]:
+        docs = self.store.similarity_search_by_vector_with_relevance_scores(query_embedding, k=k, filter=where)
+        return [(doc.metadata.get("sqlite_id"), score) for doc, score in docs if doc.metadata.get("sqlite_id")]
+
+    def upsert(self, documents: List[Document], ids: List[str]):
+        # ChromaDB는 ID를 지정하여 add_documents를 호출하면 기존 문서를 덮어씁니다 (upsert 동작).
+        self.store.add_documents(documents, ids=ids)
+
+    def delete_by_sqlite_ids(self, sqlite_ids: List[int]):
+        vector_ids = self.store.get(where={"sqlite_id": {"$in": list(sqlite_ids)}}, include=[])["ids"]
+        if vector_ids:
+            self.store.delete(ids=vector_ids)
+
+    def delete(self, ids: List[str]):
+        self.store.delete(ids=ids)
+
+    def _pages(self, include: List[str], page_size: int):
+        page_size = max(1, page_size)
+        offset = 0
+        while True:
+            page = self.store.get(include=include, limit=page_size, offset=offset)
+            yield page
+            if len(page["ids"]) < page_size:
+                return
+            offset += page_size
+
+    def list_ids(self, page_size: int = LTM_VECTOR_SYNC_PAGE_SIZE) -> Set[str]:
+        vector_ids: Set[str] = set()
+        for page in self._pages([], page_size): # 임베딩/문서 본문은 가져오지 않음
+            vector_ids.update(page["ids"])
+        return vector_ids
+
+    def load_embeddings(self, page_size: int = LTM_VECTOR_SYNC_PAGE_SIZE) -> Dict[int, List[float]]:
+        vectors: Dict[int, List[float]] = {}
+        for page in self._pages(["embeddings", "metadatas"], page_size):
+            for metadata, embedding in zip(page["metadatas"], page["embeddings"]):
+                sqlite_id = (metadata or {}).get("sqlite_id")
+                if sqlite_id is not None:
+                    vectors[sqlite_id] = embedding
+        return vectors
+
+    def count(self) -> int:
+        return len(self.store)
+
+class NumpyMemoryBackend(MemoryVectorBackend):
+    """
+    정규화된 임베딩을 메모리 맵 배열(vectors.bin)에 저장하고, 행렬-벡터 곱 한 번으로 정확한 top-k를 찾는 백엔드.
+    - 사용자당 수만 개 수준의 기억이면 전수 검색이 HNSW보다 빠르고, 여는 비용도 파일 매핑뿐
+    - 벡터 ID/SQLite ID 목록은 index.json에 두고, 메타데이터 필터는 SQLite 행(long_term_memories)으로 해석
+    - 삭제는 마지막 행을 빈 자리로 옮겨 배열을 빈틈없이 유지 (검색 대상은 항상 앞의 count개 행)
+    - 쓰기마다 index.json 전체를 다시 쓰지 않고 변경분만 index.<세대>.log에 덧붙이며,
+      기록이 색인 크기만큼 쌓이거나 close()/다시 열 때 index.json으로 합침 (쓰기당 분할상환 O(변경 수))
+    """
+
+    INDEX_FILE = "index.json"
+    VECTORS_FILE = "vectors.bin"
+    LOG_FILE = "index.{generation}.log"
+
+    def __init__(self, path: str, embedding_function: Embeddings, sqlite_pool: Optional[SQLiteConnectionPool] = None,
+                 dtype: str = MEMORY_VECTOR_DTYPE, initial_capacity: int = 1024, compact_min_entries: int = 1024):
+        if dtype not in ("float32", "float16"):
+            raise ValueError(f"Unsupported memory vector dtype: {dtype}")
+        self.path = path
+        self.embeddings = embedding_function
+        self.sqlite_pool = sqlite_pool or get_sqlite_pool()
+        self.initial_capacity = max(1, initial_capacity)
+        self.compact_min_entries = max(1, compact_min_entries)
+        self._lock = threading.RLock()
+        os.makedirs(path, exist_ok=True)
+        self._ids: List[str] = []
+        self._row_by_id: Dict[str, int] = {}
+        self._sqlite_ids = np.zeros(0, dtype=np.int64)
+        self._dim = 0
+        self._dtype = np.dtype(dtype)
+        self._vectors: Optional[np.memmap] = None
+        self._generation = 0
+        self._log_entries = 0
+        self._indexed_count = 0 # 마지막 index.json에 담긴 벡터 수 (합치기 기준)
+        self._load()
+
+    # --- 파일 ---
+    def _index_path(self) -> str:
+        return os.path.join(self.path, self.INDEX_FILE)
+
+    def _vectors_path(self) -> str:
+        return os.path.join(self.path, self.VECTORS_FILE)
+
+    def _log_path(self, generation: Optional[int] = None) -> str:
+        return os.path.join(self.path, self.LOG_FILE.format(generation=self._generation if generation is None else generation))
+
+    def _load(self):
+        if not os.path.exists(self._index_path()):
+            return
+        with open(self._index_path(), "r", encoding="utf-8") as f:
+            index = json.load(f)
+        self._dim = index["dim"]
+        self._dtype = np.dtype(index["dtype"]) # 기존 파일은 저장된 형식 그대로 사용
+        self._generation = index.get("generation", 0)
+        self._ids = index["ids"]
+        self._row_by_id = {vector_id: row for row, vector_id in enumerate(self._ids)}
+        self._sqlite_ids = np.array(index["sqlite_ids"], dtype=np.int64)
+        self._indexed_count = len(self._ids)
+        replayed = self._replay_log()
+        self._map_vectors(max(len(self._ids), self.initial_capacity))
+        if replayed:
+            self._save_index() # 지난 실행의 기록을 합쳐 새 세대로 시작 (끝이 잘린 줄 뒤에 이어 쓰지 않도록)
+        for log_path in glob.glob(os.path.join(self.path, self.LOG_FILE.format(generation="*"))):
+            if log_path != self._log_path(): # 합친 뒤 지우기 전에 종료된 이전 세대 기록
+                os.remove(log_path)
+
+    def _replay_log(self) -> bool:
+        """index.json 이후의 변경 기록을 ID 목록에 다시 적용합니다 (벡터 행은 기록 전에 이미 vectors.bin에 반영됨)."""
+        if not os.path.exists(self._log_path()):
+            return False
+        replayed = False
+        with open(self._log_path(), "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError: # 기록 도중 종료되어 잘린 마지막 줄
+                    break
+                if entry["op"] == "upsert":
+                    self._assign_rows(entry["ids"], entry["sqlite_ids"])
+                elif entry["op"] == "delete":
+                    self._delete_rows([self._row_by_id[vector_id] for vector_id in entry["ids"] if vector_id in self._row_by_id],
+                                      move_vectors=False)
+                replayed = True
+        return replayed
+
+    def _map_vectors(self, capacity: int):
+        """vectors.bin을 capacity행 이상으로 늘리고 다시 매핑합니다."""
+        required_bytes = capacity * self._dim * self._dtype.itemsize
+        mode = "r+b" if os.path.exists(self._vectors_path()) else "w+b"
+        with open(self._vectors_path(), mode) as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() < required_bytes:
+                f.truncate(required_bytes)
+        if self._vectors is not None:
+            self._vectors.flush()
+        self._vectors = np.memmap(self._vectors_path(), dtype=self._dtype, mode="r+", shape=(capacity, self._dim))
+
+    def _save_index(self):
+        """
+        벡터 행을 디스크에 반영한 뒤 다음 세대의 index.json으로 원자적으로 교체하고 이전 세대 기록을 지웁니다.
+        교체 전에 죽으면 이전 index.json과 기록이, 교체 후에 죽으면 새 index.json이 남음.
+        """
+        if self._vectors is not None:
+            self._vectors.flush()
+        previous_log = self._log_path()
+        index = {"dim": self._dim, "dtype": self._dtype.name, "generation": self._generation + 1,
+                 "ids": self._ids, "sqlite_ids": self._sqlite_ids.tolist()}
+        tmp_path = self._index_path() + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(index, f)
+        os.replace(tmp_path, self._index_path())
+        self._generation += 1
+        self._log_entries = 0
+        self._indexed_count = len(self._ids)
+        if os.path.exists(previous_log):
+            os.remove(previous_log)
+
+    def _append_log(self, entry: dict):
+        """벡터 행을 디스크에 반영한 뒤 변경분을 기록에 덧붙입니다. 기록이 충분히 쌓이면 index.json으로 합칩니다."""
+        if not os.path.exists(self._index_path()): # 새 저장소의 첫 쓰기: 차원을 남기기 위해 index.json부터 생성
+            self._save_index()
+            return
+        self._vectors.flush()
+        with open(self._log_path(), "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+        self._log_entries += 1
+        if self._log_entries >= max(self.compact_min_entries, self._indexed_count):
+            self._save_index()
+
+    # --- 쓰기 ---
+    def _assign_rows(self, ids: List[str], sqlite_ids: List[int]) -> List[int]:
+        """새 벡터 ID에 끝 행을 배정하고 SQLite ID를 기록합니다. ids 순서대로의 행 번호를 반환."""
+        new_ids = [vector_id for vector_id in dict.fromkeys(ids) if vector_id not in self._row_by_id]
+        if new_ids:
+            for vector_id in new_ids:
+                self._row_by_id[vector_id] = len(self._ids)
+                self._ids.append(vector_id)
+            self._sqlite_ids = np.concatenate([self._sqlite_ids, np.zeros(len(new_ids), dtype=np.int64)])
+        rows = [self._row_by_id[vector_id] for vector_id in ids]
+        for row, sqlite_id in zip(rows, sqlite_ids):
+            self._sqlite_ids[row] = sqlite_id
+        return rows
+
+    def upsert(self, documents: List[Document], ids: List[str]):
+        if not documents:
+            return
+        vectors = np.asarray(self.embeddings.embed_documents([doc.page_content for doc in documents]), dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.where(norms > 0, norms, 1.0)
+        sqlite_ids = [int(doc.metadata["sqlite_id"]) for doc in documents]
+        with self._lock:
+            if self._vectors is None:
+                self._dim = vectors.shape[1]
+                self._map_vectors(self.initial_capacity)
+            elif vectors.shape[1] != self._dim:
+                raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match memory index dimension {self._dim}")
+            needed = len(self._ids) + sum(1 for vector_id in set(ids) if vector_id not in self._row_by_id)
+            if needed > self._vectors.shape[0]:
+                self._map_vectors(max(needed, self._vectors.shape[0] * 2))
+            for row, vector in zip(self._assign_rows(ids, sqlite_ids), vectors):
+                self._vectors[row] = vector
+            self._append_log({"op": "upsert", "ids": list(ids), "sqlite_ids": sqlite_ids})
+
+    def _delete_rows(self, rows: List[int], move_vectors: bool = True):
+        for row in sorted(set(rows), reverse=True): # 뒤에서부터 지워야 옮겨진 행 번호가 바뀌지 않음
+            last = len(self._ids) - 1
+            removed_id = self._ids[row]
+            if row != last:
+                if move_vectors: # 기록 재적용 시에는 vectors.bin에 이미 반영되어 있음
+                    self._vectors[row] = self._vectors[last]
+                self._sqlite_ids[row] = self._sqlite_ids[last]
+                self._ids[row] = self._ids[last]
+                self._row_by_id[self._ids[row]] = row
+            self._ids.pop()
+            del self._row_by_id[removed_id]
+        self._sqlite_ids = self._sqlite_ids[:len(self._ids)].copy()
+
+    def _delete_logged(self, rows: List[int]):
+        deleted_ids = [self._ids[row] for row in rows]
+        self._delete_rows(rows)
+        self._append_log({"op": "delete", "ids": deleted_ids})
+
+    def delete_by_sqlite_ids(self, sqlite_ids: List[int]):
+        with self._lock:
+            count = len(self._ids)
+            rows = np.flatnonzero(np.isin(self._sqlite_ids[:count], np.asarray(list(sqlite_ids), dtype=np.int64))).tolist()
+            if rows:
+                self._delete_logged(rows)
+
+    def delete(self, ids: List[str]):
+        with self._lock:
+            rows = list({self._row_by_id[vector_id] for vector_id in ids if vector_id in self._row_by_id})
+            if rows:
+                self._delete_logged(rows)
+
+    # --- 읽기 ---
+    def _allowed_sqlite_ids(self, where: dict) -> np.ndarray:
+        """Chroma 형식의 메타데이터 조건을 long_term_memories 조회로 바꿔 조건에 맞는 SQLite ID를 구합니다."""
+        clauses, params = [], []
+        for key, condition in where.items():
+            column = FILTER_COLUMNS.get(key)
+            if column is None:
+                raise ValueError(f"Unsupported memory filter field: {key}")
+            if isinstance(condition, dict) and "$in" in condition:
+                values = list(condition["$in"])
+                if not values:
+                    return np.zeros(0, dtype=np.int64)
+                clauses.append(f"{column} IN ({placeholders(len(values))})")
+                params.extend(values)
+            else:
+                clauses.append(f"{column} = ?")
+                params.append(condition)
+        rows = self.sqlite_pool.execute(f"SELECT id FROM long_term_memories WHERE {' AND '.join(clauses)}", tuple(params))
+        return np.fromiter((row[0] for row in rows), dtype=np.int64)
+
+    def _scores(self, query: np.ndarray, count: int, block_rows: int = 8192) -> np.ndarray:
+        if self._dtype == np.float32:
+            return self._vectors[:count] @ query # 행렬-벡터 곱 한 번 (BLAS)
+        # float16은 BLAS 경로가 없으므로 블록 단위로 float32로 올려서 계산
+        scores = np.empty(count, dtype=np.float32)
+        for start in range(0, count, block_rows):
+            end = min(count, start + block_rows)
+            scores[start:end] = self._vectors[start:end].astype(np.float32) @ query
+        return scores
+
+    def search(self, query_embedding: List[float], k: int, where: Optional[dict] = None) -> List[Tuple[int, float]]:
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm > 0:
+            query = query / norm
+        allowed = self._allowed_sqlite_ids(where) if where else None # SQLite 조회는 잠금 밖에서
+        with self._lock:
+            count = len(self._ids)
+            if count == 0 or k <= 0 or self._vectors is None:
+                return []
+            if query.shape[0] != self._dim:
+                raise ValueError(f"Query dimension {query.shape[0]} does not match memory index dimension {self._dim}")
+            scores = self._scores(query, count)
+            sqlite_ids = self._sqlite_ids[:count]
+            if allowed is not None:
+                candidate_rows = np.flatnonzero(np.isin(sqlite_ids, allowed))
+                if candidate_rows.size == 0:
+                    return []
+                scores = scores[candidate_rows]
+            else:
+                candidate_rows = None
+            if k < scores.shape[0]:
+                top = np.argpartition(-scores, k - 1)[:k]
+                top = top[np.argsort(-scores[top])]
+            else:
+                top = np.argsort(-scores)
+            rows = candidate_rows[top] if candidate_rows is not None else top
+            return [(int(sqlite_ids[row]), float(2.0 - 2.0 * score)) for row, score in zip(rows, scores[top])]
+
+    def list_ids(self, page_size: int = LTM_VECTOR_SYNC_PAGE_SIZE) -> Set[str]:
+        with self._lock:
+            return set(self._ids)
+
+    def load_embeddings(self, page_size: int = LTM_VECTOR_SYNC_PAGE_SIZE) -> Dict[int, List[float]]:
+        with self._lock:
+            count = len(self._ids)
+            if count == 0:
+                return {}
+            vectors = np.asarray(self._vectors[:count], dtype=np.float32)
+            return {int(sqlite_id): vector.tolist() for sqlite_id, vector in zip(self._sqlite_ids[:count], vectors)}
+
+    def count(self) -> int:
+        with self._lock:
+            return len(self._ids)
+
+    def close(self):
+        """남은 변경 기록을 index.json으로 합칩니다."""
+        with self._lock:
+            if self._log_entries:
+                self._save_index()
+            elif self._vectors is not None:
+                self._vectors.flush()
+
+def as_memory_backend(memory_vdb) -> Optional[MemoryVectorBackend]:
+    """langchain Chroma 인스턴스를 넘긴 기존 호출 측(벤치마크 등)을 위해 백엔드 인터페이스로 감쌉니다."""
+    if memory_vdb is None or isinstance(memory_vdb, MemoryVectorBackend):
+        return memory_vdb
+    return ChromaMemoryBackend(memory_vdb)
@@ -0,0 +1,220 @@
+# claire_agent/core/vector_sync.py
+import argparse
+import atexit
+import datetime
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+from langchain.docstore.document import Document
+
+# 내부 모듈 import
+from .config import (
+    LTM_VECTOR_SYNC_INTERVAL_SEC,
+    LTM_VECTOR_SYNC_BATCH_SIZE,
+    LTM_VECTOR_SYNC_PAGE_SIZE
+)
+from .sqlite_storage import SQLiteConnectionPool, get_sqlite_pool, chunked, placeholders
+from .vector_backends import MemoryVectorBackend, as_memory_backend
+from .telemetry import traced
+
+def memory_row_to_document(row: tuple) -> Document:
+    """long_term_memories 행(SELECT *)을 기억 벡터DB에 저장할 Document로 변환합니다."""
+    metadata = {
+        "sqlite_id": row[0],
+        "session_id": row[2],
+        "type": "conversation_summary",
+        "creation_time": row[6],
+        "keywords_json": row[4] or "[]",
+        "user_importance": row[9],
+        "tier": row[10], # 계층 검색 필터용 (0: 대화 요약, 1: 세션 롤업, 2: 기간 다이제스트)
+        "parent_id": row[11]
+    }
+    return Document(page_content=row[3], metadata=metadata)
+
+class VectorSyncJournal:
+    """
+    SQLite(long_term_memories)와 기억 벡터DB(Chroma 또는 numpy 백엔드)의 이중 쓰기를 outbox 테이블(vector_outbox)로 일관되게 유지합니다.
+    - 기억 행을 바꾸는 트랜잭션 안에서 enqueue()로 벡터 작업을 함께 기록 (둘 중 하나만 커밋되는 일이 없음)
+    - 커밋 후 replay()가 대기 중인 작업을 벡터DB에 적용하고 outbox에서 지움
+    - 작업 내용은 적용 시점의 SQLite 상태로 결정하므로 (행이 있으면 upsert, 없으면 delete) 여러 번 적용해도 결과가 같음
+    - 적용에 실패한 작업은 남겨두었다가 백그라운드 스레드가 주기적으로 다시 적용
+    """
+
+    def __init__(self, sqlite_pool: Optional[SQLiteConnectionPool], memory_vdb: MemoryVectorBackend,
+                 replay_interval_sec: float = LTM_VECTOR_SYNC_INTERVAL_SEC, batch_size: int = LTM_VECTOR_SYNC_BATCH_SIZE):
+        self.sqlite_pool = sqlite_pool or get_sqlite_pool()
+        self.memory_vdb = as_memory_backend(memory_vdb)
+        self.replay_interval_sec = replay_interval_sec
+        self.batch_size = max(1, batch_size)
+        self._replay_lock = threading.Lock() # replay 동시 실행 방지
+        self._stop_event = threading.Event()
+        self._replayer: Optional[threading.Thread] = None
+
+    @staticmethod
+    def enqueue(conn, memory_ids: Iterable[int], op: str = "upsert"):
+        """호출 측 트랜잭션(conn) 안에서 벡터 작업을 기록합니다. op는 기록용이며 실제 작업은 replay 시점에 결정됩니다."""
+        now_iso = datetime.datetime.now().isoformat()
+        conn.executemany(
+            "INSERT INTO vector_outbox (memory_id, op, created_time) VALUES (?, ?, ?)",
+            [(memory_id, op, now_iso) for memory_id in memory_ids]
+        )
+
+    def pending_count(self) -> int:
+        row = self.sqlite_pool.execute("SELECT COUNT(*) FROM vector_outbox", fetch_one=True)
+        return row[0] if row else 0
+
+    @traced("chroma.sync", new_trace=False)
+    def _apply(self, memory_ids: List[int]):
+        """memory_ids의 벡터를 현재 SQLite 상태에 맞춥니다 (행이 있으면 upsert, 없으면 sqlite_id 메타데이터로 삭제)."""
+        rows_by_id = {}
+        for id_chunk in chunked(memory_ids):
+            for row in self.sqlite_pool.execute(f"SELECT * FROM long_term_memories WHERE id IN ({placeholders(len(id_chunk))})", tuple(id_chunk)):
+                rows_by_id[row[0]] = row
+        if rows_by_id:
+            self.memory_vdb.upsert(
+                [memory_row_to_document(row) for row in rows_by_id.values()],
+                ids=[row[1] or str(row[0]) for row in rows_by_id.values()]
+            )
+        deleted_ids = [memory_id for memory_id in memory_ids if memory_id not in rows_by_id]
+        if deleted_ids:
+            self.memory_vdb.delete_by_sqlite_ids(deleted_ids)
+
+    def replay(self, max_batches: Optional[int] = None) -> int:
+        """대기 중인 벡터 작업을 batch_size 단위로 적용합니다. 적용한 기억 수를 반환합니다."""
+        applied = 0
+        with self._replay_lock:
+            batches = 0
+            while max_batches is None or batches < max_batches:
+                rows = self.sqlite_pool.execute(
+                    "SELECT id, memory_id FROM vector_outbox ORDER BY id LIMIT ?", (self.batch_size,)
+                )
+                if not rows:
+                    break
+                entry_ids = [row[0] for row in rows]
+                memory_ids = list(dict.fromkeys(row[1] for row in rows)) # 같은 기억에 대한 작업은 한 번만 적용
+                try:
+                    self._apply(memory_ids)
+                except Exception as e:
+                    print(f"Error replaying {len(memory_ids)} vector operations: {e}")
+                    self.sqlite_pool.execute(
+                        f"UPDATE vector_outbox SET attempts = attempts + 1, last_error = ? WHERE id IN ({placeholders(len(entry_ids))})",
+                        (str(e)[:500], *entry_ids), commit=True
+                    )
+                    break # 벡터DB 장애로 보고 다음 주기에 재시도
+                # 적용 중 같은 기억에 새로 기록된 작업은 id가 더 크므로 남아 있다가 다음 배치에서 다시 적용됨
+                self.sqlite_pool.execute(
+                    f"DELETE FROM vector_outbox WHERE id IN ({placeholders(len(entry_ids))})", tuple(entry_ids), commit=True
+                )
+                applied += len(memory_ids)
+                batches += 1
+                if len(rows) < self.batch_size:
+                    break
+        return applied
+
+    def start(self):
+        """주기적으로 replay하는 백그라운드 스레드를 시작합니다 (이미 실행 중이면 무시)."""
+        if self._replayer and self._replayer.is_alive():
+            return
+        self._stop_event.clear()
+        self._replayer = threading.Thread(target=self._run_periodic_replay, name="ltm-vector-sync", daemon=True)
+        self._replayer.start()
+
+    def _run_periodic_replay(self):
+        while not self._stop_event.wait(self.replay_interval_sec):
+            try:
+                self.replay()
+            except Exception as e:
+                print(f"Vector sync replay error: {e}")
+
+    def close(self):
+        self._stop_event.set()
+
+@dataclass
+class ReconcileReport:
+    sqlite_rows: int = 0
+    vector_count: int = 0
+    orphan_vectors: int = 0 # SQLite 행이 없는 벡터
+    missing_vectors: int = 0 # 벡터가 없는 SQLite 행
+    repaired: bool = False
+    elapsed_sec: float = 0.0
+
+    def summary(self) -> str:
+        return (f"SQLite {self.sqlite_rows}행, 벡터 {self.vector_count}개, 고아 벡터 {self.orphan_vectors}개, "
+                f"누락 벡터 {self.missing_vectors}개 ({'복구함' if self.repaired else '복구하지 않음'}), {self.elapsed_sec:.2f}초")
+
+def reconcile_vector_store(journal: VectorSyncJournal, repair: bool = True,
+                           page_size: int = LTM_VECTOR_SYNC_PAGE_SIZE) -> ReconcileReport:
+    """
+    SQLite와 기억 벡터DB의 ID 집합을 한 번에 비교하여 고아 벡터는 삭제하고, 벡터가 없는 기억은 outbox로 다시 색인합니다.
+    """
+    started = time.perf_counter()
+    report = ReconcileReport()
+    expected: Dict[str, int] = {}
+    missing_vector_id_rows: List[int] = []
+    for memory_id, vector_id in journal.sqlite_pool.execute("SELECT id, vector_id FROM long_term_memories"):
+        if not vector_id:
+            missing_vector_id_rows.append(memory_id)
+        expected[vector_id or str(memory_id)] = memory_id
+    vector_ids = journal.memory_vdb.list_ids(page_size=max(1, page_size))
+
+    orphan_ids = sorted(vector_ids - expected.keys())
+    missing_memory_ids = sorted(memory_id for vector_id, memory_id in expected.items() if vector_id not in vector_ids)
+    report.sqlite_rows, report.vector_count = len(expected), len(vector_ids)
+    report.orphan_vectors, report.missing_vectors = len(orphan_ids), len(missing_memory_ids)
+
+    if repair and (orphan_ids or missing_memory_ids or missing_vector_id_rows):
+        for id_chunk in chunked(orphan_ids):
+            # 비교 이후 새로 저장된 기억의 벡터를 고아로 오인해 지우지 않도록 삭제 직전에 다시 확인
+            recreated = {row[0] for row in journal.sqlite_pool.execute(
+                f"SELECT vector_id FROM long_term_memories WHERE vector_id IN ({placeholders(len(id_chunk))})", tuple(id_chunk)
+            )}
+            stale_ids = [vector_id for vector_id in id_chunk if vector_id not in recreated]
+            if stale_ids:
+                journal.memory_vdb.delete(ids=stale_ids)
+        with journal.sqlite_pool.transaction() as conn:
+            for id_chunk in chunked(missing_vector_id_rows):
+                conn.execute(
+                    f"UPDATE long_term_memories SET vector_id = CAST(id AS TEXT) WHERE id IN ({placeholders(len(id_chunk))})", id_chunk
+                )
+            journal.enqueue(conn, missing_memory_ids, op="reindex")
+        journal.replay()
+        report.repaired = True
+    report.elapsed_sec = time.perf_counter() - started
+    return report
+
+_journal: Optional[VectorSyncJournal] = None
+_journal_lock = threading.Lock()
+
+def get_vector_journal(memory_vdb: MemoryVectorBackend) -> VectorSyncJournal:
+    """프로세스 전역 벡터 동기화 저널을 반환하고, 재시도용 백그라운드 스레드를 한 번만 시작합니다."""
+    global _journal
+    with _journal_lock:
+        if _journal is None:
+            _journal = VectorSyncJournal(get_sqlite_pool(), memory_vdb)
+            _journal.start()
+            atexit.register(_journal.close)
+        return _journal
+
+def main():
+    """SQLite와 기억 벡터DB의 일관성 점검/복구 명령: python -m core.vector_sync"""
+    from .db_services import init_sqlite_db, get_memory_vector_store
+
+    parser = argparse.ArgumentParser(description="Reconcile long-term memory rows in SQLite with the memory vector index.")
+    parser.add_argument("--dry-run", action="store_true", help="차이만 보고하고 복구하지 않음")
+    parser.add_argument("--replay-only", action="store_true", help="outbox에 남은 작업만 다시 적용")
+    parser.add_argument("--page-size", type=int, default=LTM_VECTOR_SYNC_PAGE_SIZE, help="벡터 ID 조회 페이지 크기 (Chroma)")
+    args = parser.parse_args()
+
+    init_sqlite_db()
+    journal = VectorSyncJournal(get_sqlite_pool(), get_memory_vector_store())
+    print(f"Pending vector operations: {journal.pending_count()}")
+    if not args.dry_run:
+        print(f"Replayed vector operations for {journal.replay()} memories.")
+    if not args.replay_only:
+        report = reconcile_vector_store(journal, repair=not args.dry_run, page_size=args.page_size)
+        print(f"Reconcile finished: {report.summary()}")
+
+if __name__ == "__main__":
+    main()
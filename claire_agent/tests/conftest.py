@@ -0,0 +1,122 @@
+# claire_agent/tests/conftest.py
+import os
+import sys
+
+import pytest
+
+# 앱과 같이 claire_agent 디렉토리를 기준으로 core, benchmarks를 import (python -m pytest tests 실행 위치와 무관)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.sqlite_storage import SQLiteConnectionPool
+
+@pytest.fixture
+def db_path(tmp_path):
+    """임시 폴더의 SQLite 파일 경로 (claire_memory.db는 건드리지 않음)."""
+    return str(tmp_path / "test_memory.db")
+
+@pytest.fixture
+def sqlite_pool(db_path):
+    pool = SQLiteConnectionPool(db_path, pool_size=2, busy_timeout_sec=0.2)
+    yield pool
+    pool.close()
+
+@pytest.fixture
+def memory_db(db_path):
+    """앱과 같은 스키마(init_sqlite_db)로 초기화한 임시 기억 DB의 커넥션 풀."""
+    from core.db_services import init_sqlite_db
+    from core.sqlite_storage import get_sqlite_pool
+
+    init_sqlite_db(db_path)
+    pool = get_sqlite_pool(db_path)
+    yield pool
+    pool.close()
+
+def insert_memory(pool, summary: str, session_id: str = "s1", importance: float = 0.5, access_count: int = 0,
+                  last_accessed_time: str = "2024-01-01T00:00:00", tier: int = 0, parent_id: int = 0,
+                  vector_id: str = None) -> int:
+    """테스트용 long_term_memories 행을 추가하고 SQLite ID를 반환합니다."""
+    _, memory_id = pool.execute(
+        """INSERT INTO long_term_memories (vector_id, session_id, summary, keywords, full_conversation_snippet,
+            creation_time, last_accessed_time, access_count, user_importance_score, tier, parent_id)
+        VALUES (?, ?, ?, '', '', ?, ?, ?, ?, ?, ?)""",
+        (vector_id, session_id, summary, last_accessed_time, last_accessed_time, access_count, importance, tier, parent_id),
+        commit=True
+    )
+    return memory_id
+
+@pytest.fixture
+def embeddings():
+    """모델 로드 없는 결정적 단어 해시 임베딩 (벤치마크와 같은 구현)."""
+    from benchmarks.pipeline_load import HashingEmbeddings
+    return HashingEmbeddings(dim=64)
+
+@pytest.fixture
+def memory_backend(tmp_path, embeddings, memory_db):
+    from core.vector_backends import NumpyMemoryBackend
+    return NumpyMemoryBackend(str(tmp_path / "numpy_memory"), embeddings, sqlite_pool=memory_db)
+
+@pytest.fixture
+def memory_system(memory_db, memory_backend, embeddings):
+    """LLM 없이(요약은 잘라 쓰기) 임시 DB와 numpy 벡터 백엔드를 사용하는 MemorySystem."""
+    from core.access_tracker import MemoryAccessTracker
+    from core.memory_system import MemorySystem
+    from core.vector_sync import VectorSyncJournal
+
+    tracker = MemoryAccessTracker(sqlite_pool=memory_db, flush_interval_sec=3600)
+    system = MemorySystem(
+        llm_for_summarization=None,
+        embedding_instance=embeddings,
+        memory_vdb_instance=memory_backend,
+        sqlite_pool=memory_db,
+        access_tracker=tracker,
+        vector_journal=VectorSyncJournal(memory_db, memory_backend)
+    )
+    yield system
+    tracker.close()
+
+def store_memory(memory_system, session_id: str, summary: str):
+    """사용자 제공 요약으로 기억을 저장하고 (벡터까지 반영) StoredMemoryEntry를 반환합니다."""
+    return memory_system.consolidate_session_memory(session_id, summary, user_provided_summary=summary, use_llm_summary=False)
+
+class FakeChatLLM:
+    """Ollama 없이 고정 답변을 조각으로 내보내는 채팅 모델 (호출된 프롬프트를 기록)."""
+
+    def __init__(self, reply: str = "테스트 답변입니다."):
+        self.reply = reply
+        self.calls = []
+
+    def stream(self, messages, affinity_key=None):
+        from langchain_core.messages import AIMessageChunk
+        self.calls.append(list(messages))
+        for start in range(0, len(self.reply), 4):
+            yield AIMessageChunk(content=self.reply[start:start + 4])
+
+class StaticRagStore:
+    """항상 같은 문서를 돌려주는 RAG 벡터 스토어."""
+
+    def __init__(self, documents):
+        self.documents = documents
+
+    def similarity_search_by_vector(self, embedding, k=4, **kwargs):
+        return list(self.documents[:k])
+
+@pytest.fixture
+def chat_pipeline_factory(memory_system, embeddings, monkeypatch):
+    """임시 DB 기억 시스템과 가짜 LLM/RAG로 ChatPipeline을 만듭니다 (모델 레지스트리 조회 없이 기본 컨텍스트 길이 사용)."""
+    import core.chat_pipeline as chat_pipeline_module
+
+    class _Registry:
+        def context_window(self, model_name):
+            return 4096
+    monkeypatch.setattr(chat_pipeline_module, "get_model_registry", lambda: _Registry())
+
+    def factory(llm=None, rag_documents=(), response_cache=None):
+        return chat_pipeline_module.ChatPipeline(
+            model_name="test-model",
+            llm=llm or FakeChatLLM(),
+            memory_system=memory_system,
+            rag_vector_store=StaticRagStore(list(rag_documents)),
+            embedding_model=embeddings,
+            response_cache=response_cache
+        )
+    return factory
@@ -0,0 +1,74 @@
+# claire_agent/tests/test_access_tracker.py
+import pytest
+
+from core.access_tracker import MemoryAccessTracker
+from core.ranking import effective_importance
+from conftest import insert_memory
+
+@pytest.fixture
+def tracker(memory_db):
+    tracker = MemoryAccessTracker(sqlite_pool=memory_db, flush_interval_sec=3600, flush_threshold=100)
+    yield tracker
+    tracker.close()
+
+def _row(pool, memory_id):
+    return pool.execute(
+        "SELECT access_count, last_accessed_time, user_importance_score FROM long_term_memories WHERE id = ?",
+        (memory_id,), fetch_one=True
+    )
+
+def test_accesses_are_buffered_until_flush(memory_db, tracker):
+    memory_id = insert_memory(memory_db, "buffered")
+    tracker.record_access([memory_id], accessed_time="2024-01-02T00:00:00")
+    tracker.record_access([memory_id], accessed_time="2024-01-03T00:00:00")
+    assert tracker.pending_count() == 1
+    assert _row(memory_db, memory_id)[0] == 0 # 아직 기록 안 됨
+
+    assert tracker.flush() == 1
+    assert tracker.pending_count() == 0
+    access_count, last_accessed_time, _ = _row(memory_db, memory_id)
+    assert access_count == 2
+    assert last_accessed_time == "2024-01-03T00:00:00"
+    assert tracker.flush() == 0
+
+def test_threshold_triggers_immediate_flush(memory_db):
+    ids = [insert_memory(memory_db, f"m{i}") for i in range(3)]
+    tracker = MemoryAccessTracker(sqlite_pool=memory_db, flush_interval_sec=3600, flush_threshold=3)
+    try:
+        tracker.record_access(ids[:2])
+        assert tracker.pending_count() == 2
+        tracker.record_access(ids[2:])
+        assert tracker.pending_count() == 0
+        assert [_row(memory_db, memory_id)[0] for memory_id in ids] == [1, 1, 1]
+    finally:
+        tracker.close()
+
+def test_flush_materializes_decay_before_moving_access_time(memory_db, tracker):
+    memory_id = insert_memory(memory_db, "old", importance=0.8, last_accessed_time="2023-01-01T00:00:00")
+    accessed_time = "2024-01-01T00:00:00"
+    tracker.record_access([memory_id], accessed_time=accessed_time)
+    tracker.flush()
+    expected = effective_importance(0.8, "2023-01-01T00:00:00", accessed_time)
+    assert expected < 0.8
+    assert _row(memory_db, memory_id)[2] == pytest.approx(expected)
+
+def test_failed_flush_keeps_batch_for_retry(memory_db, tracker, monkeypatch):
+    memory_id = insert_memory(memory_db, "retry")
+    tracker.record_access([memory_id], accessed_time="2024-01-02T00:00:00")
+
+    def failing_executemany(*args, **kwargs):
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(memory_db, "executemany", failing_executemany)
+    assert tracker.flush() == 0
+    assert tracker.pending_count() == 1
+    monkeypatch.undo()
+    assert tracker.flush() == 1
+    assert _row(memory_db, memory_id)[0] == 1
+
+def test_close_flushes_pending(memory_db):
+    memory_id = insert_memory(memory_db, "closing")
+    tracker = MemoryAccessTracker(sqlite_pool=memory_db, flush_interval_sec=3600, flush_threshold=100)
+    tracker.record_access([memory_id])
+    tracker.close()
+    assert _row(memory_db, memory_id)[0] == 1
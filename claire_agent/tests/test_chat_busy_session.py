@@ -0,0 +1,93 @@
+# claire_agent/tests/test_chat_busy_session.py
+import asyncio
+import http.client
+import json
+import threading
+
+import pytest
+
+from core.api_server import ChatApiServer
+from core.chat_pipeline import ChatSession
+
+class RacingLock:
+    """locked() 확인은 통과하지만 실제 획득은 실패하는 락 (확인과 획득 사이에 다른 요청이 먼저 턴을 시작한 경우)."""
+
+    def locked(self):
+        return False
+
+    def acquire(self, blocking=True):
+        return False
+
+    def release(self):
+        raise AssertionError("lock was never acquired")
+
+@pytest.fixture
+def api_server(chat_pipeline_factory):
+    pipeline = chat_pipeline_factory()
+    server = ChatApiServer(host="127.0.0.1", port=0, default_model="test-model", pipeline_factory=lambda model_name: pipeline)
+    loop = asyncio.new_event_loop()
+    started = threading.Event()
+
+    def run():
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(server.start())
+        started.set()
+        loop.run_forever()
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    started.wait(5)
+    yield server
+
+    async def shutdown():
+        server.close()
+        for task in asyncio.all_tasks():
+            if task is not asyncio.current_task():
+                task.cancel() # 유휴 세션 정리 루프
+    asyncio.run_coroutine_threadsafe(shutdown(), loop).result(5)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(5)
+    loop.close()
+
+def _request(server, method, path, payload=None):
+    connection = http.client.HTTPConnection(server.host, server.port, timeout=10)
+    connection.request(method, path, body=json.dumps(payload) if payload is not None else None,
+                       headers={"Content-Type": "application/json"})
+    response = connection.getresponse()
+    body = response.read().decode("utf-8")
+    connection.close()
+    return response.status, body
+
+def _sse_event_types(body):
+    return [line[len("event: "):] for line in body.splitlines() if line.startswith("event: ")]
+
+def test_busy_session_ends_with_done(chat_pipeline_factory):
+    pipeline = chat_pipeline_factory()
+    session = ChatSession(session_id="busy", messages=[{"role": "user", "content": "진행 중인 질문"}])
+    session.lock.acquire()
+    events = list(pipeline.stream_turn(session, "두 번째 질문"))
+    session.lock.release()
+
+    assert [event.type for event in events] == ["error", "done"]
+    assert events[-1].data["busy"] is True
+    assert session.messages == [{"role": "user", "content": "진행 중인 질문"}] # 진행 중인 턴의 기록은 그대로
+
+def test_normal_turn_reports_not_busy(chat_pipeline_factory):
+    events = list(chat_pipeline_factory().stream_turn(ChatSession(), "안녕"))
+    assert events[-1].type == "done" and events[-1].data["busy"] is False
+
+def test_server_rejects_locked_session_with_409(api_server):
+    _request(api_server, "POST", "/v1/sessions", {"session_id": "s1"})
+    api_server.sessions.get("s1").chat.lock.acquire()
+    status, _ = _request(api_server, "POST", "/v1/sessions/s1/chat", {"message": "안녕"})
+    assert status == 409
+
+def test_racing_stream_request_still_ends_with_done(api_server):
+    _request(api_server, "POST", "/v1/sessions", {"session_id": "s1"})
+    api_server.sessions.get("s1").chat.lock = RacingLock()
+
+    status, body = _request(api_server, "POST", "/v1/sessions/s1/chat", {"message": "안녕"})
+    assert status == 200
+    assert _sse_event_types(body) == ["error", "done"]
+
+    status, body = _request(api_server, "POST", "/v1/sessions/s1/chat", {"message": "안녕", "stream": False})
+    assert status == 409
@@ -0,0 +1,28 @@
+# claire_agent/tests/test_consolidation_worker.py
+import io
+import sys
+
+import pytest
+
+import core.db_services as db_services
+from core.consolidation_worker import main, validate_job_request
+
+@pytest.mark.parametrize("request_line, valid", [
+    ({"session_id": "s1", "conversation": "user: 안녕"}, True),
+    ({"session_id": "s1", "messages": [{"role": "user", "content": "안녕"}]}, True),
+    ({"conversation": "user: 안녕"}, False),
+    ({"session_id": 3}, False),
+    ({"session_id": "s1", "messages": "user: 안녕"}, False),
+    ({"session_id": "s1", "messages": ["안녕"]}, False),
+    (["s1"], False)
+])
+def test_validate_job_request(request_line, valid):
+    assert (validate_job_request(request_line) is None) == valid
+
+def test_headless_loop_skips_invalid_jobs(monkeypatch, capsys):
+    monkeypatch.setattr(db_services, "init_sqlite_db", lambda *args, **kwargs: None) # claire_memory.db를 건드리지 않음
+    monkeypatch.setattr(sys, "stdin", io.StringIO(
+        'not json\n{"conversation": "user: 안녕"}\n{"session_id": "s1", "messages": "user: 안녕"}\n\n'
+    ))
+    main()
+    assert capsys.readouterr().err.count("Skipping invalid job line") == 3
@@ -0,0 +1,61 @@
+# claire_agent/tests/test_memory_consolidation.py
+import datetime
+
+import pytest
+
+import core.memory_system as memory_system_module
+from conftest import insert_memory
+from core.ranking import effective_importance
+
+@pytest.fixture(autouse=True)
+def plain_ordering(monkeypatch):
+    monkeypatch.setattr(memory_system_module, "LTM_RANKING_ENABLED", False)
+    monkeypatch.setattr(memory_system_module, "LTM_TIERS_ENABLED", False)
+
+def _importance_and_access(pool, memory_id):
+    return pool.execute("SELECT user_importance_score, last_accessed_time FROM long_term_memories WHERE id = ?", (memory_id,), fetch_one=True)
+
+def _backdate(pool, memory_id, days):
+    old_time = (datetime.datetime.now() - datetime.timedelta(days=days)).isoformat()
+    pool.execute("UPDATE long_term_memories SET last_accessed_time = ? WHERE id = ?", (old_time, memory_id), commit=True)
+    return old_time
+
+def test_incremental_update_materializes_decay_before_touching(memory_system, memory_db):
+    messages = [{"role": "user", "content": "다음 주 여행 계획"}, {"role": "assistant", "content": "부산으로 가요"}]
+    entry = memory_system.consolidate_session_incremental("s1", messages)
+    old_time = _backdate(memory_db, entry.id, 90)
+
+    messages += [{"role": "user", "content": "숙소도 알아봐줘"}]
+    updated = memory_system.consolidate_session_incremental("s1", messages)
+
+    importance, last_accessed = _importance_and_access(memory_db, entry.id)
+    assert updated.id == entry.id
+    assert importance == pytest.approx(effective_importance(0.6, old_time, last_accessed))
+    assert importance < 0.6
+
+def test_merge_keeps_higher_of_decayed_and_new_importance(memory_system, memory_db):
+    memory_id = insert_memory(memory_db, "회의 일정 정리", importance=0.9)
+    old_time = _backdate(memory_db, memory_id, 90)
+    row = memory_db.execute("SELECT * FROM long_term_memories WHERE id = ?", (memory_id,), fetch_one=True)
+
+    memory_system._merge_into_memory(row, "회의 일정 정리 (수정)", ["회의"], 0.3, "", datetime.datetime.now().isoformat())
+
+    importance, last_accessed = _importance_and_access(memory_db, memory_id)
+    expected = effective_importance(0.9, old_time, last_accessed)
+    assert 0.3 < expected < 0.9
+    assert importance == pytest.approx(expected)
+
+def test_cleared_chat_with_same_length_starts_new_segment(memory_system, memory_db):
+    first_chat = [{"role": "system", "content": "안내"}, {"role": "user", "content": "다음 주 여행 계획"}, {"role": "assistant", "content": "부산으로 가요"}]
+    entry = memory_system.consolidate_session_incremental("s1", first_chat)
+
+    cleared_chat = [{"role": "system", "content": "안내"}, {"role": "user", "content": "저녁 메뉴 추천"}, {"role": "assistant", "content": "김치찌개"}]
+    new_entry = memory_system.consolidate_session_incremental("s1", cleared_chat) # 초기화 후 한 턴: 메시지 수는 같음
+
+    assert new_entry.id != entry.id
+    assert "저녁 메뉴" in new_entry.summary and "여행" not in new_entry.summary
+    segments = memory_db.execute("SELECT segment_index, turn_checkpoint FROM session_summaries WHERE session_id = 's1' ORDER BY segment_index")
+    assert segments == [(0, 3), (1, 3)]
+
+    cleared_chat += [{"role": "user", "content": "반찬도 알려줘"}]
+    assert memory_system.consolidate_session_incremental("s1", cleared_chat).id == new_entry.id
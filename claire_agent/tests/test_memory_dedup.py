@@ -0,0 +1,60 @@
+# claire_agent/tests/test_memory_dedup.py
+import numpy as np
+import pytest
+
+import core.memory_system as memory_system_module
+from conftest import insert_memory, store_memory
+from core.memory_dedup import deduplicate_memories, find_duplicate_groups
+
+def _rows(pool):
+    return pool.execute("SELECT id, session_id, summary, access_count FROM long_term_memories ORDER BY id")
+
+def _sync(memory_system, memory_ids):
+    with memory_system.sqlite_pool.transaction() as conn:
+        memory_system.vector_journal.enqueue(conn, memory_ids)
+    memory_system.vector_journal.replay()
+
+def test_write_time_dedup_is_off_by_default(memory_system, memory_db):
+    assert memory_system_module.LTM_DEDUP_ENABLED is False
+    store_memory(memory_system, "s1", "금요일 팀 회의 준비")
+    store_memory(memory_system, "s1", "금요일 팀 회의 준비")
+    assert len(_rows(memory_db)) == 2
+
+def test_write_time_dedup_merges_within_session(memory_system, memory_db, memory_backend, monkeypatch):
+    monkeypatch.setattr(memory_system_module, "LTM_DEDUP_ENABLED", True)
+    monkeypatch.setattr(memory_system_module, "LTM_DEDUP_SCOPE", "session")
+    first = store_memory(memory_system, "s1", "금요일 팀 회의 준비")
+    merged = store_memory(memory_system, "s1", "금요일 팀 회의 준비")
+    other_session = store_memory(memory_system, "s2", "금요일 팀 회의 준비")
+
+    assert merged.id == first.id
+    assert other_session.id != first.id
+    assert [(row[0], row[1], row[3]) for row in _rows(memory_db)] == [(first.id, "s1", 1), (other_session.id, "s2", 0)]
+    assert memory_backend.count() == 2
+
+def test_find_duplicate_groups_is_greedy_in_row_order():
+    vectors = np.array([[1.0, 0.0], [0.99, 0.01], [0.0, 1.0], [1.0, 0.001]])
+    assert find_duplicate_groups(vectors, 0.98) == [[0, 1, 3]]
+    assert find_duplicate_groups(vectors[:1], 0.5) == []
+
+def test_deduplicate_merges_rows_and_repoints_session_summaries(memory_system, memory_db, memory_backend):
+    entry = memory_system.consolidate_session_incremental("s1", [{"role": "user", "content": "주말 등산 계획 세우기"}])
+    keeper = insert_memory(memory_db, entry.summary, session_id="s1", importance=0.9, access_count=2)
+    distinct = insert_memory(memory_db, "전혀 다른 저녁 메뉴 이야기", session_id="s1")
+    _sync(memory_system, [keeper, distinct])
+    memory_db.execute("UPDATE long_term_memories SET access_count = 3 WHERE id = ?", (entry.id,), commit=True)
+
+    preview = deduplicate_memories(memory_system, scope="session", threshold=0.99, dry_run=True)
+    assert (preview.scanned, preview.groups, preview.merged_rows) == (3, 1, 1)
+    assert len(_rows(memory_db)) == 3
+
+    report = deduplicate_memories(memory_system, scope="session", threshold=0.99)
+    assert report.merged_rows == 1
+    assert [row[0] for row in _rows(memory_db)] == [keeper, distinct]
+    importance, access_count = memory_db.execute(
+        "SELECT user_importance_score, access_count FROM long_term_memories WHERE id = ?", (keeper,), fetch_one=True
+    )
+    assert (importance, access_count) == (pytest.approx(0.9), 5)
+    # 누적 요약 세그먼트가 삭제된 행 대신 대표 행을 가리킴
+    assert memory_db.execute("SELECT memory_id FROM session_summaries WHERE session_id = 's1'", fetch_one=True)[0] == keeper
+    assert memory_backend.list_ids() == {str(keeper), str(distinct)}
@@ -0,0 +1,59 @@
+# claire_agent/tests/test_memory_retrieval.py
+import pytest
+
+import core.memory_system as memory_system_module
+from conftest import store_memory
+
+@pytest.fixture(autouse=True)
+def plain_ordering(monkeypatch):
+    # 재정렬/계층/병합 없이 검색 단계 자체의 순서만 확인
+    monkeypatch.setattr(memory_system_module, "LTM_RANKING_ENABLED", False)
+    monkeypatch.setattr(memory_system_module, "LTM_TIERS_ENABLED", False)
+    monkeypatch.setattr(memory_system_module, "LTM_DEDUP_ENABLED", False)
+
+def test_default_retrieval_mode_is_dense():
+    from core.config import LTM_RETRIEVAL_MODE
+    assert LTM_RETRIEVAL_MODE == "dense"
+
+def test_fts_query_quotes_terms_and_strips_particles(memory_system):
+    query = memory_system._build_fts_query('김철수가 "OR" a* 회의')
+    assert query == '"김철수가"* OR "김철수"* OR "OR"* OR "회의"*'
+    assert memory_system._build_fts_query("a ? !") == ""
+
+def test_lexical_search_follows_inserts_updates_and_deletes(memory_system, memory_db):
+    first = store_memory(memory_system, "s1", "김철수 프로젝트 회의 일정")
+    second = store_memory(memory_system, "s1", "주말 등산 계획")
+
+    assert [hit[0] for hit in memory_system.search_memories_lexical("김철수가 언제 회의하지?", 5)] == [first.id]
+
+    memory_db.execute("UPDATE long_term_memories SET summary = ? WHERE id = ?", ("김철수 등산 동행", second.id), commit=True)
+    assert {hit[0] for hit in memory_system.search_memories_lexical("김철수", 5)} == {first.id, second.id}
+
+    memory_db.execute("DELETE FROM long_term_memories WHERE id = ?", (first.id,), commit=True)
+    assert [hit[0] for hit in memory_system.search_memories_lexical("김철수", 5)] == [second.id]
+
+def test_lexical_search_handles_fts_syntax_safely(memory_system):
+    store_memory(memory_system, "s1", "NEAR AND NOT 문법 단어")
+    assert memory_system.search_memories_lexical('NEAR( "AND" NOT', 5)
+
+def test_reciprocal_rank_fusion_scores(memory_system, monkeypatch):
+    monkeypatch.setattr(memory_system_module, "LTM_RRF_K", 60)
+    fused = dict(memory_system._reciprocal_rank_fusion([1, 2, 3], [3, 1]))
+    assert fused[1] == pytest.approx(1 / 61 + 1 / 62)
+    assert fused[3] == pytest.approx(1 / 63 + 1 / 61)
+    assert fused[2] == pytest.approx(1 / 62)
+    assert [sqlite_id for sqlite_id, _ in memory_system._reciprocal_rank_fusion([1, 2, 3], [3, 1])] == [1, 3, 2]
+
+def test_hybrid_promotes_memories_found_by_both_searches(memory_system, monkeypatch):
+    target = store_memory(memory_system, "s1", "프로젝트 마감 금요일")
+    store_memory(memory_system, "s1", "프로젝트 예산 검토")
+    store_memory(memory_system, "s1", "점심 메뉴 추천")
+
+    dense = memory_system.retrieve_relevant_memories("프로젝트 마감", top_k=3, mode="dense")
+    hybrid = memory_system.retrieve_relevant_memories("프로젝트 마감", top_k=3, mode="hybrid")
+    lexical = memory_system.retrieve_relevant_memories("프로젝트 마감", top_k=3, mode="lexical")
+    assert dense[0].id == target.id
+    assert hybrid[0].id == target.id
+    assert lexical[0].id == target.id
+    # 키워드가 겹치지 않는 기억은 lexical 결과에 없음
+    assert "점심 메뉴 추천" not in [memory.summary for memory in lexical]
@@ -0,0 +1,90 @@
+# claire_agent/tests/test_memory_tiers.py
+import datetime
+
+import pytest
+from langchain_core.documents import Document
+
+import core.memory_system as memory_system_module
+from conftest import insert_memory
+from core.memory_system import digest_period_key
+
+NOW = datetime.datetime(2024, 3, 1, 12, 0)
+
+@pytest.fixture(autouse=True)
+def plain_ordering(monkeypatch):
+    monkeypatch.setattr(memory_system_module, "LTM_RANKING_ENABLED", False)
+    monkeypatch.setattr(memory_system_module, "LTM_DEDUP_ENABLED", False)
+
+@pytest.fixture
+def entries(memory_system, memory_db):
+    """2024-W01에 만든 대화 요약: s1 세션 2개(롤업 대상), s2 세션 1개(최소 하위 수 미달)."""
+    ids = {
+        "gear": insert_memory(memory_db, "등산 준비물 목록 정리", session_id="s1"),
+        "course": insert_memory(memory_db, "북한산 등산 코스 추천", session_id="s1"),
+        "dinner": insert_memory(memory_db, "저녁 김치찌개 레시피", session_id="s2")
+    }
+    with memory_db.transaction() as conn:
+        memory_system.vector_journal.enqueue(conn, ids.values())
+    memory_system.vector_journal.replay()
+    return ids
+
+def _node(pool, memory_id):
+    return pool.execute("SELECT session_id, tier, parent_id FROM long_term_memories WHERE id = ?", (memory_id,), fetch_one=True)
+
+def _rollup_id(pool, session_id):
+    return pool.execute("SELECT id FROM long_term_memories WHERE session_id = ?", (session_id,), fetch_one=True)[0]
+
+def test_tiers_are_off_by_default():
+    assert memory_system_module.LTM_TIERS_ENABLED is False
+
+def test_digest_period_key():
+    assert digest_period_key("2024-01-01T00:00:00") == "2024-W01"
+    assert digest_period_key("2024-12-30T00:00:00") == "2025-W01"
+    assert digest_period_key("2024-02-15T09:00:00", period="month") == "2024-02"
+
+def test_rollups_build_session_and_digest_tiers(memory_system, memory_db, memory_backend, entries):
+    report = memory_system.run_tier_rollups(now=NOW)
+    assert (report.sessions_rolled_up, report.digests_updated, report.children_linked) == (1, 1, 4)
+
+    session_rollup = memory_db.execute("SELECT id FROM long_term_memories WHERE session_id = 's1' AND tier = 1", fetch_one=True)[0]
+    digest = _rollup_id(memory_db, "digest:2024-W01")
+    assert _node(memory_db, entries["gear"]) == ("s1", 0, session_rollup)
+    assert _node(memory_db, entries["course"]) == ("s1", 0, session_rollup)
+    assert _node(memory_db, session_rollup) == ("s1", 1, digest)
+    assert _node(memory_db, entries["dinner"]) == ("s2", 0, digest)
+    assert _node(memory_db, digest) == ("digest:2024-W01", 2, 0)
+    # 벡터 메타데이터의 parent_id도 함께 갱신되어 최상위 검색에는 다이제스트만 걸림
+    assert [hit[0] for hit in memory_backend.search([1.0] * 64, k=10, where={"parent_id": 0})] == [digest]
+
+    again = memory_system.run_tier_rollups(now=NOW)
+    assert (again.sessions_rolled_up, again.digests_updated, again.children_linked) == (0, 0, 0)
+
+def test_rollups_skip_active_sessions_and_current_period(memory_system, entries):
+    report = memory_system.run_tier_rollups(now=datetime.datetime(2024, 1, 1, 0, 30))
+    assert (report.sessions_rolled_up, report.digests_updated) == (0, 0)
+
+def test_new_entry_extends_existing_session_rollup(memory_system, memory_db, entries):
+    memory_system.run_tier_rollups(now=NOW)
+    session_rollup = memory_db.execute("SELECT id FROM long_term_memories WHERE session_id = 's1' AND tier = 1", fetch_one=True)[0]
+    late = insert_memory(memory_db, "하산 후 맛집", session_id="s1", last_accessed_time="2024-02-01T00:00:00")
+
+    report = memory_system.run_tier_rollups(now=NOW)
+    assert report.sessions_rolled_up == 1
+    assert _node(memory_db, late)[2] == session_rollup
+    assert "하산 후 맛집" in memory_db.execute("SELECT summary FROM long_term_memories WHERE id = ?", (session_rollup,), fetch_one=True)[0]
+
+def test_tiered_search_drills_down_to_entries(memory_system, memory_db, entries, monkeypatch):
+    memory_system.run_tier_rollups(now=NOW)
+    hits = memory_system._tiered_dense_search("북한산 등산 코스", k=2)
+    assert hits[0][0] == entries["course"]
+    assert {hit[0] for hit in hits} <= set(entries.values())
+
+    monkeypatch.setattr(memory_system_module, "LTM_TIERS_ENABLED", True)
+    recalled = memory_system.retrieve_relevant_memories("북한산 등산 코스", top_k=2, mode="dense")
+    assert recalled[0].id == entries["course"]
+    assert all(memory.id in entries.values() for memory in recalled)
+
+def test_tiered_search_falls_back_without_tier_metadata(memory_system, memory_backend):
+    # 계층 메타데이터가 없는 벡터만 있으면 전체 검색으로 대체
+    memory_backend.upsert([Document(page_content="메타데이터 없는 기억", metadata={"sqlite_id": 7})], ids=["7"])
+    assert [hit[0] for hit in memory_system._tiered_dense_search("메타데이터 없는 기억", k=1)] == [7]
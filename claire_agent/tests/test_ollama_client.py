@@ -0,0 +1,70 @@
+# claire_agent/tests/test_ollama_client.py
+import pytest
+from langchain.schema import AIMessage, HumanMessage, SystemMessage
+from langchain_community.llms.ollama import OllamaEndpointNotFoundError
+
+from benchmarks.fake_ollama import FakeOllamaServer
+from core.ollama_client import OllamaEndpointPool, PooledChatOllama
+
+MESSAGES = [SystemMessage(content="너는 Claire야."), HumanMessage(content="안녕"), AIMessage(content="안녕하세요"), HumanMessage(content="오늘 뭐 해?")]
+
+@pytest.fixture
+def server():
+    fake = FakeOllamaServer(model_names=["gemma3:4b"], tokens_per_sec=0, ttft_ms=0, response_tokens=3).start()
+    yield fake
+    fake.close()
+
+@pytest.fixture
+def pool(server):
+    endpoint_pool = OllamaEndpointPool([server.url], pool_size=2)
+    yield endpoint_pool
+    endpoint_pool.close()
+
+def test_stream_sends_chat_payload_through_pool(server, pool):
+    llm = PooledChatOllama(model="gemma3:4b", keep_alive="30m", num_ctx=2048, endpoint_pool=pool)
+    chunks = list(llm.stream(MESSAGES, affinity_key="session-1"))
+
+    assert "".join(chunk.content for chunk in chunks) == "토큰0 토큰1 토큰2 "
+    assert chunks[-1].response_metadata["eval_count"] == 3
+    assert server.last_chat_request == {
+        "model": "gemma3:4b",
+        "messages": [
+            {"role": "system", "content": "너는 Claire야."},
+            {"role": "user", "content": "안녕"},
+            {"role": "assistant", "content": "안녕하세요"},
+            {"role": "user", "content": "오늘 뭐 해?"}
+        ],
+        "stream": True,
+        "options": {"num_ctx": 2048},
+        "keep_alive": "30m"
+    }
+    assert pool.stats()[0]["in_flight"] == 0
+
+def test_invoke_passes_stop_and_extra_options(server, pool):
+    llm = PooledChatOllama(model="gemma3:4b", temperature=0.2, options={"top_p": 0.9}, endpoint_pool=pool)
+    result = llm.invoke(MESSAGES[:2], stop=["\n"], affinity_key="session-1", num_predict=16)
+
+    assert result.content == "토큰0 토큰1 토큰2 "
+    assert server.last_chat_request["options"] == {"temperature": 0.2, "stop": ["\n"], "top_p": 0.9, "num_predict": 16}
+    assert "keep_alive" not in server.last_chat_request
+
+def test_num_predict_can_be_set_after_construction(server, pool):
+    llm = PooledChatOllama(model="gemma3:4b", endpoint_pool=pool)
+    llm.num_predict = 8 # prompt_layout_ttft 벤치마크처럼 생성 후 지정
+    llm.invoke(MESSAGES[:2])
+    assert server.last_chat_request["options"] == {"num_predict": 8}
+
+def test_stopping_early_returns_the_connection(server, pool):
+    llm = PooledChatOllama(model="gemma3:4b", endpoint_pool=pool)
+    stream = llm.stream(MESSAGES[:2])
+    next(stream)
+    stream.close()
+    assert pool.stats()[0]["in_flight"] == 0
+    assert llm.invoke(MESSAGES[:2]).content # 같은 풀로 다음 요청도 정상 처리
+    assert pool.stats()[0]["requests"] == 2
+
+def test_unknown_model_raises_endpoint_not_found(server, pool):
+    llm = PooledChatOllama(model="missing:1b", endpoint_pool=pool)
+    with pytest.raises(OllamaEndpointNotFoundError):
+        llm.invoke(MESSAGES[:2])
+    assert pool.stats()[0]["in_flight"] == 0
@@ -0,0 +1,124 @@
+# claire_agent/tests/test_prompt_builder.py
+import pytest
+from langchain.docstore.document import Document
+from langchain.schema import AIMessage, HumanMessage, SystemMessage
+
+from core.data_models import StoredMemoryEntry
+from core.prompt_builder import HISTORY_SUMMARY_HEADER, MESSAGE_OVERHEAD_TOKENS, PromptBuilder, TokenCounter
+from core.retrieval import RetrievalResult
+
+SYSTEM_TEMPLATE = "시스템 {user_name}\n{recalled_ltm_str}\n{rag_context_str}"
+STABLE_SYSTEM_TEMPLATE = "시스템 {user_name}"
+CONTEXT_TEMPLATE = "기억 {recalled_ltm_str}\n참고 {rag_context_str}"
+
+@pytest.fixture
+def counter():
+    # 토크나이저 없이 근사 계산 (한글 음절 1개 = 1토큰)
+    return TokenCounter(tokenizer_name="")
+
+def _history(turns: int, length: int = 10):
+    history = []
+    for turn in range(turns):
+        history += [HumanMessage(content=f"질문{turn}" + "가" * length), AIMessage(content=f"답변{turn}" + "나" * length)]
+    return history
+
+def _builder(counter, context_window, **kwargs):
+    return PromptBuilder(SYSTEM_TEMPLATE, context_window=context_window, response_reserve=20, token_counter=counter, **kwargs)
+
+def _prompt_tokens(counter, result):
+    return sum(counter.count(message.content) + MESSAGE_OVERHEAD_TOKENS for message in result.messages)
+
+def test_truncate_respects_token_limit(counter):
+    text = "가나다라마바사아자차카타파하" * 3
+    truncated = counter.truncate(text, 10)
+    assert truncated.endswith("...")
+    assert counter.count(truncated) <= 10
+    assert counter.truncate(text, 100) == text
+    assert counter.truncate(text, 0) == ""
+
+def test_everything_fits_within_budget(counter):
+    history = _history(2)
+    result = _builder(counter, 400).build("오늘 날씨", history, {"user_name": "철수"}, RetrievalResult())
+    assert (result.history_messages_used, result.history_messages_dropped, result.history_summarized) == (4, 0, False)
+    assert result.messages[1:-1] == history
+    assert result.token_counts["total"] == _prompt_tokens(counter, result)
+    assert result.budget == 380
+
+def test_overflow_drops_oldest_history_first(counter):
+    history = _history(6) # 메시지당 15토큰 (내용 11 + 오버헤드 4)
+    builder = _builder(counter, 120)
+    result = builder.build("오늘 날씨", history, {"user_name": "철수"}, RetrievalResult())
+
+    kept = result.history_messages_used
+    assert 0 < kept < len(history)
+    assert result.history_messages_dropped == len(history) - kept
+    assert result.messages[1:-1] == history[-kept:]
+    assert isinstance(result.messages[1], HumanMessage)
+    assert result.token_counts["total"] == _prompt_tokens(counter, result) <= result.budget
+    # 하나 더 오래된 사용자 메시지까지 넣으면 예산을 넘어야 함 (최대한 많이 유지)
+    older_pair = sum(counter.count(message.content) + MESSAGE_OVERHEAD_TOKENS for message in history[-kept - 2:-kept])
+    assert result.token_counts["total"] + older_pair > result.budget
+
+def test_dropped_history_is_replaced_by_summary(counter):
+    history = _history(6)
+    summarized = []
+    def summarizer(dropped):
+        summarized.append(list(dropped))
+        return "앞선 대화 요약 " + "다" * 50
+    result = _builder(counter, 140, history_summary_budget=20).build("오늘 날씨", history, {"user_name": "철수"}, RetrievalResult(), summarizer)
+
+    assert result.history_summarized
+    assert len(summarized) == 1 and 0 < len(summarized[0]) <= result.history_messages_dropped # 예산에 넘친 가장 오래된 메시지들
+    assert summarized[0] == history[:len(summarized[0])]
+    summary_message = result.messages[1]
+    assert isinstance(summary_message, SystemMessage) and summary_message.content.startswith(HISTORY_SUMMARY_HEADER)
+    assert result.token_counts["history_summary"] <= 20
+    assert result.token_counts["total"] <= result.budget
+
+def test_missing_summary_does_not_shrink_history_budget(counter):
+    history = _history(6)
+    builder = _builder(counter, 140, history_summary_budget=20)
+    plain = builder.build("오늘 날씨", history, {"user_name": "철수"}, RetrievalResult())
+    calls = []
+    without_summary = builder.build("오늘 날씨", history, {"user_name": "철수"}, RetrievalResult(), lambda dropped: calls.append(dropped))
+
+    assert calls and not without_summary.history_summarized
+    assert without_summary.history_messages_used == plain.history_messages_used
+    assert without_summary.token_counts["history_summary"] == 0
+
+def test_stable_prefix_drops_history_in_steps(counter):
+    def build(history, step):
+        builder = PromptBuilder(STABLE_SYSTEM_TEMPLATE, context_template=CONTEXT_TEMPLATE, context_window=200, response_reserve=20,
+                                history_drop_step=step, token_counter=counter)
+        return builder.build("오늘 날씨", history, {"user_name": "철수"}, RetrievalResult())
+
+    history = _history(6)
+    minimal, stepped = build(history, 1), build(history, 4)
+    assert 0 < minimal.history_messages_dropped < stepped.history_messages_dropped
+    assert stepped.history_messages_dropped % 4 == 0
+    # [시스템(고정), 대화 기록..., 컨텍스트, 질문]
+    assert stepped.messages[0].content == "시스템 철수"
+    assert stepped.messages[1] == history[stepped.history_messages_dropped]
+    assert stepped.messages[-2].content.startswith("기억 ")
+    assert stepped.token_counts["total"] == _prompt_tokens(counter, stepped) <= stepped.budget
+
+    # 다음 턴에 대화가 늘어도 잘라내는 위치가 그대로라 대화 기록 접두부가 유지됨
+    next_turn = build(history + [HumanMessage(content="추가")], 4)
+    assert next_turn.history_messages_dropped == stepped.history_messages_dropped
+    assert next_turn.messages[:1 + stepped.history_messages_used] == stepped.messages[:1 + stepped.history_messages_used]
+
+def test_ltm_and_rag_sections_stay_within_their_budgets(counter):
+    memories = [
+        StoredMemoryEntry(id=n, session_id="s1", summary="기억" * 30, creation_time="2024-01-01T00:00:00", last_accessed_time="2024-01-01T00:00:00")
+        for n in range(5)
+    ]
+    documents = [Document(page_content="가" * 500, metadata={"source": "긴문서"}), Document(page_content="나" * 20, metadata={"source": "짧은문서"})]
+    builder = _builder(counter, 1000, ltm_budget=50, rag_budget=80)
+    result = builder.build("질문", [], {"user_name": "철수"}, RetrievalResult(memories=memories, rag_documents=documents))
+
+    assert result.token_counts["ltm"] <= 50
+    assert result.token_counts["rag"] <= 80
+    system_content = result.messages[0].content
+    assert "(ID:0," in system_content
+    assert "긴문서" in system_content and "짧은문서" in system_content # 첫 문서가 예산을 독차지하지 않음
+    assert result.token_counts["total"] == _prompt_tokens(counter, result)
@@ -0,0 +1,134 @@
+# claire_agent/tests/test_rag_ingestion.py
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from langchain_community.vectorstores import Chroma
+
+from benchmarks.pipeline_load import HashingEmbeddings
+from core.embedding_cache import CachedEmbeddings
+import core.rag_ingestion as rag_ingestion
+from core.rag_ingestion import PrecomputedEmbeddings, RagManifest, StreamingRagIngestion, sync_rag_index
+from core.sqlite_storage import SQLiteConnectionPool
+
+class CountingEmbeddings(HashingEmbeddings):
+    def __init__(self):
+        super().__init__(dim=64)
+        self.embedded_texts = 0
+
+    def embed_documents(self, texts):
+        self.embedded_texts += len(texts)
+        return super().embed_documents(texts)
+
+@pytest.fixture
+def docs_path(tmp_path):
+    path = tmp_path / "docs"
+    path.mkdir()
+    (path / "a.txt").write_text("alpha beta gamma", encoding="utf-8")
+    (path / "b.txt").write_text("delta epsilon", encoding="utf-8")
+    return str(path)
+
+def _sync(store, docs_path, tmp_path):
+    return sync_rag_index(store, docs_path=docs_path, manifest=RagManifest(str(tmp_path / "manifest.json")), num_workers=1)
+
+@pytest.mark.parametrize("cached", [True, False])
+def test_incremental_sync_embeds_each_chunk_once(tmp_path, docs_path, cached):
+    base = CountingEmbeddings()
+    embedding = CachedEmbeddings(base, model_name="hash", sqlite_pool=SQLiteConnectionPool(str(tmp_path / "cache.db"))) if cached else base
+    store = Chroma(persist_directory=str(tmp_path / "chroma"), embedding_function=embedding)
+
+    report = _sync(store, docs_path, tmp_path)
+    assert sorted(report.added_files) == ["a.txt", "b.txt"]
+    assert len(store.get(include=[])["ids"]) == 2
+    assert base.embedded_texts == 2 # 캐시 유무와 관계없이 청크마다 한 번만 계산
+
+    # 변경 없음 -> 재임베딩 없음, 변경/삭제 -> 해당 파일만 반영
+    assert not _sync(store, docs_path, tmp_path).index_changed
+    with open(os.path.join(docs_path, "a.txt"), "w", encoding="utf-8") as f:
+        f.write("alpha beta changed")
+    os.remove(os.path.join(docs_path, "b.txt"))
+    report = _sync(store, docs_path, tmp_path)
+    assert report.changed_files == ["a.txt"] and report.removed_files == ["b.txt"]
+    documents = store.get()["documents"]
+    assert documents == ["alpha beta changed"]
+
+@pytest.fixture
+def thread_pool(monkeypatch):
+    """spawn 워커 대신 같은 프로세스의 스레드 풀로 EmbeddingBatchRunner의 풀 경로를 실행합니다."""
+    started = []
+
+    def _executor(max_workers, mp_context=None, initializer=None, initargs=()):
+        started.append(max_workers)
+        return ThreadPoolExecutor(max_workers=max_workers)
+
+    monkeypatch.setattr(rag_ingestion, "ProcessPoolExecutor", _executor)
+    return started
+
+def _ingestion(store, docs_path, tmp_path):
+    ingestion = StreamingRagIngestion(store, docs_path=docs_path, manifest=RagManifest(str(tmp_path / "manifest.json")),
+                                      batch_size=1, num_workers=2)
+    ingestion.runner.pool_min_batches = 0
+    return ingestion
+
+def test_pool_results_reach_add_documents_without_persistent_cache(tmp_path, docs_path, thread_pool, monkeypatch):
+    base = CountingEmbeddings()
+    monkeypatch.setattr(rag_ingestion, "_worker_embedding_model", base)
+    lookup = PrecomputedEmbeddings(base)
+    store = Chroma(persist_directory=str(tmp_path / "chroma"), embedding_function=lookup)
+
+    report = _ingestion(store, docs_path, tmp_path).run()
+    assert thread_pool == [2]
+    assert sorted(report.added_files) == ["a.txt", "b.txt"]
+    assert base.embedded_texts == 2 # 워커가 계산한 벡터를 add_documents가 그대로 사용
+    assert lookup.get_cached(["alpha beta gamma", "delta epsilon"]) == [None, None] # upsert 후 조회층에 남지 않음
+
+def test_pool_unavailable_without_lookup_warns_and_embeds_serially(tmp_path, docs_path, thread_pool, capsys):
+    base = CountingEmbeddings()
+    store = Chroma(persist_directory=str(tmp_path / "chroma"), embedding_function=base)
+
+    report = _ingestion(store, docs_path, tmp_path).run()
+    assert thread_pool == []
+    assert sorted(report.added_files) == ["a.txt", "b.txt"]
+    assert base.embedded_texts == 2
+    assert capsys.readouterr().out.count("Warning: 2 embedding workers requested") == 1
+
+def test_manifest_is_saved_in_batches(tmp_path, docs_path, monkeypatch):
+    for n in range(3):
+        (tmp_path / "docs" / f"extra{n}.txt").write_text(f"extra {n}", encoding="utf-8")
+    manifest = RagManifest(str(tmp_path / "manifest.json"))
+    saves = []
+    original_save = manifest.save
+    monkeypatch.setattr(manifest, "save", lambda: (saves.append(len(manifest.files)), original_save()))
+    store = Chroma(persist_directory=str(tmp_path / "chroma"), embedding_function=HashingEmbeddings(dim=64))
+
+    StreamingRagIngestion(store, docs_path=docs_path, manifest=manifest, num_workers=1,
+                          save_every_files=2, save_interval_sec=3600).run()
+    assert saves == [2, 4, 5] # 파일마다가 아니라 2개마다, 그리고 끝에서 한 번
+    assert len(RagManifest(str(tmp_path / "manifest.json")).files) == 5
+
+class FailingEmbeddings(HashingEmbeddings):
+    """지정한 텍스트가 든 배치에서 실패하는 임베딩."""
+
+    def __init__(self, failing_text):
+        super().__init__(dim=64)
+        self.failing_text = failing_text
+
+    def embed_documents(self, texts):
+        if self.failing_text in texts:
+            raise RuntimeError("embedding failed")
+        return super().embed_documents(texts)
+
+def test_failed_batch_removes_chunks_already_written_for_the_file(tmp_path):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    (docs / "long.txt").write_text("첫 문단 내용\n\n둘째 문단 내용\n\n셋째 문단 내용", encoding="utf-8")
+    store = Chroma(persist_directory=str(tmp_path / "chroma"), embedding_function=FailingEmbeddings("셋째 문단 내용"))
+    ingestion = StreamingRagIngestion(store, docs_path=str(docs), manifest=RagManifest(str(tmp_path / "manifest.json")),
+                                      batch_size=1, num_workers=1)
+    ingestion.text_splitter = rag_ingestion.RecursiveCharacterTextSplitter(chunk_size=10, chunk_overlap=0)
+
+    report = ingestion.run()
+    assert report.failed_files == ["long.txt"]
+    assert report.chunks_added == 2 and report.chunks_deleted == 2
+    assert store.get(include=[])["ids"] == [] # 매니페스트에 없는 청크가 남지 않음
+    assert "long.txt" not in RagManifest(str(tmp_path / "manifest.json")).files
@@ -0,0 +1,109 @@
+# claire_agent/tests/test_response_cache.py
+import os
+
+import pytest
+from langchain.docstore.document import Document
+
+import core.response_cache as response_cache_module
+from conftest import FakeChatLLM
+from core.chat_pipeline import ChatSession
+from core.response_cache import SemanticResponseCache, context_fingerprint, rag_fingerprint
+
+DOCS = [Document(page_content="환불은 구매 후 7일 이내", metadata={"source": "policy.md", "content_hash": "a1"})]
+
+@pytest.fixture
+def cache(tmp_path):
+    return SemanticResponseCache(similarity_threshold=0.95, ttl_sec=60, max_entries=2, manifest_path=str(tmp_path / "manifest.json"))
+
+def _run(pipeline, session, query):
+    events = list(pipeline.stream_turn(session, query))
+    assert events[-1].type == "done"
+    return events[-1].data
+
+def test_rag_fingerprint_ignores_order_and_falls_back_without_ids():
+    first = Document(page_content="가", metadata={"source": "a.md"}, id="chunk-1")
+    second = Document(page_content="나", metadata={"source": "b.md"})
+    assert rag_fingerprint([first, second]) == rag_fingerprint([second, first])
+    assert rag_fingerprint([second]) != rag_fingerprint([Document(page_content="다", metadata={"source": "b.md"})])
+
+def test_context_fingerprint_depends_on_memories_and_profile():
+    profile = {"name": "철수", "preferences_summary": "짧은 답변"}
+    assert context_fingerprint([3, 1], profile) == context_fingerprint([1, 3], dict(reversed(list(profile.items()))))
+    assert context_fingerprint([1], profile) != context_fingerprint([2], profile)
+    assert context_fingerprint([1], profile) != context_fingerprint([1], dict(profile, name="영희"))
+
+def test_lookup_matches_model_documents_context_and_similarity(cache):
+    cache.store("환불 기간?", [1.0, 0.0], "model-a", DOCS, "7일입니다.", context_key="ctx")
+    assert cache.lookup([0.99, 0.05], "model-a", DOCS, "ctx").response == "7일입니다."
+    assert cache.lookup([1.0, 0.0], "model-b", DOCS, "ctx") is None
+    assert cache.lookup([1.0, 0.0], "model-a", [], "ctx") is None
+    assert cache.lookup([1.0, 0.0], "model-a", DOCS, "other") is None
+    assert cache.lookup([0.0, 1.0], "model-a", DOCS, "ctx") is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 4
+
+def test_entries_expire_after_ttl(cache, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(response_cache_module.time, "time", lambda: now[0])
+    cache.store("질문", [1.0, 0.0], "m", DOCS, "답변")
+    now[0] += 59
+    assert cache.lookup([1.0, 0.0], "m", DOCS) is not None
+    now[0] += 2
+    assert cache.lookup([1.0, 0.0], "m", DOCS) is None
+    assert cache.stats()["entries"] == 0
+
+def test_least_recently_used_entry_is_evicted(cache):
+    cache.store("첫째", [1.0, 0.0, 0.0], "m", DOCS, "1")
+    cache.store("둘째", [0.0, 1.0, 0.0], "m", DOCS, "2")
+    assert cache.lookup([1.0, 0.0, 0.0], "m", DOCS).response == "1" # 첫째를 최근 사용으로 갱신
+    cache.store("셋째", [0.0, 0.0, 1.0], "m", DOCS, "3")
+    assert cache.lookup([0.0, 1.0, 0.0], "m", DOCS) is None
+    assert cache.lookup([1.0, 0.0, 0.0], "m", DOCS).response == "1"
+
+def test_rag_manifest_change_clears_cache(cache):
+    cache.store("질문", [1.0, 0.0], "m", DOCS, "답변")
+    with open(cache.manifest_path, "w", encoding="utf-8") as f:
+        f.write("{}")
+    os.utime(cache.manifest_path, (1, 1))
+    assert cache.lookup([1.0, 0.0], "m", DOCS) is None
+    assert cache.stats()["invalidations"] == 1
+
+def test_first_question_with_rag_context_is_reused(chat_pipeline_factory, cache):
+    llm = FakeChatLLM("환불은 7일 이내입니다.")
+    pipeline = chat_pipeline_factory(llm=llm, rag_documents=DOCS, response_cache=cache)
+    assert _run(pipeline, ChatSession(session_id="a"), "환불 기간 알려줘")["cache_hit"] is False
+    reused = _run(pipeline, ChatSession(session_id="b"), "환불 기간 알려줘")
+    assert reused["cache_hit"] is True
+    assert reused["response"] == "환불은 7일 이내입니다."
+    assert len(llm.calls) == 1
+
+def test_follow_up_in_another_session_is_not_served_from_cache(chat_pipeline_factory, cache):
+    # 세션 A의 후속 질문 답변이 RAG 근거 없이 모델명 + 질의 임베딩만으로 세션 B에 재사용되던 경우
+    llm = FakeChatLLM("앞의 설명을 이어서 자세히 말씀드릴게요.")
+    pipeline = chat_pipeline_factory(llm=llm, response_cache=cache)
+    session_a = ChatSession(session_id="a")
+    _run(pipeline, session_a, "파이썬 제너레이터가 뭐야?")
+    _run(pipeline, session_a, "더 자세히 설명해줘")
+
+    session_b = ChatSession(session_id="b")
+    _run(pipeline, session_b, "러스트 소유권이 뭐야?")
+    follow_up = _run(pipeline, session_b, "더 자세히 설명해줘")
+    assert follow_up["cache_hit"] is False
+    assert len(llm.calls) == 4
+    assert cache.stats()["entries"] == 0
+
+def test_follow_up_with_history_skips_cache_even_with_rag_context(chat_pipeline_factory, cache):
+    llm = FakeChatLLM()
+    pipeline = chat_pipeline_factory(llm=llm, rag_documents=DOCS, response_cache=cache)
+    session_a = ChatSession(session_id="a")
+    _run(pipeline, session_a, "환불 규정 알려줘")
+    _run(pipeline, session_a, "계속해")
+    session_b = ChatSession(session_id="b")
+    _run(pipeline, session_b, "배송 규정 알려줘")
+    assert _run(pipeline, session_b, "계속해")["cache_hit"] is False
+    assert cache.stats()["entries"] == 2 # 첫 질문 두 개만 저장
+
+def test_different_user_profile_misses(chat_pipeline_factory, cache):
+    llm = FakeChatLLM()
+    pipeline = chat_pipeline_factory(llm=llm, rag_documents=DOCS, response_cache=cache)
+    _run(pipeline, ChatSession(session_id="a", user_profile={"name": "철수"}), "환불 기간 알려줘")
+    assert _run(pipeline, ChatSession(session_id="b", user_profile={"name": "영희"}), "환불 기간 알려줘")["cache_hit"] is False
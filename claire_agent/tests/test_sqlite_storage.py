@@ -0,0 +1,93 @@
+# claire_agent/tests/test_sqlite_storage.py
+import sqlite3
+import threading
+
+import pytest
+
+from core.sqlite_storage import SQLiteConnectionPool, chunked, placeholders
+
+@pytest.fixture
+def table_pool(sqlite_pool):
+    sqlite_pool.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT UNIQUE NOT NULL)")
+    return sqlite_pool
+
+def _names(pool):
+    return [row[0] for row in pool.execute("SELECT name FROM items ORDER BY id")]
+
+def test_transaction_commits_all_statements(table_pool):
+    with table_pool.transaction() as conn:
+        conn.execute("INSERT INTO items (name) VALUES ('a')")
+        conn.execute("INSERT INTO items (name) VALUES ('b')")
+    assert _names(table_pool) == ["a", "b"]
+
+def test_transaction_rolls_back_on_exception(table_pool):
+    with pytest.raises(RuntimeError):
+        with table_pool.transaction() as conn:
+            conn.execute("INSERT INTO items (name) VALUES ('a')")
+            raise RuntimeError("boom")
+    assert _names(table_pool) == []
+
+def test_transaction_keeps_original_error_when_sqlite_already_rolled_back(table_pool):
+    # 블록 안에서 트랜잭션이 이미 끝난 경우에도 ROLLBACK 오류가 원래 예외를 가리지 않아야 함
+    with pytest.raises(ValueError, match="original"):
+        with table_pool.transaction() as conn:
+            conn.execute("INSERT INTO items (name) VALUES ('a')")
+            conn.execute("ROLLBACK")
+            raise ValueError("original")
+    assert _names(table_pool) == []
+
+def test_constraint_error_is_rolled_back_and_connection_reusable(table_pool):
+    table_pool.execute("INSERT INTO items (name) VALUES ('a')", commit=True)
+    with pytest.raises(sqlite3.IntegrityError):
+        with table_pool.transaction() as conn:
+            conn.execute("INSERT INTO items (name) VALUES ('b')")
+            conn.execute("INSERT INTO items (name) VALUES ('a')")
+    assert _names(table_pool) == ["a"]
+    _, last_id = table_pool.execute("INSERT INTO items (name) VALUES ('c')", commit=True)
+    assert last_id is not None and _names(table_pool) == ["a", "c"]
+
+def test_executemany_returns_rowcount(table_pool):
+    assert table_pool.executemany("INSERT INTO items (name) VALUES (?)", [("x",), ("y",), ("z",)]) == 3
+    assert table_pool.execute("SELECT COUNT(*) FROM items", fetch_one=True)[0] == 3
+
+def test_exhausted_pool_raises_sqlite_error(table_pool):
+    with table_pool.connection(), table_pool.connection():
+        with pytest.raises(sqlite3.OperationalError, match="pool exhausted"):
+            with table_pool.connection():
+                pass
+    # 반납 후에는 다시 사용 가능
+    assert table_pool.execute("SELECT 1", fetch_one=True)[0] == 1
+
+def test_waiter_gets_connection_released_by_other_thread(db_path):
+    pool = SQLiteConnectionPool(db_path, pool_size=1, busy_timeout_sec=2)
+    released = threading.Event()
+    results = []
+
+    def borrower():
+        with pool.connection():
+            released.wait(1)
+
+    thread = threading.Thread(target=borrower)
+    thread.start()
+    try:
+        threading.Timer(0.05, released.set).start()
+        results.append(pool.execute("SELECT 1", fetch_one=True)[0])
+    finally:
+        thread.join()
+        pool.close()
+    assert results == [1]
+
+def test_registered_function_available_on_all_connections(sqlite_pool):
+    sqlite_pool.register_function("double_it", 1, lambda value: value * 2)
+    with sqlite_pool.connection() as first, sqlite_pool.connection() as second:
+        assert first.execute("SELECT double_it(2)").fetchone()[0] == 4
+        assert second.execute("SELECT double_it(3)").fetchone()[0] == 6
+
+def test_closed_pool_rejects_use(sqlite_pool):
+    sqlite_pool.close()
+    with pytest.raises(sqlite3.ProgrammingError):
+        sqlite_pool.execute("SELECT 1")
+
+def test_chunked_and_placeholders():
+    assert [list(chunk) for chunk in chunked(list(range(5)), 2)] == [[0, 1], [2, 3], [4]]
+    assert placeholders(3) == "?,?,?"
@@ -0,0 +1,125 @@
+# claire_agent/tests/test_vector_backends.py
+import json
+import os
+
+import pytest
+from langchain_core.documents import Document
+
+from conftest import insert_memory
+from core.vector_backends import ChromaMemoryBackend, MemoryVectorBackend, NumpyMemoryBackend
+
+def _document(sqlite_id: int, text: str) -> Document:
+    return Document(page_content=text, metadata={"sqlite_id": sqlite_id})
+
+def _store(pool, backend, text: str, **kwargs) -> int:
+    memory_id = insert_memory(pool, text, **kwargs)
+    backend.upsert([_document(memory_id, text)], ids=[str(memory_id)])
+    return memory_id
+
+def _read_index(backend) -> dict:
+    with open(os.path.join(backend.path, backend.INDEX_FILE), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def test_backend_missing_methods_cannot_be_instantiated():
+    class PartialBackend(MemoryVectorBackend):
+        def count(self) -> int:
+            return 0
+
+    with pytest.raises(TypeError):
+        PartialBackend()
+
+def test_numpy_upsert_overwrites_by_vector_id(memory_db, memory_backend, embeddings):
+    apple = _store(memory_db, memory_backend, "사과 과수원 산책")
+    _store(memory_db, memory_backend, "기차 여행 계획")
+    assert memory_backend.count() == 2
+
+    memory_backend.upsert([_document(apple, "바다 수영 연습")], ids=[str(apple)])
+    assert memory_backend.count() == 2
+    top_id, distance = memory_backend.search(embeddings.embed_query("바다 수영 연습"), k=1)[0]
+    assert top_id == apple
+    assert distance == pytest.approx(0.0, abs=1e-5)
+
+def test_numpy_delete_keeps_remaining_rows_searchable(memory_db, memory_backend, embeddings):
+    texts = ["사과 과수원 산책", "기차 여행 계획", "바다 수영 연습", "피아노 연주회"]
+    ids = [_store(memory_db, memory_backend, text) for text in texts]
+
+    memory_backend.delete([str(ids[0])]) # 마지막 행이 첫 자리로 옮겨짐
+    memory_backend.delete_by_sqlite_ids([ids[2]])
+    assert memory_backend.list_ids() == {str(ids[1]), str(ids[3])}
+    assert set(memory_backend.load_embeddings()) == {ids[1], ids[3]}
+    for memory_id, text in ((ids[1], texts[1]), (ids[3], texts[3])):
+        assert memory_backend.search(embeddings.embed_query(text), k=1)[0][0] == memory_id
+
+def test_numpy_search_filters_through_sqlite_rows(memory_db, memory_backend, embeddings):
+    parent = _store(memory_db, memory_backend, "여름 휴가 요약", session_id="s1", tier=1)
+    child = _store(memory_db, memory_backend, "여름 휴가 바다", session_id="s1", parent_id=parent)
+    other = _store(memory_db, memory_backend, "여름 휴가 산", session_id="s2")
+    query = embeddings.embed_query("여름 휴가")
+
+    assert {sqlite_id for sqlite_id, _ in memory_backend.search(query, k=10, where={"session_id": "s2"})} == {other}
+    assert {sqlite_id for sqlite_id, _ in memory_backend.search(query, k=10, where={"parent_id": 0})} == {parent, other}
+    assert [sqlite_id for sqlite_id, _ in memory_backend.search(query, k=10, where={"sqlite_id": {"$in": [child]}})] == [child]
+    assert memory_backend.search(query, k=10, where={"sqlite_id": {"$in": []}}) == []
+    with pytest.raises(ValueError):
+        memory_backend.search(query, k=1, where={"keywords": "휴가"})
+
+def test_numpy_writes_append_to_log_instead_of_rewriting_index(tmp_path, memory_db, embeddings):
+    path = str(tmp_path / "logged")
+    backend = NumpyMemoryBackend(path, embeddings, sqlite_pool=memory_db)
+    first = _store(memory_db, backend, "사과 과수원 산책") # 새 저장소는 index.json부터 생성
+    index_before = _read_index(backend)
+
+    second = _store(memory_db, backend, "기차 여행 계획")
+    third = _store(memory_db, backend, "바다 수영 연습")
+    backend.delete([str(first)])
+    assert _read_index(backend) == index_before
+    with open(backend._log_path(), "r", encoding="utf-8") as f:
+        assert len(f.readlines()) == 3
+
+    reopened = NumpyMemoryBackend(path, embeddings, sqlite_pool=memory_db) # close() 없이 다시 열어도 기록으로 복원
+    assert reopened.list_ids() == {str(second), str(third)}
+    assert reopened.search(embeddings.embed_query("기차 여행 계획"), k=1)[0][0] == second
+    assert sorted(_read_index(reopened)["ids"]) == sorted([str(second), str(third)])
+    assert [name for name in os.listdir(path) if name.endswith(".log")] == [] # 다시 열 때 기록을 합침
+
+def test_numpy_log_compacts_into_index(tmp_path, memory_db, embeddings):
+    path = str(tmp_path / "compacted")
+    backend = NumpyMemoryBackend(path, embeddings, sqlite_pool=memory_db, compact_min_entries=2)
+    ids = [_store(memory_db, backend, f"기억 {n}") for n in range(3)]
+    assert _read_index(backend)["ids"] == [str(memory_id) for memory_id in ids] # 첫 쓰기 이후 기록 2건이 쌓여 합쳐짐
+    assert not os.path.exists(backend._log_path())
+
+    _store(memory_db, backend, "마지막 기억")
+    backend.close()
+    assert len(_read_index(backend)["ids"]) == 4
+    assert [name for name in os.listdir(path) if name.endswith(".log")] == []
+
+def test_numpy_ignores_truncated_log_line(tmp_path, memory_db, embeddings):
+    path = str(tmp_path / "truncated")
+    backend = NumpyMemoryBackend(path, embeddings, sqlite_pool=memory_db)
+    first = _store(memory_db, backend, "사과 과수원 산책")
+    second = _store(memory_db, backend, "기차 여행 계획")
+    with open(backend._log_path(), "a", encoding="utf-8") as f:
+        f.write('{"op": "upsert", "ids": ["99"')
+
+    reopened = NumpyMemoryBackend(path, embeddings, sqlite_pool=memory_db)
+    assert reopened.count() == 2
+    third = _store(memory_db, reopened, "바다 수영 연습")
+    assert NumpyMemoryBackend(path, embeddings, sqlite_pool=memory_db).list_ids() == {str(first), str(second), str(third)}
+
+def test_chroma_backend_uses_collection_through_store(tmp_path, memory_db, embeddings):
+    from langchain_community.vectorstores import Chroma
+
+    store = Chroma(collection_name="memories", persist_directory=str(tmp_path / "chroma"), embedding_function=embeddings)
+    backend = ChromaMemoryBackend(store)
+    ids = [insert_memory(memory_db, f"기억 {n}") for n in range(3)]
+    backend.upsert([_document(memory_id, f"기억 {memory_id}") for memory_id in ids], ids=[str(memory_id) for memory_id in ids])
+
+    assert backend.count() == 3
+    assert backend.list_ids(page_size=2) == {str(memory_id) for memory_id in ids}
+    assert set(backend.load_embeddings(page_size=1)) == set(ids)
+
+    backend.delete_by_sqlite_ids([ids[0], 12345])
+    backend.delete([str(ids[1])])
+    assert backend.list_ids() == {str(ids[2])}
+    assert backend.count() == 1
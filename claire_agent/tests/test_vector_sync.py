@@ -0,0 +1,78 @@
+# claire_agent/tests/test_vector_sync.py
+import pytest
+from langchain_core.documents import Document
+
+from conftest import insert_memory
+from core.vector_sync import VectorSyncJournal, reconcile_vector_store
+
+@pytest.fixture
+def journal(memory_db, memory_backend):
+    return VectorSyncJournal(memory_db, memory_backend, batch_size=2)
+
+def _enqueue(pool, memory_ids, op="upsert"):
+    with pool.transaction() as conn:
+        VectorSyncJournal.enqueue(conn, memory_ids, op=op)
+
+def test_replay_applies_current_sqlite_state(journal, memory_db, memory_backend):
+    ids = [insert_memory(memory_db, f"기억 {n}") for n in range(3)]
+    _enqueue(memory_db, ids + [ids[0]]) # 같은 기억에 대한 중복 작업
+
+    assert journal.pending_count() == 4
+    assert journal.replay() == 4 # batch_size=2: [0, 1], [2, 0] (중복 제거는 배치 안에서만)
+    assert journal.pending_count() == 0
+    assert memory_backend.list_ids() == {str(memory_id) for memory_id in ids}
+
+    memory_db.execute("DELETE FROM long_term_memories WHERE id = ?", (ids[1],), commit=True)
+    _enqueue(memory_db, [ids[1]], op="delete")
+    journal.replay()
+    assert memory_backend.list_ids() == {str(ids[0]), str(ids[2])}
+
+def test_replay_is_idempotent(journal, memory_db, memory_backend):
+    memory_id = insert_memory(memory_db, "반복 적용")
+    for _ in range(2):
+        _enqueue(memory_db, [memory_id])
+        journal.replay()
+    assert memory_backend.count() == 1
+    assert journal.replay() == 0
+
+def test_rolled_back_transaction_leaves_no_outbox_entry(journal, memory_db):
+    with pytest.raises(RuntimeError):
+        with memory_db.transaction() as conn:
+            VectorSyncJournal.enqueue(conn, [1])
+            raise RuntimeError("abort")
+    assert journal.pending_count() == 0
+
+def test_failed_replay_keeps_operations_for_retry(journal, memory_db, memory_backend, monkeypatch):
+    memory_id = insert_memory(memory_db, "재시도 대상")
+    _enqueue(memory_db, [memory_id])
+
+    def broken_upsert(documents, ids):
+        raise RuntimeError("vector store down")
+    monkeypatch.setattr(memory_backend, "upsert", broken_upsert)
+    assert journal.replay() == 0
+    attempts, last_error = memory_db.execute("SELECT attempts, last_error FROM vector_outbox", fetch_one=True)
+    assert (attempts, last_error) == (1, "vector store down")
+
+    monkeypatch.undo()
+    assert journal.replay() == 1
+    assert journal.pending_count() == 0
+    assert memory_backend.list_ids() == {str(memory_id)}
+
+def test_reconcile_repairs_drift_and_is_idempotent(journal, memory_db, memory_backend):
+    synced = insert_memory(memory_db, "동기화됨")
+    missing = insert_memory(memory_db, "벡터 누락")
+    no_vector_id = insert_memory(memory_db, "vector_id 없음")
+    memory_db.execute("UPDATE long_term_memories SET vector_id = NULL WHERE id = ?", (no_vector_id,), commit=True)
+    _enqueue(memory_db, [synced])
+    journal.replay()
+    memory_backend.upsert([Document(page_content="고아", metadata={"sqlite_id": 999, "tier": 0, "parent_id": 0})], ids=["999"])
+
+    report = reconcile_vector_store(journal, page_size=1)
+    assert (report.sqlite_rows, report.vector_count, report.orphan_vectors, report.missing_vectors) == (3, 2, 1, 2)
+    assert report.repaired
+    assert memory_backend.list_ids() == {str(synced), str(missing), str(no_vector_id)}
+    assert memory_db.execute("SELECT vector_id FROM long_term_memories WHERE id = ?", (no_vector_id,), fetch_one=True)[0] == str(no_vector_id)
+
+    again = reconcile_vector_store(journal)
+    assert (again.orphan_vectors, again.missing_vectors, again.repaired) == (0, 0, False)
+    assert memory_backend.count() == 3